@@ -8,9 +8,61 @@ POST /pattern
     current in-memory disk image.  Returns the pattern number and
     dimensions.
 
+POST /pattern/frames
+    Upload an animated GIF or multi-page TIFF and write every frame as a
+    pattern, numbered consecutively from the given number, in one batch:
+    either all frames are written or none are.
+
+POST /pattern/colours
+    Upload a colour image, quantise it to a few yarn colours and write one
+    pattern per colour (Fair Isle separation), numbered consecutively, in
+    one batch.
+
+GET /pattern/{number}/repeat
+    Report the smallest repeat of a stored pattern, the smallest tile the
+    pattern is a whole number of, and the bytes storing only that tile
+    would save.  POST /pattern accepts ``store_tile`` to store just that
+    tile of a new upload.
+
+GET /pattern/{number}/floats
+    List the floats longer than max_float in a stored pattern, with a
+    heatmap; POST /pattern/{number}/floats/fix inserts tie-down stitches.
+    POST /preview reports and POST /pattern can fix floats in uploads.
+
+POST /disk/trim
+    Crop every stored pattern to its knit bounding box and compact the
+    disk image.  POST /pattern and POST /preview accept ``auto_trim`` to do
+    the same for a new upload.
+
+GET /disk/thumbnails
+    Return thumbnails of every stored pattern as one sprite-sheet PNG plus
+    an index of sprite positions, cached until the disk image changes.
+    Pattern previews and the sprite sheet are re-rendered in the
+    background after each change, so both are normally served from memory.
+
 GET /patterns
     List all patterns currently stored in the in-memory disk image.
 
+GET /pattern/{number}/pixels, PUT /pattern/{number}
+    Read and overwrite a stored pattern for the pixel editor.  Pixels travel
+    as a JSON grid or, much smaller, as base64 packed bits or per-row run
+    lengths (?format=packed|rle).  ?format=binary (or Accept:
+    application/octet-stream) and PUT /pattern/{number}/pixels exchange the
+    packed rows as a raw body.
+
+PATCH /pattern/{number}
+    Apply changed cells, row ranges and memo entries to a stored pattern
+    in place, without re-encoding the disk, and return the new ETag, so
+    the editor can autosave cheaply.  If-Match guards against overwriting
+    a newer version.
+
+GET /patterns, /disk/status, /disk/thumbnails, /preview/pattern/{number},
+GET /pattern/{number}/pixels
+    Carry strong ETags and answer If-None-Match with 304 Not Modified.
+    Disk-wide responses are tagged with the disk generation, which changes
+    on every write, upload, reset and receive; per-pattern ones with the
+    pattern's content hash.
+
 POST /send
     Send the current disk image to the machine via the serial emulator.
     The emulator runs in a background thread; this endpoint returns
@@ -25,13 +77,76 @@ GET /preview
     1-bit preview as a PNG, without touching the disk image.  Useful
     for the frontend live-preview feature.
 
-All state (disk image, emulator thread) lives in app-level singletons so
-that a single `uvicorn app.api:app` process holds the machine state.
+GET /preview/pattern/{number}/fabric
+    Render a stored pattern as knitted fabric (V-shaped stitches in two
+    yarn colours at the 4:3 stitch aspect), cached by pattern content.
+
+GET /preview/pattern/{number}.png, POST /preview.png
+    Binary image/png variants of the two preview endpoints, without the
+    base64 data-URI overhead.  All previews are 1-bit PNGs and accept a
+    compress_level (0–9).
+
+POST /preview/sweep
+    Accept one image upload plus a JSON list of parameter sets and return
+    a preview for each (optionally also as one contact sheet), together
+    with an Otsu-suggested threshold.  The image is decoded only once.
+
+GET /metrics
+    Server metrics in the Prometheus text format: request latency per
+    route, image pipeline and pattern codec timings, cache hit and miss
+    counts, and the serial emulator's traffic, commands and timeouts.
+
+Every response carries a Server-Timing header breaking the request down
+into stages (image decoding, scaling and binarising, pattern encoding,
+PNG and base64 encoding, ...; see app.timing), which browser developer
+tools show next to the request.
+
+POST /admin/profile, GET /admin/profile, GET /admin/profile/{id}
+    Profile the next N requests to a route, or the next emulator
+    sessions, with cProfile or tracemalloc, and download the results as
+    pstats, collapsed stacks (for flame graphs) or text.  Needs
+    KNITTING_ADMIN_TOKEN to be set and sent as a bearer token.
+
+GET /static/{file}
+    The browser frontend (frontend.html, .css and .js), gzip- or
+    brotli-compressed ahead of time.  Content-hashed names such as
+    frontend.<hash>.js are cached as immutable; the plain names revalidate
+    with an ETag.
+
+GET /ports/discovery
+    Progress of the FTDI port discovery that picks the default machine's
+    serial port.  It runs in the background after startup, so the server
+    answers requests straight away.
+
+GET /machines, POST /machines, DELETE /machines/{name}
+    List, add and remove machine profiles.  Every route above (and
+    /config) also exists under /machines/{name}/... and then acts on that
+    machine's own serial port, disk image and tasks; the plain paths act on
+    the "default" machine.  Transfers to different machines run in
+    parallel.  KNITTING_MACHINES=name=port,... adds profiles at startup.
+
+All state (machines, emulator threads) lives in app-level singletons so
+that a single `uvicorn app.api:app` process drives every machine.  Disk
+images are copy-on-write: every change publishes a new DiskImage, so
+requests and sends reading the disk never block and never see a half-done
+write (see _Machine).
+
+Image conversion, upload previews and the disk rebuilds behind PUT and
+DELETE /pattern/{number} run in a pool of worker processes (see
+app.workers), so they do not hold up other requests.  Set the
+KNITTING_WORKERS environment variable to size the pool; 0 runs that work
+in threads instead.
+
+The disk image and the sector files received from the machine are saved
+in the configured disk_dir (see app.persistence): every change is
+journalled before the request returns, and the state is restored when the
+server starts.
 
 Logging
 -------
 Hardware-interaction events are logged to logs/knitting_machine.log
-(rotating, 5 MB × 3 backups) and mirrored to stderr.  The logger name
+(rotating, 5 MB × 3 backups; opened when the server starts, not on
+import) and mirrored to stderr.  The logger name
 is "knitting_machine".  Set the LOG_LEVEL environment variable to
 override the default level (INFO).
 """
@@ -43,74 +158,174 @@ import io
 import logging
 import logging.handlers
 import os
+import re
+import secrets
 import threading
+import time
 import uuid
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Annotated
-
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from typing import Annotated, Any, Literal
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
-from fastapi.staticfiles import StaticFiles
-from PIL import Image
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app import timing
 from app.brother_format import DiskImage, MachineModel
-from app.image import DitherMode, ImageError, Rotation, load_image
+from app.floats import DEFAULT_MAX_FLOAT, FloatRun, find_floats, float_heatmap
+from app.render import (
+    DEFAULT_CELL,
+    cached_fabric_png,
+    fabric_key,
+    fabric_png,
+    store_fabric_png,
+)
+from app.static_assets import StaticAssets
+from app.metrics import CONTENT_TYPE, REGISTRY
+from app.persistence import DiskStore
+from app.profiling import EMULATOR, Profile, ProfileFormat, Profiler, Trigger
+from app.image import (
+    MAX_SEPARATION_COLOURS,
+    DitherMode,
+    ImageError,
+    ImageResult,
+    Rotation,
+    SweepVariant,
+    separate_colours,
+)
 from app.ports import PortDiscoveryError, PortInfo, discover_ftdi_port, list_all_ports
+from app.thumbnails import ThumbnailStore, disk_sprite_sheet, pattern_png
+from app.util import (
+    bytes_per_pattern_and_memo,
+    clear_padding,
+    find_repeat,
+    pack_rows,
+    packed_row_bytes,
+    rle_decode_rows,
+    rle_encode_rows,
+)
+from app.workers import (
+    CompactionError,
+    Preview,
+    WorkerPool,
+    convert_frames,
+    convert_image,
+    default_workers,
+    rebuild_disk,
+    render_preview,
+    render_sweep,
+)
 
 # ---------------------------------------------------------------------------
 # Logging setup
 # ---------------------------------------------------------------------------
 
 _LOG_DIR = Path("logs")
-_LOG_DIR.mkdir(exist_ok=True)
-
 _LOG_FILE = _LOG_DIR / "knitting_machine.log"
 _LOG_FORMAT = "%(asctime)s  %(levelname)-8s  %(threadName)s  %(message)s"
 _LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 _log_level = getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO)
 
-_file_handler = logging.handlers.RotatingFileHandler(
-    _LOG_FILE,
-    maxBytes=5 * 1024 * 1024,  # 5 MB
-    backupCount=3,
-    encoding="utf-8",
-)
-_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT, datefmt=_LOG_DATE_FORMAT))
-
 _stderr_handler = logging.StreamHandler()
 _stderr_handler.setFormatter(logging.Formatter(_LOG_FORMAT, datefmt=_LOG_DATE_FORMAT))
 
 log = logging.getLogger("knitting_machine")
 log.setLevel(_log_level)
-log.addHandler(_file_handler)
 log.addHandler(_stderr_handler)
 log.propagate = False  # don't double-log via the root logger
 
 logging.getLogger("app.serial_emulator").setLevel(_log_level)
 
+# Added by _open_log_file when the server starts, so that importing this
+# module does not touch the file system.
+_file_handler: logging.Handler | None = None
+
+
+def _open_log_file() -> None:
+    """Log to _LOG_FILE as well as stderr, from now on.
+
+    If the log directory cannot be created, a WARNING is logged and logging
+    continues on stderr only.
+    """
+    global _file_handler
+    if _file_handler is not None:
+        return
+    try:
+        _LOG_DIR.mkdir(exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            _LOG_FILE,
+            maxBytes=5 * 1024 * 1024,  # 5 MB
+            backupCount=3,
+            encoding="utf-8",
+            delay=True,  # opened on the first record
+        )
+    except OSError as exc:
+        log.warning("Logging to stderr only: cannot use %s: %s", _LOG_DIR, exc)
+        return
+    handler.setFormatter(logging.Formatter(_LOG_FORMAT, datefmt=_LOG_DATE_FORMAT))
+    log.addHandler(handler)
+    _file_handler = handler
+
+
 # ---------------------------------------------------------------------------
 # Application state
 # ---------------------------------------------------------------------------
 
+# Name of the machine that the routes without a /machines/{name} prefix use.
+DEFAULT_MACHINE = "default"
+
+
+class _Machine:
+    """Mutable state of one knitting machine.
+
+    Every machine has its own serial port, disk image, sector files and
+    emulator tasks, so transfers to machines on different ports run side by
+    side.  The routes in _machine_routes serve the default machine at their
+    plain paths and every machine under /machines/{name}.
 
-class _AppState:
-    """Single-process mutable state.  Not thread-safe for concurrent
-    pattern writes; good enough for a single-user machine-side tool."""
+    ``disk`` is copy-on-write: a DiskImage, once published there, is never
+    changed again.  Readers take ``disk`` once per request and work on that
+    object without locking, so they always see one consistent state, even
+    across a concurrent write.  Writers go through _editing_disk() or
+    _publish_disk(), which serialise on ``disk_lock``, change a private
+    copy and publish it by replacing ``disk``.
+    """
 
-    def __init__(self) -> None:
-        self.model: MachineModel = MachineModel.KH940
+    def __init__(
+        self,
+        name: str = DEFAULT_MACHINE,
+        *,
+        model: MachineModel = MachineModel.KH940,
+        serial_port: str = "",
+        baud_rate: int = 9600,
+        disk_dir: str = "/tmp/knitting_disk",
+    ) -> None:
+        self.name = name
+        self.model: MachineModel = model
         self.disk: DiskImage = DiskImage.blank(self.model)
-        # My cable is /dev/tty.usbserial-FT3Q58M1
-        self.serial_port: str = ""
-        self.baud_rate: int = 9600
-        self.disk_dir: str = "/tmp/knitting_disk"
+        self.disk_lock = threading.Lock()
+        self.serial_port: str = serial_port
+        self.baud_rate: int = baud_rate
+        self.disk_dir: str = disk_dir
         self.tasks: dict[str, "_TaskState"] = {}
         # Sector files persisted from the last machine save operation.
         # These are the .dat and .id files the machine itself wrote, including
@@ -119,31 +334,206 @@ class _AppState:
         # sectors by ID.  Both dicts map sector number (0–79) → raw bytes.
         self.sector_dat: dict[int, bytes] = {}
         self.sector_id: dict[int, bytes] = {}
+        # Preview PNGs of this disk's patterns, re-rendered in the background
+        # whenever the disk changes (see _disk_changed).
+        self.thumbnails = ThumbnailStore()
+        # Durable copy of the disk state in disk_dir; opened by the lifespan,
+        # so nothing is written while it is not running (see app.persistence).
+        self.persistence = DiskStore()
+
 
+def _machines_from_env() -> dict[str, _Machine]:
+    """Machine profiles from KNITTING_MACHINES, plus the default machine.
+
+    KNITTING_MACHINES is a comma-separated list of ``name=serial_port``;
+    each named machine keeps its disk state in /tmp/knitting_disk-<name>.
+    """
+    machines = {DEFAULT_MACHINE: _Machine()}
+    for item in os.environ.get("KNITTING_MACHINES", "").split(","):
+        name, _, port = item.strip().partition("=")
+        if not name:
+            continue
+        if not _MACHINE_NAME.fullmatch(name) or name in machines:
+            log.warning("Ignoring machine profile %r in KNITTING_MACHINES", item)
+            continue
+        machines[name] = _Machine(
+            name, serial_port=port, disk_dir=f"/tmp/knitting_disk-{name}"
+        )
+    return machines
 
-_state = _AppState()
 
+# Profile names: used in URLs and default disk_dir paths.
+_MACHINE_NAME = re.compile(r"[A-Za-z0-9_-]{1,32}")
 
-def _startup_discover_port() -> None:
-    """Attempt FTDI port discovery when the server starts.
+_machines = _machines_from_env()
+
+# The default machine, served by the routes without a /machines/{name} prefix.
+_state = _machines[DEFAULT_MACHINE]
+
+# Worker processes for image conversion, previews and disk rebuilds; 0 runs
+# that work in threads instead.
+_worker_count: int = int(os.environ.get("KNITTING_WORKERS", "") or default_workers())
+
+# CPU-bound request work runs here, off the event loop (see app.workers).
+_workers = WorkerPool()
+
+# Armed by the /admin/profile endpoints; profiles requests and emulator runs.
+_profiler = Profiler()
+
+# Bearer token for the /admin endpoints; unset disables them.
+_admin_token: str = os.environ.get("KNITTING_ADMIN_TOKEN", "")
+
+
+def _get_machine(request: Request) -> _Machine:
+    """Route dependency: the machine named in the path, or the default one."""
+    name = request.path_params.get("machine", DEFAULT_MACHINE)
+    machine = _machines.get(name)
+    if machine is None:
+        raise HTTPException(status_code=404, detail=f"Machine {name!r} not found.")
+    return machine
+
+
+MachineDep = Annotated[_Machine, Depends(_get_machine)]
+
+
+def _disk_changed(machine: _Machine) -> None:
+    """Call after every change to machine.disk."""
+    if machine.persistence.is_open:
+        # Under the lock, so a slower writer cannot journal its state after
+        # a newer one has been published and journalled.
+        with machine.disk_lock:
+            disk = machine.disk
+            machine.persistence.record(disk.working_region_bytes(), disk.model.value)
+    machine.thumbnails.schedule(machine.disk)
+
+
+@contextmanager
+def _editing_disk(machine: _Machine) -> Iterator[DiskImage]:
+    """Change the disk image: yield a private copy, then publish it.
+
+    Writers are serialised, so each one edits the latest published disk.
+    If the block raises, nothing is published.
+    """
+    with machine.disk_lock:
+        disk = machine.disk.snapshot()
+        yield disk
+        if disk.generation == machine.disk.generation:
+            return  # nothing changed
+        machine.disk = disk
+    _disk_changed(machine)
+
+
+# 409 detail for a writer that lost the race against another one.
+_DISK_CHANGED = "The disk image changed while this request ran; try again."
+
+
+def _publish_disk(
+    machine: _Machine, disk: DiskImage, base: DiskImage | None = None
+) -> bool:
+    """Replace the disk image of *machine* with *disk*.
+
+    With *base*, only if the published disk is still *base* — for writers
+    that built *disk* from *base* without holding the lock.  Returns
+    whether *disk* was published.
+    """
+    with machine.disk_lock:
+        if base is not None and machine.disk is not base:
+            return False
+        machine.disk = disk
+    _disk_changed(machine)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Conditional GETs
+# ---------------------------------------------------------------------------
+
+# Disk generations count up from 1 in every server process; the epoch keeps
+# ETags from one run from matching a different disk state in the next.
+_ETAG_EPOCH = uuid.uuid4().hex[:8]
+
+
+def _disk_etag(disk: DiskImage) -> str:
+    """Strong ETag for responses derived from the whole of *disk*."""
+    return f'"{_ETAG_EPOCH}-{disk.generation}"'
+
+
+def _pattern_etag(disk: DiskImage, number: int, variant: str) -> str:
+    """Strong ETag for a *variant* representation of one pattern on *disk*.
+
+    Derived from the pattern's content hash, so it survives writes to other
+    patterns and server restarts.  Raises 404 if the pattern is missing.
+    """
+    try:
+        digest = disk.pattern_hash(number)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Pattern {number} not found in disk image.",
+        )
+    return f'"{digest}-{variant}"'
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    # no-cache: clients may keep the body but must revalidate every time.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    """Return a 304 response if the request's If-None-Match matches *etag*."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    if "*" in tags or etag in tags:
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+
+class _DiscoveryStatus(str, Enum):
+    PENDING = "pending"  # the server has not started yet
+    RUNNING = "running"
+    FOUND = "found"
+    FAILED = "failed"
+    SKIPPED = "skipped"  # the default machine already had a port
+
+
+@dataclass
+class _PortDiscovery:
+    status: _DiscoveryStatus = _DiscoveryStatus.PENDING
+    port: str | None = None
+    error: str | None = None
+
+
+# Progress of the default machine's port discovery; see GET /ports/discovery.
+_discovery = _PortDiscovery()
 
-    On success, _state.serial_port is set and a single INFO line is logged.
-    On failure, _state.serial_port is left as an empty string and a WARNING
-    is logged.  POST /send and POST /receive will refuse to run until the
-    port is set via PUT /config.
+
+def _startup_discover_port() -> None:
+    """Attempt FTDI port discovery for the default machine at startup.
+
+    Runs in a background thread (see _start_port_discovery), so enumerating
+    USB devices does not delay serving; progress is kept in _discovery.
+    Ports already given to other machines are not considered, so with one
+    profile per cable but the default machine's the remaining one is found.
+    On success, _state.serial_port is set — unless PUT /config set one in
+    the meantime — and a single INFO line is logged.  On failure,
+    _state.serial_port is left as an empty string and a WARNING is logged.
+    POST /send and POST /receive will refuse to run until the port is set
+    via PUT /config.
     """
     if _state.serial_port:
+        _discovery.status = _DiscoveryStatus.SKIPPED
         return
+    _discovery.status = _DiscoveryStatus.RUNNING
+    _discovery.port = _discovery.error = None
     try:
-        port = discover_ftdi_port()
-        _state.serial_port = port.device
-        log.info(
-            "Auto-discovered FTDI serial port: %s (%s)",
-            port.device,
-            port.description,
+        port = discover_ftdi_port(
+            exclude={m.serial_port for m in _machines.values() if m.serial_port}
         )
     except PortDiscoveryError as exc:
-        _state.serial_port = ""
+        _discovery.error = str(exc)
+        _discovery.status = _DiscoveryStatus.FAILED
         log.warning(
             "Port auto-discovery failed: %s  "
             "Use PUT /config to set the port manually.  "
@@ -151,12 +541,99 @@ def _startup_discover_port() -> None:
             exc,
             [p.device for p in exc.all_ports] or "none",
         )
+        return
+    except Exception as exc:
+        _discovery.error = f"Cannot list serial ports: {exc}"
+        _discovery.status = _DiscoveryStatus.FAILED
+        log.warning("Port auto-discovery failed: cannot list serial ports: %s", exc)
+        return
+    _discovery.port = port.device
+    _discovery.status = _DiscoveryStatus.FOUND
+    if not _state.serial_port:
+        _state.serial_port = port.device
+    log.info(
+        "Auto-discovered FTDI serial port: %s (%s)",
+        port.device,
+        port.description,
+    )
+
+
+def _start_port_discovery() -> threading.Thread:
+    """Run _startup_discover_port in a background thread and return it."""
+    thread = threading.Thread(
+        target=_startup_discover_port, name="port-discovery", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+# Set while the lifespan runs: machines only save their disk state then.
+_serving = False
+
+
+def _open_disk_dir(machine: _Machine) -> bool:
+    """Save the disk state in machine.disk_dir and restore what is there.
+
+    An empty directory receives the current state instead.  If the
+    directory cannot be used, a WARNING is logged and the state is kept in
+    memory only.  Returns whether a restored disk was published.
+    """
+    directory = machine.disk_dir
+    try:
+        stored = machine.persistence.open(directory)
+    except OSError as exc:
+        log.warning("Disk state will not be saved: cannot use %s: %s", directory, exc)
+        return False
+    if stored is None:
+        log.info("Saving disk state of machine %r in %s", machine.name, directory)
+        return False
+    try:
+        disk = DiskImage.from_bytes(stored.region, MachineModel(stored.model))
+    except ValueError as exc:
+        log.warning("Ignoring the disk state saved in %s: %s", directory, exc)
+        return False
+    machine.model = disk.model
+    _publish_disk(machine, disk)
+    machine.sector_dat = stored.sector_dat
+    machine.sector_id = stored.sector_id
+    log.info(
+        "Restored disk state of machine %r from %s — %d pattern(s), "
+        "%d sector file(s)",
+        machine.name,
+        directory,
+        len(disk.list_patterns()),
+        len(stored.sector_dat),
+    )
+    return True
+
+
+def _start_machine(machine: _Machine) -> None:
+    # Publishing a restored disk already records it and renders thumbnails.
+    if not _open_disk_dir(machine):
+        _disk_changed(machine)
+
+
+def _stop_machine(machine: _Machine) -> None:
+    machine.thumbnails.close()
+    machine.persistence.close()
 
 
 @asynccontextmanager
 async def _lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    _startup_discover_port()
+    global _serving
+    _open_log_file()
+    _start_port_discovery()
+    # Compress the frontend now rather than on its first request.
+    threading.Thread(target=_static.load, name="static-assets", daemon=True).start()
+    _workers.start(_worker_count)
+    for machine in list(_machines.values()):
+        _start_machine(machine)
+    _serving = True
     yield
+    _serving = False
+    for machine in list(_machines.values()):
+        _stop_machine(machine)
+    _workers.close()
 
 
 # ---------------------------------------------------------------------------
@@ -170,7 +647,10 @@ app = FastAPI(
     lifespan=_lifespan,
 )
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# The frontend, precompressed, under content-hashed immutable URLs as well
+# as its plain ones (see app.static_assets).
+_static = StaticAssets("app/static")
+app.mount("/static", _static, name="static")
 
 app.add_middleware(
     CORSMiddleware,
@@ -179,6 +659,119 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_HTTP_SECONDS = REGISTRY.histogram(
+    "knitting_http_request_duration_seconds",
+    "Time to answer an HTTP request, by method and route.",
+    ("method", "route"),
+)
+_HTTP_REQUESTS = REGISTRY.counter(
+    "knitting_http_requests_total",
+    "HTTP requests answered, by method, route and status code.",
+    ("method", "route", "status"),
+)
+
+
+class _HTTPMetrics:
+    """ASGI middleware recording the latency and status of every request.
+
+    Requests are labelled with the route template (e.g.
+    /machines/{machine}/pattern/{number}) rather than the path, so the
+    number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # The router stores the matched route in the (shared) scope.  The
+            # routes in _machine_routes are shared by both of their mounts, so
+            # the one matched may lack the /machines/{machine} prefix.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            if "machine" in scope.get("path_params", {}) and not route.startswith(
+                _MACHINE_PREFIX
+            ):
+                route = _MACHINE_PREFIX + route
+            method = scope["method"]
+            _HTTP_SECONDS.labels(method, route).observe(time.perf_counter() - start)
+            _HTTP_REQUESTS.labels(method, route, str(status)).inc()
+
+
+app.add_middleware(_HTTPMetrics)
+
+
+class _Profiled:
+    """ASGI middleware running requests under _profiler when it is armed."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], scope["path"]
+        with _profiler.capture(path, method, f"{method} {path}"):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(_Profiled)
+
+
+class _ServerTiming:
+    """ASGI middleware adding a Server-Timing header to every response.
+
+    The header lists the stages recorded into app.timing while the request
+    was handled (image decoding and scaling, pattern encoding, PNG and
+    base64 encoding...) and the total time up to the response headers.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+
+        with timing.collect() as timings:
+
+            async def send_timings(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    header = timings.header(time.perf_counter() - start)
+                    message = dict(message)
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"server-timing", header.encode("latin-1")),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_timings)
+
+
+app.add_middleware(_ServerTiming)
+
+# Routes that act on one machine.  They are added to the app at the end of
+# this module twice: at their plain paths for the default machine, and
+# under /machines/{machine} for every machine (see _get_machine).
+_machine_routes = APIRouter()
+_MACHINE_PREFIX = "/machines/{machine}"
+
 
 # ---------------------------------------------------------------------------
 # Moar state
@@ -222,12 +815,42 @@ class PatternListResponse(BaseModel):
     patterns: list[PatternInfo]
 
 
+class ThumbnailSprite(BaseModel):
+    number: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class ThumbnailSheetResponse(BaseModel):
+    generation: int
+    width: int
+    height: int
+    data_uri: str  # 1-bit PNG holding every pattern, one pixel per stitch
+    sprites: list[ThumbnailSprite]
+
+
 class WritePatternResponse(BaseModel):
     number: int
     width: int
     height: int
     orig_width: int
     orig_height: int
+    bytes_saved: int = 0
+
+
+class WriteFramesResponse(BaseModel):
+    patterns: list[WritePatternResponse]
+
+
+class ColourPatternResponse(WritePatternResponse):
+    colour: str  # "#rrggbb"
+
+
+class WriteColoursResponse(BaseModel):
+    patterns: list[ColourPatternResponse]
+    background: str  # "#rrggbb"
 
 
 class SendResponse(BaseModel):
@@ -247,25 +870,137 @@ class PreviewResponse(BaseModel):
     width: int
     height: int
     data_uri: str
+    long_floats: int | None = None
+    heatmap_uri: str | None = None
+
+
+class SweepVariantRequest(BaseModel):
+    """One parameter set in a POST /preview/sweep request."""
+
+    threshold: Annotated[int, Field(ge=0, le=255)] = 128
+    dither: Literal["none", "floyd-steinberg", "bayer"] = "none"
+    invert: bool = False
+    target_stitches: Annotated[int | None, Field(ge=1, le=200)] = None
+
+
+class SweepPreview(SweepVariantRequest):
+    """Preview for one swept parameter set."""
+
+    width: int
+    height: int
+    data_uri: str
+
+
+class SweepResponse(BaseModel):
+    """All sweep previews, in request order."""
+
+    suggested_threshold: int
+    previews: list[SweepPreview]
+    contact_sheet: str | None = None
+
+
+# Wire encodings for pattern pixels: a JSON grid of 0/1, base64 of packed
+# 1-bit rows (see app.util), per-row run lengths (app.util.rle_encode_rows)
+# or the packed rows as a raw application/octet-stream body.
+PixelEncoding = Literal["json", "packed", "rle", "binary"]
 
 
 class PatternPixelsResponse(BaseModel):
-    """Pixel grid and memo values for a committed pattern."""
+    """Pixel data and memo values for a committed pattern.
+
+    The pixels are in whichever of ``pixels``, ``packed`` and ``rle``
+    ``encoding`` names; the other two are omitted.
+    """
 
     number: int
-    pixels: list[list[int]]
+    pixels: list[list[int]] | None = None
+    packed: str | None = None
+    rle: list[list[int]] | None = None
     memo: list[int]
     width: int
     height: int
+    encoding: PixelEncoding = "json"
+
+
+class RepeatResponse(BaseModel):
+    number: int
+    width: int
+    height: int
+    repeat_width: int
+    repeat_height: int
+    tile_width: int
+    tile_height: int
+    bytes_used: int
+    tile_bytes: int
+    bytes_saved: int
+
+
+class FloatRunInfo(BaseModel):
+    row: int
+    start: int
+    length: int
+    value: int
+
+
+class FloatReportResponse(BaseModel):
+    number: int
+    max_float: int
+    floats: list[FloatRunInfo]
+    longest: int
+    heatmap_uri: str
 
 
 class PatternEditRequest(BaseModel):
-    """Edited pixel grid and memo values to write back for a pattern."""
+    """Edited pixel data and memo values to write back for a pattern.
 
-    pixels: list[list[int]]
+    Give exactly one of ``pixels`` (grid of 0/1), ``packed`` (base64 packed
+    rows; needs ``width``) or ``rle`` (per-row run lengths).
+    """
+
+    pixels: list[list[int]] | None = None
+    packed: str | None = None
+    rle: list[list[int]] | None = None
+    width: int | None = None
     memo: list[int]
 
 
+class CellEdit(BaseModel):
+    x: int
+    y: int
+    value: int
+
+
+class RowRangeEdit(BaseModel):
+    """Complete replacement rows, starting at row ``start``."""
+
+    start: int
+    pixels: list[list[int]]
+
+
+class MemoEdit(BaseModel):
+    row: int
+    value: int
+
+
+class PatternPatchRequest(BaseModel):
+    """Changes to apply to a stored pattern without changing its size.
+
+    Row ranges are applied before single cells.
+    """
+
+    cells: list[CellEdit] = []
+    rows: list[RowRangeEdit] = []
+    memo: list[MemoEdit] = []
+
+
+class PatternPatchResponse(BaseModel):
+    number: int
+    width: int
+    height: int
+    changed: int
+    etag: str
+
+
 class ConfigRequest(BaseModel):
     serial_port: str | None = None
     baud_rate: int | None = None
@@ -278,6 +1013,62 @@ class ConfigResponse(BaseModel):
     disk_dir: str
 
 
+class MachineRequest(BaseModel):
+    """A new machine profile.  disk_dir defaults to /tmp/knitting_disk-<name>."""
+
+    name: str
+    serial_port: str = ""
+    baud_rate: int = 9600
+    model: Literal["KH-940", "KH-930"] = "KH-940"
+    disk_dir: str | None = None
+
+
+class MachineInfo(BaseModel):
+    name: str
+    model: str
+    serial_port: str
+    baud_rate: int
+    disk_dir: str
+    busy: bool  # an emulator task is running
+    patterns: int
+
+
+class MachineListResponse(BaseModel):
+    machines: list[MachineInfo]
+
+
+class ProfileTriggerRequest(BaseModel):
+    """What to profile: a route template such as /preview/pattern/{number}
+    (optionally for one method only), or "emulator" for transfers."""
+
+    target: str
+    count: int = Field(1, ge=1, le=100)
+    kind: Literal["cpu", "memory"] = "cpu"
+    method: str | None = None
+
+
+class ProfileTriggerInfo(BaseModel):
+    id: str
+    target: str
+    kind: str
+    method: str | None
+    remaining: int
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    target: str
+    kind: str
+    label: str
+    started: float  # Unix time
+    seconds: float
+
+
+class ProfileListResponse(BaseModel):
+    triggers: list[ProfileTriggerInfo]
+    profiles: list[ProfileInfo]
+
+
 class PortInfoResponse(BaseModel):
     device: str
     description: str
@@ -286,6 +1077,7 @@ class PortInfoResponse(BaseModel):
     pid: str | None
     serial_number: str | None
     is_ftdi: bool
+    machine: str | None = None  # name of the machine using this port
 
 
 class PortListResponse(BaseModel):
@@ -293,6 +1085,13 @@ class PortListResponse(BaseModel):
     ftdi_candidates: list[str]  # device names only, for quick scanning
 
 
+class PortDiscoveryResponse(BaseModel):
+    status: _DiscoveryStatus
+    port: str | None = None  # the FTDI port found
+    error: str | None = None  # why discovery failed
+    serial_port: str  # the default machine's port now
+
+
 def _port_info_to_response(p: PortInfo) -> PortInfoResponse:
     return PortInfoResponse(
         device=p.device,
@@ -302,6 +1101,9 @@ def _port_info_to_response(p: PortInfo) -> PortInfoResponse:
         pid=hex(p.pid) if p.pid is not None else None,
         serial_number=p.serial_number,
         is_ftdi=p.is_ftdi,
+        machine=next(
+            (m.name for m in _machines.values() if m.serial_port == p.device), None
+        ),
     )
 
 
@@ -318,34 +1120,87 @@ def _bytes_from_upload(upload: UploadFile) -> bytes:
     return data
 
 
-def _render_preview_png(pixel_rows: list[list[int]]) -> bytes:
-    """Convert pixel rows (0/1) to a black-and-white PNG as bytes."""
-    h = len(pixel_rows)
-    w = len(pixel_rows[0]) if h else 0
-    img = Image.new("L", (w, h), 255)
-    pixels = img.load()
-    for y, row in enumerate(pixel_rows):
-        for x, val in enumerate(row):
-            pixels[x, y] = 0 if val == 1 else 255  # type: ignore[index]
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+def _write_consecutive(
+    machine: _Machine, number: int, results: list[ImageResult]
+) -> None:
+    """Write *results* as patterns number, number + 1, … in one batch."""
+    try:
+        with _editing_disk(machine) as disk:
+            disk.write_patterns_packed(
+                [
+                    (number + i, r.packed, r.width, r.height)
+                    for i, r in enumerate(results)
+                ]
+            )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to encode patterns into disk image: {exc}",
+        )
 
 
-def _run_receive(task_id: str) -> None:
-    """Background thread: run the emulator in receive mode.
+def _written(number: int, result: ImageResult) -> WritePatternResponse:
+    return WritePatternResponse(
+        number=number,
+        width=result.width,
+        height=result.height,
+        orig_width=result.orig_width,
+        orig_height=result.orig_height,
+        bytes_saved=result.bytes_saved,
+    )
 
-    The machine initiates a save operation.  The emulator accepts whatever
-    the machine writes — sector data and sector IDs — and on completion
-    persists the full sector state into _state.sector_dat / _state.sector_id.
-    The in-memory DiskImage is then rebuilt from the received data so that
+
+def _float_heatmap_uri(
+    packed: bytes, width: int, height: int, floats: list[FloatRun]
+) -> str:
+    """PNG data URI of the float heatmap, one pixel per stitch."""
+    heatmap = float_heatmap(packed, width, height, floats)
+    buf = io.BytesIO()
+    with timing.stage("png"):
+        heatmap.save(buf, format="PNG")
+    return _png_data_uri(buf.getvalue())
+
+
+def _parse_hex_colour(field: str, value: str) -> tuple[int, int, int]:
+    """Parse "#rrggbb" (or "rrggbb") into an RGB tuple; 422 if malformed."""
+    digits = value.removeprefix("#")
+    try:
+        if len(digits) != 6:
+            raise ValueError
+        rgb = bytes.fromhex(digits)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{field} must be a #rrggbb colour; got {value!r}",
+        )
+    return (rgb[0], rgb[1], rgb[2])
+
+
+def _hex_colour(rgb: tuple[int, int, int]) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+
+def _png_data_uri(png_bytes: bytes) -> str:
+    with timing.stage("base64"):
+        return "data:image/png;base64," + base64.b64encode(png_bytes).decode()
+
+
+def _run_receive(machine: _Machine, task_id: str) -> None:
+    """Background thread: run the emulator in receive mode.
+
+    The machine initiates a save operation.  The emulator accepts whatever
+    the machine writes — sector data and sector IDs — and on completion
+    persists the full sector state into machine.sector_dat / machine.sector_id.
+    The in-memory DiskImage is then rebuilt from the received data so that
     GET /patterns reflects what was saved.
     """
-    task = _state.tasks[task_id]
+    task = machine.tasks[task_id]
     task.status = _TaskStatus.RUNNING
 
-    port = _state.serial_port
-    baud = _state.baud_rate
+    port = machine.serial_port
+    baud = machine.baud_rate
 
     log.info(
         "Receive task %s started — port=%s  baud=%d",
@@ -383,7 +1238,8 @@ def _run_receive(task_id: str) -> None:
                 port,
                 baud,
             )
-            emulator.run(port=port, baudrate=baud, idle_timeout=10)
+            with _profiler.capture(EMULATOR, label=f"receive {machine.name}"):
+                emulator.run(port=port, baudrate=baud, idle_timeout=10)
             log.info("[%s] emulator.run() returned", task_id)
 
             # ---- Capture everything the machine wrote ----------------------
@@ -401,8 +1257,9 @@ def _run_receive(task_id: str) -> None:
         log.info("[%s] Machine wrote %d sector pair(s)", task_id, len(sectors_written))
 
         # Persist sector state so the next send can serve it back.
-        _state.sector_dat = dat_files
-        _state.sector_id = id_files
+        machine.sector_dat = dat_files
+        machine.sector_id = id_files
+        machine.persistence.save_sectors(dat_files, id_files)
         log.info(
             "[%s] Persisted %d sector data + %d sector ID files",
             task_id,
@@ -416,11 +1273,12 @@ def _run_receive(task_id: str) -> None:
             dat_files.get(n, bytes(1024)) for n in range(working_sectors)
         )
         try:
-            _state.disk = DiskImage.from_bytes(working_bytes, _state.model)
+            received = DiskImage.from_bytes(working_bytes, machine.model)
+            _publish_disk(machine, received)
             log.info(
                 "[%s] Rebuilt DiskImage — %d pattern(s) found",
                 task_id,
-                len(_state.disk.list_patterns()),
+                len(received.list_patterns()),
             )
         except Exception as exc:
             log.warning(
@@ -438,20 +1296,22 @@ def _run_receive(task_id: str) -> None:
         log.error("[%s] Receive task failed: %s", task_id, exc, exc_info=True)
 
 
-def _run_send(task_id: str) -> None:
-    """Background thread: serve the current disk image to the machine.
+def _run_send(machine: _Machine, task_id: str, disk: DiskImage) -> None:
+    """Background thread: serve *disk* to the machine.
 
     The machine initiates a load operation.  The emulator populates sector
     data from the in-memory DiskImage and generates sector IDs synthetically
     via DiskImage.to_id_files() — no prior receive operation is required.
+    *disk* is the disk image as it was when the send was requested; writes
+    made while the send runs do not affect it.
     """
-    task = _state.tasks[task_id]
+    task = machine.tasks[task_id]
     task.status = _TaskStatus.RUNNING
 
-    port = _state.serial_port
-    baud = _state.baud_rate
+    port = machine.serial_port
+    baud = machine.baud_rate
 
-    patterns = _state.disk.list_patterns()
+    patterns = disk.list_patterns()
     log.info(
         "Send task %s started — port=%s  baud=%d  patterns=%d",
         task_id,
@@ -465,8 +1325,8 @@ def _run_send(task_id: str) -> None:
         from app.serial_emulator import PDDEmulator  # noqa: PLC0415
         import tempfile  # noqa: PLC0415
 
-        dat_files = _state.disk.to_sector_files()
-        id_files = _state.disk.to_id_files()
+        dat_files = disk.to_sector_files()
+        id_files = disk.to_id_files()
 
         log.info("[%s] Creating PDDEmulator and populating sector files", task_id)
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -486,7 +1346,8 @@ def _run_send(task_id: str) -> None:
                 baud,
             )
             # This hardcodes in sector 31, which is the end of the data for the KH-940
-            emulator.run(port=port, baudrate=baud, stop_after_sector=31)
+            with _profiler.capture(EMULATOR, label=f"send {machine.name}"):
+                emulator.run(port=port, baudrate=baud, stop_after_sector=31)
 
             expected = 32
             if emulator._sectors_sent >= expected:
@@ -511,25 +1372,67 @@ def _run_send(task_id: str) -> None:
         log.error("[%s] Send task failed: %s", task_id, exc, exc_info=True)
 
 
-def _require_serial_port() -> str:
+def _is_busy(machine: _Machine) -> bool:
+    return any(t.status == _TaskStatus.RUNNING for t in machine.tasks.values())
+
+
+def _require_idle(machine: _Machine) -> None:
+    """Raise 409 if an emulator task is using *machine*'s serial port.
+
+    Each machine has its own port, so tasks on different machines may run
+    at the same time.
+    """
+    if _is_busy(machine):
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"An emulator task is already running on machine {machine.name!r}. "
+                "Wait for it to finish or stop it first."
+            ),
+        )
+
+
+def _require_unshared(
+    machine: _Machine, serial_port: str | None = None, disk_dir: str | None = None
+) -> None:
+    """Raise 409 if another machine already uses *serial_port* or *disk_dir*."""
+    for other in _machines.values():
+        if other is machine:
+            continue
+        if serial_port and other.serial_port == serial_port:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Serial port {serial_port!r} belongs to machine {other.name!r}.",
+            )
+        if disk_dir and Path(other.disk_dir).resolve() == Path(disk_dir).resolve():
+            raise HTTPException(
+                status_code=409,
+                detail=f"disk_dir {disk_dir!r} belongs to machine {other.name!r}.",
+            )
+
+
+def _require_serial_port(machine: _Machine) -> str:
     """Return the configured serial port, or raise HTTP 503.
 
     The error body includes available ports so the client can present them
     to the user without needing a separate GET /ports call.
     """
-    if not _state.serial_port:
+    if not machine.serial_port:
+        message = (
+            "No serial port configured. "
+            "Use PUT /config to set one, or GET /ports for available options."
+        )
+        if machine is _state and _discovery.status == _DiscoveryStatus.RUNNING:
+            message = "Serial port discovery is still running; try again shortly."
         available = [_port_info_to_response(p) for p in list_all_ports()]
         raise HTTPException(
             status_code=503,
             detail={
-                "message": (
-                    "No serial port configured. "
-                    "Use PUT /config to set one, or GET /ports for available options."
-                ),
+                "message": message,
                 "available_ports": [p.model_dump() for p in available],
             },
         )
-    return _state.serial_port
+    return machine.serial_port
 
 
 # ---------------------------------------------------------------------------
@@ -575,13 +1478,25 @@ def _validated_dither(value: str) -> DitherMode:
 # ---------------------------------------------------------------------------
 
 
-@app.get("/patterns", response_model=PatternListResponse)
-def list_patterns() -> PatternListResponse:
-    """Return all patterns currently in the in-memory disk image."""
+@_machine_routes.get("/patterns", response_model=PatternListResponse)
+def list_patterns(
+    machine: MachineDep, request: Request, response: Response
+) -> PatternListResponse | Response:
+    """Return all patterns currently in the in-memory disk image.
+
+    Carries an ETag of the disk generation; answers 304 if it still matches.
+    """
+    disk = machine.disk
+    etag = _disk_etag(disk)
+    response.headers.update(_cache_headers(etag))
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
     patterns: list[PatternInfo] = []
     for number in range(901, 1000):
         try:
-            pixel_rows = _state.disk.read_pattern(number)
+            pixel_rows = disk.read_pattern(number)
         except Exception:
             continue
         if pixel_rows:
@@ -595,35 +1510,77 @@ def list_patterns() -> PatternListResponse:
     return PatternListResponse(patterns=patterns)
 
 
-@app.get("/disk/status", response_model=DiskStatusResponse)
-def disk_status() -> DiskStatusResponse:
+@_machine_routes.get("/disk/status", response_model=DiskStatusResponse)
+def disk_status(
+    machine: MachineDep, request: Request, response: Response
+) -> DiskStatusResponse | Response:
     """Return capacity and pattern list for the in-memory disk image.
 
     Combines the pattern list with storage metrics so the frontend can
-    display a capacity indicator without a separate round-trip.
+    display a capacity indicator without a separate round-trip.  Carries an
+    ETag of the disk generation; answers 304 if it still matches.
     """
-    entries = _state.disk.list_patterns()
+    disk = machine.disk
+    etag = _disk_etag(disk)
+    response.headers.update(_cache_headers(etag))
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    entries = disk.list_patterns()
     patterns = [
         PatternInfo(number=e.number, rows=e.rows, stitches=e.stitches) for e in entries
     ]
     return DiskStatusResponse(
         patterns=patterns,
-        bytes_remaining=_state.disk.bytes_remaining,
-        bytes_total=_state.disk._init_pattern_offset,
-        slots_used=_state.disk._next_slot,
-        slots_total=_state.disk._max_patterns,
+        bytes_remaining=disk.bytes_remaining,
+        bytes_total=disk._init_pattern_offset,
+        slots_used=disk._next_slot,
+        slots_total=disk._max_patterns,
+    )
+
+
+@_machine_routes.get("/disk/thumbnails", response_model=ThumbnailSheetResponse)
+def disk_thumbnails(
+    machine: MachineDep, request: Request, response: Response
+) -> ThumbnailSheetResponse | Response:
+    """Return every stored pattern in one sprite-sheet PNG, with an index.
+
+    Lets the frontend load the whole pattern list's thumbnails in a single
+    request.  The sheet is re-rendered only when the disk generation
+    changes, and the response carries an ETag of it (304 if unchanged).
+    """
+    disk = machine.disk
+    etag = _disk_etag(disk)
+    response.headers.update(_cache_headers(etag))
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    sheet = disk_sprite_sheet(disk)
+    return ThumbnailSheetResponse(
+        generation=sheet.generation,
+        width=sheet.width,
+        height=sheet.height,
+        data_uri=_png_data_uri(sheet.png),
+        sprites=[
+            ThumbnailSprite(
+                number=s.number, x=s.x, y=s.y, width=s.width, height=s.height
+            )
+            for s in sheet.sprites
+        ],
     )
 
 
-@app.get("/disk/download")
-def download_disk() -> Response:
+@_machine_routes.get("/disk/download")
+def download_disk(machine: MachineDep) -> Response:
     """Download the current in-memory disk image as a raw 81,920-byte binary blob.
 
     The file can be re-uploaded later via POST /disk/upload to restore the
     full pattern set.  It is also a valid input for any tool that reads
     Brother KH-940 disk images.
     """
-    blob = _state.disk.to_disk_image_bytes()
+    blob = machine.disk.to_disk_image_bytes()
     log.info("Disk image downloaded (%d bytes)", len(blob))
     return Response(
         content=blob,
@@ -632,8 +1589,9 @@ def download_disk() -> Response:
     )
 
 
-@app.post("/disk/upload")
+@_machine_routes.post("/disk/upload")
 async def upload_disk(
+    machine: MachineDep,
     file: Annotated[UploadFile, File(description="Raw 81,920-byte Brother disk image")],
     force: Annotated[
         bool,
@@ -657,7 +1615,8 @@ async def upload_disk(
     raw = _bytes_from_upload(file)
 
     # Guard: warn before overwriting a non-empty disk.
-    existing = _state.disk.list_patterns()
+    base = machine.disk
+    existing = base.list_patterns()
     if existing and not force:
         raise HTTPException(
             status_code=409,
@@ -672,7 +1631,7 @@ async def upload_disk(
         )
 
     try:
-        new_disk = DiskImage.from_bytes(raw, _state.model)
+        new_disk = DiskImage.from_bytes(raw, machine.model)
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
     except Exception as exc:
@@ -681,114 +1640,257 @@ async def upload_disk(
             detail=f"Could not parse disk image: {exc}",
         )
 
-    _state.disk = new_disk
-    patterns = _state.disk.list_patterns()
+    if not _publish_disk(machine, new_disk, base):
+        raise HTTPException(status_code=409, detail=_DISK_CHANGED)
+    patterns = new_disk.list_patterns()
     log.info(
         "Disk image uploaded — %d pattern(s) restored, %d bytes remaining",
         len(patterns),
-        _state.disk.bytes_remaining,
+        new_disk.bytes_remaining,
     )
     return {
         "status": "ok",
         "patterns_restored": len(patterns),
-        "bytes_remaining": _state.disk.bytes_remaining,
+        "bytes_remaining": new_disk.bytes_remaining,
     }
 
 
-@app.get("/preview/pattern/{number}", response_model=PreviewResponse)
-def preview_pattern(number: int) -> PreviewResponse:
-    """Return a PNG preview for a pattern already stored in the RAM disk.
+def _stored_pattern_png(
+    machine: _Machine, disk: DiskImage, number: int, compress_level: int
+) -> tuple[bytes, int, int]:
+    """Return pattern *number* on *disk* as a 1-bit PNG; 404 if missing.
 
-    This uses the same rendering path as POST /preview but reads pixel
-    data from the disk image rather than an uploaded image file.  Intended
-    for the pattern list thumbnails in the frontend.
+    Served from the thumbnail store when it is up to date with the disk;
+    rendered here only while a background refresh is still pending or for
+    a non-default compress_level.
     """
-    try:
-        pixel_rows = _state.disk.read_pattern(number)
-    except KeyError:
+    if compress_level == 6:
+        thumb = machine.thumbnails.get(number, disk.generation)
+        if thumb is not None:
+            return thumb.png, thumb.width, thumb.height
+    entry = disk.get_pattern_entry(number)
+    if entry is None:
         raise HTTPException(
             status_code=404,
             detail=f"Pattern {number} not found in disk image.",
         )
+    try:
+        packed = disk.read_pattern_packed(number)
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to read pattern {number}: {exc}",
         )
 
-    png_bytes = _render_preview_png(pixel_rows)
-    data_uri = "data:image/png;base64," + base64.b64encode(png_bytes).decode()
-    h = len(pixel_rows)
-    w = len(pixel_rows[0]) if h else 0
-    return PreviewResponse(width=w, height=h, data_uri=data_uri)
+    w, h = entry.stitches, entry.rows
+    png_bytes = pattern_png(packed, w, h, compress_level)
+    return png_bytes, w, h
 
 
-@app.delete("/pattern/{number}")
-def delete_pattern(number: int) -> dict[str, object]:
-    """Delete a single pattern from the in-memory disk image.
+# OpenAPI description of the binary preview responses.
+_PNG_CONTENT: dict[int | str, dict[str, object]] = {
+    200: {"content": {"image/png": {}}, "description": "1-bit PNG"}
+}
 
-    The pattern data is removed and the directory is compacted in-place by
-    rebuilding the disk image from the remaining patterns.  All pattern
-    numbers and their data are preserved; only the deleted pattern is lost.
+CompressLevel = Annotated[
+    int, Query(ge=0, le=9, description="PNG zlib level: 0 fastest, 9 smallest.")
+]
 
-    Raises 404 if the pattern does not exist.
+
+# Registered before GET /preview/pattern/{number}, whose path parameter
+# would otherwise also match "901.png".
+@_machine_routes.get(
+    "/preview/pattern/{number}.png", response_class=Response, responses=_PNG_CONTENT
+)
+def preview_pattern_png(
+    machine: MachineDep,
+    request: Request,
+    number: int,
+    compress_level: CompressLevel = 6,
+) -> Response:
+    """Binary variant of GET /preview/pattern/{number}: the PNG itself.
+
+    The pattern size is returned in the X-Pattern-Width/Height headers.
+    """
+    disk = machine.disk
+    etag = _pattern_etag(disk, number, f"png{compress_level}")
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    png_bytes, w, h = _stored_pattern_png(machine, disk, number, compress_level)
+    return Response(
+        content=png_bytes,
+        media_type="image/png",
+        headers={
+            "X-Pattern-Width": str(w),
+            "X-Pattern-Height": str(h),
+            **_cache_headers(etag),
+        },
+    )
+
+
+@_machine_routes.get("/preview/pattern/{number}", response_model=PreviewResponse)
+def preview_pattern(
+    machine: MachineDep,
+    request: Request,
+    response: Response,
+    number: int,
+    compress_level: CompressLevel = 6,
+) -> PreviewResponse | Response:
+    """Return a PNG preview for a pattern already stored in the RAM disk.
+
+    This uses the same rendering path as POST /preview but reads pixel
+    data from the disk image rather than an uploaded image file.  Intended
+    for the pattern list thumbnails in the frontend.  Carries an ETag of
+    the pattern content; answers 304 if it still matches.
+    """
+    disk = machine.disk
+    etag = _pattern_etag(disk, number, f"json{compress_level}")
+    response.headers.update(_cache_headers(etag))
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    png_bytes, w, h = _stored_pattern_png(machine, disk, number, compress_level)
+    return PreviewResponse(width=w, height=h, data_uri=_png_data_uri(png_bytes))
+
+
+@_machine_routes.get("/preview/pattern/{number}/fabric", response_model=PreviewResponse)
+async def preview_pattern_fabric(
+    machine: MachineDep,
+    number: int,
+    knit_colour: Annotated[
+        str, Query(description="Yarn colour of knit stitches, #rrggbb.")
+    ] = "#282830",
+    background_colour: Annotated[
+        str, Query(description="Yarn colour of background stitches, #rrggbb.")
+    ] = "#ece6d6",
+    cell_width: Annotated[
+        int, Query(description="Pixels per stitch across (height is 3/4).", ge=4, le=32)
+    ] = DEFAULT_CELL[0],
+) -> PreviewResponse:
+    """Return a stitch-realistic fabric rendering of a stored pattern.
+
+    Each stitch is drawn as a knit V in its yarn colour, 4:3 wide to tall.
+    Renders run in a worker process and are cached by pattern content, so
+    polling an unchanged pattern is cheap.  Raises 404 if the pattern does
+    not exist and 422 for a malformed colour or a rendering larger than
+    app.render.MAX_CANVAS_PIXELS (use a smaller cell_width).
     """
-    entry = _state.disk.get_pattern_entry(number)
+    knit = _parse_hex_colour("knit_colour", knit_colour)
+    background = _parse_hex_colour("background_colour", background_colour)
+    disk = machine.disk
+    entry = disk.get_pattern_entry(number)
     if entry is None:
         raise HTTPException(
             status_code=404,
             detail=f"Pattern {number} not found in disk image.",
         )
+    try:
+        packed = disk.read_pattern_packed(number)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to read pattern {number}: {exc}",
+        )
 
-    # Read all surviving patterns before we touch anything.
-    survivors: list[tuple[int, list[list[int]], list[int]]] = []
-    for e in _state.disk.list_patterns():
-        if e.number == number:
-            continue
+    options: dict[str, Any] = {
+        "knit_colour": knit,
+        "background_colour": background,
+        "cell": (cell_width, round(cell_width * 3 / 4)),
+    }
+    key = fabric_key(packed, entry.stitches, entry.rows, **options)
+    png_bytes = cached_fabric_png(key)
+    if png_bytes is None:
         try:
-            pixel_rows = _state.disk.read_pattern(e.number)
-            memo = _state.disk.read_memo(e.number)
-        except Exception as exc:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to read pattern {e.number} during compaction: {exc}",
+            png_bytes = await _workers.run(
+                fabric_png, bytes(packed), entry.stitches, entry.rows, **options
             )
-        survivors.append((e.number, pixel_rows, memo))
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+        store_fabric_png(key, png_bytes)
+    return PreviewResponse(
+        width=entry.stitches, height=entry.rows, data_uri=_png_data_uri(png_bytes)
+    )
 
-    # Rebuild from scratch with the survivors.
-    new_disk = DiskImage.blank(_state.model)
-    for pat_number, pixel_rows, memo in survivors:
-        try:
-            new_disk.write_pattern(pat_number, pixel_rows, memo)
-        except Exception as exc:
+
+# Rebuilds retried when another write lands while a worker rebuilds.
+_REBUILD_ATTEMPTS: int = 3
+
+
+async def _rebuild_published_disk(
+    machine: _Machine,
+    number: int,
+    replacement: tuple[bytes, int, int, list[int]] | None = None,
+) -> DiskImage:
+    """Rebuild the disk without (or with a *replacement* for) pattern *number*.
+
+    The rebuild runs in a worker without holding the disk lock; if another
+    write was published meanwhile, it is redone on top of that one.  Raises
+    404 if the pattern does not exist, 409 if the disk kept changing, and
+    CompactionError from rebuild_disk.
+    """
+    for _ in range(_REBUILD_ATTEMPTS):
+        base = machine.disk
+        if base.get_pattern_entry(number) is None:
             raise HTTPException(
-                status_code=500,
-                detail=f"Failed to re-write pattern {pat_number} during compaction: {exc}",
+                status_code=404,
+                detail=f"Pattern {number} not found in disk image.",
             )
+        new_disk = await _workers.run(
+            rebuild_disk, base, machine.model, number, replacement
+        )
+        if _publish_disk(machine, new_disk, base):
+            return new_disk
+    raise HTTPException(status_code=409, detail=_DISK_CHANGED)
+
+
+@_machine_routes.delete("/pattern/{number}")
+async def delete_pattern(machine: MachineDep, number: int) -> dict[str, object]:
+    """Delete a single pattern from the in-memory disk image.
+
+    The pattern data is removed and the directory is compacted in-place by
+    rebuilding the disk image from the remaining patterns, in a worker
+    process.  All pattern numbers and their data are preserved; only the
+    deleted pattern is lost.
+
+    Raises 404 if the pattern does not exist.
+    """
+    try:
+        new_disk = await _rebuild_published_disk(machine, number)
+    except CompactionError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    survivors = new_disk.list_patterns()
 
-    _state.disk = new_disk
     log.info(
         "Pattern %d deleted — %d pattern(s) remaining, %d bytes remaining",
         number,
         len(survivors),
-        _state.disk.bytes_remaining,
+        new_disk.bytes_remaining,
     )
     return {
         "status": "ok",
         "deleted": number,
         "patterns_remaining": len(survivors),
-        "bytes_remaining": _state.disk.bytes_remaining,
+        "bytes_remaining": new_disk.bytes_remaining,
     }
 
 
-@app.get("/pattern/{number}/pixels", response_model=PatternPixelsResponse)
-def get_pattern_pixels(number: int) -> PatternPixelsResponse:
-    """Return the pixel grid and memo values for a committed pattern.
+@_machine_routes.get("/pattern/{number}/repeat", response_model=RepeatResponse)
+def get_pattern_repeat(machine: MachineDep, number: int) -> RepeatResponse:
+    """Report the smallest repeating tile of a stored pattern.
 
-    Used by the Stage 2 pixel editor to load a pattern for editing.
-    Raises 404 if the pattern does not exist.
+    The machine repeats a pattern across the needle bed and down the
+    fabric, so a pattern made of whole tiles could be stored as just one.
+    ``repeat_width``/``repeat_height`` is the smallest repeat, which may
+    end in a partial tile; ``tile_width``/``tile_height`` is the smallest
+    repeat that divides the pattern size, i.e. what ``store_tile`` keeps,
+    and ``bytes_saved`` is what storing it would free.  Raises 404 if the
+    pattern does not exist.
     """
-    entry = _state.disk.get_pattern_entry(number)
+    disk = machine.disk
+    entry = disk.get_pattern_entry(number)
     if entry is None:
         raise HTTPException(
             status_code=404,
@@ -796,46 +1898,124 @@ def get_pattern_pixels(number: int) -> PatternPixelsResponse:
         )
 
     try:
-        pixels = _state.disk.read_pattern(number)
-        memo = _state.disk.read_memo(number)
+        packed = disk.read_pattern_packed(number)
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to read pattern {number}: {exc}",
         )
 
-    h = len(pixels)
-    w = len(pixels[0]) if h else 0
-    return PatternPixelsResponse(
+    w, h = entry.stitches, entry.rows
+    repeat_w, repeat_h = find_repeat(packed, w, h)
+    tile_w, tile_h = find_repeat(packed, w, h, whole=True)
+    used = bytes_per_pattern_and_memo(w, h)
+    tile = bytes_per_pattern_and_memo(tile_w, tile_h)
+    return RepeatResponse(
         number=number,
-        pixels=pixels,
-        memo=memo,
         width=w,
         height=h,
+        repeat_width=repeat_w,
+        repeat_height=repeat_h,
+        tile_width=tile_w,
+        tile_height=tile_h,
+        bytes_used=used,
+        tile_bytes=tile,
+        bytes_saved=used - tile,
     )
 
 
-@app.put("/pattern/{number}", response_model=WritePatternResponse)
-def edit_pattern(number: int, req: PatternEditRequest) -> WritePatternResponse:
-    """Overwrite an existing committed pattern with edited pixel and memo data.
-
-    Performs a delete-then-rewrite compaction internally so the caller does not
-    need to orchestrate two separate requests.  All other patterns are preserved.
+@_machine_routes.get("/pattern/{number}/floats", response_model=FloatReportResponse)
+def get_pattern_floats(
+    machine: MachineDep,
+    number: int,
+    max_float: Annotated[int, Query(ge=1)] = DEFAULT_MAX_FLOAT,
+) -> FloatReportResponse:
+    """List every float longer than ``max_float`` in a stored pattern.
 
-    Raises 404 if the pattern does not exist.
-    Raises 422 if the pixel data is invalid (empty, unequal row widths, stitch
-    count out of range) or if any memo value is outside 0–15.
+    Returns the runs row by row together with a heatmap PNG highlighting
+    them.  Raises 404 if the pattern does not exist.
     """
-
-    entry = _state.disk.get_pattern_entry(number)
+    disk = machine.disk
+    entry = disk.get_pattern_entry(number)
     if entry is None:
         raise HTTPException(
             status_code=404,
             detail=f"Pattern {number} not found in disk image.",
         )
 
-    # --- Validate pixels ---
-    pixels = req.pixels
+    try:
+        packed = disk.read_pattern_packed(number)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to read pattern {number}: {exc}",
+        )
+
+    floats = find_floats(packed, entry.stitches, entry.rows, max_float)
+    return FloatReportResponse(
+        number=number,
+        max_float=max_float,
+        floats=[FloatRunInfo(**vars(f)) for f in floats],
+        longest=max((f.length for f in floats), default=0),
+        heatmap_uri=_float_heatmap_uri(packed, entry.stitches, entry.rows, floats),
+    )
+
+
+@_machine_routes.post("/pattern/{number}/floats/fix")
+def fix_pattern_floats(
+    machine: MachineDep,
+    number: int,
+    max_float: Annotated[int, Query(ge=2)] = DEFAULT_MAX_FLOAT,
+) -> dict[str, object]:
+    """Insert tie-down stitches into a stored pattern to break long floats.
+
+    Raises 404 if the pattern does not exist.
+    """
+    _require_pattern(machine, number)
+    try:
+        with _editing_disk(machine) as disk:
+            changed = disk.fix_floats([number], max_float)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fix floats in pattern {number}: {exc}",
+        )
+
+    tie_downs = changed.get(number, 0)
+    log.info("Pattern %d: %d tie-down stitch(es) inserted", number, tie_downs)
+    return {"status": "ok", "number": number, "tie_downs": tie_downs}
+
+
+def _memo_hex(memo: list[int]) -> str:
+    """Memo values as one hex digit per row, for the X-Pattern-Memo header."""
+    return "".join(f"{v:x}" for v in memo)
+
+
+# Pattern pixels as packed rows (see app.util): (packed, stitches, rows).
+_PackedPixels = tuple[bytes, int, int]
+
+
+def _packed_pixels(data: bytes, width: int | None) -> _PackedPixels:
+    """Packed 1-bit rows *width* stitches wide, as given; 422 if malformed."""
+    if width is None or not (1 <= width <= 200):
+        raise HTTPException(
+            status_code=422,
+            detail="width (1–200) is required with packed pixel data.",
+        )
+    row_bytes = packed_row_bytes(width)
+    if not data or len(data) % row_bytes:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"Packed pixel data is {len(data)} bytes; expected a non-zero "
+                f"multiple of {row_bytes} for {width} stitches."
+            ),
+        )
+    return clear_padding(data, width), width, len(data) // row_bytes
+
+
+def _grid_pixels(pixels: list[list[int]]) -> _PackedPixels:
+    """Validate a JSON 0/1 grid and pack it; 422 if malformed."""
     if not pixels:
         raise HTTPException(status_code=422, detail="pixels must not be empty.")
     stitches = len(pixels[0])
@@ -856,60 +2036,81 @@ def edit_pattern(number: int, req: PatternEditRequest) -> WritePatternResponse:
                     status_code=422,
                     detail=f"pixels[{i}][{j}] = {val!r}; must be 0 or 1.",
                 )
+    return pack_rows(pixels, stitches), stitches, len(pixels)
 
-    # --- Validate memo ---
-    memo = req.memo
-    for i, val in enumerate(memo):
-        if not (0 <= val <= 15):
-            raise HTTPException(
-                status_code=422,
-                detail=f"memo[{i}] = {val!r}; must be 0–15.",
-            )
 
-    # --- Read all surviving patterns (everyone except the one being edited) ---
-    all_patterns: list[tuple[int, list[list[int]], list[int]]] = []
-    for e in _state.disk.list_patterns():
-        if e.number == number:
-            continue
+def _edit_request_pixels(req: PatternEditRequest) -> _PackedPixels:
+    """Decode whichever pixel encoding *req* carries into packed rows."""
+    given = [
+        name for name in ("pixels", "packed", "rle") if getattr(req, name) is not None
+    ]
+    if len(given) != 1:
+        raise HTTPException(
+            status_code=422,
+            detail="Give exactly one of pixels, packed and rle.",
+        )
+    if req.packed is not None:
         try:
-            survivor_pixels = _state.disk.read_pattern(e.number)
-            survivor_memo = _state.disk.read_memo(e.number)
-        except Exception as exc:
+            data = base64.b64decode(req.packed, validate=True)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="packed is not valid base64.")
+        return _packed_pixels(data, req.width)
+    if req.rle is not None:
+        if not req.rle:
+            raise HTTPException(status_code=422, detail="rle must not be empty.")
+        stitches = sum(req.rle[0])
+        if not (1 <= stitches <= 200):
             raise HTTPException(
-                status_code=500,
-                detail=f"Failed to read pattern {e.number} during compaction: {exc}",
+                status_code=422,
+                detail=f"rle rows must cover 1–200 stitches; got {stitches}.",
             )
-        all_patterns.append((e.number, survivor_pixels, survivor_memo))
-
-    # Include the edited pattern and sort by number so that write order matches
-    # slot order.  list_patterns() stops at the first FINHDR/empty slot, so
-    # every valid pattern must occupy a contiguous run of slots starting at 0;
-    # writing out of numerical order would place the FINHDR before some entries
-    # and cause them to be invisible to subsequent reads.
-    all_patterns.append((number, pixels, memo))
-    all_patterns.sort(key=lambda t: t[0])
-
-    # --- Rebuild disk from scratch with all patterns in slot order ---
-    new_disk = DiskImage.blank(_state.model)
-    for pat_number, pat_pixels, pat_memo in all_patterns:
         try:
-            new_disk.write_pattern(pat_number, pat_pixels, pat_memo)
+            data = rle_decode_rows(req.rle, stitches)
         except ValueError as exc:
             raise HTTPException(status_code=422, detail=str(exc))
-        except Exception as exc:
+        return data, stitches, len(req.rle)
+    assert req.pixels is not None
+    return _grid_pixels(req.pixels)
+
+
+def _require_pattern(machine: _Machine, number: int) -> None:
+    if machine.disk.get_pattern_entry(number) is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Pattern {number} not found in disk image.",
+        )
+
+
+async def _replace_pattern(
+    machine: _Machine, number: int, pixels: _PackedPixels, memo: list[int]
+) -> WritePatternResponse:
+    """Validate and write *pixels*/*memo* over stored pattern *number*."""
+    packed, stitches, rows = pixels
+
+    # --- Validate memo ---
+    for i, val in enumerate(memo):
+        if not (0 <= val <= 15):
             raise HTTPException(
-                status_code=500,
-                detail=f"Failed to re-write pattern {pat_number} during compaction: {exc}",
+                status_code=422,
+                detail=f"memo[{i}] = {val!r}; must be 0–15.",
             )
 
-    _state.disk = new_disk
-    rows = len(pixels)
+    # --- Rebuild the disk with the edited pattern, in a worker process ---
+    try:
+        new_disk = await _rebuild_published_disk(
+            machine, number, (packed, stitches, rows, memo)
+        )
+    except CompactionError as exc:
+        if isinstance(exc.__cause__, ValueError):
+            raise HTTPException(status_code=422, detail=str(exc.__cause__))
+        raise HTTPException(status_code=500, detail=str(exc))
+
     log.info(
         "Pattern %d edited — %d stitches × %d rows, %d bytes remaining",
         number,
         stitches,
         rows,
-        _state.disk.bytes_remaining,
+        new_disk.bytes_remaining,
     )
     return WritePatternResponse(
         number=number,
@@ -920,91 +2121,361 @@ def edit_pattern(number: int, req: PatternEditRequest) -> WritePatternResponse:
     )
 
 
-@app.post("/pattern", response_model=WritePatternResponse)
-def write_pattern(
-    file: Annotated[UploadFile, File(description="1-bit image to knit")],
-    number: Annotated[
-        int,
-        Form(description="Pattern number 901–999", ge=901, le=999),
-    ] = 901,
-    threshold: Annotated[
-        int,
-        Form(description="Binarisation threshold 0–255", ge=0, le=255),
-    ] = 128,
-    stitch_aspect_ratio: Annotated[
-        float,
-        Form(
-            description=(
-                "Vertical stretch factor to compensate for non-square stitch "
-                "aspect ratio. 1.33 (4:3) is a good default for most yarns."
-            ),
-            gt=0,
-        ),
-    ] = 4
-    / 3,
-    target_stitches: Annotated[
-        int | None,
-        Form(
+@_machine_routes.get(
+    "/pattern/{number}/pixels",
+    response_model=PatternPixelsResponse,
+    response_model_exclude_none=True,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+def get_pattern_pixels(
+    machine: MachineDep,
+    request: Request,
+    response: Response,
+    number: int,
+    encoding: Annotated[
+        PixelEncoding | None,
+        Query(
+            alias="format",
             description=(
-                "Scale image uniformly to this exact stitch width (1–200). "
-                "Overrides the default 200-stitch cap. Leave unset to use max_width."
+                "json (default), packed, rle or binary.  Without it, "
+                "Accept: application/octet-stream selects binary."
             ),
-            ge=1,
-            le=200,
         ),
     ] = None,
-    flip_horizontal: Annotated[
-        bool,
-        Form(description="Mirror the image left-to-right before scaling."),
-    ] = False,
-    rotation: Annotated[
-        int,
-        Form(description="Clockwise rotation in degrees: 0, 90, 180, or 270."),
-    ] = 0,
-    invert: Annotated[
-        bool,
-        Form(description="Swap knit (1) and background (0) after binarisation."),
-    ] = False,
-    dither: Annotated[
-        str,
-        Form(description="Binarisation method: 'none', 'floyd-steinberg', or 'bayer'."),
-    ] = "none",
-    crop_left: Annotated[
-        int, Form(description="Crop left edge (original pixels).")
-    ] = 0,
-    crop_upper: Annotated[
-        int, Form(description="Crop upper edge (original pixels).")
-    ] = 0,
-    crop_right: Annotated[int, Form(description="Crop right edge (0 = no crop).")] = 0,
-    crop_lower: Annotated[int, Form(description="Crop lower edge (0 = no crop).")] = 0,
-) -> WritePatternResponse:
-    """Upload an image and write it as a knitting pattern.
+) -> PatternPixelsResponse | Response:
+    """Return the pixel data and memo values for a committed pattern.
 
-    The image is scaled to ≤ 200 stitches wide, stretched vertically by
-    stitch_aspect_ratio to correct for non-square stitch proportions,
-    binarised, and encoded into the Brother disk image format.  The pattern
-    can then be sent to the machine via POST /send.
+    Used by the Stage 2 pixel editor to load a pattern for editing.  The
+    JSON grid costs about three bytes per stitch; ``packed`` is an eighth
+    of a byte per stitch (as base64) and ``rle`` is smallest for patterns
+    with long runs.  ``binary`` returns the packed rows as the body, with
+    size and memo (one hex digit per row) in X-Pattern-Width/Height/Memo.
+
+    Raises 404 if the pattern does not exist.  Carries an ETag of the
+    pattern content; answers 304 if it still matches.
     """
-    raw = _bytes_from_upload(file)
-    crop = _parse_crop(crop_left, crop_upper, crop_right, crop_lower)
+    disk = machine.disk
+    entry = disk.get_pattern_entry(number)
+    if entry is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Pattern {number} not found in disk image.",
+        )
+    if encoding is None:
+        accept = request.headers.get("accept", "")
+        encoding = "binary" if "application/octet-stream" in accept else "json"
+    etag = _pattern_etag(disk, number, f"pixels-{encoding}")
+    headers = {**_cache_headers(etag), "Vary": "Accept"}
+    response.headers.update(headers)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        not_modified.headers["Vary"] = "Accept"
+        return not_modified
+
     try:
-        result = load_image(
-            raw,
-            threshold=threshold,
-            stitch_aspect_ratio=stitch_aspect_ratio,
-            target_stitches=target_stitches,
-            max_rows=_state.disk.max_rows,
-            flip_horizontal=flip_horizontal,
-            rotation=_validated_rotation(rotation),
-            invert=invert,
-            dither=_validated_dither(dither),
-            crop=crop,
+        if encoding == "json":
+            pixels = disk.read_pattern(number)
+            packed = b""
+        else:
+            packed = disk.read_pattern_packed(number)
+        memo = disk.read_memo(number)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to read pattern {number}: {exc}",
+        )
+
+    if encoding == "json":
+        h = len(pixels)
+        w = len(pixels[0]) if h else 0
+        return PatternPixelsResponse(
+            number=number,
+            pixels=pixels,
+            memo=memo,
+            width=w,
+            height=h,
+        )
+
+    w, h = entry.stitches, entry.rows
+    if encoding == "binary":
+        return Response(
+            content=packed,
+            media_type="application/octet-stream",
+            headers={
+                "X-Pattern-Width": str(w),
+                "X-Pattern-Height": str(h),
+                "X-Pattern-Memo": _memo_hex(memo),
+                **headers,
+            },
+        )
+    if encoding == "packed":
+        return PatternPixelsResponse(
+            number=number,
+            packed=base64.b64encode(packed).decode("ascii"),
+            memo=memo,
+            width=w,
+            height=h,
+            encoding="packed",
+        )
+    return PatternPixelsResponse(
+        number=number,
+        rle=rle_encode_rows(packed, w, h),
+        memo=memo,
+        width=w,
+        height=h,
+        encoding="rle",
+    )
+
+
+@_machine_routes.put("/pattern/{number}", response_model=WritePatternResponse)
+async def edit_pattern(
+    machine: MachineDep, number: int, req: PatternEditRequest
+) -> WritePatternResponse:
+    """Overwrite an existing committed pattern with edited pixel and memo data.
+
+    Performs a delete-then-rewrite compaction internally so the caller does not
+    need to orchestrate two separate requests.  All other patterns are preserved.
+    The pixels may be sent in any of the encodings GET /pattern/{n}/pixels
+    offers as JSON (see PatternEditRequest).
+
+    Raises 404 if the pattern does not exist.
+    Raises 422 if the pixel data is invalid (empty, unequal row widths, stitch
+    count out of range) or if any memo value is outside 0–15.
+    """
+    _require_pattern(machine, number)
+    return await _replace_pattern(machine, number, _edit_request_pixels(req), req.memo)
+
+
+def _if_match(request: Request, disk: DiskImage, number: int) -> None:
+    """Raise 412 if If-Match names none of pattern *number*'s current ETags.
+
+    Every per-pattern ETag starts with the pattern's content hash, so any
+    representation's tag (pixels in any format, previews) can be sent back.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return
+    digest = disk.pattern_hash(number)
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.strip('"').split("-", 1)[0] == digest:
+            return
+    raise HTTPException(
+        status_code=412,
+        detail=f"Pattern {number} has changed since it was loaded.",
+    )
+
+
+@_machine_routes.patch("/pattern/{number}", response_model=PatternPatchResponse)
+def patch_pattern(
+    machine: MachineDep,
+    request: Request,
+    response: Response,
+    number: int,
+    req: PatternPatchRequest,
+) -> PatternPatchResponse:
+    """Apply cell, row-range and memo edits to a stored pattern in place.
+
+    Unlike PUT, nothing is re-encoded or moved: only the nibbles the edits
+    touch are rewritten, so an editor can autosave every few seconds
+    cheaply.  The size of a pattern cannot be changed this way; use PUT.
+
+    Returns the new ETag of GET /pattern/{number}/pixels?format=packed in
+    both the ETag header and the body.  With If-Match, the edits are only
+    applied if the pattern still matches one of its ETags.
+
+    Raises 404 if the pattern does not exist, 412 if If-Match does not
+    match, and 422 if an edit is outside the pattern or a value is out of
+    range (no edits are applied then).
+    """
+    rows: dict[int, list[int]] = {}
+    for edit in req.rows:
+        for i, row in enumerate(edit.pixels):
+            rows[edit.start + i] = row
+    try:
+        # If-Match is checked under the disk lock, so no other write can
+        # land between the check and the edit.
+        with _editing_disk(machine) as disk:
+            _if_match(request, disk, number)
+            changed = disk.patch_pattern(
+                number,
+                cells=[(c.x, c.y, c.value) for c in req.cells],
+                rows=rows,
+                memo={m.row: m.value for m in req.memo},
+            )
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Pattern {number} not found in disk image.",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    entry = disk.get_pattern_entry(number)
+    assert entry is not None
+    etag = _pattern_etag(disk, number, "pixels-packed")
+    response.headers.update(_cache_headers(etag))
+    log.debug("Pattern %d patched — %d nibble(s) changed", number, changed)
+    return PatternPatchResponse(
+        number=number,
+        width=entry.stitches,
+        height=entry.rows,
+        changed=changed,
+        etag=etag,
+    )
+
+
+@_machine_routes.put("/pattern/{number}/pixels", response_model=WritePatternResponse)
+async def put_pattern_pixels(
+    machine: MachineDep,
+    number: int,
+    body: Annotated[bytes, Body(media_type="application/octet-stream")],
+    width: Annotated[int, Query(ge=1, le=200, description="Stitches per row")],
+    memo: Annotated[
+        str, Header(alias="X-Pattern-Memo", description="One hex digit per row")
+    ] = "",
+) -> WritePatternResponse:
+    """Binary variant of PUT /pattern/{number}: the body is the packed rows.
+
+    The row count follows from the body length.  Memo values default to 0.
+    """
+    _require_pattern(machine, number)
+    pixels = _packed_pixels(body, width)
+    if not memo:
+        memo_values = [0] * pixels[2]
+    else:
+        try:
+            memo_values = [int(c, 16) for c in memo]
+        except ValueError:
+            raise HTTPException(
+                status_code=422,
+                detail="X-Pattern-Memo must be one hex digit per row.",
+            )
+    return await _replace_pattern(machine, number, pixels, memo_values)
+
+
+@_machine_routes.post("/pattern", response_model=WritePatternResponse)
+async def write_pattern(
+    machine: MachineDep,
+    file: Annotated[UploadFile, File(description="1-bit image to knit")],
+    number: Annotated[
+        int,
+        Form(description="Pattern number 901–999", ge=901, le=999),
+    ] = 901,
+    threshold: Annotated[
+        int,
+        Form(description="Binarisation threshold 0–255", ge=0, le=255),
+    ] = 128,
+    stitch_aspect_ratio: Annotated[
+        float,
+        Form(
+            description=(
+                "Vertical stretch factor to compensate for non-square stitch "
+                "aspect ratio. 1.33 (4:3) is a good default for most yarns."
+            ),
+            gt=0,
+        ),
+    ] = 4
+    / 3,
+    target_stitches: Annotated[
+        int | None,
+        Form(
+            description=(
+                "Scale image uniformly to this exact stitch width (1–200). "
+                "Overrides the default 200-stitch cap. Leave unset to use max_width."
+            ),
+            ge=1,
+            le=200,
+        ),
+    ] = None,
+    flip_horizontal: Annotated[
+        bool,
+        Form(description="Mirror the image left-to-right before scaling."),
+    ] = False,
+    rotation: Annotated[
+        int,
+        Form(description="Clockwise rotation in degrees: 0, 90, 180, or 270."),
+    ] = 0,
+    invert: Annotated[
+        bool,
+        Form(description="Swap knit (1) and background (0) after binarisation."),
+    ] = False,
+    dither: Annotated[
+        str,
+        Form(description="Binarisation method: 'none', 'floyd-steinberg', or 'bayer'."),
+    ] = "none",
+    crop_left: Annotated[
+        int, Form(description="Crop left edge (original pixels).")
+    ] = 0,
+    crop_upper: Annotated[
+        int, Form(description="Crop upper edge (original pixels).")
+    ] = 0,
+    crop_right: Annotated[int, Form(description="Crop right edge (0 = no crop).")] = 0,
+    crop_lower: Annotated[int, Form(description="Crop lower edge (0 = no crop).")] = 0,
+    auto_trim: Annotated[
+        bool,
+        Form(description="Crop blank margins around the knit stitches."),
+    ] = False,
+    trim_margin: Annotated[
+        int,
+        Form(description="Blank stitches/rows to keep when auto-trimming.", ge=0),
+    ] = 0,
+    store_tile: Annotated[
+        bool,
+        Form(
+            description="Store only the smallest repeating tile the image "
+            "is a whole number of."
+        ),
+    ] = False,
+    fix_floats: Annotated[
+        bool,
+        Form(description="Insert tie-down stitches to break long floats."),
+    ] = False,
+    max_float: Annotated[
+        int,
+        Form(description="Longest float allowed when fixing floats.", ge=2),
+    ] = DEFAULT_MAX_FLOAT,
+) -> WritePatternResponse:
+    """Upload an image and write it as a knitting pattern.
+
+    The image is scaled to ≤ 200 stitches wide, stretched vertically by
+    stitch_aspect_ratio to correct for non-square stitch proportions,
+    binarised, and encoded into the Brother disk image format.  The pattern
+    can then be sent to the machine via POST /send.
+    """
+    raw = _bytes_from_upload(file)
+    options = _image_options(
+        machine,
+        threshold=threshold,
+        stitch_aspect_ratio=stitch_aspect_ratio,
+        target_stitches=target_stitches,
+        flip_horizontal=flip_horizontal,
+        rotation=rotation,
+        invert=invert,
+        dither=dither,
+        crop_left=crop_left,
+        crop_upper=crop_upper,
+        crop_right=crop_right,
+        crop_lower=crop_lower,
+        auto_trim=auto_trim,
+        trim_margin=trim_margin,
+    )
+    try:
+        result = await _workers.run(
+            convert_image,
+            raw,
+            options,
+            store_tile=store_tile,
+            fix_floats=max_float if fix_floats else None,
         )
     except ImageError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
 
     try:
-        _state.disk.write_pattern(number, result.rows)
+        with _editing_disk(machine) as disk:
+            disk.write_pattern_packed(
+                number, result.packed, result.width, result.height
+            )
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
     except Exception as exc:
@@ -1013,18 +2484,19 @@ def write_pattern(
             detail=f"Failed to encode pattern into disk image: {exc}",
         )
 
-    return WritePatternResponse(
-        number=number,
-        width=result.width,
-        height=result.height,
-        orig_width=result.orig_width,
-        orig_height=result.orig_height,
-    )
+    return _written(number, result)
 
 
-@app.post("/preview", response_model=PreviewResponse)
-def preview_image(
-    file: Annotated[UploadFile, File(description="Image to preview")],
+@_machine_routes.post("/pattern/frames", response_model=WriteFramesResponse)
+async def write_pattern_frames(
+    machine: MachineDep,
+    file: Annotated[
+        UploadFile, File(description="Animated GIF or multi-page TIFF to knit")
+    ],
+    number: Annotated[
+        int,
+        Form(description="Pattern number for the first frame, 901–999", ge=901, le=999),
+    ] = 901,
     threshold: Annotated[int, Form(ge=0, le=255)] = 128,
     stitch_aspect_ratio: Annotated[float, Form(gt=0)] = 4 / 3,
     target_stitches: Annotated[int | None, Form(ge=1, le=200)] = None,
@@ -1036,74 +2508,463 @@ def preview_image(
     crop_upper: Annotated[int, Form()] = 0,
     crop_right: Annotated[int, Form()] = 0,
     crop_lower: Annotated[int, Form()] = 0,
-) -> PreviewResponse:
-    """Return a scaled/binarised preview PNG without writing to disk."""
+) -> WriteFramesResponse:
+    """Write every frame of a multi-frame image as consecutive patterns.
+
+    Frame 0 becomes pattern ``number``, frame 1 ``number + 1`` and so on,
+    all converted with the same settings as POST /pattern.  The frames are
+    committed to the disk image in one batch, so a frame that fails to
+    convert or does not fit leaves the disk unchanged.
+
+    Raises 422 if a frame cannot be converted, the frames would run past
+    pattern 999, or the batch does not fit on the disk.
+    """
     raw = _bytes_from_upload(file)
     crop = _parse_crop(crop_left, crop_upper, crop_right, crop_lower)
+    available = 999 - number + 1
+    options = {
+        "threshold": threshold,
+        "stitch_aspect_ratio": stitch_aspect_ratio,
+        "target_stitches": target_stitches,
+        "max_rows": machine.disk.max_rows,
+        "flip_horizontal": flip_horizontal,
+        "rotation": _validated_rotation(rotation),
+        "invert": invert,
+        "dither": _validated_dither(dither),
+        "crop": crop,
+    }
     try:
-        result = load_image(
+        results = await _workers.run(
+            convert_frames, raw, options, max_frames=available + 1
+        )
+    except ImageError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if len(results) > available:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"Image has more than {available} frames; starting at {number} "
+                "they would run past pattern 999."
+            ),
+        )
+
+    _write_consecutive(machine, number, results)
+    log.info(
+        "Patterns %d–%d written from %d frame(s)",
+        number,
+        number + len(results) - 1,
+        len(results),
+    )
+    return WriteFramesResponse(
+        patterns=[_written(number + i, r) for i, r in enumerate(results)]
+    )
+
+
+@_machine_routes.post("/pattern/colours", response_model=WriteColoursResponse)
+async def write_pattern_colours(
+    machine: MachineDep,
+    file: Annotated[UploadFile, File(description="Colour image to separate")],
+    number: Annotated[
+        int,
+        Form(
+            description="Pattern number for the first colour, 901–999", ge=901, le=999
+        ),
+    ] = 901,
+    colours: Annotated[
+        int,
+        Form(
+            description="Number of yarn colours to reduce the image to (2–8).",
+            ge=2,
+            le=MAX_SEPARATION_COLOURS,
+        ),
+    ] = 2,
+    method: Annotated[
+        str, Form(description="Palette reduction: 'median-cut' or 'k-means'.")
+    ] = "median-cut",
+    include_background: Annotated[
+        bool,
+        Form(description="Also write a pattern for the most common colour."),
+    ] = False,
+    stitch_aspect_ratio: Annotated[float, Form(gt=0)] = 4 / 3,
+    target_stitches: Annotated[int | None, Form(ge=1, le=200)] = None,
+    flip_horizontal: Annotated[bool, Form()] = False,
+    rotation: Annotated[int, Form()] = 0,
+    crop_left: Annotated[int, Form()] = 0,
+    crop_upper: Annotated[int, Form()] = 0,
+    crop_right: Annotated[int, Form()] = 0,
+    crop_lower: Annotated[int, Form()] = 0,
+) -> WriteColoursResponse:
+    """Separate a colour image into one pattern per yarn colour.
+
+    The image is quantised to ``colours`` colours and each colour (except
+    the most common one, the background, unless ``include_background`` is
+    set) is written as a pattern whose knit stitches are that colour.
+    Patterns are numbered consecutively from ``number`` in order of
+    decreasing stitch count and committed in one batch.
+
+    Raises 422 for an unknown method, an unreadable image, an image with
+    no colours besides the background, or a batch that runs past pattern
+    999 or does not fit on the disk.
+    """
+    if method not in ("median-cut", "k-means"):
+        raise HTTPException(
+            status_code=422,
+            detail=f"method must be 'median-cut' or 'k-means'; got {method!r}",
+        )
+    raw = _bytes_from_upload(file)
+    crop = _parse_crop(crop_left, crop_upper, crop_right, crop_lower)
+    try:
+        separation = await _workers.run(
+            separate_colours,
             raw,
-            threshold=threshold,
+            colours,
+            method=method,
+            include_background=include_background,
             stitch_aspect_ratio=stitch_aspect_ratio,
             target_stitches=target_stitches,
-            max_rows=_state.disk.max_rows,
+            max_rows=machine.disk.max_rows,
             flip_horizontal=flip_horizontal,
             rotation=_validated_rotation(rotation),
-            invert=invert,
-            dither=_validated_dither(dither),
             crop=crop,
         )
     except ImageError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
+    results = separation.results
+    if not results:
+        raise HTTPException(
+            status_code=422, detail="image has no colours besides the background"
+        )
+    if number + len(results) - 1 > 999:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"{len(results)} colour patterns starting at {number} would run "
+                "past pattern 999."
+            ),
+        )
+
+    _write_consecutive(machine, number, results)
+    log.info(
+        "Patterns %d–%d written from %d colour(s)",
+        number,
+        number + len(results) - 1,
+        len(results),
+    )
+    return WriteColoursResponse(
+        patterns=[
+            ColourPatternResponse(
+                **_written(number + i, r).model_dump(), colour=_hex_colour(rgb)
+            )
+            for i, (r, rgb) in enumerate(zip(results, separation.palette))
+        ],
+        background=_hex_colour(separation.background),
+    )
+
+
+def _image_options(
+    machine: _Machine,
+    *,
+    threshold: int,
+    stitch_aspect_ratio: float,
+    target_stitches: int | None,
+    flip_horizontal: bool,
+    rotation: int,
+    invert: bool,
+    dither: str,
+    crop_left: int,
+    crop_upper: int,
+    crop_right: int,
+    crop_lower: int,
+    auto_trim: bool,
+    trim_margin: int,
+) -> dict[str, object]:
+    """load_image keyword arguments for an upload's form fields.
+
+    Validated here, so that bad values are rejected before any work is
+    handed to a worker process.
+    """
+    return {
+        "threshold": threshold,
+        "stitch_aspect_ratio": stitch_aspect_ratio,
+        "target_stitches": target_stitches,
+        "max_rows": machine.disk.max_rows,
+        "flip_horizontal": flip_horizontal,
+        "rotation": _validated_rotation(rotation),
+        "invert": invert,
+        "dither": _validated_dither(dither),
+        "crop": _parse_crop(crop_left, crop_upper, crop_right, crop_lower),
+        "auto_trim": auto_trim,
+        "trim_margin": trim_margin,
+    }
+
+
+async def _upload_preview(
+    machine: _Machine,
+    file: UploadFile,
+    *,
+    fix_floats: bool,
+    max_float: int | None,
+    compress_level: int,
+    **options: Any,
+) -> Preview:
+    """Shared body of POST /preview and POST /preview.png.
+
+    *options* are the image form fields (see _image_options).  Converting
+    and encoding run in a worker process.
+    """
+    raw = _bytes_from_upload(file)
+    load_options = _image_options(machine, **options)
+    try:
+        return await _workers.run(
+            render_preview,
+            raw,
+            load_options,
+            fix_floats=fix_floats,
+            max_float=max_float,
+            compress_level=compress_level,
+        )
+    except ImageError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@_machine_routes.post("/preview", response_model=PreviewResponse)
+async def preview_image(
+    machine: MachineDep,
+    file: Annotated[UploadFile, File(description="Image to preview")],
+    threshold: Annotated[int, Form(ge=0, le=255)] = 128,
+    stitch_aspect_ratio: Annotated[float, Form(gt=0)] = 4 / 3,
+    target_stitches: Annotated[int | None, Form(ge=1, le=200)] = None,
+    flip_horizontal: Annotated[bool, Form()] = False,
+    rotation: Annotated[int, Form()] = 0,
+    invert: Annotated[bool, Form()] = False,
+    dither: Annotated[str, Form()] = "none",
+    crop_left: Annotated[int, Form()] = 0,
+    crop_upper: Annotated[int, Form()] = 0,
+    crop_right: Annotated[int, Form()] = 0,
+    crop_lower: Annotated[int, Form()] = 0,
+    auto_trim: Annotated[bool, Form()] = False,
+    trim_margin: Annotated[int, Form(ge=0)] = 0,
+    max_float: Annotated[int | None, Form(ge=2)] = None,
+    fix_floats: Annotated[bool, Form()] = False,
+    compress_level: Annotated[int, Form(ge=0, le=9)] = 6,
+) -> PreviewResponse:
+    """Return a scaled/binarised preview PNG without writing to disk.
+
+    With ``max_float`` set, the response also counts the runs longer than
+    that and carries a heatmap highlighting them; ``fix_floats`` breaks
+    them with tie-down stitches before previewing.
+    """
+    preview = await _upload_preview(
+        machine,
+        file,
+        threshold=threshold,
+        stitch_aspect_ratio=stitch_aspect_ratio,
+        target_stitches=target_stitches,
+        flip_horizontal=flip_horizontal,
+        rotation=rotation,
+        invert=invert,
+        dither=dither,
+        crop_left=crop_left,
+        crop_upper=crop_upper,
+        crop_right=crop_right,
+        crop_lower=crop_lower,
+        auto_trim=auto_trim,
+        trim_margin=trim_margin,
+        fix_floats=fix_floats,
+        max_float=max_float,
+        compress_level=compress_level,
+    )
+    long_floats = heatmap_uri = None
+    if preview.floats is not None and preview.heatmap_png is not None:
+        long_floats = len(preview.floats)
+        heatmap_uri = _png_data_uri(preview.heatmap_png)
 
-    png_bytes = _render_preview_png(result.rows)
-    data_uri = "data:image/png;base64," + base64.b64encode(png_bytes).decode()
     return PreviewResponse(
-        width=result.width,
-        height=result.height,
-        data_uri=data_uri,
+        width=preview.result.width,
+        height=preview.result.height,
+        data_uri=_png_data_uri(preview.png),
+        long_floats=long_floats,
+        heatmap_uri=heatmap_uri,
     )
 
 
-@app.post("/send", response_model=SendResponse)
-def send_to_machine() -> SendResponse:
+@_machine_routes.post("/preview.png", response_class=Response, responses=_PNG_CONTENT)
+async def preview_image_png(
+    machine: MachineDep,
+    file: Annotated[UploadFile, File(description="Image to preview")],
+    threshold: Annotated[int, Form(ge=0, le=255)] = 128,
+    stitch_aspect_ratio: Annotated[float, Form(gt=0)] = 4 / 3,
+    target_stitches: Annotated[int | None, Form(ge=1, le=200)] = None,
+    flip_horizontal: Annotated[bool, Form()] = False,
+    rotation: Annotated[int, Form()] = 0,
+    invert: Annotated[bool, Form()] = False,
+    dither: Annotated[str, Form()] = "none",
+    crop_left: Annotated[int, Form()] = 0,
+    crop_upper: Annotated[int, Form()] = 0,
+    crop_right: Annotated[int, Form()] = 0,
+    crop_lower: Annotated[int, Form()] = 0,
+    auto_trim: Annotated[bool, Form()] = False,
+    trim_margin: Annotated[int, Form(ge=0)] = 0,
+    max_float: Annotated[int | None, Form(ge=2)] = None,
+    fix_floats: Annotated[bool, Form()] = False,
+    compress_level: Annotated[int, Form(ge=0, le=9)] = 6,
+) -> Response:
+    """Binary variant of POST /preview: the 1-bit PNG itself.
+
+    The pattern size is returned in the X-Pattern-Width/Height headers.
+    """
+    preview = await _upload_preview(
+        machine,
+        file,
+        threshold=threshold,
+        stitch_aspect_ratio=stitch_aspect_ratio,
+        target_stitches=target_stitches,
+        flip_horizontal=flip_horizontal,
+        rotation=rotation,
+        invert=invert,
+        dither=dither,
+        crop_left=crop_left,
+        crop_upper=crop_upper,
+        crop_right=crop_right,
+        crop_lower=crop_lower,
+        auto_trim=auto_trim,
+        trim_margin=trim_margin,
+        fix_floats=fix_floats,
+        max_float=max_float,
+        compress_level=compress_level,
+    )
+    return Response(
+        content=preview.png,
+        media_type="image/png",
+        headers={
+            "X-Pattern-Width": str(preview.result.width),
+            "X-Pattern-Height": str(preview.result.height),
+        },
+    )
+
+
+# Upper bound on parameter sets per sweep, to keep one request bounded.
+_MAX_SWEEP_VARIANTS: int = 16
+
+_sweep_variants_adapter = TypeAdapter(list[SweepVariantRequest])
+
+
+@_machine_routes.post("/preview/sweep", response_model=SweepResponse)
+async def preview_sweep(
+    machine: MachineDep,
+    file: Annotated[UploadFile, File(description="Image to preview")],
+    variants: Annotated[
+        str,
+        Form(
+            description=(
+                "JSON list of parameter sets, each with optional threshold, "
+                "dither, invert and target_stitches."
+            )
+        ),
+    ],
+    stitch_aspect_ratio: Annotated[float, Form(gt=0)] = 4 / 3,
+    flip_horizontal: Annotated[bool, Form()] = False,
+    rotation: Annotated[int, Form()] = 0,
+    crop_left: Annotated[int, Form()] = 0,
+    crop_upper: Annotated[int, Form()] = 0,
+    crop_right: Annotated[int, Form()] = 0,
+    crop_lower: Annotated[int, Form()] = 0,
+    sheet: Annotated[
+        bool,
+        Form(description="Also return every preview side by side as one PNG."),
+    ] = False,
+) -> SweepResponse:
+    """Preview several thresholds / dither modes of one image side by side.
+
+    The upload is decoded and resized once per distinct target_stitches, so
+    comparing N variants costs far less than N calls to POST /preview.
+    """
+    try:
+        requested = _sweep_variants_adapter.validate_json(variants)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors())
+    if not requested:
+        raise HTTPException(status_code=422, detail="variants must not be empty.")
+    if len(requested) > _MAX_SWEEP_VARIANTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {_MAX_SWEEP_VARIANTS} variants per sweep.",
+        )
+
+    raw = _bytes_from_upload(file)
+    crop = _parse_crop(crop_left, crop_upper, crop_right, crop_lower)
+    options = {
+        "stitch_aspect_ratio": stitch_aspect_ratio,
+        "max_rows": machine.disk.max_rows,
+        "flip_horizontal": flip_horizontal,
+        "rotation": _validated_rotation(rotation),
+        "crop": crop,
+    }
+    try:
+        rendered = await _workers.run(
+            render_sweep,
+            raw,
+            [SweepVariant(**v.model_dump()) for v in requested],
+            options,
+            sheet=sheet,
+        )
+    except ImageError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    swept = rendered.sweep
+    previews = [
+        SweepPreview(
+            **v.model_dump(),
+            width=result.width,
+            height=result.height,
+            data_uri=_png_data_uri(png),
+        )
+        for v, result, png in zip(requested, swept.results, rendered.pngs)
+    ]
+    sheet_uri = None
+    if rendered.sheet_png is not None:
+        sheet_uri = _png_data_uri(rendered.sheet_png)
+    return SweepResponse(
+        suggested_threshold=swept.suggested_threshold,
+        previews=previews,
+        contact_sheet=sheet_uri,
+    )
+
+
+@_machine_routes.post("/send", response_model=SendResponse)
+def send_to_machine(machine: MachineDep) -> SendResponse:
     """Serve the persisted sector files to the machine for a load operation.
 
     Returns a task_id; poll GET /send/{task_id} for status.
     """
-    # Prevent two emulator tasks from opening the serial port simultaneously.
-    for task in _state.tasks.values():
-        if task.status == _TaskStatus.RUNNING:
-            raise HTTPException(
-                status_code=409,
-                detail="An emulator task is already running. Wait for it to finish or stop it first.",
-            )
-
-    _require_serial_port()  # raises 503 if no port is configured
+    _require_idle(machine)
+    _require_serial_port(machine)  # raises 503 if no port is configured
 
     task_id = str(uuid.uuid4())
-    _state.tasks[task_id] = _TaskState()
+    machine.tasks[task_id] = _TaskState()
+    disk = machine.disk
 
     log.info(
         "Queuing send task %s — %d pattern(s) in disk image, port=%s",
         task_id,
-        len(_state.disk.list_patterns()),
-        _state.serial_port,
+        len(disk.list_patterns()),
+        machine.serial_port,
     )
 
     thread = threading.Thread(
         target=_run_send,
-        args=(task_id,),
+        args=(machine, task_id, disk),
         daemon=True,
-        name=f"pdd-emulator-{task_id[:8]}",
+        name=f"pdd-{machine.name}-{task_id[:8]}",
     )
     thread.start()
 
     return SendResponse(task_id=task_id, status=_TaskStatus.PENDING)
 
 
-@app.post("/receive", response_model=SendResponse)
+@_machine_routes.post("/receive", response_model=SendResponse)
 def receive_from_machine(
+    machine: MachineDep,
     force: Annotated[
         bool,
         Form(
@@ -1128,18 +2989,11 @@ def receive_from_machine(
 
     Returns a task_id; poll GET /send/{task_id} for status.
     """
-    # Prevent two emulator tasks from opening the serial port simultaneously.
-    for task in _state.tasks.values():
-        if task.status == _TaskStatus.RUNNING:
-            raise HTTPException(
-                status_code=409,
-                detail="An emulator task is already running. Wait for it to finish or stop it first.",
-            )
-
-    _require_serial_port()  # raises 503 if no port is configured
+    _require_idle(machine)
+    _require_serial_port(machine)  # raises 503 if no port is configured
 
     # Guard: warn before overwriting a non-empty disk.
-    existing = _state.disk.list_patterns()
+    existing = machine.disk.list_patterns()
     if existing and not force:
         raise HTTPException(
             status_code=409,
@@ -1154,29 +3008,29 @@ def receive_from_machine(
         )
 
     task_id = str(uuid.uuid4())
-    _state.tasks[task_id] = _TaskState()
+    machine.tasks[task_id] = _TaskState()
 
     log.info(
         "Queuing receive task %s — port=%s",
         task_id,
-        _state.serial_port,
+        machine.serial_port,
     )
 
     thread = threading.Thread(
         target=_run_receive,
-        args=(task_id,),
+        args=(machine, task_id),
         daemon=True,
-        name=f"pdd-emulator-{task_id[:8]}",
+        name=f"pdd-{machine.name}-{task_id[:8]}",
     )
     thread.start()
 
     return SendResponse(task_id=task_id, status=_TaskStatus.PENDING)
 
 
-@app.get("/send/{task_id}", response_model=TaskStatusResponse)
-def send_status(task_id: str) -> TaskStatusResponse:
+@_machine_routes.get("/send/{task_id}", response_model=TaskStatusResponse)
+def send_status(machine: MachineDep, task_id: str) -> TaskStatusResponse:
     """Poll the status of a send task."""
-    task = _state.tasks.get(task_id)
+    task = machine.tasks.get(task_id)
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found.")
     return TaskStatusResponse(
@@ -1186,40 +3040,108 @@ def send_status(task_id: str) -> TaskStatusResponse:
     )
 
 
-@app.get("/config", response_model=ConfigResponse)
-def get_config() -> ConfigResponse:
+@_machine_routes.get("/config", response_model=ConfigResponse)
+def get_config(machine: MachineDep) -> ConfigResponse:
     return ConfigResponse(
-        serial_port=_state.serial_port,
-        baud_rate=_state.baud_rate,
-        disk_dir=_state.disk_dir,
+        serial_port=machine.serial_port,
+        baud_rate=machine.baud_rate,
+        disk_dir=machine.disk_dir,
     )
 
 
-@app.put("/config", response_model=ConfigResponse)
-def update_config(req: ConfigRequest) -> ConfigResponse:
+def _move_disk_dir(machine: _Machine, directory: str) -> None:
+    """Save the current disk state in *directory* from now on.
+
+    Whatever was stored there before is replaced.  Raises 400, and keeps
+    saving in the old directory, if *directory* cannot be created.
+    """
+    try:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        machine.persistence.open(directory)
+    except OSError as exc:
+        raise HTTPException(
+            status_code=400, detail=f"Cannot use disk_dir {directory!r}: {exc}"
+        )
+    with machine.disk_lock:
+        disk = machine.disk
+        machine.persistence.record(disk.working_region_bytes(), disk.model.value)
+        machine.persistence.save_sectors(machine.sector_dat, machine.sector_id)
+        machine.persistence.snapshot()
+
+
+@_machine_routes.put("/config", response_model=ConfigResponse)
+def update_config(machine: MachineDep, req: ConfigRequest) -> ConfigResponse:
+    _require_unshared(machine, req.serial_port, req.disk_dir)
     changes: list[str] = []
     if req.serial_port is not None:
         changes.append(f"serial_port={req.serial_port!r}")
-        _state.serial_port = req.serial_port
+        machine.serial_port = req.serial_port
     if req.baud_rate is not None:
         changes.append(f"baud_rate={req.baud_rate}")
-        _state.baud_rate = req.baud_rate
+        machine.baud_rate = req.baud_rate
     if req.disk_dir is not None:
+        if machine.persistence.is_open:
+            _move_disk_dir(machine, req.disk_dir)
         changes.append(f"disk_dir={req.disk_dir!r}")
-        _state.disk_dir = req.disk_dir
+        machine.disk_dir = req.disk_dir
     if changes:
-        log.info("Configuration updated: %s", ", ".join(changes))
-    return get_config()
+        log.info(
+            "Configuration of machine %r updated: %s", machine.name, ", ".join(changes)
+        )
+    return get_config(machine)
+
+
+@_machine_routes.post("/disk/trim")
+def trim_disk(
+    machine: MachineDep,
+    margin: Annotated[int, Query(ge=0, description="Blank border to keep")] = 0,
+) -> dict[str, object]:
+    """Crop every stored pattern to the bounding box of its knit stitches.
 
+    Blank margins carried over from the original artwork are removed and
+    the disk image is compacted, freeing space for more patterns.  Returns
+    the bytes saved per trimmed pattern.
+    """
+    try:
+        with _editing_disk(machine) as disk:
+            saved = disk.trim_patterns(margin=margin)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to trim patterns: {exc}")
 
-@app.delete("/disk")
-def reset_disk() -> dict[str, str]:
+    log.info(
+        "Trimmed %d pattern(s), %d bytes saved, %d bytes remaining",
+        len(saved),
+        sum(saved.values()),
+        disk.bytes_remaining,
+    )
+    return {
+        "status": "ok",
+        "trimmed": {str(n): b for n, b in saved.items()},
+        "bytes_saved": sum(saved.values()),
+        "bytes_remaining": disk.bytes_remaining,
+    }
+
+
+@_machine_routes.delete("/disk")
+def reset_disk(machine: MachineDep) -> dict[str, str]:
     """Wipe the in-memory disk image back to blank."""
-    _state.disk = DiskImage.blank(_state.model)
+    _publish_disk(machine, DiskImage.blank(machine.model))
     log.info("Disk image reset to blank")
     return {"status": "ok", "detail": "Disk image reset to blank."}
 
 
+@app.get("/metrics", response_class=Response)
+def get_metrics() -> Response:
+    """Return the server's metrics in the Prometheus text format.
+
+    Covers HTTP request latency per route, load_image stage timings,
+    pattern encode/decode and compaction timings, cache hits and misses,
+    and the serial drive emulator's traffic, commands and timeouts (see
+    app.metrics).
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/ports", response_model=PortListResponse)
 def list_ports() -> PortListResponse:
     """Return all available serial ports and flag FTDI candidates.
@@ -1232,3 +3154,247 @@ def list_ports() -> PortListResponse:
         ports=[_port_info_to_response(p) for p in ports],
         ftdi_candidates=[p.device for p in ports if p.is_ftdi],
     )
+
+
+@app.get("/ports/discovery", response_model=PortDiscoveryResponse)
+def get_port_discovery() -> PortDiscoveryResponse:
+    """Report on the default machine's FTDI port discovery.
+
+    Discovery runs in the background once the server has started, so the
+    first requests may see "pending" or "running".
+    """
+    return PortDiscoveryResponse(
+        status=_discovery.status,
+        port=_discovery.port,
+        error=_discovery.error,
+        serial_port=_state.serial_port,
+    )
+
+
+def _machine_info(machine: _Machine) -> MachineInfo:
+    return MachineInfo(
+        name=machine.name,
+        model=machine.model.value,
+        serial_port=machine.serial_port,
+        baud_rate=machine.baud_rate,
+        disk_dir=machine.disk_dir,
+        busy=_is_busy(machine),
+        patterns=len(machine.disk.list_patterns()),
+    )
+
+
+@app.get("/machines", response_model=MachineListResponse)
+def list_machines() -> MachineListResponse:
+    """List the machine profiles and whether each is busy with a transfer."""
+    return MachineListResponse(
+        machines=[_machine_info(m) for m in list(_machines.values())]
+    )
+
+
+@app.post("/machines", response_model=MachineInfo, status_code=201)
+def add_machine(req: MachineRequest) -> MachineInfo:
+    """Add a machine profile with its own port, disk image and tasks.
+
+    Its routes are then served under /machines/{name}.  Raises 422 for a
+    name that is not 1–32 letters, digits, '-' or '_', and 409 if the name,
+    serial port or disk_dir is already in use.
+    """
+    if not _MACHINE_NAME.fullmatch(req.name):
+        raise HTTPException(
+            status_code=422,
+            detail="Machine names are 1–32 letters, digits, '-' or '_'.",
+        )
+    if req.name in _machines:
+        raise HTTPException(
+            status_code=409, detail=f"Machine {req.name!r} already exists."
+        )
+    machine = _Machine(
+        req.name,
+        model=MachineModel(req.model),
+        serial_port=req.serial_port,
+        baud_rate=req.baud_rate,
+        disk_dir=req.disk_dir or f"/tmp/knitting_disk-{req.name}",
+    )
+    _require_unshared(machine, machine.serial_port, machine.disk_dir)
+    if _serving:
+        _start_machine(machine)
+    _machines[machine.name] = machine
+    log.info(
+        "Machine %r added — model=%s  port=%s",
+        machine.name,
+        req.model,
+        machine.serial_port or "none",
+    )
+    return _machine_info(machine)
+
+
+@app.delete("/machines/{machine}")
+def remove_machine(machine: MachineDep) -> dict[str, str]:
+    """Remove a machine profile; its saved disk state stays in its disk_dir.
+
+    Raises 409 for the default machine or while a transfer is running.
+    """
+    if machine is _state:
+        raise HTTPException(
+            status_code=409, detail="The default machine cannot be removed."
+        )
+    _require_idle(machine)
+    del _machines[machine.name]
+    _stop_machine(machine)
+    log.info("Machine %r removed", machine.name)
+    return {"status": "ok", "detail": f"Machine {machine.name!r} removed."}
+
+
+# ---------------------------------------------------------------------------
+# Admin: profiling
+# ---------------------------------------------------------------------------
+
+
+def _require_admin(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    """Route dependency: require ``Authorization: Bearer $KNITTING_ADMIN_TOKEN``.
+
+    Raises 403 if no admin token is configured, 401 if the header does not
+    carry it.
+    """
+    if not _admin_token:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled; set KNITTING_ADMIN_TOKEN.",
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), _admin_token.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Admin token required.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+_admin_only = [Depends(_require_admin)]
+
+
+def _trigger_info(trigger: Trigger) -> ProfileTriggerInfo:
+    return ProfileTriggerInfo(
+        id=trigger.id,
+        target=trigger.target,
+        kind=trigger.kind,
+        method=trigger.method,
+        remaining=trigger.remaining,
+    )
+
+
+def _profile_info(profile: Profile) -> ProfileInfo:
+    return ProfileInfo(
+        id=profile.id,
+        target=profile.target,
+        kind=profile.kind,
+        label=profile.label,
+        started=profile.started,
+        seconds=profile.seconds,
+    )
+
+
+@app.post(
+    "/admin/profile",
+    response_model=ProfileTriggerInfo,
+    status_code=201,
+    dependencies=_admin_only,
+)
+def arm_profiler(req: ProfileTriggerRequest) -> ProfileTriggerInfo:
+    """Profile the next *count* requests to a route, or emulator sessions.
+
+    Each matching request (or send/receive) runs under cProfile ("cpu") or
+    tracemalloc ("memory"); fetch the results from GET /admin/profile.
+    Image conversion runs in worker processes, which are not profiled:
+    set KNITTING_WORKERS=0 to profile it in-process.
+
+    Raises 422 if target is neither a path nor "emulator".
+    """
+    try:
+        trigger = _profiler.arm(
+            req.target,
+            req.count,
+            req.kind,
+            req.method.upper() if req.method else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    log.info(
+        "Profiler armed — %s %s × %d (%s)",
+        trigger.method or "",
+        trigger.target,
+        trigger.remaining,
+        trigger.kind,
+    )
+    return _trigger_info(trigger)
+
+
+@app.get("/admin/profile", response_model=ProfileListResponse, dependencies=_admin_only)
+def list_profiles() -> ProfileListResponse:
+    """List the armed triggers and the stored profiles, oldest first."""
+    return ProfileListResponse(
+        triggers=[_trigger_info(t) for t in _profiler.triggers()],
+        profiles=[_profile_info(p) for p in _profiler.profiles()],
+    )
+
+
+@app.delete("/admin/profile", dependencies=_admin_only)
+def disarm_profiler() -> dict[str, str]:
+    """Drop every armed trigger; stored profiles are kept."""
+    dropped = _profiler.disarm()
+    return {"status": "ok", "detail": f"{dropped} trigger(s) removed."}
+
+
+_PROFILE_MEDIA_TYPES: dict[str, str] = {
+    "pstats": "application/octet-stream",
+    "collapsed": "text/plain; charset=utf-8",
+    "text": "text/plain; charset=utf-8",
+}
+
+
+@app.get(
+    "/admin/profile/{profile_id}",
+    response_class=Response,
+    dependencies=_admin_only,
+)
+def download_profile(
+    profile_id: str,
+    fmt: Annotated[
+        ProfileFormat,
+        Query(
+            alias="format",
+            description=(
+                "pstats (cpu profiles; load with pstats.Stats), collapsed "
+                "(stacks for flamegraph.pl or speedscope) or text."
+            ),
+        ),
+    ] = "text",
+) -> Response:
+    """Download a stored profile.
+
+    Raises 404 if the profile is unknown (or was evicted), 400 for pstats of
+    a memory profile.
+    """
+    profile = _profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=404, detail=f"Profile {profile_id!r} not found."
+        )
+    try:
+        body = profile.export(fmt)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    ext = {"pstats": "prof", "collapsed": "folded", "text": "txt"}[fmt]
+    return Response(
+        content=body,
+        media_type=_PROFILE_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{profile.id}.{ext}"'},
+    )
+
+
+app.include_router(_machine_routes)
+app.include_router(_machine_routes, prefix=_MACHINE_PREFIX)
@@ -0,0 +1,402 @@
+"""
+app/batch.py — Headless batch conversion of artwork into Brother disk images.
+
+Turns a directory (or glob) of images into one or more ``.dat`` disk images
+without going through the web API.  Images are converted in parallel in a
+process pool with the same options ``load_image`` accepts, packed into as
+many DiskImages as needed, and written out together with a JSON manifest
+describing where every design ended up.
+
+Usage::
+
+    python -m app.batch artwork/ --out disks/ --model kh940 --start 901
+    knitting-batch 'designs/*.png' --out disks/ --numbering filename
+
+Numbering schemes
+-----------------
+sequential   Patterns are numbered ``start``, ``start + 1``, … in source
+             order.  Numbering restarts at ``start`` on each new disk.
+filename     The pattern number is taken from the last run of digits in the
+             file name (``design-905.png`` → 905).  A number that is already
+             used on the current disk starts a new disk.
+
+A new disk is also started whenever the next pattern would not fit in the
+remaining pattern memory or directory slots of the current one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Sequence
+
+from app.brother_format import (
+    PATTERN_NUMBER_MAX,
+    PATTERN_NUMBER_MIN,
+    DiskImage,
+    MachineModel,
+)
+from app.image import DEFAULT_STITCH_ASPECT_RATIO, ImageResult, load_image
+from app.util import bytes_per_pattern_and_memo
+
+logger = logging.getLogger(__name__)
+
+# File suffixes picked up when a source is a directory.
+IMAGE_SUFFIXES: frozenset[str] = frozenset(
+    {".png", ".gif", ".bmp", ".jpg", ".jpeg", ".tif", ".tiff", ".webp"}
+)
+
+Numbering = Literal["sequential", "filename"]
+
+_MODELS: dict[str, MachineModel] = {
+    "kh930": MachineModel.KH930,
+    "kh940": MachineModel.KH940,
+}
+
+
+class BatchError(ValueError):
+    """Raised when a batch cannot be set up (no sources, bad numbering, …)."""
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    """Where one source image ended up."""
+
+    source: str
+    disk: int  # 0-based index into BatchResult.disks
+    number: int
+    width: int
+    height: int
+    orig_width: int
+    orig_height: int
+    bytes_used: int
+
+
+@dataclass
+class BatchResult:
+    """Outcome of convert_batch()."""
+
+    disks: list[DiskImage] = field(default_factory=list)
+    items: list[BatchItem] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+# ---------------------------------------------------------------------------
+# Source discovery
+# ---------------------------------------------------------------------------
+
+
+def collect_sources(patterns: Sequence[str | Path]) -> list[Path]:
+    """Expand directories and glob patterns into a sorted list of image files.
+
+    Directories contribute every file whose suffix is in IMAGE_SUFFIXES;
+    anything else is treated as a glob pattern (a plain path is a glob that
+    matches itself).  Duplicates are dropped.
+    """
+    found: set[Path] = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            found.update(
+                p
+                for p in path.iterdir()
+                if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
+            )
+        else:
+            found.update(Path(p) for p in glob.glob(str(pattern)) if Path(p).is_file())
+    return sorted(found)
+
+
+def number_from_filename(path: Path) -> int:
+    """Return the pattern number encoded in *path*'s file name.
+
+    Uses the last run of digits in the stem.  Raises BatchError if there is
+    none or it is outside 901–999.
+    """
+    digits = re.findall(r"\d+", path.stem)
+    if not digits:
+        raise BatchError(f"No pattern number in file name {path.name!r}")
+    number = int(digits[-1])
+    if not (PATTERN_NUMBER_MIN <= number <= PATTERN_NUMBER_MAX):
+        raise BatchError(
+            f"Pattern number {number} from {path.name!r} is out of range "
+            f"{PATTERN_NUMBER_MIN}–{PATTERN_NUMBER_MAX}"
+        )
+    return number
+
+
+# ---------------------------------------------------------------------------
+# Conversion
+# ---------------------------------------------------------------------------
+
+
+def _convert_one(source: str, options: dict[str, Any]) -> ImageResult:
+    """Process-pool worker: load and binarise one image."""
+    return load_image(source, **options)
+
+
+def convert_batch(
+    sources: Sequence[Path],
+    *,
+    model: MachineModel = MachineModel.KH940,
+    numbering: Numbering = "sequential",
+    start: int = PATTERN_NUMBER_MIN,
+    workers: int | None = None,
+    **load_options: Any,
+) -> BatchResult:
+    """Convert *sources* in parallel and pack them into DiskImages.
+
+    Parameters
+    ----------
+    sources:
+        Image files, typically from collect_sources().
+    model:
+        Target machine model; also sets the ``max_rows`` passed to
+        load_image.
+    numbering:
+        "sequential" or "filename" (see module docstring).
+    start:
+        First pattern number for sequential numbering (901–999).
+    workers:
+        Process-pool size.  Defaults to the number of CPUs.
+    load_options:
+        Passed through to load_image (threshold, dither, invert, …).
+
+    Returns
+    -------
+    BatchResult
+        Images that could not be converted or placed are listed in
+        ``errors`` (source → message) rather than aborting the batch.
+    """
+    if not (PATTERN_NUMBER_MIN <= start <= PATTERN_NUMBER_MAX):
+        raise BatchError(
+            f"start must be between {PATTERN_NUMBER_MIN} and {PATTERN_NUMBER_MAX}, "
+            f"got {start}"
+        )
+    if numbering not in ("sequential", "filename"):
+        raise BatchError(f"Unknown numbering scheme {numbering!r}")
+
+    result = BatchResult()
+    options = dict(load_options)
+    options.setdefault("max_rows", DiskImage.blank(model).max_rows)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (path, pool.submit(_convert_one, str(path), options)) for path in sources
+        ]
+        converted: list[tuple[Path, ImageResult]] = []
+        for path, future in futures:
+            try:
+                converted.append((path, future.result()))
+            except Exception as exc:
+                result.errors[str(path)] = str(exc)
+                logger.warning("Skipping %s: %s", path, exc)
+
+    _pack(converted, result, model=model, numbering=numbering, start=start)
+    return result
+
+
+def _pack(
+    converted: list[tuple[Path, ImageResult]],
+    result: BatchResult,
+    *,
+    model: MachineModel,
+    numbering: Numbering,
+    start: int,
+) -> None:
+    """Assign converted images to disks and pattern numbers, then write them.
+
+    Placement is planned first and each disk is written in pattern-number
+    order, so that directory slot order always matches number order.
+    """
+    capacity = DiskImage.blank(model)
+    plans: list[list[tuple[int, Path, ImageResult]]] = [[]]
+    used_bytes = 0
+    used_numbers: set[int] = set()
+    next_number = start
+
+    for path, image in converted:
+        size = bytes_per_pattern_and_memo(image.width, image.height)
+        if size > capacity.bytes_remaining:
+            result.errors[str(path)] = (
+                f"Pattern needs {size} bytes; a blank {model.value} disk holds "
+                f"{capacity.bytes_remaining}"
+            )
+            continue
+        if numbering == "filename":
+            try:
+                number = number_from_filename(path)
+            except BatchError as exc:
+                result.errors[str(path)] = str(exc)
+                continue
+        else:
+            number = next_number
+
+        if (
+            number > PATTERN_NUMBER_MAX
+            or number in used_numbers
+            or len(plans[-1]) >= capacity.slots_remaining
+            or used_bytes + size > capacity.bytes_remaining
+        ):
+            plans.append([])
+            used_bytes = 0
+            used_numbers = set()
+            if numbering == "sequential":
+                number = start
+
+        plans[-1].append((number, path, image))
+        used_bytes += size
+        used_numbers.add(number)
+        next_number = number + 1
+
+    for plan in plans:
+        if not plan:
+            continue
+        disk = DiskImage.blank(model)
+        index = len(result.disks)
+        for number, path, image in sorted(plan, key=lambda t: t[0]):
+            disk.write_pattern_packed(number, image.packed, image.width, image.height)
+            result.items.append(
+                BatchItem(
+                    source=str(path),
+                    disk=index,
+                    number=number,
+                    width=image.width,
+                    height=image.height,
+                    orig_width=image.orig_width,
+                    orig_height=image.orig_height,
+                    bytes_used=bytes_per_pattern_and_memo(image.width, image.height),
+                )
+            )
+        result.disks.append(disk)
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+
+def write_batch(result: BatchResult, out_dir: str | Path, prefix: str = "disk") -> Path:
+    """Write every disk as ``<prefix>-NN.dat`` plus ``manifest.json``.
+
+    Returns the path of the manifest.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    disk_files: list[str] = []
+    for index, disk in enumerate(result.disks):
+        path = out / f"{prefix}-{index + 1:02d}.dat"
+        path.write_bytes(disk.to_disk_image_bytes())
+        disk_files.append(path.name)
+        logger.info("Wrote %s (%d patterns)", path, len(disk.list_patterns()))
+
+    manifest = {
+        "disks": [
+            {
+                "file": disk_files[i],
+                "model": disk.model.value,
+                "patterns": len(disk.list_patterns()),
+                "bytes_remaining": disk.bytes_remaining,
+            }
+            for i, disk in enumerate(result.disks)
+        ],
+        "patterns": [
+            {**asdict(item), "disk": disk_files[item.disk]} for item in result.items
+        ],
+        "errors": result.errors,
+    }
+    manifest_path = out / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest_path
+
+
+# ---------------------------------------------------------------------------
+# Command-line entry point
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Convert a folder of images into Brother KH-930/940 disk images"
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="Image files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "--out", "-o", required=True, help="Output directory for .dat files"
+    )
+    parser.add_argument(
+        "--model", choices=sorted(_MODELS), default="kh940", help="Target machine"
+    )
+    parser.add_argument(
+        "--numbering",
+        choices=["sequential", "filename"],
+        default="sequential",
+        help="How pattern numbers are assigned (default: sequential)",
+    )
+    parser.add_argument(
+        "--start", type=int, default=PATTERN_NUMBER_MIN, help="First pattern number"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPUs)"
+    )
+    parser.add_argument("--threshold", type=int, default=128)
+    parser.add_argument(
+        "--stitch-aspect-ratio", type=float, default=DEFAULT_STITCH_ASPECT_RATIO
+    )
+    parser.add_argument("--target-stitches", type=int, default=None)
+    parser.add_argument(
+        "--dither", choices=["none", "floyd-steinberg", "bayer"], default="none"
+    )
+    parser.add_argument("--invert", action="store_true")
+    parser.add_argument("--flip-horizontal", action="store_true")
+    parser.add_argument("--rotation", type=int, choices=[0, 90, 180, 270], default=0)
+    args = parser.parse_args(argv)
+
+    sources = collect_sources(args.sources)
+    if not sources:
+        parser.error("no image files matched")
+
+    try:
+        result = convert_batch(
+            sources,
+            model=_MODELS[args.model],
+            numbering=args.numbering,
+            start=args.start,
+            workers=args.workers or os.cpu_count(),
+            threshold=args.threshold,
+            stitch_aspect_ratio=args.stitch_aspect_ratio,
+            target_stitches=args.target_stitches,
+            dither=args.dither,
+            invert=args.invert,
+            flip_horizontal=args.flip_horizontal,
+            rotation=args.rotation,
+        )
+    except (BatchError, ValueError) as exc:
+        parser.error(str(exc))
+
+    manifest = write_batch(result, args.out)
+    logger.info(
+        "Converted %d of %d image(s) onto %d disk(s); manifest: %s",
+        len(result.items),
+        len(sources),
+        len(result.disks),
+        manifest,
+    )
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -132,20 +132,29 @@ Row 0 is the FIRST row knitted. Rows stored sequentially in nibble-space.
 
 from __future__ import annotations
 
+import hashlib
+import itertools
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Sequence
+from typing import Iterable, Mapping, Sequence
 
+from app.floats import DEFAULT_MAX_FLOAT, FloatRun, find_floats, fix_floats
+from app.metrics import DISK_IMAGE_SECONDS
 from app.util import (
+    bcd_decode_3digit,
+    bcd_encode_3digit,
+    bytes_for_memo,
+    bytes_per_pattern,
     bytes_per_pattern_and_memo,
-    ceil4,
     ceil2,
+    ceil4,
+    crop_packed,
+    knit_bounds,
     nibbles_per_row,
-    bytes_per_pattern,
-    bytes_for_memo,
-    bcd_encode_3digit,
-    bcd_decode_3digit,
+    packed_row_bytes,
     read_nibble,
+    trim_box,
+    unpack_rows,
     write_nibble,
 )
 
@@ -287,6 +296,7 @@ def decode_row(nibble_list: Sequence[int], stitches: int) -> list[int]:
 # ---------------------------------------------------------------------------
 
 
+@DISK_IMAGE_SECONDS.labels("encode").timed
 def encode_pattern_data(
     pixel_rows: Sequence[Sequence[int]],
     stitches: int,
@@ -348,6 +358,88 @@ def decode_pattern_data(
     return pixel_rows[::-1]
 
 
+@DISK_IMAGE_SECONDS.labels("encode").timed
+def encode_pattern_packed(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+) -> bytearray:
+    """
+    Encode packed 1-bit rows (see app.util) into a pattern block.
+
+    Produces exactly the same bytes as encode_pattern_data, but works a row
+    at a time: a packed byte already holds two nibbles in the Brother bit
+    order, so rows are concatenated (last row first) into a forward nibble
+    stream and the whole block is then reversed into backward addressing.
+    When a row has an odd number of nibbles, rows are paired up so that each
+    pair fills a whole number of bytes.
+    """
+    row_bytes = packed_row_bytes(stitches)
+    if len(packed) != rows * row_bytes:
+        raise ValueError(
+            f"Expected {rows * row_bytes} packed bytes for {stitches}×{rows}, "
+            f"got {len(packed)}"
+        )
+    npr = nibbles_per_row(stitches)
+    stream = [bytes(packed[r * row_bytes : (r + 1) * row_bytes]) for r in range(rows)]
+    stream.reverse()
+
+    if npr % 2 == 0:
+        forward = b"".join(stream)
+    else:
+        bits = 4 * npr
+        nib_mask = (1 << bits) - 1
+        chunks: list[bytes] = []
+        for i in range(0, rows - 1, 2):
+            first = int.from_bytes(stream[i], "little") & nib_mask
+            second = int.from_bytes(stream[i + 1], "little") & nib_mask
+            chunks.append((first | (second << bits)).to_bytes(npr, "little"))
+        if rows % 2:
+            chunks.append(stream[-1])
+        forward = b"".join(chunks)
+
+    return bytearray(forward[::-1])
+
+
+@DISK_IMAGE_SECONDS.labels("decode").timed
+def decode_pattern_packed(
+    data: bytearray | bytes,
+    pattern_offset: int,
+    stitches: int,
+    rows: int,
+) -> bytes:
+    """
+    Decode a pattern from the working region into packed 1-bit rows.
+
+    The inverse of encode_pattern_packed; returns the same pixels as
+    decode_pattern_data, in the packed layout of app.util.  Padding stitches
+    are cleared even if the stored nibbles have them set.
+    """
+    npr = nibbles_per_row(stitches)
+    total = bytes_per_pattern(stitches, rows)
+    forward = bytes(data[pattern_offset - total + 1 : pattern_offset + 1])[::-1]
+    row_bytes = packed_row_bytes(stitches)
+    stitch_mask = (1 << stitches) - 1
+
+    out: list[bytes] = [b""] * rows
+    if npr % 2 == 0:
+        step = npr // 2
+        for i in range(rows):
+            value = int.from_bytes(forward[i * step : (i + 1) * step], "little")
+            out[rows - 1 - i] = (value & stitch_mask).to_bytes(row_bytes, "little")
+    else:
+        bits = 4 * npr
+        for i in range(0, rows, 2):
+            start = (i // 2) * npr
+            value = int.from_bytes(forward[start : start + npr], "little")
+            out[rows - 1 - i] = (value & stitch_mask).to_bytes(row_bytes, "little")
+            if i + 1 < rows:
+                out[rows - 2 - i] = ((value >> bits) & stitch_mask).to_bytes(
+                    row_bytes, "little"
+                )
+    return b"".join(out)
+
+
 # ---------------------------------------------------------------------------
 # Memo encode / decode
 # ---------------------------------------------------------------------------
@@ -676,6 +768,10 @@ def generate_sector_id(psn: int) -> bytes:
 # DiskImage — top-level object, supports both KH-930 and KH-940
 # ---------------------------------------------------------------------------
 
+# Source of DiskImage.generation values, shared by all instances so that a
+# generation identifies one state of one disk image within the process.
+_generations = itertools.count(1)
+
 
 @dataclass
 class DiskImage:
@@ -709,6 +805,9 @@ class DiskImage:
     # Slot index for the next directory entry (0-based).
     _next_slot: int = field(init=False)
 
+    # Changes whenever pattern data changes; see _touch().
+    generation: int = field(init=False, compare=False)
+
     def __post_init__(self) -> None:
         size = self._working_region_size
         if self.model == MachineModel.KH940:
@@ -720,6 +819,23 @@ class DiskImage:
             self._data = bytearray(size)
         self._next_pattern_ptr = self._init_pattern_offset
         self._next_slot = 0
+        self._touch()
+
+    def _touch(self) -> None:
+        """Give the image a new generation after its pattern data changed.
+
+        Generations are unique across every DiskImage in the process, so
+        caches of rendered pattern data can be keyed on the generation alone
+        even when the app swaps in a different disk image.
+        """
+        self.generation = next(_generations)
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        # Generations are only unique within one process, so an image
+        # unpickled in another one (e.g. returned by a worker process) gets
+        # a fresh generation there.
+        self.__dict__.update(state)
+        self._touch()
 
     # ------------------------------------------------------------------
     # Properties derived from model
@@ -834,6 +950,7 @@ class DiskImage:
         img = cls(model=model)
         img._data = bytearray(data[:size])
         img._sync_state_from_directory()
+        img._touch()
         return img
 
     def _zero_940_regions(self) -> None:
@@ -1070,9 +1187,42 @@ class DiskImage:
         entry = self.get_pattern_entry(number)
         if entry is None:
             raise KeyError(f"Pattern {number} not found in disk image")
-        return decode_pattern_data(
+        packed = decode_pattern_packed(
             self._data, entry.pattern_offset, entry.stitches, entry.rows
         )
+        return unpack_rows(packed, entry.stitches, entry.rows)
+
+    def read_pattern_packed(self, number: int) -> bytes:
+        """
+        Return the pixel data for pattern `number` as packed 1-bit rows
+        (see app.util), without building a list-of-lists grid.
+
+        Raises KeyError if the pattern is not found.
+        """
+        entry = self.get_pattern_entry(number)
+        if entry is None:
+            raise KeyError(f"Pattern {number} not found in disk image")
+        return decode_pattern_packed(
+            self._data, entry.pattern_offset, entry.stitches, entry.rows
+        )
+
+    def pattern_hash(self, number: int) -> str:
+        """
+        Return a hex digest of pattern `number`'s dimensions, data and memo.
+
+        Hashes the encoded block as stored, without decoding it, so it is
+        cheap enough to compute per request.  Equal patterns hash equal
+        wherever they sit in the working region.
+
+        Raises KeyError if the pattern is not found.
+        """
+        entry = self.get_pattern_entry(number)
+        if entry is None:
+            raise KeyError(f"Pattern {number} not found in disk image")
+        block = self._data[entry.block_end_offset + 1 : entry.memo_offset + 1]
+        return hashlib.blake2b(
+            f"{entry.stitches}x{entry.rows}:".encode() + block, digest_size=16
+        ).hexdigest()
 
     def read_memo(self, number: int) -> list[int]:
         """
@@ -1108,12 +1258,7 @@ class DiskImage:
         Returns the PatternEntry that was written.
         Raises ValueError if the image is full or the pattern number is taken.
         """
-        if self._next_slot >= self._max_patterns:
-            raise ValueError(
-                f"Disk image is full ({self._max_patterns} patterns already stored)"
-            )
-        if self.get_pattern_entry(number) is not None:
-            raise ValueError(f"Pattern {number} already exists in this disk image")
+        self._check_writable(number)
 
         rows = len(pixel_rows)
         if rows == 0:
@@ -1130,7 +1275,98 @@ class DiskImage:
         # --- Encode data blocks ---
         pat_bytes = encode_pattern_data(pixel_rows, stitches, rows)
         memo_bytes = encode_memo(rows, memo_values)
+        return self._store_pattern(number, stitches, rows, pat_bytes, memo_bytes)
 
+    def write_pattern_packed(
+        self,
+        number: int,
+        packed: bytes | bytearray,
+        stitches: int,
+        rows: int,
+        memo_values: Sequence[int] | None = None,
+    ) -> PatternEntry:
+        """
+        Write a new pattern given as packed 1-bit rows (see app.util).
+
+        Behaves exactly like write_pattern, but skips the list-of-lists grid
+        entirely: ImageResult.packed can be passed straight in.
+
+        Raises ValueError if the image is full, the pattern number is taken,
+        the dimensions are out of range or `packed` has the wrong length.
+        """
+        self._check_writable(number)
+        if rows == 0:
+            raise ValueError("pixel_rows must not be empty")
+        if stitches == 0 or stitches > 200:
+            raise ValueError(f"Stitch count {stitches} out of range 1–200")
+
+        pat_bytes = encode_pattern_packed(packed, stitches, rows)
+        memo_bytes = encode_memo(rows, memo_values)
+        return self._store_pattern(number, stitches, rows, pat_bytes, memo_bytes)
+
+    def write_patterns_packed(
+        self,
+        patterns: Sequence[tuple[int, bytes | bytearray, int, int]],
+    ) -> list[PatternEntry]:
+        """
+        Write several packed patterns as one all-or-nothing batch.
+
+        `patterns` is a sequence of (number, packed, stitches, rows) tuples,
+        written in the order given.  Every pattern is validated and encoded
+        before the image is touched, so if ValueError is raised (duplicate or
+        existing number, bad dimensions, not enough slots or bytes) the disk
+        image is left unchanged.
+
+        Returns the PatternEntry written for each pattern, in order.
+        """
+        numbers = [number for number, _, _, _ in patterns]
+        if len(set(numbers)) != len(numbers):
+            raise ValueError("Batch contains duplicate pattern numbers")
+        if len(patterns) > self.slots_remaining:
+            raise ValueError(
+                f"Batch of {len(patterns)} patterns needs more directory slots "
+                f"than the {self.slots_remaining} remaining"
+            )
+
+        encoded: list[tuple[int, int, int, bytearray, bytearray]] = []
+        for number, packed, stitches, rows in patterns:
+            self._check_writable(number)
+            if rows == 0:
+                raise ValueError(f"Pattern {number} has no rows")
+            if stitches == 0 or stitches > 200:
+                raise ValueError(
+                    f"Pattern {number}: stitch count {stitches} out of range 1–200"
+                )
+            pat_bytes = encode_pattern_packed(packed, stitches, rows)
+            memo_bytes = encode_memo(rows)
+            encoded.append((number, stitches, rows, pat_bytes, memo_bytes))
+
+        total = sum(len(p) + len(m) for _, _, _, p, m in encoded)
+        if total > self.bytes_remaining:
+            raise ValueError(
+                f"Not enough space in disk image for {len(patterns)} patterns "
+                f"({total} bytes needed, {self.bytes_remaining} available)"
+            )
+        return [self._store_pattern(*args) for args in encoded]
+
+    def _check_writable(self, number: int) -> None:
+        """Raise ValueError unless a new pattern `number` can be added."""
+        if self._next_slot >= self._max_patterns:
+            raise ValueError(
+                f"Disk image is full ({self._max_patterns} patterns already stored)"
+            )
+        if self.get_pattern_entry(number) is not None:
+            raise ValueError(f"Pattern {number} already exists in this disk image")
+
+    def _store_pattern(
+        self,
+        number: int,
+        stitches: int,
+        rows: int,
+        pat_bytes: bytearray,
+        memo_bytes: bytearray,
+    ) -> PatternEntry:
+        """Place encoded data and memo blocks and write the directory entry."""
         total = len(pat_bytes) + len(memo_bytes)
         if self._next_pattern_ptr - total < 0:
             raise ValueError(
@@ -1179,6 +1415,7 @@ class DiskImage:
         # --- Advance cursors ---
         self._next_pattern_ptr -= total
         self._next_slot += 1
+        self._touch()
 
         # --- KH-940: update FINHDR and control/metadata blocks ---
         if self.model == MachineModel.KH940:
@@ -1201,6 +1438,194 @@ class DiskImage:
                 self._data[dir_offset : dir_offset + DIRECTORY_ENTRY_SIZE]
             )  # type: ignore[return-value]
 
+    @DISK_IMAGE_SECONDS.labels("trim").timed
+    def trim_patterns(
+        self, numbers: Iterable[int] | None = None, margin: int = 0
+    ) -> dict[int, int]:
+        """
+        Crop stored patterns to the bounding box of their knit stitches.
+
+        `numbers` selects the patterns to trim (default: all); `margin`
+        blank stitches/rows are kept around each bounding box.  Memo rows
+        are cropped along with the pattern rows.  Patterns with no knit
+        stitches, or nothing to remove, are left alone.
+
+        The working region is rebuilt with every pattern in its current slot
+        order, so the space freed is available to new patterns.  Returns a
+        mapping of trimmed pattern number → bytes saved (as counted by
+        bytes_per_pattern_and_memo).
+
+        Raises KeyError if a requested pattern is not stored, ValueError if
+        margin is negative.
+        """
+        if margin < 0:
+            raise ValueError(f"margin must not be negative, got {margin}")
+        entries = self.list_patterns()
+        stored = {e.number for e in entries}
+        wanted = stored if numbers is None else set(numbers)
+        missing = wanted - stored
+        if missing:
+            raise KeyError(f"Pattern {min(missing)} not found in disk image")
+
+        saved: dict[int, int] = {}
+        patterns: list[tuple[int, bytes, int, int, list[int]]] = []
+        for e in entries:
+            packed = self.read_pattern_packed(e.number)
+            memo = self.read_memo(e.number)
+            stitches, rows = e.stitches, e.rows
+            bounds = knit_bounds(packed, stitches, rows) if e.number in wanted else None
+            if bounds is not None:
+                left, top, right, bottom = trim_box(bounds, stitches, rows, margin)
+                if (right - left, bottom - top) != (stitches, rows):
+                    packed = crop_packed(packed, stitches, (left, top, right, bottom))
+                    memo = memo[top:bottom]
+                    saved[e.number] = bytes_per_pattern_and_memo(
+                        stitches, rows
+                    ) - bytes_per_pattern_and_memo(right - left, bottom - top)
+                    stitches, rows = right - left, bottom - top
+            patterns.append((e.number, packed, stitches, rows, memo))
+
+        if saved:
+            fresh = DiskImage.blank(self.model)
+            for number, packed, stitches, rows, memo in patterns:
+                fresh.write_pattern_packed(number, packed, stitches, rows, memo)
+            self._data = fresh._data
+            self._next_pattern_ptr = fresh._next_pattern_ptr
+            self._next_slot = fresh._next_slot
+            self._touch()
+        return saved
+
+    def find_floats(
+        self, number: int, max_float: int = DEFAULT_MAX_FLOAT
+    ) -> list[FloatRun]:
+        """
+        Return every run of more than `max_float` equal stitches in pattern
+        `number` (see app.floats).
+
+        Raises KeyError if the pattern is not found.
+        """
+        entry = self.get_pattern_entry(number)
+        if entry is None:
+            raise KeyError(f"Pattern {number} not found in disk image")
+        packed = self.read_pattern_packed(number)
+        return find_floats(packed, entry.stitches, entry.rows, max_float)
+
+    def fix_floats(
+        self, numbers: Iterable[int] | None = None, max_float: int = DEFAULT_MAX_FLOAT
+    ) -> dict[int, int]:
+        """
+        Insert tie-down stitches so no run in the selected patterns (default:
+        all) is longer than `max_float` (see app.floats.fix_floats).
+
+        Tie-downs change stitches but not dimensions, so each fixed pattern
+        is re-encoded in place.  Returns pattern number → stitches changed
+        for every pattern that needed fixing.
+
+        Raises KeyError if a requested pattern is not stored.
+        """
+        entries = {e.number: e for e in self.list_patterns()}
+        wanted = list(entries) if numbers is None else list(numbers)
+        for number in wanted:
+            if number not in entries:
+                raise KeyError(f"Pattern {number} not found in disk image")
+
+        changed: dict[int, int] = {}
+        for number in wanted:
+            entry = entries[number]
+            fixed, count = fix_floats(
+                self.read_pattern_packed(number), entry.stitches, entry.rows, max_float
+            )
+            if count:
+                pat_bytes = encode_pattern_packed(fixed, entry.stitches, entry.rows)
+                pat_start = entry.pattern_offset - len(pat_bytes) + 1
+                self._data[pat_start : entry.pattern_offset + 1] = pat_bytes
+                changed[number] = count
+        if changed:
+            self._touch()
+        return changed
+
+    def patch_pattern(
+        self,
+        number: int,
+        cells: Iterable[tuple[int, int, int]] = (),
+        rows: Mapping[int, Sequence[int]] | None = None,
+        memo: Mapping[int, int] | None = None,
+    ) -> int:
+        """
+        Edit pattern `number` in place, without re-encoding or moving it.
+
+        `cells` are (x, y, value) stitches to set; `rows` maps a row index to
+        a complete replacement row; `memo` maps a row index to a memo value
+        (0–15).  Row replacements are applied before single cells.  Only the
+        affected nibbles of the working region are rewritten, so the cost is
+        proportional to the edit, not to the pattern or disk size.
+
+        Everything is validated before anything is written.  Returns the
+        number of nibbles whose value changed.
+
+        Raises KeyError if the pattern is not found, ValueError if an edit
+        is out of range for the pattern's dimensions.
+        """
+        entry = self.get_pattern_entry(number)
+        if entry is None:
+            raise KeyError(f"Pattern {number} not found in disk image")
+        stitches, height = entry.stitches, entry.rows
+        npr = nibbles_per_row(stitches)
+        cells = list(cells)
+        rows = dict(rows or {})
+        memo = dict(memo or {})
+
+        writes: dict[int, int] = {}  # pattern nibble index → new value
+        for y, row in rows.items():
+            if not (0 <= y < height):
+                raise ValueError(f"Row {y} is outside rows 0–{height - 1}")
+            if any(v not in (0, 1) for v in row):
+                raise ValueError(f"Row {y} values must be 0 or 1")
+            base = (height - 1 - y) * npr
+            for i, nibble in enumerate(encode_row(row, stitches)):
+                writes[base + i] = nibble
+        for x, y, value in cells:
+            if not (0 <= x < stitches and 0 <= y < height):
+                raise ValueError(
+                    f"Stitch ({x}, {y}) is outside the {stitches}×{height} pattern"
+                )
+            if value not in (0, 1):
+                raise ValueError(f"Stitch ({x}, {y}) value {value!r} must be 0 or 1")
+            index = (height - 1 - y) * npr + x // 4
+            if index not in writes:
+                writes[index] = read_nibble(self._data, entry.pattern_offset, index)
+            bit = 1 << (x % 4)
+            writes[index] = writes[index] | bit if value else writes[index] & ~bit
+        for y, value in memo.items():
+            if not (0 <= y < height):
+                raise ValueError(f"Memo row {y} is outside rows 0–{height - 1}")
+            if not (0 <= value <= 15):
+                raise ValueError(f"Memo value {value!r} for row {y} must be 0–15")
+
+        changed = 0
+        for base, updates in (
+            (entry.pattern_offset, writes),
+            (entry.memo_offset, {height - 1 - y: v for y, v in memo.items()}),
+        ):
+            for index, value in updates.items():
+                if read_nibble(self._data, base, index) != value:
+                    write_nibble(self._data, base, index, value)
+                    changed += 1
+        if changed:
+            self._touch()
+        return changed
+
+    def snapshot(self) -> "DiskImage":
+        """
+        Return an independent copy of this image with the same generation.
+
+        Lets slow readers (e.g. background rendering) work on a consistent
+        state while the original keeps being written to.
+        """
+        img = DiskImage.__new__(DiskImage)
+        img.__dict__.update(self.__dict__, _data=bytearray(self._data))
+        return img
+
     # ------------------------------------------------------------------
     # Serialisation
     # ------------------------------------------------------------------
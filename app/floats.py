@@ -0,0 +1,189 @@
+"""
+app/floats.py — Float-length analysis and tie-down fixing for patterns.
+
+In two-colour (Fair Isle) knitting each row is knitted with both yarns: a
+selected needle (1) knits the contrast yarn and an unselected one (0) the
+main yarn.  Whichever yarn is not knitting is carried loosely across the
+back of the fabric as a *float*.  A run of n equal stitches in a row is an
+n-stitch float of the other yarn, and floats much longer than 5–7 stitches
+snag and make the fabric unwearable.
+
+All functions work on packed 1-bit rows (see app.util).  Each row is
+handled as one integer: rows without a long run are rejected with a few
+shift-and-AND operations, and only rows that have one are walked run by
+run, so analysing a full 200 × 500 pattern is cheap enough to redo on
+every preview change.
+
+Public API
+----------
+find_floats(packed, stitches, rows, max_float) -> list[FloatRun]
+    Every run longer than max_float stitches, row by row.
+
+fix_floats(packed, stitches, rows, max_float) -> (bytes, int)
+    Insert single tie-down stitches so that no run exceeds max_float.
+
+float_heatmap(packed, stitches, rows, floats) -> Image.Image
+    RGB rendering of the pattern with long floats highlighted.
+
+Pattern edges are treated as the end of a run; floats that continue into
+the next repeat across the needle bed are not joined up.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.util import packed_row_bytes
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Longest float most knitters accept without catching it.
+DEFAULT_MAX_FLOAT: int = 7
+
+# Heatmap colours for long floats; knit/background stay black/white as in
+# the 1-bit previews, tinted so the run's colour still shows through.
+_HEAT_FLOAT_ON_KNIT = (160, 0, 0)
+_HEAT_FLOAT_ON_BACKGROUND = (255, 140, 140)
+
+
+@dataclass(frozen=True)
+class FloatRun:
+    """A run of `length` equal stitches starting at (`start`, `row`).
+
+    ``value`` is the stitch value of the run (1 = knit/contrast selected,
+    0 = background); the float itself is the *other* yarn, carried behind.
+    """
+
+    row: int
+    start: int
+    length: int
+    value: int
+
+
+def _row_values(
+    packed: bytes | bytearray, stitches: int, rows: int
+) -> Iterator[tuple[int, int]]:
+    """Yield (row index, row as int) for every row of a packed pattern."""
+    row_bytes = packed_row_bytes(stitches)
+    for r in range(rows):
+        yield r, int.from_bytes(packed[r * row_bytes : (r + 1) * row_bytes], "little")
+
+
+def _has_run_longer_than(bits: int, limit: int) -> bool:
+    """True if *bits* holds more than *limit* consecutive set bits."""
+    # After the loop, bit i survives only if bits i … i + limit are all set.
+    covered = 1
+    while covered <= limit and bits:
+        step = min(covered, limit + 1 - covered)
+        bits &= bits >> step
+        covered += step
+    return bits != 0
+
+
+def _runs(bits: int) -> Iterator[tuple[int, int]]:
+    """Yield (start, length) of each run of set bits, lowest bit first."""
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        run = bits >> start
+        length = (~run & (run + 1)).bit_length() - 1
+        yield start, length
+        bits &= ~(((1 << length) - 1) << start)
+
+
+def find_floats(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    max_float: int = DEFAULT_MAX_FLOAT,
+) -> list[FloatRun]:
+    """Return every run of more than *max_float* equal stitches.
+
+    Runs are listed row by row, left to right.  Raises ValueError if
+    max_float is less than 1.
+    """
+    if max_float < 1:
+        raise ValueError(f"max_float must be at least 1, got {max_float}")
+    full = (1 << stitches) - 1
+    found: list[FloatRun] = []
+    for r, knit in _row_values(packed, stitches, rows):
+        row_runs: list[FloatRun] = []
+        for value, bits in ((1, knit), (0, ~knit & full)):
+            if not _has_run_longer_than(bits, max_float):
+                continue
+            row_runs.extend(
+                FloatRun(r, start, length, value)
+                for start, length in _runs(bits)
+                if length > max_float
+            )
+        found.extend(sorted(row_runs, key=lambda f: f.start))
+    return found
+
+
+def fix_floats(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    max_float: int = DEFAULT_MAX_FLOAT,
+) -> tuple[bytes, int]:
+    """Break every run longer than *max_float* with single tie-down stitches.
+
+    A tie-down flips one stitch inside the run to the other colour, which
+    catches the floating yarn.  Tie-downs are spaced max_float + 1 apart and
+    shifted by half a float on alternate rows so they do not stack into a
+    vertical line.  Returns the fixed packed rows and the number of stitches
+    changed.
+
+    Raises ValueError if max_float is less than 2: a one-stitch tie-down
+    needs a run of at least three stitches to sit inside.
+    """
+    if max_float < 2:
+        raise ValueError(f"max_float must be at least 2 to fix floats, got {max_float}")
+    out = bytearray(packed)
+    row_bytes = packed_row_bytes(stitches)
+    changed = 0
+    runs_by_row: dict[int, list[FloatRun]] = {}
+    for f in find_floats(packed, stitches, rows, max_float):
+        runs_by_row.setdefault(f.row, []).append(f)
+
+    for r, row_runs in runs_by_row.items():
+        value = int.from_bytes(out[r * row_bytes : (r + 1) * row_bytes], "little")
+        first = max_float - (r % 2) * (max_float // 2)
+        for f in row_runs:
+            # Never flip the last stitch of a run: it would lengthen the
+            # neighbouring run instead of creating a one-stitch tie-down.
+            end = f.start + f.length - 1
+            offset = min(first, f.length - 2)
+            ties = list(range(f.start + offset, end, max_float + 1))
+            if end - ties[-1] > max_float:
+                ties.append(end - 1)
+            for x in ties:
+                value ^= 1 << x
+            changed += len(ties)
+        out[r * row_bytes : (r + 1) * row_bytes] = value.to_bytes(row_bytes, "little")
+    return bytes(out), changed
+
+
+def float_heatmap(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    floats: list[FloatRun],
+) -> "Image.Image":
+    """Render the pattern as RGB with every run in *floats* highlighted.
+
+    Knit stitches are black and background white, as in the 1-bit previews;
+    stitches in a long knit run are dark red and in a long background run
+    light red.
+    """
+    from PIL import Image, ImageDraw  # noqa: PLC0415
+
+    bilevel = Image.frombytes("1", (stitches, rows), bytes(packed), "raw", "1;IR")
+    img = bilevel.convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for f in floats:
+        colour = _HEAT_FLOAT_ON_KNIT if f.value else _HEAT_FLOAT_ON_BACKGROUND
+        draw.line([(f.start, f.row), (f.start + f.length - 1, f.row)], fill=colour)
+    return img
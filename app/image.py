@@ -2,8 +2,9 @@
 app/image.py — Image loading and preprocessing for the Brother KH-930/940.
 
 Loads a 1-bit (or any) image via Pillow, scales/crops to fit within
-MAX_NEEDLES (200) columns, converts to 1-bit, and returns a list of
-rows, each row a list of ints (0 = background/skip, 1 = knit).
+MAX_NEEDLES (200) columns, converts to 1-bit, and returns the result as
+packed 1-bit rows (see app.util), viewable as a list of rows, each row a
+list of ints (0 = background/skip, 1 = knit).
 
 Public API
 ----------
@@ -11,12 +12,53 @@ load_image(source, **kwargs) -> ImageResult
     source: path-like, bytes, or a Pillow Image.
     Returns an ImageResult dataclass.
 
+load_image_frames(source, **kwargs) -> Iterator[ImageResult]
+    Like load_image, but yields one ImageResult per frame of an animated
+    GIF or multi-page TIFF (a single-frame image yields exactly one).
+
+separate_colours(source, colours, **kwargs) -> ColourSeparation
+    Quantise a colour image to a few yarn colours and return one binary
+    pattern per colour, for Fair Isle and other multi-colour work.
+
+sweep_image(source, variants, **kwargs) -> SweepResult
+    Binarise one image under several SweepVariant parameter sets, decoding
+    and resizing it only once per distinct geometry.
+
 ImageResult
-    .rows       : list[list[int]]  — pixel rows, each len == width
+    .packed     : bytes            — packed 1-bit rows, row 0 first
+    .rows       : list[list[int]]  — pixel rows, each len == width; built
+                                     lazily from .packed on first access
+    .iter_rows(): Iterator[list[int]] — rows one at a time, nothing cached
+    .to_image() : Image.Image      — mode "1" image, black = knit
+    .repeat     : (int, int)       — smallest repeating tile (stitches, rows)
+    .base_tile(): ImageResult      — the smallest tile dividing the size, for
+                                     compact storage
+    .find_floats(max_float)        — long floats per row (app.floats)
+    .fix_floats(max_float)         — copy with tie-downs inserted
     .width      : int
     .height     : int
     .orig_width : int
     .orig_height: int
+    .bytes_saved: int              — disk bytes saved by auto_trim
+
+Machine-ready bitmaps
+---------------------
+A source that is already bilevel (mode "1", or a palette image using at most
+two colours), fits within the needle limit and is loaded with
+``stitch_aspect_ratio=1`` and no dithering is passed through without any
+greyscale conversion, resampling or per-pixel loop, so charts drawn at stitch
+resolution are reproduced exactly.
+
+Auto-trim
+---------
+With ``auto_trim=True`` the binarised pattern is cropped to the bounding box
+of its knit stitches (plus ``trim_margin`` blank stitches/rows), so blank
+margins in the artwork are not stored on the disk.  The saving, as counted
+by util.bytes_per_pattern_and_memo, is reported in ImageResult.bytes_saved.
+trim_result() applies the same step to an existing ImageResult.
+
+Pillow is imported by the functions that use it rather than at module
+level, so the API server starts without loading it.
 
 Errors
 ------
@@ -27,11 +69,29 @@ ImageError   raised for unsupported files or images that can't be reduced
 from __future__ import annotations
 
 import io
-from dataclasses import dataclass
+import os
+from collections import deque
+from collections.abc import Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import cached_property
 from pathlib import Path
-from typing import Literal, Union, cast
-
-from PIL import Image, UnidentifiedImageError
+from typing import TYPE_CHECKING, Any, Literal, Union
+
+from app.floats import DEFAULT_MAX_FLOAT, FloatRun, find_floats, fix_floats
+from app.metrics import REGISTRY, Laps
+from app.util import (
+    bytes_per_pattern_and_memo,
+    crop_packed,
+    find_repeat,
+    knit_bounds,
+    packed_row_bytes,
+    trim_box,
+    unpack_rows,
+)
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 MAX_NEEDLES: int = 200  # KH-940 physical needle count
 
@@ -41,9 +101,6 @@ MAX_NEEDLES: int = 200  # KH-940 physical needle count
 # vertically by this factor before binarising compensates for that distortion.
 DEFAULT_STITCH_ASPECT_RATIO: float = 4 / 3  # ≈ 1.333
 
-# Pillow resample filter — LANCZOS gives best quality for downscaling
-_RESAMPLE = Image.Resampling.LANCZOS
-
 # Bayer 4×4 ordered dithering matrix (values 0–15, normalised to 0–255 below).
 # Each entry is a threshold: if the pixel luminance > threshold, output white.
 _BAYER_4X4: list[list[int]] = [
@@ -59,6 +116,19 @@ Rotation = Literal[0, 90, 180, 270]
 # Dithering algorithm names accepted by load_image.
 DitherMode = Literal["none", "floyd-steinberg", "bayer"]
 
+# Palette reduction algorithms accepted by separate_colours.
+QuantizeMethod = Literal["median-cut", "k-means"]
+
+# Most yarn colours separate_colours will produce.
+MAX_SEPARATION_COLOURS: int = 8
+
+_STAGE_SECONDS = REGISTRY.histogram(
+    "knitting_load_image_stage_seconds",
+    "Time spent in each stage of load_image.",
+    ("stage",),
+    timing="",
+)
+
 
 class ImageError(ValueError):
     """Raised when an image cannot be processed for the knitting machine."""
@@ -66,13 +136,77 @@ class ImageError(ValueError):
 
 @dataclass(frozen=True)
 class ImageResult:
-    """Processed image ready for Brother format encoding."""
+    """Processed image ready for Brother format encoding.
 
-    rows: list[list[int]]
+    The binarised pixels are held as packed 1-bit rows in ``packed``; the
+    list-of-lists view in ``rows`` is only built the first time it is read.
+    """
+
+    packed: bytes
     width: int
     height: int
     orig_width: int
     orig_height: int
+    bytes_saved: int = 0
+
+    @cached_property
+    def rows(self) -> list[list[int]]:
+        """Pixel rows (0 = skip, 1 = knit), materialised on first access."""
+        return unpack_rows(self.packed, self.width, self.height)
+
+    def iter_rows(self) -> Iterator[list[int]]:
+        """Yield pixel rows one at a time without caching the full grid."""
+        row_bytes = packed_row_bytes(self.width)
+        for y in range(self.height):
+            chunk = self.packed[y * row_bytes : (y + 1) * row_bytes]
+            yield unpack_rows(chunk, self.width, 1)[0]
+
+    @cached_property
+    def repeat(self) -> tuple[int, int]:
+        """Smallest (stitches, rows) tile that repeats to give this pattern
+        (see util.find_repeat); (width, height) if it does not repeat."""
+        return find_repeat(self.packed, self.width, self.height)
+
+    def base_tile(self) -> "ImageResult":
+        """Return just the repeating tile, or self if there is no repeat.
+
+        The machine repeats a stored pattern across the bed and down the
+        fabric, so knitting the tile gives the same fabric as the full
+        artwork.  Only repeats that divide the pattern size are used (see
+        util.find_repeat's *whole*): a smaller repeat ending in a partial
+        tile would knit a different fabric.  ``bytes_saved`` grows by the
+        storage the tile saves.
+        """
+        tile_w, tile_h = find_repeat(self.packed, self.width, self.height, whole=True)
+        if (tile_w, tile_h) == (self.width, self.height):
+            return self
+        return ImageResult(
+            packed=crop_packed(self.packed, self.width, (0, 0, tile_w, tile_h)),
+            width=tile_w,
+            height=tile_h,
+            orig_width=self.orig_width,
+            orig_height=self.orig_height,
+            bytes_saved=self.bytes_saved
+            + bytes_per_pattern_and_memo(self.width, self.height)
+            - bytes_per_pattern_and_memo(tile_w, tile_h),
+        )
+
+    def find_floats(self, max_float: int = DEFAULT_MAX_FLOAT) -> list[FloatRun]:
+        """Runs of more than *max_float* equal stitches (see app.floats)."""
+        return find_floats(self.packed, self.width, self.height, max_float)
+
+    def fix_floats(self, max_float: int = DEFAULT_MAX_FLOAT) -> "ImageResult":
+        """Return a copy with tie-down stitches breaking every long float."""
+        packed, changed = fix_floats(self.packed, self.width, self.height, max_float)
+        return self if not changed else replace(self, packed=packed)
+
+    def to_image(self) -> "Image.Image":
+        """Return the pattern as a mode "1" Pillow image (black = knit)."""
+        from PIL import Image  # noqa: PLC0415
+
+        return Image.frombytes(
+            "1", (self.width, self.height), self.packed, "raw", "1;IR"
+        )
 
 
 def load_image(
@@ -88,6 +222,8 @@ def load_image(
     rotation: Rotation = 0,
     invert: bool = False,
     dither: DitherMode = "none",
+    auto_trim: bool = False,
+    trim_margin: int = 0,
 ) -> ImageResult:
     """Load, scale, optionally crop/flip/rotate, and binarise an image.
 
@@ -113,7 +249,9 @@ def load_image(
         Ignored when dither is not "none".
     stitch_aspect_ratio:
         Vertical stretch factor to compensate for non-square stitch aspect
-        ratio.  Default 4/3 (≈1.333).  Set to 1.0 to disable.
+        ratio.  Default 4/3 (≈1.333).  Set to 1.0 to disable; together with
+        no scaling this enables the exact fast path for bilevel sources
+        (see "Machine-ready bitmaps" above).
     crop:
         Optional (left, upper, right, lower) box in original-image coordinates,
         applied before any other transformation.
@@ -133,6 +271,13 @@ def load_image(
                               for photos and smooth gradients.
           "bayer"           — 4×4 ordered (Bayer) dithering; produces a regular
                               crosshatch pattern, good for geometric designs.
+    auto_trim:
+        If True, crop the final pattern to the bounding box of its knit
+        stitches (see "Auto-trim" above).  A pattern with no knit stitches
+        is left as it is.  Applied last, after invert.
+    trim_margin:
+        Blank stitches/rows to keep around the knit bounding box when
+        auto_trim is set.
 
     Returns
     -------
@@ -147,8 +292,102 @@ def load_image(
     ValueError
         If stitch_aspect_ratio is not positive, max_rows is not a positive
         integer, rotation is not one of {0, 90, 180, 270}, or
-        target_stitches is outside 1–200.
+        target_stitches is outside 1–200, or trim_margin is negative.
+    """
+    _check_geometry(stitch_aspect_ratio, max_rows, rotation, target_stitches)
+    if trim_margin < 0:
+        raise ValueError(f"trim_margin must not be negative, got {trim_margin}")
+
+    lap = Laps(_STAGE_SECONDS)
+    img = _open(source)
+    orig_width, orig_height = img.size
+    lap("open")
+
+    # --- 1–3. Crop, flip, rotate ---
+    img = _orient(img, crop, flip_horizontal, rotation)
+    lap("orient")
+
+    # --- 4. Fast path: bitmaps that are already machine-ready ---
+    if _is_machine_ready(
+        img,
+        max_width=max_width,
+        target_stitches=target_stitches,
+        max_rows=max_rows,
+        stitch_aspect_ratio=stitch_aspect_ratio,
+        dither=dither,
+    ):
+        w, h = img.size
+        packed = _threshold_packed(img, threshold)
+        result = _make_result(packed, w, h, orig_width, orig_height, invert)
+        lap("fast_path")
+        return _trim_stage(result, trim_margin, lap) if auto_trim else result
+
+    # --- 5. Convert to greyscale before scaling ---
+    img = img.convert("L")
+    lap("greyscale")
+
+    # --- 6–8. Scale, stretch, enforce max_rows ---
+    img = _scale(
+        img,
+        max_width=max_width,
+        target_stitches=target_stitches,
+        max_rows=max_rows,
+        stitch_aspect_ratio=stitch_aspect_ratio,
+    )
+    w, h = img.size
+    lap("scale")
+
+    # --- 9. Binarise ---
+    packed = _binarise(img, w, h, dither, threshold)
+
+    result = _make_result(packed, w, h, orig_width, orig_height, invert)
+    lap("binarise")
+
+    # --- 10. Auto-trim blank margins ---
+    return _trim_stage(result, trim_margin, lap) if auto_trim else result
+
+
+def _trim_stage(result: ImageResult, margin: int, lap: Laps) -> ImageResult:
+    result = trim_result(result, margin)
+    lap("trim")
+    return result
+
+
+def trim_result(result: ImageResult, margin: int = 0) -> ImageResult:
+    """Crop *result* to its knit bounding box grown by *margin*.
+
+    Returns *result* unchanged if it has no knit stitches or nothing would
+    be removed; otherwise the new result's ``bytes_saved`` holds the
+    reduction in util.bytes_per_pattern_and_memo.
     """
+    w, h = result.width, result.height
+    bounds = knit_bounds(result.packed, w, h)
+    if bounds is None:
+        return result
+    box = trim_box(bounds, w, h, margin)
+    left, top, right, bottom = box
+    if (right - left, bottom - top) == (w, h):
+        return result
+    new_w, new_h = right - left, bottom - top
+    return ImageResult(
+        packed=crop_packed(result.packed, w, box),
+        width=new_w,
+        height=new_h,
+        orig_width=result.orig_width,
+        orig_height=result.orig_height,
+        bytes_saved=result.bytes_saved
+        + bytes_per_pattern_and_memo(w, h)
+        - bytes_per_pattern_and_memo(new_w, new_h),
+    )
+
+
+def _check_geometry(
+    stitch_aspect_ratio: float,
+    max_rows: int | None,
+    rotation: int,
+    target_stitches: int | None,
+) -> None:
+    """Raise ValueError for geometry arguments load_image cannot honour."""
     if stitch_aspect_ratio <= 0:
         raise ValueError(
             f"stitch_aspect_ratio must be positive, got {stitch_aspect_ratio}"
@@ -163,11 +402,19 @@ def load_image(
             f"got {target_stitches}"
         )
 
-    img = _open(source)
-    orig_width, orig_height = img.size
+
+def _orient(
+    img: "Image.Image",
+    crop: tuple[int, int, int, int] | None,
+    flip_horizontal: bool,
+    rotation: Rotation,
+) -> "Image.Image":
+    """Apply crop, horizontal flip and rotation — all lossless."""
+    from PIL import Image  # noqa: PLC0415
 
     # --- 1. Crop (in original-image space) ---
     if crop is not None:
+        orig_width, orig_height = img.size
         left, upper, right, lower = crop
         left = max(0, left)
         upper = max(0, upper)
@@ -187,38 +434,51 @@ def load_image(
     # --- 3. Rotate (clockwise; Pillow rotates counter-clockwise, so negate) ---
     if rotation != 0:
         img = img.rotate(-rotation, expand=True)
+    return img
 
-    # --- 4. Convert to greyscale before scaling ---
-    img = img.convert("L")
 
-    # --- 5. Scale width to target_stitches (exact) or ≤ max_width (cap) ---
+def _scale(
+    img: "Image.Image",
+    *,
+    max_width: int,
+    target_stitches: int | None,
+    max_rows: int | None,
+    stitch_aspect_ratio: float,
+) -> "Image.Image":
+    """Resize a greyscale image to its final stitch × row geometry."""
+    from PIL import Image  # noqa: PLC0415
+
+    # LANCZOS gives the best quality for downscaling.
+    resample = Image.Resampling.LANCZOS
+
+    # --- 6. Scale width to target_stitches (exact) or ≤ max_width (cap) ---
     w, h = img.size
     if target_stitches is not None:
         # Scale uniformly so width == target_stitches exactly.
         new_w = target_stitches
         new_h = max(1, round(h * target_stitches / w)) if w != target_stitches else h
         if w != new_w or h != new_h:
-            img = img.resize((new_w, new_h), _RESAMPLE)
+            img = img.resize((new_w, new_h), resample)
             w, h = img.size
     elif w > max_width:
         scale = max_width / w
         new_w = max_width
         new_h = max(1, round(h * scale))
-        img = img.resize((new_w, new_h), _RESAMPLE)
+        img = img.resize((new_w, new_h), resample)
         w, h = img.size
 
-    # --- 6. Apply stitch aspect-ratio correction (vertical stretch) ---
+    # --- 7. Apply stitch aspect-ratio correction (vertical stretch) ---
     if stitch_aspect_ratio != 1.0:
         new_h = max(1, round(h * stitch_aspect_ratio))
-        img = img.resize((w, new_h), _RESAMPLE)
+        img = img.resize((w, new_h), resample)
         h = new_h
 
-    # --- 7. Enforce max_rows ---
+    # --- 8. Enforce max_rows ---
     if max_rows is not None and h > max_rows:
         scale = max_rows / h
         new_w = max(1, round(w * scale))
         new_h = max_rows
-        img = img.resize((new_w, new_h), _RESAMPLE)
+        img = img.resize((new_w, new_h), resample)
         w, h = img.size
 
     if w == 0 or h == 0:
@@ -226,16 +486,24 @@ def load_image(
             f"Image reduced to zero size (got {w}×{h}). "
             "Check that the source image is not empty."
         )
+    return img
 
-    # --- 8. Binarise ---
-    rows: list[list[int]] = _binarise(img, w, h, dither, threshold)
 
-    # --- 9. Invert (swap knit ↔ background) ---
+def _make_result(
+    packed: bytes,
+    w: int,
+    h: int,
+    orig_width: int,
+    orig_height: int,
+    invert: bool,
+) -> ImageResult:
+    """Apply the final invert step and wrap *packed* in an ImageResult."""
+    # Invert (swap knit ↔ background)
     if invert:
-        rows = [[1 - v for v in row] for row in rows]
+        packed = _invert_packed(packed, w, h)
 
     return ImageResult(
-        rows=rows,
+        packed=packed,
         width=w,
         height=h,
         orig_width=orig_width,
@@ -243,6 +511,348 @@ def load_image(
     )
 
 
+# ---------------------------------------------------------------------------
+# Multi-frame sources
+# ---------------------------------------------------------------------------
+
+
+def load_image_frames(
+    source: Union[str, Path, bytes, "Image.Image"],
+    *,
+    max_frames: int | None = None,
+    workers: int | None = None,
+    **options: Any,
+) -> Iterator[ImageResult]:
+    """Yield one ImageResult per frame of a multi-frame image, in frame order.
+
+    Frames are pulled from the source lazily through ImageSequence and
+    converted concurrently on a thread pool (Pillow releases the GIL while
+    resampling and binarising), all with the same *options* load_image()
+    accepts.  At most ``2 × workers`` frames are held in flight, so long
+    animations are never decoded all at once.
+
+    Parameters
+    ----------
+    max_frames:
+        Stop after this many frames.  Defaults to None (every frame).
+    workers:
+        Thread-pool size.  Defaults to the number of CPUs.
+
+    Raises
+    ------
+    ImageError, ValueError
+        As for load_image(), raised when the offending frame is reached.
+    """
+    from PIL import Image, ImageSequence  # noqa: PLC0415
+
+    img = source if isinstance(source, Image.Image) else _open(source)
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    pending: deque[Future[ImageResult]] = deque()
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frames")
+    try:
+        for index, frame in enumerate(ImageSequence.Iterator(img)):
+            if max_frames is not None and index >= max_frames:
+                break
+            # copy() detaches the frame from the sequence's seek position.
+            pending.append(pool.submit(load_image, frame.copy(), **options))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------------------------------------------------------------------------
+# Colour separation
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ColourSeparation:
+    """Outcome of separate_colours().
+
+    ``palette[i]`` is the RGB colour knitted by ``results[i]``; colours are
+    ordered from most to least stitches.  ``background`` is the most common
+    colour, which is only included in ``palette`` when asked for.
+    """
+
+    palette: list[tuple[int, int, int]]
+    results: list[ImageResult]
+    background: tuple[int, int, int]
+
+
+def separate_colours(
+    source: Union[str, Path, bytes, "Image.Image"],
+    colours: int = 2,
+    *,
+    method: QuantizeMethod = "median-cut",
+    include_background: bool = False,
+    max_width: int = MAX_NEEDLES,
+    target_stitches: int | None = None,
+    max_rows: int | None = None,
+    stitch_aspect_ratio: float = DEFAULT_STITCH_ASPECT_RATIO,
+    crop: tuple[int, int, int, int] | None = None,
+    flip_horizontal: bool = False,
+    rotation: Rotation = 0,
+) -> ColourSeparation:
+    """Split a colour image into one knit/skip pattern per yarn colour.
+
+    The image is oriented and scaled to its final stitch geometry first, so
+    quantisation runs on at most 200 × max_rows pixels, then reduced to
+    *colours* colours with Pillow's median-cut quantiser ("k-means" refines
+    the median-cut palette with k-means passes until it converges).  Each
+    colour's mask is taken from the palette-index image with a lookup
+    table, so no per-pixel Python loop runs.
+
+    In every returned pattern 1 means "this stitch is this colour".  The
+    most common colour is treated as the background (main yarn) and left
+    out unless *include_background* is set, so a two-colour design yields
+    a single contrast pattern.  The geometry arguments mean the same as for
+    load_image().
+
+    Raises
+    ------
+    ImageError
+        As for load_image().
+    ValueError
+        For invalid geometry arguments, *colours* outside
+        2–MAX_SEPARATION_COLOURS, or an unknown *method*.
+    """
+    from PIL import Image  # noqa: PLC0415
+
+    _check_geometry(stitch_aspect_ratio, max_rows, rotation, target_stitches)
+    if not (2 <= colours <= MAX_SEPARATION_COLOURS):
+        raise ValueError(
+            f"colours must be between 2 and {MAX_SEPARATION_COLOURS}, got {colours}"
+        )
+    if method not in ("median-cut", "k-means"):
+        raise ValueError(f"Unknown quantize method {method!r}")
+
+    img = _open(source)
+    orig_width, orig_height = img.size
+    img = _orient(img, crop, flip_horizontal, rotation).convert("RGB")
+    img = _scale(
+        img,
+        max_width=max_width,
+        target_stitches=target_stitches,
+        max_rows=max_rows,
+        stitch_aspect_ratio=stitch_aspect_ratio,
+    )
+    w, h = img.size
+
+    quantised = img.quantize(
+        colors=colours,
+        method=Image.Quantize.MEDIANCUT,
+        kmeans=1 if method == "k-means" else 0,
+        dither=Image.Dither.NONE,
+    )
+    # View the palette indices as plain luminance so point() maps indices,
+    # not palette colours.
+    indices = Image.frombytes("L", (w, h), quantised.tobytes())
+    flat_palette = quantised.getpalette() or []
+    by_count = sorted(
+        ((n, i) for i, n in enumerate(indices.histogram()) if n), reverse=True
+    )
+
+    def _rgb(index: int) -> tuple[int, int, int]:
+        r, g, b = flat_palette[3 * index : 3 * index + 3]
+        return (r, g, b)
+
+    background = _rgb(by_count[0][1])
+    palette: list[tuple[int, int, int]] = []
+    results: list[ImageResult] = []
+    for rank, (_, index) in enumerate(by_count):
+        if rank == 0 and not include_background:
+            continue
+        lut = [0 if v == index else 255 for v in range(256)]
+        packed = indices.point(lut, "1").tobytes("raw", "1;IR")
+        palette.append(_rgb(index))
+        results.append(_make_result(packed, w, h, orig_width, orig_height, False))
+    return ColourSeparation(palette=palette, results=results, background=background)
+
+
+# ---------------------------------------------------------------------------
+# Parameter sweeps
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class SweepVariant:
+    """One binarisation parameter set for sweep_image()."""
+
+    threshold: int = 128
+    dither: DitherMode = "none"
+    invert: bool = False
+    target_stitches: int | None = None
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    """Outcome of sweep_image(): one ImageResult per variant, in order."""
+
+    results: list[ImageResult]
+    suggested_threshold: int
+
+
+def sweep_image(
+    source: Union[str, Path, bytes, "Image.Image"],
+    variants: Sequence[SweepVariant],
+    *,
+    max_width: int = MAX_NEEDLES,
+    max_rows: int | None = None,
+    stitch_aspect_ratio: float = DEFAULT_STITCH_ASPECT_RATIO,
+    crop: tuple[int, int, int, int] | None = None,
+    flip_horizontal: bool = False,
+    rotation: Rotation = 0,
+) -> SweepResult:
+    """Binarise one image under several parameter sets from a single decode.
+
+    The source is decoded, oriented and converted to greyscale once, then
+    resized once per distinct ``target_stitches`` among the variants; each
+    variant only pays for its own binarisation.  Every result is identical
+    to what load_image() returns for the same arguments.
+
+    The shared geometry arguments mean the same as for load_image().  The
+    result also carries an Otsu threshold suggested from the histogram of
+    the greyscale source.
+
+    Raises
+    ------
+    ImageError, ValueError
+        As for load_image(), plus ValueError for a variant whose threshold,
+        dither or target_stitches is invalid.
+    """
+    _check_geometry(stitch_aspect_ratio, max_rows, rotation, None)
+    for v in variants:
+        _check_geometry(stitch_aspect_ratio, max_rows, rotation, v.target_stitches)
+        if not (0 <= v.threshold <= 255):
+            raise ValueError(f"threshold must be 0–255, got {v.threshold}")
+        if v.dither not in ("none", "floyd-steinberg", "bayer"):
+            raise ValueError(f"Unknown dither mode {v.dither!r}")
+
+    img = _open(source)
+    orig_width, orig_height = img.size
+    grey = _orient(img, crop, flip_horizontal, rotation).convert("L")
+    suggested = otsu_threshold(grey.histogram())
+
+    scaled: dict[int | None, Image.Image] = {}
+    results: list[ImageResult] = []
+    for v in variants:
+        geometry = scaled.get(v.target_stitches)
+        if geometry is None:
+            geometry = scaled[v.target_stitches] = _scale(
+                grey,
+                max_width=max_width,
+                target_stitches=v.target_stitches,
+                max_rows=max_rows,
+                stitch_aspect_ratio=stitch_aspect_ratio,
+            )
+        w, h = geometry.size
+        packed = _binarise(geometry, w, h, v.dither, v.threshold)
+        results.append(_make_result(packed, w, h, orig_width, orig_height, v.invert))
+    return SweepResult(results=results, suggested_threshold=suggested)
+
+
+def otsu_threshold(histogram: Sequence[int]) -> int:
+    """Return Otsu's threshold for a 256-bin greyscale histogram.
+
+    The value maximises the between-class variance of pixels ≤ t versus
+    pixels > t, which is the split load_image() uses, so it can be passed
+    straight in as ``threshold``.  Returns 128 for an empty or single-level
+    histogram, where there is nothing to separate.
+    """
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    weight_b = 0
+    sum_b = 0
+    best = 0.0
+    best_t = 128
+    for t, count in enumerate(histogram):
+        weight_b += count
+        if weight_b == 0:
+            continue
+        weight_f = total - weight_b
+        if weight_f == 0:
+            break
+        sum_b += t * count
+        mean_b = sum_b / weight_b
+        mean_f = (sum_all - sum_b) / weight_f
+        between = weight_b * weight_f * (mean_b - mean_f) ** 2
+        if between > best:
+            best, best_t = between, t
+    return best_t
+
+
+def contact_sheet(results: Sequence[ImageResult], gap: int = 4) -> "Image.Image":
+    """Lay *results* out left to right on one greyscale image.
+
+    Knit stitches are black, skipped ones white, and the ``gap``-pixel
+    gutters between previews are mid grey.
+    """
+    from PIL import Image  # noqa: PLC0415
+
+    width = sum(r.width for r in results) + gap * max(0, len(results) - 1)
+    height = max((r.height for r in results), default=0)
+    sheet = Image.new("L", (max(1, width), max(1, height)), 128)
+    x = 0
+    for r in results:
+        sheet.paste(r.to_image(), (x, 0))
+        x += r.width + gap
+    return sheet
+
+
+# ---------------------------------------------------------------------------
+# Machine-ready fast path
+# ---------------------------------------------------------------------------
+
+
+def _is_machine_ready(
+    img: "Image.Image",
+    *,
+    max_width: int,
+    target_stitches: int | None,
+    max_rows: int | None,
+    stitch_aspect_ratio: float,
+    dither: DitherMode,
+) -> bool:
+    """Return True if *img* can be knitted stitch-for-stitch as it stands.
+
+    That is the case for bilevel sources — mode "1", or a palette image that
+    uses at most two colours — which need no scaling and no aspect stretch,
+    and which are binarised with a plain threshold.  Such images skip the
+    greyscale conversion, every resample and the per-pixel binarisation loop,
+    so they are reproduced exactly.
+    """
+    if stitch_aspect_ratio != 1.0 or dither != "none":
+        return False
+    w, h = img.size
+    if target_stitches is not None:
+        if w != target_stitches:
+            return False
+    elif w > max_width:
+        return False
+    if max_rows is not None and h > max_rows:
+        return False
+    if img.mode == "1":
+        return True
+    return img.mode == "P" and img.getcolors(2) is not None
+
+
+def _threshold_packed(img: "Image.Image", threshold: int) -> bytes:
+    """Threshold *img* in C via a lookup table and return packed 1-bit rows.
+
+    Pixels whose luminance is ≤ threshold become knit (hard threshold).  The
+    result uses the packed layout described in
+    app.util (Pillow's "1;IR" raw mode: LSB = leftmost stitch, 1 = knit).
+    """
+    lut = [0 if v <= threshold else 255 for v in range(256)]
+    bilevel = img.convert("L").point(lut, "1")
+    return bilevel.tobytes("raw", "1;IR")
+
+
 # ---------------------------------------------------------------------------
 # Binarisation helpers
 # ---------------------------------------------------------------------------
@@ -254,66 +864,61 @@ def _binarise(
     h: int,
     dither: DitherMode,
     threshold: int,
-) -> list[list[int]]:
-    """Convert a greyscale Pillow image to a list-of-lists of 0/1 values."""
+) -> bytes:
+    """Convert a greyscale Pillow image to packed 1-bit rows (1 = knit)."""
     if dither == "floyd-steinberg":
-        return _binarise_floyd_steinberg(img, w, h)
+        return _binarise_floyd_steinberg(img)
     elif dither == "bayer":
         return _binarise_bayer(img, w, h)
     else:
-        return _binarise_threshold(img, w, h, threshold)
-
+        return _threshold_packed(img, threshold)
 
-def _binarise_threshold(
-    img: "Image.Image", w: int, h: int, threshold: int
-) -> list[list[int]]:
-    """Hard threshold: pixels ≤ threshold → 1 (knit), else → 0."""
-    pixels = img.load()
-    rows: list[list[int]] = []
-    for y in range(h):
-        row: list[int] = []
-        for x in range(w):
-            lum: int = cast(int, pixels[x, y])  # type: ignore[index]
-            row.append(1 if lum <= threshold else 0)
-        rows.append(row)
-    return rows
 
-
-def _binarise_floyd_steinberg(img: "Image.Image", w: int, h: int) -> list[list[int]]:
+def _binarise_floyd_steinberg(img: "Image.Image") -> bytes:
     """Error-diffusion dithering using Pillow's built-in Floyd-Steinberg.
 
     Pillow's Image.convert("1") uses Floyd-Steinberg by default.
-    The resulting 1-bit image maps black (0) → knit (1), white (255) → skip (0).
+    The resulting 1-bit image maps black (0) → knit (1), white (255) → skip (0),
+    which is exactly what the "1;IR" raw packer writes.
     """
     dithered = img.convert("1")  # Pillow applies Floyd-Steinberg here
-    pixels = dithered.load()
-    rows: list[list[int]] = []
-    for y in range(h):
-        row: list[int] = []
-        for x in range(w):
-            # Pillow "1" mode: pixel value is 0 (black) or 255 (white)
-            row.append(1 if pixels[x, y] == 0 else 0)  # type: ignore[index]
-        rows.append(row)
-    return rows
-
-
-def _binarise_bayer(img: "Image.Image", w: int, h: int) -> list[list[int]]:
+    return dithered.tobytes("raw", "1;IR")
+
+
+def _binarise_bayer(img: "Image.Image", w: int, h: int) -> bytes:
     """Ordered (Bayer 4×4) dithering.
 
     Each pixel's luminance is compared against a spatially-varying threshold
     from the Bayer matrix, tiled across the image.  Produces a regular
     crosshatch pattern that preserves overall tone without error propagation.
+
+    The comparison runs in C: the tiled threshold map is built row-wise, and
+    a saturating ``luminance - threshold`` is zero exactly where the pixel
+    should be knit.
+    """
+    from PIL import Image, ImageChops  # noqa: PLC0415
+
+    tile_rows = [bytes(_BAYER_4X4[y][x % 4] for x in range(w)) for y in range(4)]
+    thresholds = Image.frombytes(
+        "L", (w, h), b"".join(tile_rows[y % 4] for y in range(h))
+    )
+    over = ImageChops.subtract(img, thresholds)
+    knit = over.point([0] + [255] * 255, "1")
+    return knit.tobytes("raw", "1;IR")
+
+
+def _invert_packed(packed: bytes, width: int, height: int) -> bytes:
+    """Swap knit ↔ skip in packed rows with a single byte-wise XOR.
+
+    The XOR mask covers only real stitches, so row padding bits stay 0.
     """
-    pixels = img.load()
-    rows: list[list[int]] = []
-    for y in range(h):
-        row: list[int] = []
-        for x in range(w):
-            lum: int = cast(int, pixels[x, y])  # type: ignore[index]
-            bayer_threshold = _BAYER_4X4[y % 4][x % 4]
-            row.append(1 if lum <= bayer_threshold else 0)
-        rows.append(row)
-    return rows
+    row_bytes = packed_row_bytes(width)
+    tail_bits = width - 8 * (row_bytes - 1)
+    row_mask = b"\xff" * (row_bytes - 1) + bytes([(1 << tail_bits) - 1])
+    value = int.from_bytes(packed, "little") ^ int.from_bytes(
+        row_mask * height, "little"
+    )
+    return value.to_bytes(len(packed), "little")
 
 
 # ---------------------------------------------------------------------------
@@ -323,6 +928,8 @@ def _binarise_bayer(img: "Image.Image", w: int, h: int) -> list[list[int]]:
 
 def _open(source: Union[str, Path, bytes, "Image.Image"]) -> "Image.Image":
     """Normalise *source* to a PIL Image."""
+    from PIL import Image, UnidentifiedImageError  # noqa: PLC0415
+
     if isinstance(source, Image.Image):
         return source.copy()
 
@@ -0,0 +1,421 @@
+"""
+app/metrics.py — In-process metrics in the Prometheus text format.
+
+A small, dependency-free registry of counters and histograms that the rest
+of the app updates as it works and that GET /metrics renders on demand.
+Recording is a dictionary lookup, a lock and an addition; all formatting
+happens at scrape time, so an unscraped server pays next to nothing.
+
+Metrics are declared once, at module level, next to the code they
+measure:
+
+    _SENT = REGISTRY.counter(
+        "knitting_x_bytes_total", "Bytes x handled.", ("direction",)
+    )
+    _SENT.labels("out").inc(len(data))
+
+    _SECONDS = REGISTRY.histogram("knitting_x_seconds", "Time spent in x.")
+    with _SECONDS.time():
+        ...
+
+Worker processes (app.workers) record into their own copy of REGISTRY;
+take() hands over what they recorded since the last call and merge() adds
+it to the server's, so work done there is counted too.
+
+Histograms declared with a ``timing`` prefix also add each observation to
+the current request's Server-Timing header (app.timing).
+
+The caches share CACHE_LOOKUPS, which counts hits and misses per cache;
+the hit ratio is the "hit" series over the sum of both.
+
+Public API
+----------
+REGISTRY                                   (the app's registry)
+CACHE_LOOKUPS                              (cache hits and misses)
+DISK_IMAGE_SECONDS                         (pattern codec and compaction)
+Registry                                   (counter, histogram, render,
+                                            take, merge)
+Counter, Histogram                         (labels, inc / observe, time)
+Laps                                       (per-stage timings of one call)
+CONTENT_TYPE                               (of render()'s output)
+"""
+
+from __future__ import annotations
+
+import abc
+import bisect
+import functools
+import math
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, Callable, TypeVar
+
+from app import timing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds, in seconds, suiting everything from a codec call (tens of
+# microseconds) to a whole transfer to the machine (a minute or more).
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# What take() returns: per metric name, per label values, the recorded
+# value (counters) or (bucket counts, sum) (histograms).
+Deltas = dict[str, dict[tuple[str, ...], Any]]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric(abc.ABC):
+    """A metric family: one time series per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        """The series for *values*, one per label name, created on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes {len(self.labelnames)} label value(s), "
+                f"got {len(values)}"
+            )
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child(key))
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self, values: tuple[str, ...]) -> Any:
+        """A fresh series for the label *values*."""
+
+    def _series(self) -> list[tuple[tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {_escape(self.help)}"]
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self._series():
+            lines += self._render_child(_label_text(self.labelnames, values), child)
+        return lines
+
+    @abc.abstractmethod
+    def _render_child(self, labels: str, child: Any) -> list[str]:
+        """Exposition lines of one series, whose labels render as *labels*."""
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _take(self) -> float:
+        with self._lock:
+            value, self.value = self.value, 0.0
+        return value
+
+    def _merge(self, value: float) -> None:
+        self.inc(value)
+
+
+class Counter(_Metric):
+    """A count that only goes up.  Call inc() on labels(...)."""
+
+    kind = "counter"
+
+    def _new_child(self, values: tuple[str, ...]) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Shorthand for a counter without labels."""
+        self.labels().inc(amount)
+
+    def _render_child(self, labels: str, child: _CounterChild) -> list[str]:
+        return [f"{self.name}{labels} {_format_value(child.value)}"]
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "_timing", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...], timing: str | None) -> None:
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self._timing = timing
+        # counts[i] holds observations in (bounds[i-1], bounds[i]]; the last
+        # one those above every bound.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+        if self._timing is not None:
+            timing.record(self._timing, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the seconds the with block takes, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def timed(self, fn: F) -> F:
+        """Decorator: observe the seconds every call of *fn* takes."""
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    def _take(self) -> tuple[list[int], float]:
+        with self._lock:
+            taken = (self.counts, self.sum)
+            self.counts, self.sum = [0] * len(self.counts), 0.0
+        return taken
+
+    def _merge(self, delta: tuple[list[int], float]) -> None:
+        counts, total = delta
+        with self._lock:
+            for i, n in enumerate(counts):
+                self.counts[i] += n
+            self.sum += total
+
+
+class Histogram(_Metric):
+    """Observations (usually durations in seconds) counted into buckets.
+
+    Call observe(), time() or timed() on labels(...).  With a *timing*
+    prefix, observations made during a request are also recorded in its
+    Server-Timing header (app.timing), named by the prefix followed by the
+    label values.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        timing: str | None = None,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(b for b in buckets if not math.isinf(b)))
+        self.timing = timing
+
+    def _new_child(self, values: tuple[str, ...]) -> _HistogramChild:
+        name = None
+        if self.timing is not None:
+            name = self.timing + "-".join(values) if values else self.timing
+        return _HistogramChild(self.buckets, name)
+
+    def observe(self, value: float) -> None:
+        """Shorthand for a histogram without labels."""
+        self.labels().observe(value)
+
+    def time(self) -> Any:
+        """Shorthand for a histogram without labels."""
+        return self.labels().time()
+
+    def _render_child(self, labels: str, child: _HistogramChild) -> list[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        # Bucket series carry an extra "le" label, after the metric's own.
+        sep = labels[:-1] + "," if labels else "{"
+        lines = []
+        cumulative = 0
+        for bound, n in zip((*self.buckets, math.inf), counts):
+            cumulative += n
+            lines.append(
+                f'{self.name}_bucket{sep}le="{_format_value(bound)}"}} {cumulative}'
+            )
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Laps:
+    """Times consecutive stages of one call into a histogram labelled by stage.
+
+    lap = Laps(_STAGE_SECONDS)
+    decode(...)
+    lap("decode")      # observes the time since Laps() was created
+    scale(...)
+    lap("scale")       # ... and since the previous lap
+    """
+
+    __slots__ = ("_histogram", "_last")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self._histogram = histogram
+        self._last = time.perf_counter()
+
+    def __call__(self, stage: str) -> None:
+        now = time.perf_counter()
+        self._histogram.labels(stage).observe(now - self._last)
+        self._last = now
+
+
+class Registry:
+    """A set of named metrics, rendered together."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> Any:
+        # Declaring a metric again, as a reloaded module does, returns the
+        # existing one; a different metric under the same name is an error.
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if existing is not metric and (
+            type(existing) is not type(metric)
+            or existing.labelnames != metric.labelnames
+        ):
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        return existing
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register and return a new counter."""
+        counter: Counter = self._add(Counter(name, help, labelnames))
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        timing: str | None = None,
+    ) -> Histogram:
+        """Register and return a new histogram."""
+        histogram: Histogram = self._add(
+            Histogram(name, help, labelnames, buckets, timing)
+        )
+        return histogram
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def take(self) -> Deltas:
+        """Return everything recorded since the last take() and reset it."""
+        deltas: Deltas = {}
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            series = {
+                values: child._take()
+                for values, child in metric._series()
+                if _recorded(child)
+            }
+            if series:
+                deltas[metric.name] = series
+        return deltas
+
+    def merge(self, deltas: Deltas) -> None:
+        """Add what another registry's take() returned to these metrics.
+
+        Metrics this registry does not have are ignored.
+        """
+        for name, series in deltas.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            for values, delta in series.items():
+                metric.labels(*values)._merge(delta)
+
+
+def _recorded(child: Any) -> bool:
+    if isinstance(child, _CounterChild):
+        return child.value != 0
+    return any(child.counts)
+
+
+# The app's metrics, served by GET /metrics.
+REGISTRY = Registry()
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    "knitting_cache_lookups_total",
+    "Lookups in the app's caches, by cache and hit or miss.",
+    ("cache", "result"),
+)
+
+# Declared here rather than in app.brother_format because app.workers
+# records its disk rebuilds under "compact" too.
+DISK_IMAGE_SECONDS = REGISTRY.histogram(
+    "knitting_disk_image_seconds",
+    "Time spent encoding, decoding, trimming and compacting patterns.",
+    ("operation",),
+    timing="pattern-",
+)
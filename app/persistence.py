@@ -0,0 +1,359 @@
+"""
+app/persistence.py — Durable storage of the disk state in disk_dir.
+
+The disk image and the sector files captured from the machine otherwise
+live only in memory, so a server restart would lose every pattern.  A
+DiskStore keeps them in a directory:
+
+disk.snapshot   The working region as of one point in the journal.
+disk.journal    Append-only log of every change made since the snapshot.
+sectors.bin     Sector data and sector IDs from the machine's last save.
+
+record() appends each new state of the working region to the journal as
+just the 64-byte blocks that differ from the previous one, so a one-stitch
+edit costs a few dozen bytes, and fsyncs it before returning.  Once the
+journal outgrows *compact_bytes* the current region is written as a new
+snapshot and the journal is started afresh.  Snapshot and sector files are
+replaced atomically (written to a temporary file, fsynced, renamed), so a
+crash leaves either the old or the new version, never a mix.
+
+open() memory-maps the snapshot and replays the journal on top of it.
+Journal records carry sequence numbers, so records already folded into
+the snapshot are skipped, and a CRC, so a record torn by a crash ends the
+replay and is cut off.
+
+The store deals in raw bytes only; app.api turns them into a DiskImage.
+
+Public API
+----------
+DiskStore                      (open, record, save_sectors, snapshot, close)
+StoredState                    (what open() found)
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "disk.snapshot"
+JOURNAL_FILE = "disk.journal"
+SECTORS_FILE = "sectors.bin"
+
+# Journal size beyond which the next record() writes a new snapshot.
+DEFAULT_COMPACT_BYTES: int = 256 * 1024
+
+# Granularity of the journalled differences between two states.
+_BLOCK = 64
+
+# Snapshot header: magic, model (e.g. "KH-940", NUL-padded), last journal
+# sequence number folded in, region length, CRC-32 of the region.
+_SNAPSHOT_HEADER = struct.Struct("<8s8sQII")
+_SNAPSHOT_MAGIC = b"KMSNAP01"
+
+# Journal record header: payload length, sequence number, CRC-32 of the
+# sequence number and payload.  The payload is (offset, length, bytes)
+# runs of changed blocks.
+_RECORD_HEADER = struct.Struct("<IQI")
+_RUN_HEADER = struct.Struct("<IH")
+
+_SECTORS_MAGIC = b"KMSECT01"
+_SECTOR_ENTRY = struct.Struct("<BHH")
+
+
+@dataclass
+class StoredState:
+    """Disk state loaded by DiskStore.open()."""
+
+    model: str
+    region: bytes
+    sector_dat: dict[int, bytes] = field(default_factory=dict)
+    sector_id: dict[int, bytes] = field(default_factory=dict)
+
+
+def _diff(old: bytes, new: bytes) -> bytes:
+    """Journal payload turning *old* into *new* (equal lengths)."""
+    runs: list[bytes] = []
+    start = -1
+    for offset in range(0, len(new) + _BLOCK, _BLOCK):
+        changed = offset < len(new) and (
+            old[offset : offset + _BLOCK] != new[offset : offset + _BLOCK]
+        )
+        if changed and start < 0:
+            start = offset
+        elif not changed and start >= 0:
+            # Runs are cut at 64 KiB - 1 so the length fits the header.
+            for run in range(start, offset, 0xFFC0):
+                chunk = new[run : min(offset, run + 0xFFC0)]
+                runs.append(_RUN_HEADER.pack(run, len(chunk)) + chunk)
+            start = -1
+    return b"".join(runs)
+
+
+def _apply(region: bytearray, payload: bytes) -> None:
+    """Apply a journal payload to *region*; ValueError if it does not fit."""
+    pos = 0
+    while pos < len(payload):
+        offset, length = _RUN_HEADER.unpack_from(payload, pos)
+        pos += _RUN_HEADER.size
+        if offset + length > len(region) or pos + length > len(payload):
+            raise ValueError("journal run outside the working region")
+        region[offset : offset + length] = payload[pos : pos + length]
+        pos += length
+
+
+def _record_crc(seq: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(seq.to_bytes(8, "little")))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Replace *path* with *data* so that readers see all or nothing."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    # Makes a rename durable; not possible (or needed) on every platform.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class DiskStore:
+    """Snapshot-plus-journal store of the working region and sector files.
+
+    Does nothing until open() is called.  Methods are thread-safe.
+    """
+
+    def __init__(
+        self, compact_bytes: int = DEFAULT_COMPACT_BYTES, fsync: bool = True
+    ) -> None:
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._dir: Path | None = None
+        self._journal: BinaryIO | None = None
+        self._journal_bytes = 0
+        # Last recorded state, which the next record() is diffed against.
+        self._model = ""
+        self._region = b""
+        self._seq = 0
+
+    @property
+    def directory(self) -> Path | None:
+        return self._dir
+
+    @property
+    def is_open(self) -> bool:
+        return self._dir is not None
+
+    def open(self, directory: str | Path) -> StoredState | None:
+        """Start storing in *directory* and return the state found there.
+
+        Returns None if the directory holds no saved disk state yet.
+        Raises OSError if the directory cannot be created or read.
+        """
+        self.close()
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = self._load(path)
+            self._dir = path
+            if state is not None:
+                self._model, self._region = state.model, state.region
+            # Start from a clean journal: fold any replayed records into
+            # the snapshot now rather than replaying them on every start.
+            # _write_snapshot() reopens the journal itself.
+            if state is not None and self._journal_bytes:
+                self._write_snapshot()
+            else:
+                self._open_journal()
+        return state
+
+    def record(self, region: bytes, model: str) -> None:
+        """Durably record *region* (of a *model* machine) as the current state."""
+        with self._lock:
+            if self._dir is None:
+                return
+            if model != self._model or len(region) != len(self._region):
+                self._model, self._region = model, bytes(region)
+                self._write_snapshot()
+                return
+            payload = _diff(self._region, region)
+            if not payload:
+                return
+            self._seq += 1
+            header = _RECORD_HEADER.pack(
+                len(payload), self._seq, _record_crc(self._seq, payload)
+            )
+            assert self._journal is not None
+            self._journal.write(header + payload)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._journal_bytes += len(header) + len(payload)
+            self._region = bytes(region)
+            if self._journal_bytes > self.compact_bytes:
+                self._write_snapshot()
+
+    def snapshot(self) -> None:
+        """Write the current state as the snapshot and restart the journal."""
+        with self._lock:
+            if self._dir is not None and self._region:
+                self._write_snapshot()
+
+    def save_sectors(
+        self, sector_dat: dict[int, bytes], sector_id: dict[int, bytes]
+    ) -> None:
+        """Durably store the sector data and IDs captured from the machine."""
+        with self._lock:
+            if self._dir is None:
+                return
+            parts = [_SECTORS_MAGIC, len(sector_dat | sector_id).to_bytes(2, "little")]
+            for n in sorted(sector_dat.keys() | sector_id.keys()):
+                dat, ids = sector_dat.get(n, b""), sector_id.get(n, b"")
+                parts += [_SECTOR_ENTRY.pack(n, len(dat), len(ids)), dat, ids]
+            body = b"".join(parts)
+            _write_atomic(
+                self._dir / SECTORS_FILE, body + zlib.crc32(body).to_bytes(4, "little")
+            )
+
+    def close(self) -> None:
+        """Fold the journal into the snapshot and stop storing."""
+        with self._lock:
+            if self._dir is None:
+                return
+            if self._journal_bytes:
+                self._write_snapshot()
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = None
+            self._dir = None
+            self._model, self._region, self._seq = "", b"", 0
+            self._journal_bytes = 0
+
+    # ------------------------------------------------------------------
+    # Internals; called with _lock held
+    # ------------------------------------------------------------------
+
+    def _open_journal(self) -> None:
+        assert self._dir is not None
+        self._journal = open(self._dir / JOURNAL_FILE, "ab")
+
+    def _write_snapshot(self) -> None:
+        assert self._dir is not None
+        header = _SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC,
+            self._model.encode("ascii"),
+            self._seq,
+            len(self._region),
+            zlib.crc32(self._region),
+        )
+        _write_atomic(self._dir / SNAPSHOT_FILE, header + self._region)
+        # Records up to _seq are now in the snapshot, so the journal can be
+        # restarted.  A crash before this point leaves them to be skipped.
+        if self._journal is not None:
+            self._journal.close()
+        _write_atomic(self._dir / JOURNAL_FILE, b"")
+        self._journal_bytes = 0
+        self._open_journal()
+
+    def _load(self, path: Path) -> StoredState | None:
+        snapshot = path / SNAPSHOT_FILE
+        if not snapshot.exists():
+            return None
+        with (
+            open(snapshot, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m,
+        ):
+            if len(m) < _SNAPSHOT_HEADER.size:
+                log.warning("Ignoring truncated snapshot %s", snapshot)
+                return None
+            magic, model, seq, size, crc = _SNAPSHOT_HEADER.unpack_from(m)
+            region = bytearray(m[_SNAPSHOT_HEADER.size : _SNAPSHOT_HEADER.size + size])
+        if magic != _SNAPSHOT_MAGIC or len(region) != size or zlib.crc32(region) != crc:
+            log.warning("Ignoring corrupt snapshot %s", snapshot)
+            return None
+        self._seq = seq
+        self._journal_bytes = self._replay(path / JOURNAL_FILE, region)
+
+        state = StoredState(model.rstrip(b"\0").decode("ascii"), bytes(region))
+        state.sector_dat, state.sector_id = self._load_sectors(path / SECTORS_FILE)
+        return state
+
+    def _replay(self, journal: Path, region: bytearray) -> int:
+        """Apply journal records after the snapshot; return the bytes kept."""
+        if not journal.exists():
+            return 0
+        data = journal.read_bytes()
+        pos = applied = 0
+        while pos + _RECORD_HEADER.size <= len(data):
+            length, seq, crc = _RECORD_HEADER.unpack_from(data, pos)
+            end = pos + _RECORD_HEADER.size + length
+            payload = data[pos + _RECORD_HEADER.size : end]
+            if end > len(data) or _record_crc(seq, payload) != crc:
+                break
+            if seq > self._seq:
+                try:
+                    _apply(region, payload)
+                except ValueError:
+                    break
+                self._seq = seq
+                applied += 1
+            pos = end
+        if pos < len(data):
+            log.warning(
+                "Discarding %d byte(s) of torn journal at the end of %s",
+                len(data) - pos,
+                journal,
+            )
+            with open(journal, "r+b") as f:
+                f.truncate(pos)
+        if applied:
+            log.info("Replayed %d journal record(s)", applied)
+        return pos
+
+    def _load_sectors(self, path: Path) -> tuple[dict[int, bytes], dict[int, bytes]]:
+        if not path.exists():
+            return {}, {}
+        data = path.read_bytes()
+        body, crc = data[:-4], data[-4:]
+        if (
+            not body.startswith(_SECTORS_MAGIC)
+            or zlib.crc32(body).to_bytes(4, "little") != crc
+        ):
+            log.warning("Ignoring corrupt sector file %s", path)
+            return {}, {}
+        dat: dict[int, bytes] = {}
+        ids: dict[int, bytes] = {}
+        pos = len(_SECTORS_MAGIC) + 2
+        for _ in range(int.from_bytes(body[len(_SECTORS_MAGIC) : pos], "little")):
+            n, dat_len, id_len = _SECTOR_ENTRY.unpack_from(body, pos)
+            pos += _SECTOR_ENTRY.size
+            if dat_len:
+                dat[n] = body[pos : pos + dat_len]
+            pos += dat_len
+            if id_len:
+                ids[n] = body[pos : pos + id_len]
+            pos += id_len
+        return dat, ids
@@ -5,14 +5,21 @@ FTDI chips (VID 0x0403) are used by the cable that connects the host machine
 to the KH-940.  Discovery filters available serial ports by that VID and
 returns the single unambiguous match, or raises PortDiscoveryError with
 enough context for the caller to surface a useful message to the user.
+Ports already assigned to other machines can be excluded, so that with
+several cables plugged in the one left over is still found.
+
+pyserial's port enumeration is imported on first use, so importing this
+module (and the API with it) stays cheap.
 """
 
 from __future__ import annotations
 
+from collections.abc import Collection
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-from serial.tools.list_ports import comports
-from serial.tools.list_ports_common import ListPortInfo
+if TYPE_CHECKING:
+    from serial.tools.list_ports_common import ListPortInfo
 
 # USB vendor ID assigned to FTDI Ltd.
 _FTDI_VID: int = 0x0403
@@ -87,12 +94,17 @@ class PortDiscoveryError(Exception):
 
 def list_all_ports() -> list[PortInfo]:
     """Return every available serial port on the system."""
+    from serial.tools.list_ports import comports  # noqa: PLC0415
+
     return [PortInfo.from_list_port_info(p) for p in comports()]
 
 
-def discover_ftdi_port() -> PortInfo:
+def discover_ftdi_port(exclude: Collection[str] = ()) -> PortInfo:
     """Return the single FTDI serial port, or raise PortDiscoveryError.
 
+    FTDI ports whose device name is in *exclude* (e.g. ports already in use
+    by other machines) are ignored.
+
     Raises
     ------
     PortDiscoveryError
@@ -101,7 +113,7 @@ def discover_ftdi_port() -> PortInfo:
         that callers can construct a helpful message for the user.
     """
     all_ports = list_all_ports()
-    candidates = [p for p in all_ports if p.is_ftdi]
+    candidates = [p for p in all_ports if p.is_ftdi and p.device not in exclude]
 
     if len(candidates) == 1:
         return candidates[0]
@@ -0,0 +1,395 @@
+"""
+app/profiling.py — On-demand profiling of live requests and emulator runs.
+
+A Profiler is armed with triggers: "profile the next *count* requests to
+this route" or "profile the next emulator session".  Code paths that can
+be profiled wrap themselves in Profiler.capture(); while nothing is armed
+that costs one attribute check.  When a trigger matches, the wrapped code
+runs under cProfile (kind "cpu") or tracemalloc (kind "memory") and the
+result is kept as a Profile in a bounded in-memory store, oldest dropped
+first.
+
+Profiles can be exported as:
+
+pstats      cProfile's own format (cpu only), for pstats, snakeviz etc.
+collapsed   One "frame;frame;frame weight" line per stack, for
+            flamegraph.pl and speedscope.  cpu weights are microseconds of
+            own time; cProfile records only direct callers, so stacks are
+            reconstructed by splitting each function's time among its
+            callers.  memory weights are bytes still allocated when the
+            capture ended, by allocation traceback.
+text        A human-readable summary.
+
+Both profilers are process-wide: only one capture runs at a time, a
+trigger that matches while another capture is running is left armed for
+a later call, and work done concurrently by other threads appears in the
+profile too.  Work handed to worker processes (app.workers) is not seen.
+
+Public API
+----------
+Profiler                                   (arm, disarm, capture,
+                                            triggers, profiles, get)
+Profile, Trigger
+ProfileKind, ProfileFormat
+EMULATOR                                   (target of emulator sessions)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+ProfileKind = Literal["cpu", "memory"]
+ProfileFormat = Literal["pstats", "collapsed", "text"]
+
+# Trigger target matching PDDEmulator sessions rather than a route.
+EMULATOR = "emulator"
+
+DEFAULT_MAX_PROFILES: int = 16
+
+# Frames recorded per allocation by memory captures.
+_MEMORY_FRAMES = 32
+
+# Deepest stack reconstructed from cProfile's caller data, and the smallest
+# share of the total time a reconstructed stack may hold.
+_MAX_DEPTH = 64
+_MIN_STACK = 0.001
+
+_PATH_PARAM = re.compile(r"\{[^/{}]+\}")
+
+
+@dataclass
+class Trigger:
+    """Profile the next *remaining* calls matching *target*."""
+
+    id: str
+    target: str  # a route template such as /preview/pattern/{number}, or EMULATOR
+    kind: ProfileKind
+    remaining: int
+    method: str | None = None
+    _pattern: re.Pattern[str] | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.target == EMULATOR:
+            return
+        if not self.target.startswith("/"):
+            raise ValueError(
+                f"target must be a route path or {EMULATOR!r}, got {self.target!r}"
+            )
+        parts = _PATH_PARAM.split(self.target)
+        self._pattern = re.compile("[^/]+".join(re.escape(p) for p in parts))
+
+    def matches(self, target: str, method: str | None) -> bool:
+        if self._pattern is None:
+            return target == EMULATOR
+        if self.method is not None and self.method != method:
+            return False
+        return self._pattern.fullmatch(target) is not None
+
+
+@dataclass(frozen=True)
+class Profile:
+    """The result of one capture."""
+
+    id: str
+    target: str
+    kind: ProfileKind
+    label: str  # what ran, e.g. "GET /preview/pattern/3"
+    started: float  # time.time()
+    seconds: float
+    collapsed: str
+    text: str
+    pstats: bytes | None = None  # marshalled cProfile stats, cpu only
+
+    def export(self, fmt: ProfileFormat) -> bytes:
+        """The profile in *fmt*; ValueError for pstats of a memory profile."""
+        if fmt == "pstats":
+            if self.pstats is None:
+                raise ValueError("Only cpu profiles can be exported as pstats")
+            return self.pstats
+        return (self.collapsed if fmt == "collapsed" else self.text).encode()
+
+
+class Profiler:
+    """Triggers plus a bounded store of the profiles they produced.
+
+    Methods are thread-safe.
+    """
+
+    def __init__(self, max_profiles: int = DEFAULT_MAX_PROFILES) -> None:
+        self._lock = threading.Lock()
+        self._triggers: list[Trigger] = []
+        self._profiles: deque[Profile] = deque(maxlen=max_profiles)
+        # Held while a capture runs: cProfile and tracemalloc are global.
+        self._running = threading.Lock()
+
+    def arm(
+        self,
+        target: str,
+        count: int = 1,
+        kind: ProfileKind = "cpu",
+        method: str | None = None,
+    ) -> Trigger:
+        """Profile the next *count* calls matching *target*.
+
+        *target* is a route template (path parameters in braces match any
+        one path segment) optionally restricted to one HTTP *method*, or
+        EMULATOR.  Raises ValueError for any other target or a count below 1.
+        """
+        if count < 1:
+            raise ValueError(f"count must be at least 1, got {count}")
+        trigger = Trigger(uuid.uuid4().hex[:12], target, kind, count, method)
+        with self._lock:
+            self._triggers.append(trigger)
+        return trigger
+
+    def disarm(self) -> int:
+        """Drop every trigger; return how many there were."""
+        with self._lock:
+            dropped = len(self._triggers)
+            self._triggers = []
+        return dropped
+
+    def triggers(self) -> list[Trigger]:
+        with self._lock:
+            return list(self._triggers)
+
+    def profiles(self) -> list[Profile]:
+        """Stored profiles, oldest first."""
+        with self._lock:
+            return list(self._profiles)
+
+    def get(self, profile_id: str) -> Profile | None:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def capture(
+        self, target: str, method: str | None = None, label: str = ""
+    ) -> contextlib.AbstractContextManager[None]:
+        """Context manager profiling its block if a trigger matches.
+
+        *target* is a request path (with *method*) or EMULATOR.
+        """
+        if not self._triggers:
+            return contextlib.nullcontext()
+        trigger = self._claim(target, method)
+        if trigger is None:
+            return contextlib.nullcontext()
+        return self._capture(trigger, label or target)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _claim(self, target: str, method: str | None) -> Trigger | None:
+        """Find the first matching trigger and start running.
+
+        The call is taken off the trigger by _consume() only once the
+        capture has started, so a capture that cannot start leaves the
+        trigger armed.
+        """
+        with self._lock:
+            trigger = next(
+                (t for t in self._triggers if t.matches(target, method)), None
+            )
+            if trigger is None or not self._running.acquire(blocking=False):
+                return None
+        return trigger
+
+    def _consume(self, trigger: Trigger) -> None:
+        """Take one call off *trigger*, dropping it once it is used up."""
+        with self._lock:
+            trigger.remaining -= 1
+            if trigger.remaining == 0 and trigger in self._triggers:
+                self._triggers.remove(trigger)
+
+    @contextlib.contextmanager
+    def _capture(self, trigger: Trigger, label: str) -> Iterator[None]:
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            if trigger.kind == "cpu":
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:  # another profiler (a debugger?) is active
+                    yield
+                    return
+                self._consume(trigger)
+                try:
+                    yield
+                finally:
+                    profile.disable()
+                    self._store(
+                        trigger,
+                        label,
+                        started,
+                        time.perf_counter() - start,
+                        *_cpu_results(profile),
+                    )
+            else:
+                was_tracing = tracemalloc.is_tracing()
+                if not was_tracing:
+                    tracemalloc.start(_MEMORY_FRAMES)
+                tracemalloc.reset_peak()
+                self._consume(trigger)
+                try:
+                    yield
+                finally:
+                    snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    if not was_tracing:
+                        tracemalloc.stop()
+                    self._store(
+                        trigger,
+                        label,
+                        started,
+                        time.perf_counter() - start,
+                        *_memory_results(snapshot, peak),
+                    )
+        finally:
+            self._running.release()
+
+    def _store(
+        self,
+        trigger: Trigger,
+        label: str,
+        started: float,
+        seconds: float,
+        collapsed: str,
+        text: str,
+        stats: bytes | None = None,
+    ) -> None:
+        profile = Profile(
+            uuid.uuid4().hex[:12],
+            trigger.target,
+            trigger.kind,
+            label,
+            started,
+            seconds,
+            collapsed,
+            text,
+            stats,
+        )
+        with self._lock:
+            self._profiles.append(profile)
+
+
+# ---------------------------------------------------------------------------
+# Exports
+# ---------------------------------------------------------------------------
+
+# pstats function key: (filename, line number, function name).
+_Func = tuple[str, int, str]
+
+
+def _frame_name(func: _Func) -> str:
+    filename, line, name = func
+    if filename == "~":  # built-in
+        text = name
+    else:
+        text = f"{name} ({os.path.basename(filename)}:{line})"
+    return text.replace(";", ",")
+
+
+def _cpu_results(profile: cProfile.Profile) -> tuple[str, str, bytes]:
+    """(collapsed stacks, text summary, marshalled stats) of a cpu capture."""
+    profile.create_stats()
+    raw: dict[_Func, Any] = profile.stats  # type: ignore[attr-defined]
+
+    buf = io.StringIO()
+    pstats.Stats(profile, stream=buf).sort_stats("cumulative").print_stats(40)
+    return _collapse(raw), buf.getvalue(), marshal.dumps(raw)
+
+
+def _collapse(stats: dict[_Func, Any]) -> str:
+    """Collapsed stacks from cProfile's per-caller statistics.
+
+    Each function's own time is split among its callers in proportion to
+    the cumulative time spent in it from each of them.  Time with no
+    recorded caller (functions already running when the capture started,
+    e.g. in another thread) starts a stack of its own.  Stacks holding less
+    than _MIN_STACK of the total are left out, which keeps the walk short.
+    """
+    callees: dict[_Func, list[tuple[_Func, float]]] = {}
+    for func, (_cc, _nc, _tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            share = edge[3] / ct if ct else 0.0
+            callees.setdefault(caller, []).append((func, share))
+
+    roots: list[tuple[_Func, float]] = []
+    for func, (_cc, _nc, _tt, ct, callers) in stats.items():
+        if not callers:
+            roots.append((func, 1.0))
+        elif ct:
+            unattributed = ct - sum(edge[3] for edge in callers.values())
+            if unattributed > 0:
+                roots.append((func, unattributed / ct))
+    cutoff = _MIN_STACK * sum(stats[func][3] * share for func, share in roots)
+
+    weights: dict[str, float] = {}
+
+    def walk(func: _Func, path: tuple[str, ...], share: float, seen: set) -> None:
+        if stats[func][3] * share < cutoff:
+            return
+        path = (*path, _frame_name(func))
+        own = stats[func][2] * share
+        if own:
+            key = ";".join(path)
+            weights[key] = weights.get(key, 0.0) + own
+        if len(path) >= _MAX_DEPTH:
+            return
+        for callee, edge_share in callees.get(func, ()):
+            if callee not in seen and callee in stats:
+                walk(callee, path, share * edge_share, seen | {callee})
+
+    for func, share in roots:
+        walk(func, (), share, {func})
+    return "".join(
+        f"{stack} {round(seconds * 1e6)}\n"
+        for stack, seconds in sorted(weights.items())
+        if round(seconds * 1e6)
+    )
+
+
+def _memory_results(snapshot: tracemalloc.Snapshot, peak: int) -> tuple[str, str]:
+    """(collapsed stacks, text summary) of a memory capture."""
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, contextlib.__file__),
+        ]
+    )
+    stats = snapshot.statistics("traceback")
+    collapsed = "".join(
+        ";".join(
+            f"{os.path.basename(f.filename)}:{f.lineno}".replace(";", ",")
+            for f in stat.traceback
+        )
+        + f" {stat.size}\n"
+        for stat in stats
+    )
+    lines = [
+        f"Peak traced memory: {peak} bytes",
+        f"Still allocated at the end: {sum(s.size for s in stats)} bytes "
+        f"in {sum(s.count for s in stats)} block(s)",
+        "",
+    ]
+    for stat in itertools.islice(snapshot.statistics("lineno"), 40):
+        lines.append(str(stat))
+    return collapsed, "\n".join(lines) + "\n"
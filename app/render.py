@@ -0,0 +1,266 @@
+"""
+app/render.py — Stitch-realistic fabric previews of patterns.
+
+Renders a pattern the way the knitted fabric will look: every stitch is a
+small V-shaped knit stitch sprite in one of two yarn colours, with cells
+4 units wide × 3 tall to match the real stitch aspect ratio.
+
+The image is assembled without any per-stitch work in Python:
+
+1. The stitch sprite is tiled over the whole canvas by repeated doubling
+   (a handful of Image.paste calls, however large the pattern).
+2. Two yarn layers are made by multiplying that shading tile by each yarn
+   colour.
+3. The packed pattern is scaled up to the canvas with NEAREST resampling to
+   give a per-pixel yarn mask, and Image.composite picks a layer per pixel.
+
+The canvas is capped at MAX_CANVAS_PIXELS (a full 200 × 999 pattern at
+the default cell size), since the layers take several bytes per pixel.
+
+Rendered PNGs are cached by a hash of the pattern content and render
+settings, up to _CACHE_BYTES in total, so repeated previews of an
+unchanged pattern are free.  fabric_png() renders without the cache, for
+worker processes; the server looks the result up and stores it with
+fabric_key(), cached_fabric_png() and store_fabric_png().
+
+Public API
+----------
+render_fabric(packed, stitches, rows, **kwargs) -> Image.Image
+render_fabric_png(packed, stitches, rows, **kwargs) -> bytes   (cached)
+fabric_png(packed, stitches, rows, **kwargs) -> bytes          (uncached)
+fabric_key(packed, stitches, rows, **kwargs) -> bytes
+cached_fabric_png(key) -> bytes | None, store_fabric_png(key, png)
+MAX_CANVAS_PIXELS
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from app import timing
+from app.metrics import CACHE_LOOKUPS
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Default yarn colours: knit (1) stitches in the contrast yarn, background
+# (0) stitches in the main yarn.
+DEFAULT_KNIT_COLOUR: tuple[int, int, int] = (40, 40, 48)
+DEFAULT_BACKGROUND_COLOUR: tuple[int, int, int] = (236, 230, 214)
+
+# Default cell size in pixels per stitch: 4 wide × 3 tall.
+DEFAULT_CELL: tuple[int, int] = (8, 6)
+
+# Largest canvas (stitches × rows × cell area) render_fabric draws.
+MAX_CANVAS_PIXELS: int = 200 * 999 * DEFAULT_CELL[0] * DEFAULT_CELL[1]
+
+# Total size of the rendered PNGs kept by render_fabric_png.
+_CACHE_BYTES: int = 32 * 1024 * 1024
+
+_SUPERSAMPLE: int = 4
+
+Colour = tuple[int, int, int]
+
+
+@lru_cache(maxsize=8)
+def _stitch_sprite(cell_width: int, cell_height: int) -> "Image.Image":
+    """Greyscale shading for one knit stitch: two lit legs forming a V.
+
+    Drawn at _SUPERSAMPLE× and reduced, so edges are anti-aliased.  Values
+    are multiplied with the yarn colour, so 255 is full yarn brightness.
+    """
+    from PIL import Image, ImageDraw  # noqa: PLC0415
+
+    s = _SUPERSAMPLE
+    w, h = cell_width * s, cell_height * s
+    img = Image.new("L", (w, h), 100)  # gap between stitches
+    draw = ImageDraw.Draw(img)
+    mid = w / 2
+    # Each leg runs from the top outer corner down to the bottom centre,
+    # overlapping the row above slightly as real stitches do.
+    left_leg = [(0, -h * 0.2), (mid * 0.85, -h * 0.2), (mid, h), (mid * 0.3, h)]
+    right_leg = [
+        (w, -h * 0.2),
+        (w - mid * 0.85, -h * 0.2),
+        (mid, h),
+        (w - mid * 0.3, h),
+    ]
+    draw.polygon(left_leg, fill=225)
+    draw.polygon(right_leg, fill=255)
+    # A darker groove down the middle of the V.
+    draw.line([(mid, 0), (mid, h)], fill=120, width=max(1, s // 2))
+    return img.resize((cell_width, cell_height), Image.Resampling.LANCZOS)
+
+
+def _tile(tile: "Image.Image", width: int, height: int) -> "Image.Image":
+    """Repeat *tile* over a width × height canvas in O(log n) pastes."""
+    from PIL import Image  # noqa: PLC0415
+
+    out = Image.new(tile.mode, (width, height))
+    out.paste(tile, (0, 0))
+    filled = tile.width
+    while filled < width:
+        out.paste(out.crop((0, 0, filled, tile.height)), (filled, 0))
+        filled *= 2
+    filled = tile.height
+    while filled < height:
+        out.paste(out.crop((0, 0, width, filled)), (0, filled))
+        filled *= 2
+    return out
+
+
+def render_fabric(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    *,
+    knit_colour: Colour = DEFAULT_KNIT_COLOUR,
+    background_colour: Colour = DEFAULT_BACKGROUND_COLOUR,
+    cell: tuple[int, int] = DEFAULT_CELL,
+) -> "Image.Image":
+    """Render packed rows (see app.util) as an RGB image of knitted fabric.
+
+    Row 0 is drawn at the top.  *cell* is the (width, height) in pixels of
+    one stitch.  Raises ValueError for an empty pattern, a cell smaller
+    than 2 × 2 or a canvas larger than MAX_CANVAS_PIXELS.
+    """
+    from PIL import Image, ImageChops  # noqa: PLC0415
+
+    if stitches < 1 or rows < 1:
+        raise ValueError(f"Cannot render an empty {stitches}×{rows} pattern")
+    cell_w, cell_h = cell
+    if cell_w < 2 or cell_h < 2:
+        raise ValueError(f"cell must be at least 2×2 pixels, got {cell_w}×{cell_h}")
+    if stitches * rows * cell_w * cell_h > MAX_CANVAS_PIXELS:
+        raise ValueError(
+            f"A {stitches}×{rows} pattern at {cell_w}×{cell_h} pixels per stitch "
+            f"is larger than {MAX_CANVAS_PIXELS} pixels; use a smaller cell"
+        )
+
+    size = (stitches * cell_w, rows * cell_h)
+    shading = _tile(_stitch_sprite(cell_w, cell_h), *size).convert("RGB")
+    knit_layer = ImageChops.multiply(shading, Image.new("RGB", size, knit_colour))
+    background_layer = ImageChops.multiply(
+        shading, Image.new("RGB", size, background_colour)
+    )
+
+    # "1;R" keeps knit bits as white, so the scaled-up mask selects the knit
+    # layer wherever a stitch is knit.
+    mask = Image.frombytes("1", (stitches, rows), bytes(packed), "raw", "1;R")
+    mask = mask.convert("L").resize(size, Image.Resampling.NEAREST)
+    return Image.composite(knit_layer, background_layer, mask)
+
+
+_cache: OrderedDict[bytes, bytes] = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_cache_hits = CACHE_LOOKUPS.labels("fabric", "hit")
+_cache_misses = CACHE_LOOKUPS.labels("fabric", "miss")
+
+
+def fabric_key(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    *,
+    knit_colour: Colour = DEFAULT_KNIT_COLOUR,
+    background_colour: Colour = DEFAULT_BACKGROUND_COLOUR,
+    cell: tuple[int, int] = DEFAULT_CELL,
+) -> bytes:
+    """Cache key of a render: a hash of the pattern content and settings."""
+    return hashlib.blake2b(
+        repr((stitches, rows, knit_colour, background_colour, cell)).encode()
+        + bytes(packed),
+        digest_size=16,
+    ).digest()
+
+
+def cached_fabric_png(key: bytes) -> bytes | None:
+    """The cached PNG for *key* (see fabric_key), or None."""
+    with _cache_lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+    (_cache_misses if png is None else _cache_hits).inc()
+    return png
+
+
+def store_fabric_png(key: bytes, png: bytes) -> None:
+    """Cache *png* under *key*, dropping the least recently used renders.
+
+    A PNG larger than the whole cache is not kept.
+    """
+    global _cache_bytes
+    if len(png) > _CACHE_BYTES:
+        return
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        _cache_bytes -= len(old) if old is not None else 0
+        _cache[key] = png
+        _cache_bytes += len(png)
+        while _cache_bytes > _CACHE_BYTES:
+            _, dropped = _cache.popitem(last=False)
+            _cache_bytes -= len(dropped)
+
+
+def fabric_png(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    *,
+    knit_colour: Colour = DEFAULT_KNIT_COLOUR,
+    background_colour: Colour = DEFAULT_BACKGROUND_COLOUR,
+    cell: tuple[int, int] = DEFAULT_CELL,
+) -> bytes:
+    """render_fabric() encoded as PNG, without the cache."""
+    img = render_fabric(
+        packed,
+        stitches,
+        rows,
+        knit_colour=knit_colour,
+        background_colour=background_colour,
+        cell=cell,
+    )
+    buf = io.BytesIO()
+    # Fast zlib level: fabric shading compresses poorly anyway, and the
+    # encode dominates render time at full size.
+    with timing.stage("png"):
+        img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def render_fabric_png(
+    packed: bytes | bytearray,
+    stitches: int,
+    rows: int,
+    *,
+    knit_colour: Colour = DEFAULT_KNIT_COLOUR,
+    background_colour: Colour = DEFAULT_BACKGROUND_COLOUR,
+    cell: tuple[int, int] = DEFAULT_CELL,
+) -> bytes:
+    """render_fabric() encoded as PNG, cached by pattern content hash."""
+    key = fabric_key(
+        packed,
+        stitches,
+        rows,
+        knit_colour=knit_colour,
+        background_colour=background_colour,
+        cell=cell,
+    )
+    png = cached_fabric_png(key)
+    if png is None:
+        png = fabric_png(
+            packed,
+            stitches,
+            rows,
+            knit_colour=knit_colour,
+            background_colour=background_colour,
+            cell=cell,
+        )
+        store_fabric_png(key, png)
+    return png
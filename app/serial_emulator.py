@@ -50,6 +50,12 @@ THREAD SAFETY
 PDDEmulator.run() is a blocking loop intended to run in a dedicated thread or
 process.  Call stop() from another thread to request a clean shutdown.
 
+METRICS
+-------
+Bytes in and out, sectors served and written, the time each FDC command
+takes, acknowledgement and idle timeouts and the duration of run() are
+recorded in app.metrics.REGISTRY (GET /metrics).
+
 INTEGRATION
 -----------
 Subclass or instantiate with a callback to receive notifications when the
@@ -67,12 +73,15 @@ from __future__ import annotations
 
 import logging
 import threading
+import time
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Callable
 
 import serial  # pyserial
 
+from app.metrics import REGISTRY
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -89,6 +98,42 @@ _STATUS_ERR = b"80000000"
 _STATUS_NOT_FOUND = b"40000000"
 
 
+# Metrics (see app.metrics), shared by every emulator in the process.
+_BYTES = REGISTRY.counter(
+    "knitting_emulator_bytes_total",
+    "Bytes the drive emulator received from (in) and sent to (out) the machine.",
+    ("direction",),
+)
+_BYTES_IN = _BYTES.labels("in")
+_BYTES_OUT = _BYTES.labels("out")
+_SECTORS = REGISTRY.counter(
+    "knitting_emulator_sectors_total",
+    "Sectors the drive emulator served to or had written by the machine.",
+    ("operation",),
+)
+_COMMAND_SECONDS = REGISTRY.histogram(
+    "knitting_emulator_command_seconds",
+    "Time to handle one FDC command, including waits for the machine.",
+    ("command",),
+)
+_ACK_TIMEOUTS = REGISTRY.counter(
+    "knitting_emulator_ack_timeouts_total",
+    "Reads for which the machine sent no acknowledgement in time.",
+)
+_IDLE_TIMEOUTS = REGISTRY.counter(
+    "knitting_emulator_idle_timeouts_total",
+    "Emulator runs ended because the machine went quiet.",
+)
+_RUN_SECONDS = REGISTRY.histogram(
+    "knitting_emulator_run_seconds",
+    "Duration of PDDEmulator.run, by how it ended.",
+    ("outcome",),
+)
+
+# FDC commands timed under their own label; anything else is "other".
+_FDC_COMMANDS = frozenset("FGARSBCWXMD")
+
+
 def _status_ok(psn: int) -> bytes:
     """Build an 8-char OK status response with the sector number embedded."""
     return f"00{psn:02X}0000".encode("ascii")
@@ -271,10 +316,17 @@ class _SerialIO:
     def __init__(self, port: serial.Serial) -> None:
         self._port = port
 
+    def read(self, n: int = 1) -> bytes:
+        """Read up to n bytes; fewer (possibly none) if the port times out."""
+        data = self._port.read(n)
+        if data:
+            _BYTES_IN.inc(len(data))
+        return data
+
     def read_byte(self) -> int:
         """Block until one byte is available; return it as an int."""
         while True:
-            b = self._port.read(1)
+            b = self.read(1)
             if b:
                 return b[0]
 
@@ -282,7 +334,7 @@ class _SerialIO:
         """Read exactly n bytes (blocking)."""
         buf = bytearray()
         while len(buf) < n:
-            chunk = self._port.read(n - len(buf))
+            chunk = self.read(n - len(buf))
             if chunk:
                 buf.extend(chunk)
         return bytes(buf)
@@ -304,11 +356,12 @@ class _SerialIO:
 
     def write(self, data: bytes) -> None:
         self._port.write(data)
+        _BYTES_OUT.inc(len(data))
 
     def write_status(self, status: bytes) -> None:
         """Write an 8-byte uppercase hex-ASCII status string."""
         assert len(status) == 8 and status == status.upper(), repr(status)
-        self._port.write(status)
+        self.write(status)
 
     def in_waiting(self) -> int:
         return self._port.in_waiting
@@ -385,6 +438,8 @@ class PDDEmulator:
         Call stop() from another thread to request a clean shutdown.
         """
         self._sectors_sent = 0
+        started = time.perf_counter()
+        outcome = "error"
         ser = serial.Serial(
             port=port,
             baudrate=baudrate,
@@ -404,24 +459,27 @@ class PDDEmulator:
         try:
             self._stop_after_sector = stop_after_sector
             while not self._stop_event.is_set():
-                b = ser.read(1)
+                b = io.read(1)
                 if not b:
                     idle_seconds += 1
                     if idle_seconds >= idle_timeout:
                         logger.info(
                             "Idle timeout (%d s) — stopping emulator", idle_timeout
                         )
+                        _IDLE_TIMEOUTS.inc()
+                        outcome = "idle_timeout"
                         break
                     continue
                 idle_seconds = 0
                 logger.debug("RX byte: 0x%02X (%r)", b[0], chr(b[0]))
                 self._dispatch(io, chr(b[0]))
+            else:
+                outcome = "stopped"
         finally:
             ser.flush()  # drain any bytes still in the OS TX buffer
-            import time
-
             time.sleep(1.5)  # give the machine ~1.5 s to finish reading the last sector
             ser.close()
+            _RUN_SECONDS.labels(outcome).observe(time.perf_counter() - started)
             logger.info("PDDEmulator stopped")
 
     def stop(self) -> None:
@@ -560,6 +618,11 @@ class PDDEmulator:
 
         logger.debug("FDC command: %r (0x%02X)", cmd, ord(cmd))
 
+        label = cmd if cmd in _FDC_COMMANDS else "other"
+        with _COMMAND_SECONDS.labels(label).time():
+            self._run_fdc_command(io, cmd)
+
+    def _run_fdc_command(self, io: _SerialIO, cmd: str) -> None:
         if cmd in ("F", "G"):
             self._cmd_format(io)
         elif cmd == "A":
@@ -639,7 +702,7 @@ class PDDEmulator:
             return
 
         io.write(_status_ok(psn))
-        ack = io._port.read(1)
+        ack = io.read(1)
         logger.debug(
             "Read ID sector %d: ack byte = %r (0x%02X)",
             psn,
@@ -651,6 +714,8 @@ class PDDEmulator:
             io.write(id_data)
             logger.debug("Read ID sector %d: sent 12 bytes", psn)
         else:
+            if not ack:
+                _ACK_TIMEOUTS.inc()
             logger.warning(
                 "Read ID sector %d: expected CR ack, got %r — not sending data",
                 psn,
@@ -669,11 +734,12 @@ class PDDEmulator:
             return
 
         io.write(_status_ok(psn))
-        ack = io._port.read(1)
+        ack = io.read(1)
         if ack and chr(ack[0]) == "\r":
             io.write(data)
             logger.debug("Read sector %d: sent 1024 bytes", psn)
             self._sectors_sent += 1
+            _SECTORS.labels("served").inc()
             if self._stop_after_sector is not None and psn >= self._stop_after_sector:
                 logger.info(
                     "Sector %d served — all sectors sent, stopping emulator", psn
@@ -681,6 +747,8 @@ class PDDEmulator:
                 self.stop()
 
         else:
+            if not ack:
+                _ACK_TIMEOUTS.inc()
             logger.warning(
                 "Read sector %d: expected CR ack, got %r — not sending data", psn, ack
             )
@@ -724,6 +792,7 @@ class PDDEmulator:
             return
 
         io.write(_status_ok(psn))
+        _SECTORS.labels("written").inc()
 
         # Fire the write callback if a pair was completed
         if self._on_write and self._disk.last_written_pair is not None:
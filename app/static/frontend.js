@@ -0,0 +1,950 @@
+/* ── Config ──────────────────────────────────────────────────────────── */
+const API = (window.KM_API_BASE || 'http://localhost:8000');
+
+/* ── State ───────────────────────────────────────────────────────────── */
+let currentFile      = null;   // image file staged for import
+let xferPollInterval = null;   // polling handle for send/receive tasks
+
+/* ── Toast ───────────────────────────────────────────────────────────── */
+function toast(msg, isErr = false, ms = 3000) {
+  const el = document.getElementById('toast');
+  el.textContent = msg;
+  el.className = 'show' + (isErr ? ' err' : '');
+  clearTimeout(el._timer);
+  el._timer = setTimeout(() => { el.className = ''; }, ms);
+}
+
+/* ── Status dot ──────────────────────────────────────────────────────── */
+function setDot(state, title = '') {
+  const d = document.getElementById('status-dot');
+  d.className = 'status-dot' + (state ? ' ' + state : '');
+  if (title) d.title = title;
+}
+
+/* ── API helper ──────────────────────────────────────────────────────── */
+async function apiFetch(path, opts = {}) {
+  const resp = await fetch(API + path, opts);
+  if (!resp.ok) {
+    let detail = resp.statusText;
+    let rawDetail = null;
+    try {
+      const j = await resp.json();
+      rawDetail = j.detail;
+      detail = (typeof j.detail === 'object') ? j.detail.message : (j.detail || detail);
+    } catch {}
+    const err = new Error(detail);
+    err.status = resp.status;
+    err.rawDetail = rawDetail;
+    throw err;
+  }
+  return resp.json();
+}
+
+/* ── Load config ─────────────────────────────────────────────────────── */
+async function loadConfig() {
+  try {
+    const cfg = await apiFetch('/config');
+    document.getElementById('cfg-port').value = cfg.serial_port;
+    document.getElementById('cfg-baud').value = cfg.baud_rate;
+    document.getElementById('port-display').textContent =
+      cfg.serial_port || 'no port';
+    setDot('ok', 'API connected');
+  } catch {
+    setDot('err', 'API unreachable');
+  }
+}
+
+/* ── Disk status + pattern list ──────────────────────────────────────── */
+async function refreshDiskStatus() {
+  const ul = document.getElementById('pattern-list');
+  ul.innerHTML = '<li class="list-empty">Loading…</li>';
+
+  let data;
+  try {
+    data = await apiFetch('/disk/status');
+  } catch {
+    ul.innerHTML = '<li class="list-empty" style="color:var(--thread)">Could not load patterns</li>';
+    updateCapacityBar(null);
+    return;
+  }
+
+  updateCapacityBar(data);
+
+  // Advance pattern number input to next available slot
+  if (data.patterns.length > 0) {
+    const maxUsed = Math.max(...data.patterns.map(p => p.number));
+    document.getElementById('pattern-num').value = Math.min(maxUsed + 1, 999);
+  } else {
+    document.getElementById('pattern-num').value = 901;
+  }
+
+  if (!data.patterns.length) {
+    ul.innerHTML = `
+      <li class="list-empty">
+        No patterns on disk
+        <div class="empty-hint">Import an image and write a pattern to get started.</div>
+      </li>`;
+    return;
+  }
+
+  ul.innerHTML = data.patterns.map(p => `
+    <li class="pattern-item" id="pat-item-${p.number}">
+      <div class="pattern-thumb" id="thumb-${p.number}">
+        <div class="thumb-spinner"></div>
+      </div>
+      <div class="pattern-info">
+        <div class="pattern-num">${p.number}</div>
+        <div class="pattern-dims">${p.stitches}\u202fst\u202f\u00d7\u202f${p.rows}\u202frows</div>
+      </div>
+      <button class="btn sm" data-edit="${p.number}" title="Edit pattern ${p.number}">✎</button>
+      <button class="btn sm danger" data-del="${p.number}" title="Delete pattern ${p.number}">✕</button>
+    </li>`).join('');
+
+  // Load thumbnails lazily (fire and forget — errors handled inside)
+  loadThumbnails(data.patterns.map(p => p.number));
+
+  // Wire delete buttons
+  ul.querySelectorAll('[data-del]').forEach(btn => {
+    btn.addEventListener('click', () => deletePattern(parseInt(btn.dataset.del, 10)));
+  });
+
+  // Wire edit buttons
+  ul.querySelectorAll('[data-edit]').forEach(btn => {
+    btn.addEventListener('click', () => openEditor(parseInt(btn.dataset.edit, 10)));
+  });
+}
+
+function updateCapacityBar(data) {
+  const fill  = document.getElementById('capacity-fill');
+  const label = document.getElementById('capacity-text');
+  if (!data) {
+    fill.style.width = '0%';
+    label.textContent = '—';
+    return;
+  }
+  const used  = data.bytes_total - data.bytes_remaining;
+  const pct   = Math.min(100, (used / data.bytes_total) * 100);
+  fill.style.width = pct.toFixed(1) + '%';
+  fill.className = 'capacity-fill'
+    + (pct > 90 ? ' danger' : pct > 70 ? ' warn' : '');
+  const usedKB  = (used  / 1024).toFixed(1);
+  const totalKB = (data.bytes_total / 1024).toFixed(1);
+  label.textContent =
+    `${usedKB}\u202f/\u202f${totalKB}\u202fKB\u2002·\u2002${data.slots_used}/${data.slots_total} patterns`;
+}
+
+async function loadThumbnails(numbers) {
+  // One request for the whole list: every pattern is in one sprite sheet,
+  // and each thumbnail is cut out of it onto its own canvas.
+  let sheet, img;
+  try {
+    sheet = await apiFetch('/disk/thumbnails');
+    img = new Image();
+    img.src = sheet.data_uri;
+    await img.decode();
+  } catch {
+    sheet = { sprites: [] };
+  }
+  const sprites = new Map(sheet.sprites.map(s => [s.number, s]));
+  for (const number of numbers) {
+    const container = document.getElementById(`thumb-${number}`);
+    if (!container) continue;
+    const s = sprites.get(number);
+    if (!s) {
+      container.innerHTML = '<span style="font-size:0.6rem;opacity:0.35;">—</span>';
+      continue;
+    }
+    const canvas = document.createElement('canvas');
+    canvas.width = s.width;
+    canvas.height = s.height;
+    canvas.setAttribute('aria-label', `Pattern ${number}`);
+    canvas.getContext('2d').drawImage(
+      img, s.x, s.y, s.width, s.height, 0, 0, s.width, s.height);
+    container.replaceChildren(canvas);
+  }
+}
+
+/* ── Delete pattern ──────────────────────────────────────────────────── */
+async function deletePattern(number) {
+  if (!confirm(`Delete pattern ${number}? This cannot be undone.`)) return;
+  try {
+    await apiFetch(`/pattern/${number}`, { method: 'DELETE' });
+    toast(`Pattern ${number} deleted`);
+    refreshDiskStatus();
+  } catch (e) {
+    toast(`Delete failed: ${e.message}`, true, 4000);
+  }
+}
+
+/* ── File selection (image import) ──────────────────────────────────── */
+function onFileSelected(file) {
+  if (!file) return;
+  currentFile = file;
+  document.getElementById('btn-write').disabled   = false;
+  document.getElementById('btn-preview').disabled = false;
+  requestPreview();
+}
+
+document.getElementById('file-input').addEventListener('change', e => {
+  onFileSelected(e.target.files[0] || null);
+});
+
+const dropZone = document.getElementById('drop-zone');
+dropZone.addEventListener('dragover', e => {
+  e.preventDefault();
+  dropZone.classList.add('drag-over');
+});
+dropZone.addEventListener('dragleave', () => dropZone.classList.remove('drag-over'));
+dropZone.addEventListener('drop', e => {
+  e.preventDefault();
+  dropZone.classList.remove('drag-over');
+  const file = e.dataTransfer.files[0];
+  if (file) onFileSelected(file);
+});
+
+/* ── Threshold slider ────────────────────────────────────────────────── */
+const slider = document.getElementById('threshold');
+slider.addEventListener('input', () => {
+  document.getElementById('thresh-val').textContent = slider.value;
+});
+slider.addEventListener('change', () => { if (currentFile) requestPreview(); });
+
+/* ── Stitch aspect ratio slider ──────────────────────────────────────── */
+const aspectSlider = document.getElementById('stitch-aspect');
+aspectSlider.addEventListener('input', () => {
+  document.getElementById('aspect-val').textContent =
+    parseFloat(aspectSlider.value).toFixed(2);
+});
+aspectSlider.addEventListener('change', () => { if (currentFile) requestPreview(); });
+
+/* ── Image processing controls (flip, rotate, invert, dither, crop) ──── */
+['rotation', 'dither'].forEach(id => {
+  document.getElementById(id).addEventListener('change', () => {
+    if (currentFile) requestPreview();
+  });
+});
+['flip-horizontal', 'invert'].forEach(id => {
+  document.getElementById(id).addEventListener('change', () => {
+    if (currentFile) requestPreview();
+  });
+});
+['crop-left', 'crop-upper', 'crop-right', 'crop-lower'].forEach(id => {
+  document.getElementById(id).addEventListener('change', () => {
+    if (currentFile) requestPreview();
+  });
+});
+document.getElementById('target-stitches').addEventListener('change', () => {
+  if (currentFile) requestPreview();
+});
+
+/* ── Preview ─────────────────────────────────────────────────────────── */
+async function requestPreview() {
+  if (!currentFile) return;
+  const wrap = document.getElementById('preview-wrap');
+  wrap.innerHTML = '<span class="preview-empty"><span class="spinner"></span></span>';
+
+  const fd = new FormData();
+  fd.append('file', currentFile);
+  fd.append('threshold', slider.value);
+  fd.append('stitch_aspect_ratio', aspectSlider.value);
+  fd.append('flip_horizontal', document.getElementById('flip-horizontal').checked);
+  fd.append('rotation', document.getElementById('rotation').value);
+  fd.append('invert', document.getElementById('invert').checked);
+  fd.append('dither', document.getElementById('dither').value);
+  fd.append('crop_left',  document.getElementById('crop-left').value  || 0);
+  fd.append('crop_upper', document.getElementById('crop-upper').value || 0);
+  fd.append('crop_right', document.getElementById('crop-right').value || 0);
+  fd.append('crop_lower', document.getElementById('crop-lower').value || 0);
+  const targetStitches = document.getElementById('target-stitches').value;
+  if (targetStitches) fd.append('target_stitches', targetStitches);
+
+  try {
+    const data = await apiFetch('/preview', { method: 'POST', body: fd });
+    wrap.innerHTML = `<img src="${data.data_uri}" alt="pattern preview" />`;
+    document.getElementById('preview-meta').textContent =
+      `${data.width}\u202fstitches\u202f\u00d7\u202f${data.height}\u202frows`;
+  } catch (e) {
+    wrap.innerHTML =
+      `<span class="preview-empty" style="color:var(--thread)">${e.message}</span>`;
+    document.getElementById('preview-meta').textContent = '';
+  }
+}
+
+document.getElementById('btn-preview').addEventListener('click', requestPreview);
+
+/* ── Write pattern ───────────────────────────────────────────────────── */
+document.getElementById('btn-write').addEventListener('click', async () => {
+  if (!currentFile) return;
+  const btn = document.getElementById('btn-write');
+  btn.disabled = true;
+  btn.innerHTML = '<span class="spinner"></span>\u202fWriting\u2026';
+
+  const fd = new FormData();
+  fd.append('file', currentFile);
+  fd.append('number', document.getElementById('pattern-num').value);
+  fd.append('threshold', slider.value);
+  fd.append('stitch_aspect_ratio', aspectSlider.value);
+  fd.append('flip_horizontal', document.getElementById('flip-horizontal').checked);
+  fd.append('rotation', document.getElementById('rotation').value);
+  fd.append('invert', document.getElementById('invert').checked);
+  fd.append('dither', document.getElementById('dither').value);
+  fd.append('crop_left',  document.getElementById('crop-left').value  || 0);
+  fd.append('crop_upper', document.getElementById('crop-upper').value || 0);
+  fd.append('crop_right', document.getElementById('crop-right').value || 0);
+  fd.append('crop_lower', document.getElementById('crop-lower').value || 0);
+  const targetStitchesW = document.getElementById('target-stitches').value;
+  if (targetStitchesW) fd.append('target_stitches', targetStitchesW);
+
+  try {
+    const data = await apiFetch('/pattern', { method: 'POST', body: fd });
+    toast(`Pattern ${data.number} written — ${data.width}\u202f\u00d7\u202f${data.height}`);
+    refreshDiskStatus();
+  } catch (e) {
+    toast(`Write failed: ${e.message}`, true, 5000);
+  } finally {
+    btn.disabled = false;
+    btn.textContent = 'Write Pattern';
+  }
+});
+
+/* ── Download disk ───────────────────────────────────────────────────── */
+document.getElementById('btn-download-disk').addEventListener('click', () => {
+  window.location.href = API + '/disk/download';
+});
+
+/* ── Upload disk ─────────────────────────────────────────────────────── */
+document.getElementById('disk-file-input').addEventListener('change', async e => {
+  const file = e.target.files[0];
+  e.target.value = ''; // reset so re-selecting same file triggers change event
+  if (!file) return;
+
+  async function doUpload(force) {
+    const fd = new FormData();
+    fd.append('file', file);
+    if (force) fd.append('force', 'true');
+    return apiFetch('/disk/upload', { method: 'POST', body: fd });
+  }
+
+  try {
+    const data = await doUpload(false);
+    toast(`Loaded ${data.patterns_restored} pattern(s) from file`);
+    refreshDiskStatus();
+  } catch (e) {
+    if (e.status === 409 && e.rawDetail && e.rawDetail.pattern_count != null) {
+      const count = e.rawDetail.pattern_count;
+      const ok = confirm(
+        `The current disk has ${count} pattern(s) that will be overwritten.\n\nLoad the file anyway?`
+      );
+      if (!ok) return;
+      try {
+        const data = await doUpload(true);
+        toast(`Loaded ${data.patterns_restored} pattern(s) from file`);
+        refreshDiskStatus();
+      } catch (e2) {
+        toast(`Load failed: ${e2.message}`, true, 5000);
+      }
+    } else {
+      toast(`Load failed: ${e.message}`, true, 5000);
+    }
+  }
+});
+
+/* ── Reset disk ──────────────────────────────────────────────────────── */
+document.getElementById('btn-reset-disk').addEventListener('click', async () => {
+  if (!confirm('Wipe the in-memory disk image? This cannot be undone.')) return;
+  try {
+    await apiFetch('/disk', { method: 'DELETE' });
+    toast('Disk reset to blank');
+    refreshDiskStatus();
+  } catch (e) {
+    toast(`Reset failed: ${e.message}`, true, 4000);
+  }
+});
+
+/* ── Machine transfer (send + receive) ───────────────────────────────── */
+function setSendReceiveBtns(disabled) {
+  document.getElementById('btn-send').disabled    = disabled;
+  document.getElementById('btn-receive').disabled = disabled;
+}
+
+function startXferPoll(taskId, runningMsg, doneMsg, refreshAfter) {
+  const stat = document.getElementById('xfer-status');
+  if (xferPollInterval) clearInterval(xferPollInterval);
+
+  xferPollInterval = setInterval(async () => {
+    try {
+      const t = await apiFetch(`/send/${taskId}`);
+      stat.className    = 'xfer-status ' + t.status;
+      stat.style.display = 'block';
+
+      if (t.status === 'running') {
+        stat.innerHTML = `<span class="spinner"></span>\u202f${runningMsg}`;
+      } else if (t.status === 'done') {
+        stat.textContent = `\u2713 ${doneMsg}`;
+        setDot('ok', 'Transfer complete');
+        clearInterval(xferPollInterval);
+        setSendReceiveBtns(false);
+        if (refreshAfter) refreshDiskStatus();
+      } else if (t.status === 'timed_out') {
+        stat.textContent = '\u2717 Timed out — machine did not respond';
+        setDot('err', 'Transfer timed out');
+        clearInterval(xferPollInterval);
+        setSendReceiveBtns(false);
+      } else if (t.status === 'error') {
+        stat.textContent = `\u2717 Error: ${t.error}`;
+        setDot('err', 'Transfer error');
+        clearInterval(xferPollInterval);
+        setSendReceiveBtns(false);
+      }
+    } catch { /* swallow polling errors; they usually self-resolve */ }
+  }, 1200);
+}
+
+document.getElementById('btn-send').addEventListener('click', async () => {
+  const stat = document.getElementById('xfer-status');
+  setSendReceiveBtns(true);
+  stat.style.display = 'block';
+  stat.className     = 'xfer-status pending';
+  stat.textContent   = 'Starting emulator\u2026';
+  setDot('busy', 'Sending to machine\u2026');
+
+  try {
+    const data = await apiFetch('/send', { method: 'POST' });
+    startXferPoll(
+      data.task_id,
+      'Emulator running \u2014 initiate disk-read on KH-940\u2026',
+      'Transfer complete',
+      false,
+    );
+  } catch (e) {
+    stat.className   = 'xfer-status error';
+    stat.textContent = `Failed to start: ${e.message}`;
+    setDot('err', e.message);
+    setSendReceiveBtns(false);
+  }
+});
+
+document.getElementById('btn-receive').addEventListener('click', async () => {
+  const stat = document.getElementById('xfer-status');
+  setSendReceiveBtns(true);
+  stat.style.display = 'block';
+  stat.className     = 'xfer-status pending';
+  stat.textContent   = 'Starting emulator\u2026';
+  setDot('busy', 'Receiving from machine\u2026');
+
+  try {
+    const data = await apiFetch('/receive', { method: 'POST' });
+    startXferPoll(
+      data.task_id,
+      'Emulator running \u2014 initiate disk-save on KH-940\u2026',
+      'Received \u2014 pattern list updated',
+      true,  // refresh disk status after receive
+    );
+  } catch (e) {
+    stat.className   = 'xfer-status error';
+    stat.textContent = `Failed to start: ${e.message}`;
+    setDot('err', e.message);
+    setSendReceiveBtns(false);
+  }
+});
+
+/* ── Config ──────────────────────────────────────────────────────────── */
+document.getElementById('btn-save-cfg').addEventListener('click', async () => {
+  const body = JSON.stringify({
+    serial_port: document.getElementById('cfg-port').value,
+    baud_rate:   parseInt(document.getElementById('cfg-baud').value, 10),
+  });
+  try {
+    const cfg = await apiFetch('/config', {
+      method: 'PUT',
+      headers: { 'Content-Type': 'application/json' },
+      body,
+    });
+    document.getElementById('port-display').textContent = cfg.serial_port || 'no port';
+    setDot('ok', 'Config saved');
+    toast('Config saved');
+  } catch (e) {
+    toast(`Save failed: ${e.message}`, true, 4000);
+  }
+});
+
+document.getElementById('btn-detect-port').addEventListener('click', async () => {
+  try {
+    const data = await apiFetch('/ports');
+    if (data.ftdi_candidates.length === 1) {
+      document.getElementById('cfg-port').value = data.ftdi_candidates[0];
+      toast(`Auto-detected: ${data.ftdi_candidates[0]}`);
+    } else if (data.ftdi_candidates.length === 0) {
+      toast('No FTDI port found — is the cable plugged in?', true, 4000);
+    } else {
+      toast(
+        `Multiple FTDI ports: ${data.ftdi_candidates.join(', ')} — select one manually`,
+        true, 5000,
+      );
+    }
+  } catch (e) {
+    toast(`Detection failed: ${e.message}`, true, 4000);
+  }
+});
+
+document.getElementById('btn-refresh-list').addEventListener('click', refreshDiskStatus);
+
+/* ── Stage 2 pixel editor ────────────────────────────────────────────── */
+
+// Editor state
+const editorState = {
+  number:   null,   // pattern number being edited
+  pixels:   null,   // list[list[int]] — current in-editor pixel grid
+  memo:     null,   // list[int] — current in-editor memo values
+  width:    0,
+  height:   0,
+  dirty:    false,
+  cellSize: 8,      // px per stitch on canvas
+  etag:     null,   // ETag of the stored pattern the edits apply to
+  cells:    new Map(),  // "x,y" → value, changed since the last save
+  memoRows: new Map(),  // row → memo value, changed since the last save
+  saving:   null,   // Promise of the PATCH in flight, if any
+};
+
+// Edits are sent as PATCH /pattern/{n} every few seconds while editing.
+const AUTOSAVE_MS = 3000;
+
+const CELL_MIN = 4;
+const CELL_MAX = 16;
+const GRID_COLOUR   = '#cccccc';
+const KNIT_COLOUR   = '#000000';
+const SKIP_COLOUR   = '#ffffff';
+const GUTTER_W      = 28;   // px width of the memo gutter drawn on the canvas
+const GUTTER_BG     = '#f0f4f0';
+const GUTTER_BORDER = '#cccccc';
+const GUTTER_TEXT   = '#444444';
+const GUTTER_NONZERO_BG = '#dff0e4';  // tint rows whose memo != 0
+
+function editorCellSize(width, height) {
+  // Pick the largest cell size that keeps the stitch grid under ~1200px wide
+  // and ~600px tall, subject to CELL_MIN / CELL_MAX clamps.
+  // The gutter adds GUTTER_W px to the right; exclude it from the width budget.
+  const maxW = Math.floor((1200 - GUTTER_W) / Math.max(width, 1));
+  const maxH = Math.floor(600 / Math.max(height, 1));
+  return Math.max(CELL_MIN, Math.min(CELL_MAX, maxW, maxH));
+}
+
+function editorRender() {
+  const { pixels, memo, width, height, cellSize } = editorState;
+  const canvas = document.getElementById('editor-canvas');
+  const gridW = width * cellSize;
+  const gridH = height * cellSize;
+  canvas.width  = gridW + GUTTER_W;
+  canvas.height = gridH;
+
+  const ctx = canvas.getContext('2d');
+
+  // --- Stitch grid ---
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      ctx.fillStyle = pixels[y][x] === 1 ? KNIT_COLOUR : SKIP_COLOUR;
+      ctx.fillRect(x * cellSize, y * cellSize, cellSize, cellSize);
+    }
+  }
+
+  // Grid lines (skip when cells are very small — too dense to be useful)
+  if (cellSize >= 6) {
+    ctx.strokeStyle = GRID_COLOUR;
+    ctx.lineWidth = 0.5;
+    for (let x = 0; x <= width; x++) {
+      ctx.beginPath();
+      ctx.moveTo(x * cellSize, 0);
+      ctx.lineTo(x * cellSize, gridH);
+      ctx.stroke();
+    }
+    for (let y = 0; y <= height; y++) {
+      ctx.beginPath();
+      ctx.moveTo(0, y * cellSize);
+      ctx.lineTo(gridW, y * cellSize);
+      ctx.stroke();
+    }
+  }
+
+  // --- Memo gutter ---
+  // Background strip
+  ctx.fillStyle = GUTTER_BG;
+  ctx.fillRect(gridW, 0, GUTTER_W, gridH);
+
+  // Vertical separator
+  ctx.strokeStyle = GUTTER_BORDER;
+  ctx.lineWidth = 1;
+  ctx.beginPath();
+  ctx.moveTo(gridW + 0.5, 0);
+  ctx.lineTo(gridW + 0.5, gridH);
+  ctx.stroke();
+
+  // Per-row values + horizontal dividers
+  const fontSize = Math.max(8, Math.min(11, cellSize - 1));
+  ctx.font = `${fontSize}px var(--font-mono, monospace)`;
+  ctx.textAlign = 'center';
+  ctx.textBaseline = 'middle';
+
+  for (let y = 0; y < height; y++) {
+    const rowY = y * cellSize;
+    const memoVal = memo ? memo[y] : 0;
+
+    // Tint non-zero rows
+    if (memoVal !== 0) {
+      ctx.fillStyle = GUTTER_NONZERO_BG;
+      ctx.fillRect(gridW + 1, rowY, GUTTER_W - 1, cellSize);
+    }
+
+    // Row divider
+    if (y > 0 && cellSize >= 4) {
+      ctx.strokeStyle = GUTTER_BORDER;
+      ctx.lineWidth = 0.5;
+      ctx.beginPath();
+      ctx.moveTo(gridW, rowY);
+      ctx.lineTo(gridW + GUTTER_W, rowY);
+      ctx.stroke();
+    }
+
+    // Text — only draw when cells are tall enough to be legible
+    if (cellSize >= 8) {
+      ctx.fillStyle = GUTTER_TEXT;
+      ctx.fillText(String(memoVal), gridW + GUTTER_W / 2, rowY + cellSize / 2);
+    }
+  }
+}
+
+// --- Gutter click: show the floating input over the clicked row ---
+let _gutterActiveRow = -1;
+
+function _gutterInputCommit() {
+  const inp = document.getElementById('memo-gutter-input');
+  if (_gutterActiveRow < 0) return;
+  const v = Math.max(0, Math.min(15, parseInt(inp.value, 10) || 0));
+  inp.value = v;
+  editorState.memo[_gutterActiveRow] = v;
+  editorState.memoRows.set(_gutterActiveRow, v);
+  editorState.dirty = true;
+  editorSetStatus(`Row ${_gutterActiveRow} memo → ${v}`);
+  editorRender();
+  // keep input open (user may want to Tab to next row or click elsewhere)
+}
+
+function _gutterShowInput(row) {
+  const { cellSize, height, width } = editorState;
+  const inp = document.getElementById('memo-gutter-input');
+
+  if (row < 0 || row >= height) { inp.style.display = 'none'; _gutterActiveRow = -1; return; }
+
+  _gutterActiveRow = row;
+
+  // The input is position:absolute inside #editor-canvas-area.
+  // The canvas starts at (0,0) within the area; the gutter starts at gridW.
+  const gridW  = width * cellSize;
+  const inputH = 22;
+  const rowMid = row * cellSize + cellSize / 2;
+  const top    = Math.max(0, Math.min(rowMid - inputH / 2, height * cellSize - inputH));
+
+  inp.style.left  = (gridW + 1) + 'px';
+  inp.style.top   = top + 'px';
+  inp.style.display = 'block';
+  inp.value = editorState.memo[row];
+  // Defer focus so the browser has processed the display change
+  requestAnimationFrame(() => { inp.focus(); inp.select(); });
+}
+
+function editorSetupGutterInput() {
+  const inp = document.getElementById('memo-gutter-input');
+  inp.addEventListener('change', _gutterInputCommit);
+  inp.addEventListener('blur', () => {
+    _gutterInputCommit();
+    inp.style.display = 'none';
+    _gutterActiveRow = -1;
+  });
+  inp.addEventListener('keydown', e => {
+    if (e.key === 'Enter') { _gutterInputCommit(); inp.blur(); }
+    if (e.key === 'Escape') { inp.style.display = 'none'; _gutterActiveRow = -1; }
+    if (e.key === 'Tab') {
+      e.preventDefault();
+      _gutterInputCommit();
+      const next = _gutterActiveRow + (e.shiftKey ? -1 : 1);
+      _gutterShowInput(next);
+    }
+    if (e.key === 'ArrowDown') { e.preventDefault(); _gutterInputCommit(); _gutterShowInput(_gutterActiveRow + 1); }
+    if (e.key === 'ArrowUp')   { e.preventDefault(); _gutterInputCommit(); _gutterShowInput(_gutterActiveRow - 1); }
+  });
+}
+
+// editorBuildMemoCol is no longer needed — memo is drawn on the canvas gutter.
+// Kept as a no-op so any remaining call sites don't throw.
+function editorBuildMemoCol() {}
+
+function editorSetStatus(msg) {
+  document.getElementById('editor-status').textContent = msg;
+}
+
+function editorCanvasClick(e) {
+  const canvas = document.getElementById('editor-canvas');
+  const rect   = canvas.getBoundingClientRect();
+  const scaleX = canvas.width  / rect.width;
+  const scaleY = canvas.height / rect.height;
+  const cx = (e.clientX - rect.left)  * scaleX;
+  const cy = (e.clientY - rect.top)   * scaleY;
+
+  // Ignore clicks in the gutter — handled by pointerdown.
+  if (cx >= editorState.width * editorState.cellSize) return;
+
+  const x = Math.floor(cx / editorState.cellSize);
+  const y = Math.floor(cy / editorState.cellSize);
+
+  if (x < 0 || x >= editorState.width || y < 0 || y >= editorState.height) return;
+
+  editorState.pixels[y][x] ^= 1;
+  editorMarkCell(x, y);
+  editorRender();
+  editorSetStatus(`Toggled stitch (${x}, ${y}) → ${editorState.pixels[y][x] === 1 ? 'knit' : 'skip'}`);
+}
+
+// Paint-drag support: track pointer down, draw on mousemove while held.
+let _editorPainting = false;
+let _editorPaintValue = null;
+
+function editorPointerDown(e) {
+  const canvas = document.getElementById('editor-canvas');
+  const rect   = canvas.getBoundingClientRect();
+  const scaleX = canvas.width  / rect.width;
+  const scaleY = canvas.height / rect.height;
+  const cx = (e.clientX - rect.left)  * scaleX;
+  const cy = (e.clientY - rect.top)   * scaleY;
+
+  // If click lands in the gutter strip, open the memo input for that row.
+  const gridW = editorState.width * editorState.cellSize;
+  if (cx >= gridW) {
+    const row = Math.floor(cy / editorState.cellSize);
+    _gutterShowInput(row);
+    e.stopPropagation();
+    return;
+  }
+
+  const x = Math.floor(cx / editorState.cellSize);
+  const y = Math.floor(cy / editorState.cellSize);
+  if (x < 0 || x >= editorState.width || y < 0 || y >= editorState.height) return;
+
+  // On initial click, decide whether we're painting knit (1) or skip (0)
+  // by toggling the clicked cell and using its new value as the paint value.
+  editorState.pixels[y][x] ^= 1;
+  _editorPaintValue = editorState.pixels[y][x];
+  _editorPainting = true;
+  editorMarkCell(x, y);
+  editorRender();
+  editorSetStatus(`Painting — stitch (${x}, ${y}) → ${_editorPaintValue === 1 ? 'knit' : 'skip'}`);
+}
+
+function editorPointerMove(e) {
+  if (!_editorPainting) return;
+  const canvas = document.getElementById('editor-canvas');
+  const rect   = canvas.getBoundingClientRect();
+  const scaleX = canvas.width  / rect.width;
+  const scaleY = canvas.height / rect.height;
+  const cx = (e.clientX - rect.left)  * scaleX;
+  const cy = (e.clientY - rect.top)   * scaleY;
+  const x = Math.floor(cx / editorState.cellSize);
+  const y = Math.floor(cy / editorState.cellSize);
+  if (x < 0 || x >= editorState.width || y < 0 || y >= editorState.height) return;
+  if (editorState.pixels[y][x] === _editorPaintValue) return;  // already correct
+  editorState.pixels[y][x] = _editorPaintValue;
+  editorMarkCell(x, y);
+  editorRender();
+}
+
+function editorPointerUp() {
+  _editorPainting = false;
+}
+
+function editorMarkCell(x, y) {
+  editorState.cells.set(`${x},${y}`, editorState.pixels[y][x]);
+  editorState.dirty = true;
+}
+
+/* Send the edits made since the last save as one PATCH.  The stored
+   pattern is only changed if it still has the ETag the editor loaded (or
+   last saved), so edits made elsewhere are never silently overwritten. */
+async function editorFlush() {
+  if (editorState.saving) await editorState.saving.catch(() => {});
+  const { number, cells, memoRows } = editorState;
+  if (number === null || (!cells.size && !memoRows.size)) return;
+
+  const body = {
+    cells: [...cells].map(([k, value]) => {
+      const [x, y] = k.split(',').map(Number);
+      return { x, y, value };
+    }),
+    memo: [...memoRows].map(([row, value]) => ({ row, value })),
+  };
+  editorState.cells = new Map();
+  editorState.memoRows = new Map();
+  editorState.saving = (async () => {
+    try {
+      const data = await apiFetch(`/pattern/${number}`, {
+        method: 'PATCH',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(editorState.etag ? { 'If-Match': editorState.etag } : {}),
+        },
+        body: JSON.stringify(body),
+      });
+      editorState.etag = data.etag;
+    } catch (e) {
+      // Put the unsent edits back, behind any made while the request ran.
+      body.cells.forEach(({ x, y, value }) => {
+        const k = `${x},${y}`;
+        if (!editorState.cells.has(k)) editorState.cells.set(k, value);
+      });
+      body.memo.forEach(({ row, value }) => {
+        if (!editorState.memoRows.has(row)) editorState.memoRows.set(row, value);
+      });
+      throw e;
+    } finally {
+      editorState.saving = null;
+      editorState.dirty = editorState.cells.size > 0 || editorState.memoRows.size > 0;
+    }
+  })();
+  return editorState.saving;
+}
+
+let _editorAutosaveTimer = null;
+
+async function editorAutosave() {
+  try {
+    await editorFlush();
+  } catch (e) {
+    if (e.status === 412) {
+      clearInterval(_editorAutosaveTimer);
+      editorSetStatus('Pattern changed elsewhere — autosave stopped; reopen it to keep editing');
+    } else {
+      editorSetStatus(`Autosave failed: ${e.message}`);
+    }
+  }
+}
+
+/* Packed pixel wire format: each row is ceil(width / 8) bytes, the leftmost
+   stitch in the lowest bit of the first byte, 1 = knit (see app/util.py). */
+function unpackPixels(b64, width, height) {
+  const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+  const rowBytes = (width + 7) >> 3;
+  const pixels = [];
+  for (let y = 0; y < height; y++) {
+    const row = new Array(width);
+    for (let x = 0; x < width; x++) {
+      row[x] = (bytes[y * rowBytes + (x >> 3)] >> (x & 7)) & 1;
+    }
+    pixels.push(row);
+  }
+  return pixels;
+}
+
+async function openEditor(number) {
+  editorSetStatus('Loading…');
+
+  let data, etag;
+  try {
+    const resp = await fetch(API + `/pattern/${number}/pixels?format=packed`);
+    if (!resp.ok) throw new Error(resp.statusText);
+    etag = resp.headers.get('ETag');
+    data = await resp.json();
+  } catch (e) {
+    toast(`Could not load pattern ${number}: ${e.message}`, true, 4000);
+    return;
+  }
+
+  editorState.number  = number;
+  editorState.pixels  = unpackPixels(data.packed, data.width, data.height);
+  editorState.memo    = data.memo.slice();
+  editorState.width   = data.width;
+  editorState.height  = data.height;
+  editorState.dirty   = false;
+  editorState.etag    = etag;
+  editorState.cells   = new Map();
+  editorState.memoRows = new Map();
+  editorState.cellSize = editorCellSize(data.width, data.height);
+  clearInterval(_editorAutosaveTimer);
+  _editorAutosaveTimer = setInterval(editorAutosave, AUTOSAVE_MS);
+
+  document.getElementById('editor-pattern-num').textContent = number;
+
+  // Show editor, hide import panel
+  document.querySelector('#editor-panel').classList.add('active');
+  document.querySelector('.panel:first-child').style.display = 'none';
+
+  editorRender();
+  editorBuildMemoCol();
+  editorSetStatus(`${data.width}\u202fstitches \u00d7 ${data.height}\u202frows — click/drag to toggle stitches; click the right-hand gutter to edit memo values`);
+
+  // Wire canvas interaction (remove any previous listeners by replacing the element)
+  const oldCanvas = document.getElementById('editor-canvas');
+  const newCanvas = oldCanvas.cloneNode(false);
+  oldCanvas.parentNode.replaceChild(newCanvas, oldCanvas);
+  // Re-render onto the new canvas element
+  editorRender();
+  newCanvas.addEventListener('pointerdown', editorPointerDown);
+  newCanvas.addEventListener('pointermove', editorPointerMove);
+  newCanvas.addEventListener('pointerup',   editorPointerUp);
+  newCanvas.addEventListener('pointerleave', editorPointerUp);
+}
+
+function closeEditor() {
+  // Hide the floating gutter input if it's open.
+  const gutterInp = document.getElementById('memo-gutter-input');
+  if (gutterInp) { gutterInp.style.display = 'none'; }
+  _gutterActiveRow = -1;
+  clearInterval(_editorAutosaveTimer);
+
+  document.querySelector('#editor-panel').classList.remove('active');
+  document.querySelector('.panel:first-child').style.display = '';
+  editorState.number = null;
+  editorState.pixels = null;
+  editorState.memo   = null;
+  editorState.dirty  = false;
+  editorState.etag   = null;
+  editorState.cells  = new Map();
+  editorState.memoRows = new Map();
+}
+
+document.getElementById('btn-editor-back').addEventListener('click', () => {
+  if (editorState.dirty) {
+    if (!confirm('Changes from the last few seconds are not saved yet. Discard them and go back?')) return;
+  }
+  closeEditor();
+});
+
+document.getElementById('btn-editor-cancel').addEventListener('click', () => {
+  if (editorState.dirty) {
+    if (!confirm('Discard the changes not yet autosaved?')) return;
+  }
+  closeEditor();
+});
+
+document.getElementById('btn-editor-save').addEventListener('click', async () => {
+  const { number, width, height } = editorState;
+  if (number === null) return;
+
+  const btn = document.getElementById('btn-editor-save');
+  btn.disabled = true;
+  btn.innerHTML = '<span class="spinner"></span>\u202fSaving\u2026';
+
+  try {
+    await editorFlush();
+    toast(`Pattern ${number} saved — ${width}\u202f\u00d7\u202f${height}`);
+    refreshDiskStatus();
+    closeEditor();
+  } catch (e) {
+    toast(`Save failed: ${e.message}`, true, 5000);
+    editorSetStatus(`Save failed: ${e.message}`);
+  } finally {
+    btn.disabled = false;
+    btn.textContent = 'Save Changes';
+  }
+});
+
+/* ── Init ────────────────────────────────────────────────────────────── */
+editorSetupGutterInput();
+loadConfig();
+refreshDiskStatus();
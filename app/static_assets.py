@@ -0,0 +1,236 @@
+"""
+app/static_assets.py — The frontend's static files, precompressed and cacheable.
+
+StaticAssets serves the files in a directory (app/static) as an ASGI app
+mounted at /static.  The files are read once, when the server starts,
+and prepared for a slow network:
+
+- Each file is compressed once, at the highest level, with gzip and, if
+  the optional brotli package is installed, brotli.  Clients get the
+  smallest variant their Accept-Encoding allows.
+- Each file is also served under a content-hashed name, e.g.
+  frontend.css as frontend.3f2a9c1b7d0e.css.  Those URLs never change
+  content, so they are sent with Cache-Control: immutable and a max-age
+  of a year.  HTML files have their src and href references to other
+  files in the directory rewritten to the hashed names, so a page's
+  stylesheets and scripts are never fetched twice.
+- The plain names are sent with Cache-Control: no-cache and a strong
+  ETag, so revalidating an unchanged page costs one 304 response.
+
+Only files directly in the directory are served.  Changes to them are
+picked up by reload() or a restart.
+
+Public API
+----------
+StaticAssets(directory)                    (ASGI app; load, reload, asset)
+Asset                                      (one prepared file)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Hex digits of the content hash in hashed names.
+_HASH_LENGTH = 12
+
+_IMMUTABLE = "public, max-age=31536000, immutable"
+_REVALIDATE = "no-cache"
+
+# Content codings by preference, with their compressors.
+_ENCODERS: dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+}
+if brotli is not None:
+    _ENCODERS = {"br": lambda data: brotli.compress(data, quality=11), **_ENCODERS}
+
+# src="name" / href='name' attributes naming a file in the same directory.
+_REFERENCE = re.compile(rb"""((?:src|href)\s*=\s*["'])([^"'/?#:]+)(?=["'])""")
+
+
+@dataclass(frozen=True)
+class Asset:
+    """One static file, with its hashed name and encoded variants."""
+
+    name: str
+    hashed_name: str
+    content_type: str
+    digest: str  # of the identity body
+    bodies: dict[str, bytes]  # content coding ("identity", "gzip", "br") → body
+
+    def etag(self, coding: str) -> str:
+        """Strong ETag of the *coding* representation."""
+        if coding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{coding}"'
+
+
+class StaticAssets:
+    """ASGI app serving the prepared files of *directory* (GET and HEAD)."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._assets: dict[str, Asset] | None = None
+
+    def load(self) -> dict[str, Asset]:
+        """Read and prepare the files, if not done yet; plain and hashed names."""
+        with self._lock:
+            if self._assets is None:
+                self._assets = _prepare(self.directory)
+            return self._assets
+
+    def reload(self) -> None:
+        """Forget the prepared files; the next request reads them again."""
+        with self._lock:
+            self._assets = None
+
+    def asset(self, name: str) -> Asset | None:
+        """The file served as *name* (plain or hashed), or None."""
+        return self.load().get(name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assets = self._assets
+        if assets is None:
+            # Compressing every file takes a while; keep the loop free.
+            assets = await asyncio.to_thread(self.load)
+        response = self._respond(scope, assets)
+        await response(scope, receive, send)
+
+    def _respond(self, scope: Scope, assets: dict[str, Asset]) -> Response:
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            return Response(
+                "Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"}
+            )
+        name = _route_path(scope).lstrip("/")
+        asset = assets.get(name)
+        if asset is None:
+            return Response("Not Found", status_code=404)
+
+        headers = Headers(scope=scope)
+        coding = _negotiate(headers.get("accept-encoding", ""), asset.bodies)
+        body = asset.bodies[coding]
+        etag = asset.etag(coding)
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": _IMMUTABLE if name == asset.hashed_name else _REVALIDATE,
+        }
+        if len(asset.bodies) > 1:
+            response_headers["Vary"] = "Accept-Encoding"
+
+        tags = headers.get("if-none-match")
+        if tags is not None and _matches(tags, etag):
+            return Response(status_code=304, headers=response_headers)
+
+        if coding != "identity":
+            response_headers["Content-Encoding"] = coding
+        response_headers["Content-Length"] = str(len(body))
+        return Response(
+            b"" if method == "HEAD" else body,
+            headers=response_headers,
+            media_type=asset.content_type,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Internals
+# ---------------------------------------------------------------------------
+
+
+def _route_path(scope: Scope) -> str:
+    """The request path below the mount point."""
+    path: str = scope["path"]
+    root: str = scope.get("root_path", "")
+    if root and path.startswith(root):
+        return path[len(root) :]
+    return path
+
+
+def _prepare(directory: Path) -> dict[str, Asset]:
+    files = {p.name: p.read_bytes() for p in directory.iterdir() if p.is_file()}
+    hashed: dict[str, str] = {}
+    assets: dict[str, Asset] = {}
+    # HTML last: its references are rewritten to the other files' hashed names.
+    for name in sorted(files, key=lambda n: (_is_html(n), n)):
+        data = files[name]
+        if _is_html(name):
+            data = _rewrite_references(data, hashed)
+        digest = hashlib.sha256(data).hexdigest()[:_HASH_LENGTH]
+        stem, dot, suffix = name.rpartition(".")
+        hashed[name] = f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+        asset = Asset(name, hashed[name], _content_type(name), digest, _encode(data))
+        assets[name] = assets[asset.hashed_name] = asset
+    return assets
+
+
+def _is_html(name: str) -> bool:
+    return name.endswith((".html", ".htm"))
+
+
+def _rewrite_references(html: bytes, hashed: dict[str, str]) -> bytes:
+    def sub(m: re.Match[bytes]) -> bytes:
+        target = hashed.get(m.group(2).decode("utf-8", "replace"))
+        return m.group(1) + target.encode() if target else m.group(0)
+
+    return _REFERENCE.sub(sub, html)
+
+
+def _content_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type.endswith(
+        ("javascript", "json", "svg+xml")
+    ):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _encode(data: bytes) -> dict[str, bytes]:
+    """Identity body plus every compressed variant that is smaller."""
+    bodies = {"identity": data}
+    for coding, compress in _ENCODERS.items():
+        encoded = compress(data)
+        if len(encoded) < len(data):
+            bodies[coding] = encoded
+    return bodies
+
+
+def _negotiate(accept_encoding: str, bodies: dict[str, bytes]) -> str:
+    """The preferred coding in *bodies* that *accept_encoding* allows."""
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    for coding in _ENCODERS:
+        if coding in bodies and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
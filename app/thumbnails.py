@@ -0,0 +1,328 @@
+"""
+app/thumbnails.py — Pre-rendered pattern thumbnails and sprite sheets.
+
+The frontend pattern list shows a thumbnail per pattern.  Rather than one
+preview request (and one PNG encode) per pattern, every pattern is pasted
+at one pixel per stitch into a single 1-bit sprite sheet, and the client
+cuts its thumbnails out of that using the index of sprite positions.
+
+Sprites are packed onto shelves, tallest first: each shelf is filled left
+to right up to the sheet width, and the next shelf starts below the
+tallest sprite of the previous one.  Patterns are at most 200 stitches
+wide, so with the default 512-pixel sheet width the sheet is a few
+patterns wide and stays small even for a full disk.
+
+Sheets are cached by DiskImage.generation, which changes on every write
+and is unique across disk images, so an unchanged disk is never
+re-rendered.  The cache holds the sheets of the last few generations, so
+several machines' disks do not evict each other.
+
+ThumbnailStore keeps the per-pattern preview PNGs rendered ahead of time.
+After each change to the disk the app calls ThumbnailStore.schedule(),
+and a single background worker renders the disk it was given — the app
+never changes a published DiskImage, so no copy is taken: patterns whose
+content hash is unchanged keep their PNG, patterns that were removed are
+dropped, and the sprite sheet is rebuilt.  Entries keep their recency
+across refreshes, and patterns evicted by the size cap are not rendered
+again until their content changes.  Requests then look the PNG
+up by pattern number; the store only answers while it is in step with the
+live disk's generation, so a request never gets a stale thumbnail.
+
+Public API
+----------
+pattern_png(packed, width, height, compress_level=6) -> bytes
+build_sprite_sheet(patterns, **kwargs) -> SpriteSheet
+disk_sprite_sheet(disk) -> SpriteSheet   (cached by disk generation)
+ThumbnailStore                          (background-rendered previews)
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING
+
+from app import timing
+from app.metrics import CACHE_LOOKUPS
+
+if TYPE_CHECKING:
+    from app.brother_format import DiskImage
+
+log = logging.getLogger(__name__)
+
+# Default sheet width in pixels; widened if a single pattern is wider.
+DEFAULT_SHEET_WIDTH: int = 512
+
+# Blank pixels between sprites, so scaled thumbnails do not bleed into
+# their neighbours.
+DEFAULT_PADDING: int = 1
+
+# Upper bound on the PNG bytes a ThumbnailStore keeps.  1-bit previews are
+# a few hundred bytes each, so this holds a full disk many times over.
+DEFAULT_STORE_BYTES: int = 4 * 1024 * 1024
+
+
+def pattern_png(
+    packed: bytes | bytearray, width: int, height: int, compress_level: int = 6
+) -> bytes:
+    """Encode packed 1-bit rows (see app.util) as a black-and-white PNG.
+
+    The packed layout is Pillow's "1;IR" raw mode, so the image is built in
+    one frombytes call and saved as a 1-bit PNG (about 8× smaller than an
+    8-bit greyscale one).  *compress_level* is zlib's 0 (fastest) – 9
+    (smallest).
+    """
+    from PIL import Image  # noqa: PLC0415
+
+    with timing.stage("png"):
+        img = Image.frombytes("1", (width, height), bytes(packed), "raw", "1;IR")
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=compress_level)
+    return buf.getvalue()
+
+
+@dataclass(frozen=True)
+class Sprite:
+    """Position of pattern `number` in a sprite sheet, one pixel per stitch."""
+
+    number: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class SpriteSheet:
+    """A 1-bit PNG holding every sprite, and where each one is."""
+
+    png: bytes
+    width: int
+    height: int
+    sprites: list[Sprite]
+    generation: int = 0
+
+
+def _layout(
+    sizes: list[tuple[int, int, int]], sheet_width: int, padding: int
+) -> tuple[list[Sprite], int, int]:
+    """Shelf-pack (number, width, height) boxes; return sprites and sheet size."""
+    width = max([sheet_width] + [w for _, w, _ in sizes])
+    sprites: list[Sprite] = []
+    x = y = shelf_height = 0
+    for number, w, h in sorted(sizes, key=lambda s: (-s[2], s[0])):
+        if x and x + w > width:
+            x, y = 0, y + shelf_height + padding
+            shelf_height = 0
+        sprites.append(Sprite(number, x, y, w, h))
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+    return sorted(sprites, key=lambda s: s.number), width, y + shelf_height
+
+
+def build_sprite_sheet(
+    patterns: Iterable[tuple[int, bytes, int, int]],
+    *,
+    sheet_width: int = DEFAULT_SHEET_WIDTH,
+    padding: int = DEFAULT_PADDING,
+    compress_level: int = 6,
+) -> SpriteSheet:
+    """Pack (number, packed, stitches, rows) patterns into one 1-bit PNG.
+
+    Packed rows are as in app.util; knit stitches are black, as in the
+    preview PNGs.  Sprites are listed in pattern-number order.  An empty
+    iterable gives a 1 × 1 blank sheet with no sprites.
+    """
+    from PIL import Image  # noqa: PLC0415
+
+    patterns = [p for p in patterns if p[2] and p[3]]
+    sprites, width, height = _layout(
+        [(number, w, h) for number, _, w, h in patterns], sheet_width, padding
+    )
+    sheet = Image.new("1", (width, max(height, 1)), 1)
+    by_number = {s.number: s for s in sprites}
+    for number, packed, w, h in patterns:
+        sprite = by_number[number]
+        tile = Image.frombytes("1", (w, h), bytes(packed), "raw", "1;IR")
+        sheet.paste(tile, (sprite.x, sprite.y))
+
+    buf = io.BytesIO()
+    with timing.stage("png"):
+        sheet.save(buf, format="PNG", compress_level=compress_level)
+    return SpriteSheet(buf.getvalue(), sheet.width, sheet.height, sprites)
+
+
+# Sheets of the most recently used disk generations, oldest first.
+_SHEET_CACHE_SIZE = 8
+_cache: OrderedDict[int, SpriteSheet] = OrderedDict()
+_cache_lock = threading.Lock()
+_sheet_hits = CACHE_LOOKUPS.labels("sprite_sheet", "hit")
+_sheet_misses = CACHE_LOOKUPS.labels("sprite_sheet", "miss")
+
+
+def disk_sprite_sheet(disk: "DiskImage") -> SpriteSheet:
+    """Sprite sheet of every pattern on *disk*, cached by disk generation."""
+    generation = disk.generation
+    with _cache_lock:
+        cached = _cache.get(generation)
+        if cached is not None:
+            _cache.move_to_end(generation)
+            _sheet_hits.inc()
+            return cached
+    _sheet_misses.inc()
+
+    sheet = build_sprite_sheet(
+        (e.number, disk.read_pattern_packed(e.number), e.stitches, e.rows)
+        for e in disk.list_patterns()
+    )
+    sheet = replace(sheet, generation=generation)
+    with _cache_lock:
+        _cache[generation] = sheet
+        while len(_cache) > _SHEET_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return sheet
+
+
+_thumbnail_hits = CACHE_LOOKUPS.labels("thumbnail", "hit")
+_thumbnail_misses = CACHE_LOOKUPS.labels("thumbnail", "miss")
+
+
+@dataclass(frozen=True)
+class Thumbnail:
+    """Preview PNG of one stored pattern."""
+
+    number: int
+    content_hash: str  # DiskImage.pattern_hash()
+    width: int
+    height: int
+    png: bytes
+
+
+class ThumbnailStore:
+    """Preview PNGs of the patterns on the current disk, rendered ahead of time.
+
+    Entries are keyed by pattern number and carry the hash of the pattern
+    content they were rendered from, so a refresh re-renders only patterns
+    that actually changed.  Total PNG size is capped at *max_bytes*; the
+    least recently used entries are evicted beyond that.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_STORE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[int, Thumbnail] = OrderedDict()
+        self._bytes = 0
+        # Content hashes of patterns evicted by the size cap, so a refresh
+        # does not render them again while they are unchanged.
+        self._evicted: dict[int, str] = {}
+        # Generation of the disk the entries were last brought in step with.
+        self._generation: int | None = None
+        self._lock = threading.Lock()
+        # Newest disk still to be rendered, and the worker rendering it.
+        # The worker is started on demand and exits once nothing is pending,
+        # so an idle store holds no thread.
+        self._next: DiskImage | None = None
+        self._worker: threading.Thread | None = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def bytes_used(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    def get(self, number: int, generation: int) -> Thumbnail | None:
+        """Return the thumbnail of *number* if the store is at *generation*."""
+        with self._lock:
+            entry = None
+            if self._generation == generation:
+                entry = self._entries.get(number)
+            if entry is None:
+                _thumbnail_misses.inc()
+                return None
+            self._entries.move_to_end(number)
+        _thumbnail_hits.inc()
+        return entry
+
+    def schedule(self, disk: "DiskImage") -> None:
+        """Refresh the store from *disk* in the background.
+
+        *disk* must not change afterwards, as holds for a published disk.
+        Disks scheduled while a refresh is running are coalesced: only the
+        newest one is rendered next.
+        """
+        with self._lock:
+            self._next = disk
+            if self._worker is None:
+                self._idle.clear()
+                self._worker = threading.Thread(
+                    target=self._run, name="thumbnails", daemon=True
+                )
+                self._worker.start()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until no refresh is pending; False if *timeout* expired."""
+        return self._idle.wait(timeout)
+
+    def close(self) -> None:
+        """Drop any pending refresh and wait for a running one to finish."""
+        with self._lock:
+            self._next = None
+        self.wait()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                disk, self._next = self._next, None
+                if disk is None:
+                    self._worker = None
+                    self._idle.set()
+                    return
+            try:
+                self.refresh(disk)
+            except Exception:
+                log.exception("Thumbnail refresh failed")
+
+    def refresh(self, disk: "DiskImage") -> None:
+        """Bring the store in step with *disk*, rendering changed patterns."""
+        generation = disk.generation
+        with self._lock:
+            current = dict(self._entries)
+            evicted = dict(self._evicted)
+
+        kept: dict[int, Thumbnail] = {}
+        added: dict[int, Thumbnail] = {}
+        still_evicted: dict[int, str] = {}
+        for e in disk.list_patterns():
+            digest = disk.pattern_hash(e.number)
+            old = current.get(e.number)
+            if old is not None and old.content_hash == digest:
+                kept[e.number] = old
+            elif evicted.get(e.number) == digest:
+                still_evicted[e.number] = digest
+            else:
+                packed = disk.read_pattern_packed(e.number)
+                png = pattern_png(packed, e.stitches, e.rows)
+                added[e.number] = Thumbnail(e.number, digest, e.stitches, e.rows, png)
+        disk_sprite_sheet(disk)
+
+        with self._lock:
+            # Kept entries in their current recency order (get() may have
+            # reordered them meanwhile), then new ones as most recent.
+            entries = OrderedDict((n, kept[n]) for n in self._entries if n in kept)
+            entries.update(added)
+            self._entries = entries
+            self._bytes = sum(len(t.png) for t in entries.values())
+            while self._bytes > self.max_bytes and self._entries:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped.png)
+                still_evicted[dropped.number] = dropped.content_hash
+            self._evicted = still_evicted
+            self._generation = generation
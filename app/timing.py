@@ -0,0 +1,110 @@
+"""
+app/timing.py — Per-request stage timings for the Server-Timing header.
+
+While a request is handled, its Timings collect how long each stage of
+the work took: image decoding and scaling, pattern encoding, PNG encoding
+and so on.  The API sends them back in a Server-Timing header, which the
+browser's developer tools show next to the request, so a slow preview can
+be broken down without reading server logs.
+
+Code records into whichever request is current, and does nothing outside
+one:
+
+    with timing.stage("base64"):
+        ...
+    timing.record("png", seconds)
+
+Histograms declared with a ``timing`` prefix in app.metrics record every
+observation here too, so load_image's stages and the pattern codec need
+no separate calls.  The current request is a context variable: threads
+started through asyncio.to_thread see it, and app.workers carries
+worker-process timings back via collect() and merge().
+
+Public API
+----------
+Timings                                    (add, items, header)
+collect() -> context manager yielding the Timings of a new request
+record(name, seconds), stage(name), merge(items)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# (name, total seconds, number of times recorded)
+Entry = tuple[str, float, int]
+
+_current: ContextVar[Timings | None] = ContextVar("timings", default=None)
+
+
+class Timings:
+    """Total time and count per stage name, in order of first record."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: dict[str, list[float]] = {}
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += count
+
+    def items(self) -> list[Entry]:
+        with self._lock:
+            return [(n, s, int(c)) for n, (s, c) in self._stages.items()]
+
+    def header(self, total: float | None = None) -> str:
+        """Server-Timing header value, durations in milliseconds.
+
+        A stage recorded more than once carries its count as description.
+        """
+        parts = []
+        for name, seconds, count in self.items():
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if count > 1:
+                part += f';desc="{count}x"'
+            parts.append(part)
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Collect the timings recorded inside the with block."""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add *seconds* to stage *name* of the current request, if any."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Record the time the with block takes as stage *name*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def merge(items: Iterable[Entry]) -> None:
+    """Add timings collected elsewhere (another process) to the current ones."""
+    timings = _current.get()
+    if timings is not None:
+        for name, seconds, count in items:
+            timings.add(name, seconds, count)
@@ -2,6 +2,9 @@
 util.py - Helper functions that don't get into the nitty gritty of the format
 """
 
+from itertools import chain
+from typing import Sequence
+
 # ---------------------------------------------------------------------------
 # Low-level geometry helpers
 # ---------------------------------------------------------------------------
@@ -110,3 +113,255 @@ def write_nibble(data: bytearray, base: int, nibble_index: int, value: int) -> N
     else:
         # Write MSN, preserve LSN
         data[byte_offset] = (data[byte_offset] & 0x0F) | ((value & 0x0F) << 4)
+
+
+# ---------------------------------------------------------------------------
+# Packed 1-bit rows
+# ---------------------------------------------------------------------------
+#
+# "Packed" pattern data stores each row in packed_row_bytes(stitches) bytes,
+# row 0 first.  Bit 0 (LSB) of each byte is the leftmost stitch of that byte,
+# and a set bit means knit — the same bit order the Brother format uses inside
+# a nibble, so the low nibble of a packed byte is one encoded nibble.  Padding
+# bits past the last stitch of a row are always 0.  This is exactly Pillow's
+# "1;IR" raw layout for mode "1" images.
+
+# bytes(row).translate(...) maps pixel values 0/1 to the ASCII digits "0"/"1";
+# any other value becomes "x", which int(..., 2) then rejects.
+_BIT_CHARS: bytes = b"01" + b"x" * 254
+
+# _BYTE_BITS[b] is the 8 stitches encoded in packed byte b, leftmost first.
+_BYTE_BITS: tuple[tuple[int, ...], ...] = tuple(
+    tuple((b >> bit) & 1 for bit in range(8)) for b in range(256)
+)
+
+
+def packed_row_bytes(stitches: int) -> int:
+    """Number of bytes used by one packed row of `stitches` stitches."""
+    return (stitches + 7) // 8
+
+
+def pack_rows(pixel_rows: Sequence[Sequence[int]], stitches: int) -> bytes:
+    """
+    Pack rows of 0/1 pixel values into the packed 1-bit layout.
+
+    Every row must contain exactly `stitches` values, each 0 or 1.
+    Raises ValueError otherwise.
+    """
+    row_bytes = packed_row_bytes(stitches)
+    out = bytearray()
+    for i, row in enumerate(pixel_rows):
+        if len(row) != stitches:
+            raise ValueError(f"Row {i} has {len(row)} stitches; expected {stitches}")
+        try:
+            digits = bytes(row).translate(_BIT_CHARS)[::-1]
+            out += int(digits, 2).to_bytes(row_bytes, "little")
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {i} contains values other than 0 and 1") from None
+    return bytes(out)
+
+
+def unpack_rows(packed: bytes | bytearray, stitches: int, rows: int) -> list[list[int]]:
+    """Inverse of pack_rows: return `rows` lists of `stitches` 0/1 values."""
+    row_bytes = packed_row_bytes(stitches)
+    if len(packed) < rows * row_bytes:
+        raise ValueError(
+            f"Need {rows * row_bytes} packed bytes for {stitches}×{rows}, "
+            f"got {len(packed)}"
+        )
+    pixel_rows: list[list[int]] = []
+    for r in range(rows):
+        chunk = packed[r * row_bytes : (r + 1) * row_bytes]
+        row = list(chain.from_iterable(_BYTE_BITS[b] for b in chunk))
+        del row[stitches:]
+        pixel_rows.append(row)
+    return pixel_rows
+
+
+def clear_padding(packed: bytes | bytearray, stitches: int) -> bytes:
+    """Return `packed` with the padding bits past each row's last stitch cleared.
+
+    For packed rows from outside the app, which may not keep padding at 0.
+    """
+    used = stitches % 8
+    if not used:
+        return bytes(packed)
+    row_bytes = packed_row_bytes(stitches)
+    table = bytes(b & ((1 << used) - 1) for b in range(256))
+    out = bytearray(packed)
+    out[row_bytes - 1 :: row_bytes] = out[row_bytes - 1 :: row_bytes].translate(table)
+    return bytes(out)
+
+
+def rle_encode_rows(
+    packed: bytes | bytearray, stitches: int, rows: int
+) -> list[list[int]]:
+    """
+    Run-length encode a packed pattern row by row.
+
+    Each row becomes the lengths of its runs, alternating background (0) and
+    knit (1) and always starting with background, so a row that begins with
+    a knit stitch starts with a 0-length run.  The runs of a row sum to
+    `stitches`.  Runs are found with integer bit tricks on the whole row
+    rather than stitch by stitch.
+    """
+    row_bytes = packed_row_bytes(stitches)
+    full = (1 << stitches) - 1
+    encoded: list[list[int]] = []
+    for r in range(rows):
+        knit = int.from_bytes(packed[r * row_bytes : (r + 1) * row_bytes], "little")
+        background = ~knit & full
+        runs: list[int] = []
+        pos = 0
+        value = 0
+        while pos < stitches:
+            bits = (knit if value else background) >> pos
+            # Number of trailing 1 bits: the length of the run at `pos`.
+            length = (bits ^ (bits + 1)).bit_length() - 1
+            runs.append(length)
+            pos += length
+            value ^= 1
+        encoded.append(runs)
+    return encoded
+
+
+def rle_decode_rows(runs: Sequence[Sequence[int]], stitches: int) -> bytes:
+    """
+    Inverse of rle_encode_rows: return the packed rows.
+
+    Raises ValueError if a run is negative or a row's runs do not sum to
+    `stitches`; a run past the end of the row is rejected before it is
+    decoded, so huge run lengths cost nothing.
+    """
+    row_bytes = packed_row_bytes(stitches)
+    out = bytearray()
+    for i, row in enumerate(runs):
+        value = pos = 0
+        for j, length in enumerate(row):
+            if length < 0:
+                raise ValueError(f"Row {i} has a negative run length")
+            if pos + length > stitches:
+                raise ValueError(f"Row {i} runs cover more than {stitches} stitches")
+            if j % 2:
+                value |= ((1 << length) - 1) << pos
+            pos += length
+        if pos != stitches:
+            raise ValueError(f"Row {i} runs cover {pos} stitches; expected {stitches}")
+        out += value.to_bytes(row_bytes, "little")
+    return bytes(out)
+
+
+def knit_bounds(
+    packed: bytes | bytearray, stitches: int, rows: int
+) -> tuple[int, int, int, int] | None:
+    """
+    Return the bounding box of the knit stitches in a packed pattern.
+
+    The box is (left, top, right, bottom) with right/bottom exclusive, like a
+    Pillow crop box.  Returns None if no stitch is knit.
+
+    Each row is tested as one integer, and the column extent comes from the
+    OR of all rows, so the scan costs one big-int operation per row rather
+    than one per stitch.
+    """
+    row_bytes = packed_row_bytes(stitches)
+    columns = 0
+    top = bottom = -1
+    for r in range(rows):
+        value = int.from_bytes(packed[r * row_bytes : (r + 1) * row_bytes], "little")
+        if value:
+            if top < 0:
+                top = r
+            bottom = r
+            columns |= value
+    if not columns:
+        return None
+    left = (columns & -columns).bit_length() - 1
+    return (left, top, columns.bit_length(), bottom + 1)
+
+
+def crop_packed(
+    packed: bytes | bytearray,
+    stitches: int,
+    box: tuple[int, int, int, int],
+) -> bytes:
+    """
+    Crop a packed pattern `stitches` wide to `box` (left, top, right, bottom;
+    right/bottom exclusive) and return the packed rows of the result.
+    """
+    left, top, right, bottom = box
+    row_bytes = packed_row_bytes(stitches)
+    width = right - left
+    mask = (1 << width) - 1
+    out_bytes = packed_row_bytes(width)
+    out = bytearray()
+    for r in range(top, bottom):
+        value = int.from_bytes(packed[r * row_bytes : (r + 1) * row_bytes], "little")
+        out += ((value >> left) & mask).to_bytes(out_bytes, "little")
+    return bytes(out)
+
+
+def trim_box(
+    bounds: tuple[int, int, int, int], stitches: int, rows: int, margin: int = 0
+) -> tuple[int, int, int, int]:
+    """Grow `bounds` by `margin` stitches/rows on every side, clipped to the
+    `stitches` × `rows` pattern."""
+    left, top, right, bottom = bounds
+    return (
+        max(0, left - margin),
+        max(0, top - margin),
+        min(stitches, right + margin),
+        min(rows, bottom + margin),
+    )
+
+
+def find_repeat(
+    packed: bytes | bytearray, stitches: int, rows: int, *, whole: bool = False
+) -> tuple[int, int]:
+    """
+    Return the smallest (stitch, row) repeat of a packed pattern.
+
+    The pattern repeats with period (px, py) when every stitch equals the
+    stitch px to its right and the one py rows below it, wherever those
+    exist; tiling the top-left px × py block then reproduces the whole
+    pattern, possibly ending in a partial tile.  With *whole* only periods
+    that divide the size are accepted, so the pattern is a whole number of
+    tiles.  A pattern with no repeat returns (stitches, rows).
+
+    Rows are compared as hashable byte strings: the row period is the
+    smallest period of the sequence of row ids (via the KMP failure
+    function), and the stitch period is checked once per distinct row with
+    a shift-and-compare on the row's integer value.
+    """
+    row_bytes = packed_row_bytes(stitches)
+    chunks = [bytes(packed[r * row_bytes : (r + 1) * row_bytes]) for r in range(rows)]
+
+    # --- Row period: smallest period of the row-id sequence ---
+    ids: dict[bytes, int] = {}
+    seq = [ids.setdefault(chunk, len(ids)) for chunk in chunks]
+    failure = [0] * rows
+    k = 0
+    for i in range(1, rows):
+        while k and seq[i] != seq[k]:
+            k = failure[k - 1]
+        if seq[i] == seq[k]:
+            k += 1
+        failure[i] = k
+    # Every period of the sequence is rows minus one of its borders, and
+    # the borders are failure[-1], failure[failure[-1] - 1], ...
+    border = failure[-1] if rows else 0
+    while whole and border and rows % (rows - border):
+        border = failure[border - 1]
+    row_period = rows - border
+
+    # --- Stitch period: smallest p every distinct row agrees with ---
+    values = [int.from_bytes(chunk, "little") for chunk in ids]
+    stitch_period = stitches
+    for p in range(1, stitches):
+        if whole and stitches % p:
+            continue
+        mask = (1 << (stitches - p)) - 1
+        if all((v >> p) == (v & mask) for v in values):
+            stitch_period = p
+            break
+    return stitch_period, row_period
@@ -0,0 +1,320 @@
+"""
+app/workers.py — Warm process pool for CPU-bound request work.
+
+Image loading, dithering, PNG encoding and the pure-Python pattern codec
+hold the GIL for the whole of a request, so run in the server's thread
+pool they stall every other request, even trivial ones like polling a
+send task.  The handlers for that work await a WorkerPool instead, which
+hands it to separate processes and leaves the event loop free.
+
+Workers are started together with the pool and have Pillow, the image
+pipeline and the codec imported up front, so the first upload does not
+pay for process start-up and imports.  Everything crossing the process
+boundary is plain data: upload bytes and options in, ImageResults (packed
+1-bit rows), PNG bytes or a DiskImage out.
+
+A pool with no workers runs tasks in a thread instead, which is also
+what happens before start() — e.g. in tests that never run the app's
+lifespan.
+
+Public API
+----------
+WorkerPool                                 (start, run, close)
+convert_image(data, options, ...) -> ImageResult
+convert_frames(data, options, max_frames) -> list[ImageResult]
+render_preview(data, options, ...) -> Preview
+render_sweep(data, variants, options, sheet) -> SweepPreviews
+rebuild_disk(disk, model, number, replacement) -> DiskImage
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+from app import timing
+from app.brother_format import DiskImage, MachineModel
+from app.floats import DEFAULT_MAX_FLOAT, FloatRun, float_heatmap
+from app.image import (
+    ImageResult,
+    SweepResult,
+    SweepVariant,
+    contact_sheet,
+    load_image,
+    load_image_frames,
+    sweep_image,
+)
+from app.metrics import DISK_IMAGE_SECONDS, REGISTRY, Deltas
+from app.thumbnails import pattern_png
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def default_workers() -> int:
+    """Pool size when none is configured: one per CPU, at most four.
+
+    A single-user tool rarely has more heavy requests in flight than that.
+    """
+    return min(4, multiprocessing.cpu_count())
+
+
+def _warm() -> None:
+    """Worker initializer: load every Pillow plugin before the first task."""
+    from PIL import Image  # noqa: PLC0415
+
+    Image.init()
+
+
+def _ready() -> int:
+    return multiprocessing.current_process().pid or 0
+
+
+def _call(call: Callable[[], T]) -> tuple[T, Deltas, list[timing.Entry]]:
+    """Run *call* in a worker; also return the metrics and timings it recorded.
+
+    Metrics of a call that raises stay in the worker and are returned with
+    its next result.
+    """
+    with timing.collect() as timings:
+        result = call()
+    return result, REGISTRY.take(), timings.items()
+
+
+class WorkerPool:
+    """Process pool that handlers await for CPU-bound work.
+
+    Workers are started by start() and live until close().  Task functions
+    and their arguments must be picklable: module-level functions of plain
+    data.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ProcessPoolExecutor | None = None
+        self.workers = 0
+
+    def start(self, workers: int) -> None:
+        """(Re)start the pool with *workers* processes; 0 runs tasks in threads.
+
+        Returns straight away; the workers warm up in the background.
+        """
+        self.close()
+        self.workers = workers
+        if workers < 1:
+            return
+        # Forking a process that is already running threads (the server's)
+        # is unsafe; the forkserver forks workers from a clean process that
+        # imported this module and Pillow, which the server itself only
+        # imports on first use, once.
+        method = "spawn"
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            multiprocessing.set_forkserver_preload([__name__, "PIL.Image"])
+            method = "forkserver"
+        self._executor = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_warm,
+        )
+        # The executor only starts a worker when a task finds none idle, so
+        # submitting one task per worker starts them all now.
+        for _ in range(workers):
+            self._executor.submit(_ready)
+        log.info("Starting %d worker process(es)", workers)
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run fn(*args, **kwargs) in a worker and return its result.
+
+        Exceptions raised by *fn* are re-raised here.  If a worker process
+        died, the pool is restarted before the error is raised.  Metrics
+        recorded in the worker are added to app.metrics.REGISTRY, and its
+        stage timings to the current request's (app.timing).
+        """
+        call = functools.partial(fn, *args, **kwargs)
+        executor = self._executor
+        if executor is None:
+            return await asyncio.to_thread(call)
+        loop = asyncio.get_running_loop()
+        try:
+            result, deltas, timings = await loop.run_in_executor(executor, _call, call)
+        except BrokenProcessPool:
+            log.error("A worker process died; restarting the pool")
+            if self._executor is executor:
+                self.start(self.workers)
+            raise
+        REGISTRY.merge(deltas)
+        timing.merge(timings)
+        return result
+
+    def close(self) -> None:
+        """Stop the workers, waiting for running tasks to finish."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------------------------------------------------------------------------
+# Tasks
+# ---------------------------------------------------------------------------
+
+
+def convert_image(
+    data: bytes,
+    options: dict[str, Any],
+    *,
+    store_tile: bool = False,
+    fix_floats: int | None = None,
+) -> ImageResult:
+    """load_image(data, **options), then optionally keep only the repeating
+    tile (ImageResult.base_tile) and break floats longer than *fix_floats*."""
+    result = load_image(data, **options)
+    if store_tile:
+        result = result.base_tile()
+    if fix_floats is not None:
+        result = result.fix_floats(fix_floats)
+    return result
+
+
+def convert_frames(
+    data: bytes, options: dict[str, Any], *, max_frames: int | None = None
+) -> list[ImageResult]:
+    """load_image_frames(data, **options), at most *max_frames* of them."""
+    return list(load_image_frames(data, max_frames=max_frames, **options))
+
+
+@dataclass(frozen=True)
+class Preview:
+    """A converted upload with its 1-bit preview PNG.
+
+    ``floats`` and ``heatmap_png`` are only set when a float limit was
+    given to render_preview.
+    """
+
+    result: ImageResult
+    png: bytes
+    floats: list[FloatRun] | None = None
+    heatmap_png: bytes | None = None
+
+
+def render_preview(
+    data: bytes,
+    options: dict[str, Any],
+    *,
+    fix_floats: bool = False,
+    max_float: int | None = None,
+    compress_level: int = 6,
+) -> Preview:
+    """Convert an upload as convert_image does and encode its preview.
+
+    With *max_float*, the runs longer than that are found and drawn on a
+    heatmap; *fix_floats* breaks them (at DEFAULT_MAX_FLOAT if no limit is
+    given) before previewing.
+    """
+    result = convert_image(
+        data,
+        options,
+        fix_floats=(max_float or DEFAULT_MAX_FLOAT) if fix_floats else None,
+    )
+    png = pattern_png(result.packed, result.width, result.height, compress_level)
+    if max_float is None:
+        return Preview(result, png)
+
+    floats = result.find_floats(max_float)
+    heatmap = float_heatmap(result.packed, result.width, result.height, floats)
+    buf = io.BytesIO()
+    with timing.stage("png"):
+        heatmap.save(buf, format="PNG")
+    return Preview(result, png, floats, buf.getvalue())
+
+
+@dataclass(frozen=True)
+class SweepPreviews:
+    """A sweep_image() outcome with the preview PNG of every variant.
+
+    ``sheet_png`` is the contact sheet, only set when asked for.
+    """
+
+    sweep: SweepResult
+    pngs: list[bytes]
+    sheet_png: bytes | None = None
+
+
+def render_sweep(
+    data: bytes,
+    variants: list[SweepVariant],
+    options: dict[str, Any],
+    *,
+    sheet: bool = False,
+) -> SweepPreviews:
+    """sweep_image(data, variants, **options), then encode the previews."""
+    swept = sweep_image(data, variants, **options)
+    pngs = [pattern_png(r.packed, r.width, r.height) for r in swept.results]
+    if not sheet:
+        return SweepPreviews(swept, pngs)
+    buf = io.BytesIO()
+    with timing.stage("png"):
+        contact_sheet(swept.results).save(buf, format="PNG")
+    return SweepPreviews(swept, pngs, buf.getvalue())
+
+
+class CompactionError(Exception):
+    """A pattern could not be read or re-written while rebuilding a disk.
+
+    When the pattern was rejected by DiskImage.write_pattern, the
+    ValueError is the ``__cause__``.
+    """
+
+
+@DISK_IMAGE_SECONDS.labels("compact").timed
+def rebuild_disk(
+    disk: DiskImage,
+    model: MachineModel,
+    number: int,
+    replacement: tuple[bytes, int, int, list[int]] | None = None,
+) -> DiskImage:
+    """Return a new, compacted disk image with pattern *number* removed.
+
+    With *replacement* (packed, stitches, rows, memo), *number* is written
+    back with that content instead.  Patterns are copied as packed rows, in
+    number order, which is also slot order: list_patterns() stops at the
+    first empty slot, so every pattern has to sit in a contiguous run of
+    slots from 0.
+    """
+    patterns: list[tuple[int, bytes, int, int, list[int]]] = []
+    for e in disk.list_patterns():
+        if e.number == number:
+            continue
+        try:
+            patterns.append(
+                (
+                    e.number,
+                    disk.read_pattern_packed(e.number),
+                    e.stitches,
+                    e.rows,
+                    disk.read_memo(e.number),
+                )
+            )
+        except Exception as exc:
+            raise CompactionError(
+                f"Failed to read pattern {e.number} during compaction: {exc}"
+            ) from exc
+    if replacement is not None:
+        patterns.append((number, *replacement))
+        patterns.sort(key=lambda p: p[0])
+
+    new_disk = DiskImage.blank(model)
+    for pat_number, packed, stitches, rows, memo in patterns:
+        try:
+            new_disk.write_pattern_packed(pat_number, packed, stitches, rows, memo)
+        except Exception as exc:
+            raise CompactionError(
+                f"Failed to re-write pattern {pat_number} during compaction: {exc}"
+            ) from exc
+    return new_disk
@@ -28,3 +28,22 @@ def _make_png_bytes(
 
 def _make_rgb_png_bytes(width: int = 10, height: int = 10) -> bytes:
     return _make_png_bytes(width, height, color=(200, 100, 50), mode="RGB")
+
+
+def _make_multiframe_bytes(
+    frames: int, width: int = 10, height: int = 8, format: str = "GIF"
+) -> bytes:
+    """Return an animated GIF / multi-page TIFF with *frames* frames.
+
+    Frame i has its leftmost i + 1 columns black and the rest white, so
+    frames can be told apart after binarisation (and GIF does not merge
+    them as duplicates).
+    """
+    images = []
+    for i in range(frames):
+        img = Image.new("L", (width, height), 255)
+        img.paste(0, (0, 0, i + 1, height))
+        images.append(img)
+    buf = io.BytesIO()
+    images[0].save(buf, format=format, save_all=True, append_images=images[1:])
+    return buf.getvalue()
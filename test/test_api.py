@@ -10,6 +10,8 @@ from __future__ import annotations
 import sys
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 # ---------------------------------------------------------------------------
 # Patch sys.modules before any app.* imports so that heavy/hardware
 # dependencies are never imported by the real import machinery.
@@ -20,6 +22,9 @@ _mock_disk.max_rows = 500
 _mock_disk.read_pattern.return_value = []
 _mock_disk.write_pattern.return_value = None
 _mock_disk.to_disk_image_bytes.return_value = b"\x00" * 16
+# Writers edit a snapshot of the disk and publish it; let the mock stand in
+# for its own snapshots so writes stay observable on _mock_disk.
+_mock_disk.snapshot.return_value = _mock_disk
 
 _mock_disk_image_cls = MagicMock()
 _mock_disk_image_cls.blank.return_value = _mock_disk
@@ -31,6 +36,19 @@ from PIL import Image as _PIL_Image  # noqa: E402
 
 _PIL_Image.preinit()
 
+# app.workers imports this; a first import inside the patch.dict below would
+# be dropped from sys.modules again on exit, and app.batch would then pickle
+# work items with a second copy of the module.
+import concurrent.futures.process  # noqa: E402,F401
+
+# Likewise FastAPI: the app's routes are built lazily, on the first request,
+# and would otherwise be built from a second copy of fastapi's modules.
+import fastapi.routing  # noqa: E402,F401
+
+# And the metrics registry, so that GET /metrics renders the one that the
+# tests (and modules imported after the patch) record into.
+import app.metrics  # noqa: E402,F401
+
 with patch.dict(
     "sys.modules",
     {
@@ -58,7 +76,7 @@ sys.modules["app.api"] = _api_module
 _state = _api_module._state
 client = TestClient(app)
 
-from .helpers import _make_png_bytes  # noqa: E402
+from .helpers import _make_multiframe_bytes, _make_png_bytes  # noqa: E402
 
 # ===========================================================================
 # api.py tests  (uses FastAPI TestClient)
@@ -135,6 +153,308 @@ class TestWritePattern:
         assert resp.status_code == 422
 
 
+class TestWritePatternFrames:
+    def setup_method(self):
+        _state.disk = _mock_disk
+        _mock_disk.write_patterns_packed.reset_mock()
+        _mock_disk.write_patterns_packed.side_effect = None
+
+    def _upload(self, data: bytes, number: int = 901):
+        return client.post(
+            "/pattern/frames",
+            data={"number": str(number), "stitch_aspect_ratio": "1"},
+            files={"file": ("frames.gif", data, "image/gif")},
+        )
+
+    def test_frames_written_as_consecutive_numbers_in_one_batch(self):
+        resp = self._upload(_make_multiframe_bytes(3), number=905)
+        assert resp.status_code == 200
+        patterns = resp.json()["patterns"]
+        assert [p["number"] for p in patterns] == [905, 906, 907]
+        _mock_disk.write_patterns_packed.assert_called_once()
+        (batch,) = _mock_disk.write_patterns_packed.call_args.args
+        assert [(n, w, h) for n, _, w, h in batch] == [
+            (905, 10, 8),
+            (906, 10, 8),
+            (907, 10, 8),
+        ]
+
+    def test_frames_past_999_return_422(self):
+        resp = self._upload(_make_multiframe_bytes(3), number=998)
+        assert resp.status_code == 422
+        _mock_disk.write_patterns_packed.assert_not_called()
+
+    def test_disk_rejection_returns_422(self):
+        _mock_disk.write_patterns_packed.side_effect = ValueError("Not enough space")
+        resp = self._upload(_make_multiframe_bytes(2))
+        assert resp.status_code == 422
+        assert "Not enough space" in resp.json()["detail"]
+
+    def test_bad_image_returns_422(self):
+        resp = self._upload(b"garbage")
+        assert resp.status_code == 422
+
+
+class TestWritePatternColours:
+    def setup_method(self):
+        _state.disk = _mock_disk
+        _mock_disk.write_patterns_packed.reset_mock()
+        _mock_disk.write_patterns_packed.side_effect = None
+
+    def _upload(self, number: int = 901, single_colour: bool = False, **data):
+        import io
+
+        from PIL import Image
+
+        img = Image.new("RGB", (30, 10), (255, 255, 255))
+        if not single_colour:
+            img.paste((200, 0, 0), (0, 0, 10, 10))
+            img.paste((0, 0, 200), (10, 0, 15, 10))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return client.post(
+            "/pattern/colours",
+            data={"number": str(number), "stitch_aspect_ratio": "1", **data},
+            files={"file": ("design.png", buf.getvalue(), "image/png")},
+        )
+
+    def test_contrast_colours_written_consecutively(self):
+        resp = self._upload(number=910, colours="3")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["background"] == "#ffffff"
+        assert [(p["number"], p["colour"]) for p in body["patterns"]] == [
+            (910, "#c80000"),
+            (911, "#0000c8"),
+        ]
+        (batch,) = _mock_disk.write_patterns_packed.call_args.args
+        assert [n for n, _, _, _ in batch] == [910, 911]
+
+    def test_include_background(self):
+        resp = self._upload(colours="3", include_background="true")
+        assert resp.status_code == 200
+        assert len(resp.json()["patterns"]) == 3
+
+    def test_background_only_returns_422(self):
+        resp = self._upload(single_colour=True)
+        assert resp.status_code == 422
+        assert "no colours besides the background" in resp.json()["detail"]
+        _mock_disk.write_patterns_packed.assert_not_called()
+
+    def test_past_999_returns_422(self):
+        resp = self._upload(number=999, colours="3")
+        assert resp.status_code == 422
+        _mock_disk.write_patterns_packed.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "data", [{"colours": "1"}, {"colours": "9"}, {"method": "octree"}]
+    )
+    def test_invalid_options_return_422(self, data):
+        assert self._upload(**data).status_code == 422
+
+
+class TestAutoTrim:
+    def setup_method(self):
+        _state.disk = _mock_disk
+
+    def test_write_pattern_auto_trim_reports_bytes_saved(self):
+        import io
+
+        from PIL import Image
+
+        img = Image.new("L", (40, 20), 255)
+        img.paste(0, (10, 5, 18, 9))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        resp = client.post(
+            "/pattern",
+            data={"stitch_aspect_ratio": "1", "auto_trim": "true"},
+            files={"file": ("t.png", buf.getvalue(), "image/png")},
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert (body["width"], body["height"]) == (8, 4)
+        assert body["bytes_saved"] > 0
+
+    def test_trim_disk(self):
+        _mock_disk.trim_patterns.return_value = {901: 120, 903: 30}
+        resp = client.post("/disk/trim?margin=1")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["trimmed"] == {"901": 120, "903": 30}
+        assert body["bytes_saved"] == 150
+        _mock_disk.trim_patterns.assert_called_with(margin=1)
+
+    def test_trim_disk_negative_margin_returns_422(self):
+        assert client.post("/disk/trim?margin=-1").status_code == 422
+
+
+class TestPatternRepeat:
+    def setup_method(self):
+        _state.disk = _mock_disk
+
+    def teardown_method(self):
+        _mock_disk.get_pattern_entry.reset_mock(return_value=True)
+
+    def test_reports_tile_and_saving(self):
+        from app.util import bytes_per_pattern_and_memo, pack_rows
+
+        grid = [[(x // 2 + y) % 2 for x in range(40)] for y in range(10)]
+        entry = MagicMock(stitches=40, rows=10)
+        _mock_disk.get_pattern_entry.return_value = entry
+        _mock_disk.read_pattern_packed.return_value = pack_rows(grid, 40)
+        resp = client.get("/pattern/901/repeat")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert (body["repeat_width"], body["repeat_height"]) == (4, 2)
+        assert (body["tile_width"], body["tile_height"]) == (4, 2)
+        assert body["bytes_used"] == bytes_per_pattern_and_memo(40, 10)
+        assert body["bytes_saved"] == body["bytes_used"] - body["tile_bytes"]
+
+    def test_partial_repeat_is_not_a_tile(self):
+        from app.util import pack_rows
+
+        grid = [[1, 0, 0] * 3 + [1]] * 4
+        _mock_disk.get_pattern_entry.return_value = MagicMock(stitches=10, rows=4)
+        _mock_disk.read_pattern_packed.return_value = pack_rows(grid, 10)
+        body = client.get("/pattern/901/repeat").json()
+        assert (body["repeat_width"], body["repeat_height"]) == (3, 1)
+        assert (body["tile_width"], body["tile_height"]) == (10, 1)
+        assert body["bytes_saved"] == body["bytes_used"] - body["tile_bytes"]
+
+    def test_missing_pattern_returns_404(self):
+        _mock_disk.get_pattern_entry.return_value = None
+        assert client.get("/pattern/950/repeat").status_code == 404
+
+    def test_write_pattern_store_tile(self):
+        import io
+
+        from PIL import Image
+
+        img = Image.new("L", (40, 8), 255)
+        for x0 in range(0, 40, 4):
+            img.paste(0, (x0, 0, x0 + 2, 8))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        resp = client.post(
+            "/pattern",
+            data={"stitch_aspect_ratio": "1", "store_tile": "true"},
+            files={"file": ("t.png", buf.getvalue(), "image/png")},
+        )
+        assert resp.status_code == 200
+        assert (resp.json()["width"], resp.json()["height"]) == (4, 1)
+
+
+class TestFloats:
+    def setup_method(self):
+        _state.disk = _mock_disk
+
+    def teardown_method(self):
+        _mock_disk.get_pattern_entry.reset_mock(return_value=True)
+        _mock_disk.fix_floats.reset_mock(return_value=True)
+
+    @staticmethod
+    def _png() -> bytes:
+        import io
+
+        from PIL import Image
+
+        img = Image.new("L", (30, 4), 255)
+        img.paste(0, (0, 0, 2, 4))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return buf.getvalue()
+
+    def test_preview_reports_long_floats_and_heatmap(self):
+        resp = client.post(
+            "/preview",
+            data={"stitch_aspect_ratio": "1", "max_float": "7"},
+            files={"file": ("f.png", self._png(), "image/png")},
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["long_floats"] == 4
+        assert body["heatmap_uri"].startswith("data:image/png;base64,")
+
+    def test_preview_fix_floats(self):
+        resp = client.post(
+            "/preview",
+            data={"stitch_aspect_ratio": "1", "max_float": "7", "fix_floats": "true"},
+            files={"file": ("f.png", self._png(), "image/png")},
+        )
+        assert resp.json()["long_floats"] == 0
+
+    def test_preview_without_max_float_omits_analysis(self):
+        resp = client.post(
+            "/preview", files={"file": ("f.png", self._png(), "image/png")}
+        )
+        assert resp.json()["long_floats"] is None
+
+    def test_stored_pattern_report(self):
+        from app.util import pack_rows
+
+        _mock_disk.get_pattern_entry.return_value = MagicMock(stitches=12, rows=1)
+        _mock_disk.read_pattern_packed.return_value = pack_rows([[0] * 12], 12)
+        resp = client.get("/pattern/901/floats?max_float=5")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["floats"] == [{"row": 0, "start": 0, "length": 12, "value": 0}]
+        assert body["longest"] == 12
+
+    def test_fix_stored_pattern(self):
+        _mock_disk.fix_floats.return_value = {901: 3}
+        resp = client.post("/pattern/901/floats/fix?max_float=6")
+        assert resp.status_code == 200
+        assert resp.json()["tie_downs"] == 3
+        _mock_disk.fix_floats.assert_called_with([901], 6)
+
+    def test_missing_pattern_returns_404(self):
+        _mock_disk.get_pattern_entry.return_value = None
+        assert client.get("/pattern/950/floats").status_code == 404
+        assert client.post("/pattern/950/floats/fix").status_code == 404
+
+
+class TestFabricPreview:
+    def setup_method(self):
+        _state.disk = _mock_disk
+
+    def teardown_method(self):
+        _mock_disk.get_pattern_entry.reset_mock(return_value=True)
+
+    def test_renders_stored_pattern(self):
+        import base64
+        import io
+
+        from PIL import Image
+
+        from app.util import pack_rows
+
+        _mock_disk.get_pattern_entry.return_value = MagicMock(stitches=4, rows=2)
+        _mock_disk.read_pattern_packed.return_value = pack_rows([[1, 0, 1, 0]] * 2, 4)
+        resp = client.get("/preview/pattern/901/fabric?cell_width=12")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert (body["width"], body["height"]) == (4, 2)
+        png = base64.b64decode(body["data_uri"].split(",", 1)[1])
+        assert Image.open(io.BytesIO(png)).size == (48, 18)
+
+    def test_oversized_canvas_returns_422(self):
+        from app.util import pack_rows
+
+        _mock_disk.get_pattern_entry.return_value = MagicMock(stitches=200, rows=999)
+        _mock_disk.read_pattern_packed.return_value = pack_rows([[0] * 200] * 999, 200)
+        resp = client.get("/preview/pattern/901/fabric?cell_width=32")
+        assert resp.status_code == 422
+
+    def test_bad_colour_returns_422(self):
+        resp = client.get("/preview/pattern/901/fabric?knit_colour=red")
+        assert resp.status_code == 422
+
+    def test_missing_pattern_returns_404(self):
+        _mock_disk.get_pattern_entry.return_value = None
+        assert client.get("/preview/pattern/950/fabric").status_code == 404
+
+
 class TestPreview:
     def setup_method(self):
         _state.disk = _mock_disk
@@ -188,6 +508,113 @@ class TestPreview:
         assert resp.status_code == 400
 
 
+class TestPreviewPng:
+    def setup_method(self):
+        _state.disk = _mock_disk
+
+    def _post(self, **data):
+        return client.post(
+            "/preview.png",
+            data=data,
+            files={
+                "file": ("test.png", _make_png_bytes(width=40, height=30), "image/png")
+            },
+        )
+
+    def test_returns_1bit_png_body(self):
+        import io
+
+        resp = self._post()
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "image/png"
+        img = _PIL_Image.open(io.BytesIO(resp.content))
+        assert img.mode == "1"
+        assert img.size == (
+            int(resp.headers["X-Pattern-Width"]),
+            int(resp.headers["X-Pattern-Height"]),
+        )
+
+    def test_matches_json_preview(self):
+        import base64
+
+        json_resp = client.post(
+            "/preview",
+            data={},
+            files={
+                "file": ("test.png", _make_png_bytes(width=40, height=30), "image/png")
+            },
+        )
+        uri = json_resp.json()["data_uri"]
+        assert base64.b64decode(uri.split(",", 1)[1]) == self._post().content
+
+    def test_compress_level_changes_encoding(self):
+        fast = self._post(compress_level="0").content
+        small = self._post(compress_level="9").content
+        assert len(small) < len(fast)
+
+    def test_compress_level_out_of_range_returns_422(self):
+        assert self._post(compress_level="10").status_code == 422
+
+
+class TestPreviewSweep:
+    def _sweep(self, variants, **data):
+        import json
+
+        return client.post(
+            "/preview/sweep",
+            data={"variants": json.dumps(variants), **data},
+            files={
+                "file": ("test.png", _make_png_bytes(width=20, height=20), "image/png")
+            },
+        )
+
+    def test_returns_one_preview_per_variant(self):
+        variants = [
+            {"threshold": 64},
+            {"threshold": 192, "invert": True},
+            {"dither": "bayer", "target_stitches": 10},
+        ]
+        resp = self._sweep(variants)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert len(body["previews"]) == 3
+        assert body["previews"][1]["invert"] is True
+        assert body["previews"][2]["width"] == 10
+        assert all(
+            p["data_uri"].startswith("data:image/png;base64,") for p in body["previews"]
+        )
+        assert 0 <= body["suggested_threshold"] <= 255
+        assert body["contact_sheet"] is None
+
+    def test_sheet_returns_contact_sheet(self):
+        resp = self._sweep([{}, {"threshold": 50}], sheet="true")
+        assert resp.status_code == 200
+        assert resp.json()["contact_sheet"].startswith("data:image/png;base64,")
+
+    @pytest.mark.parametrize(
+        "variants",
+        ["not json", [], [{"threshold": 999}], [{"dither": "sparkle"}], [{}] * 17],
+    )
+    def test_invalid_variants_return_422(self, variants):
+        if isinstance(variants, str):
+            resp = client.post(
+                "/preview/sweep",
+                data={"variants": variants},
+                files={"file": ("test.png", _make_png_bytes(), "image/png")},
+            )
+        else:
+            resp = self._sweep(variants)
+        assert resp.status_code == 422
+
+    def test_bad_image_returns_422(self):
+        resp = client.post(
+            "/preview/sweep",
+            data={"variants": "[{}]"},
+            files={"file": ("bad.png", b"garbage", "image/png")},
+        )
+        assert resp.status_code == 422
+
+
 class TestSendStatus:
     def setup_method(self):
         _state.tasks.clear()
@@ -0,0 +1,117 @@
+"""
+tests/test_batch.py — Tests for the headless batch converter in app/batch.py.
+
+Run with:
+    pytest tests/test_batch.py -v
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.batch import (
+    BatchError,
+    collect_sources,
+    convert_batch,
+    main,
+    number_from_filename,
+    write_batch,
+)
+from app.brother_format import DiskImage, MachineModel
+
+from .helpers import _make_png_bytes
+
+
+def _write_images(directory, names, width=20, height=10):
+    for name in names:
+        (directory / name).write_bytes(_make_png_bytes(width, height, color=0))
+
+
+class TestCollectSources:
+    def test_directory_picks_up_images_only(self, tmp_path):
+        _write_images(tmp_path, ["b.png", "a.png"])
+        (tmp_path / "notes.txt").write_text("hi")
+        assert [p.name for p in collect_sources([tmp_path])] == ["a.png", "b.png"]
+
+    def test_glob_pattern(self, tmp_path):
+        _write_images(tmp_path, ["x1.png", "x2.png", "y.png"])
+        found = collect_sources([str(tmp_path / "x*.png")])
+        assert [p.name for p in found] == ["x1.png", "x2.png"]
+
+
+class TestNumberFromFilename:
+    def test_uses_last_digits(self, tmp_path):
+        assert number_from_filename(tmp_path / "card-2-905.png") == 905
+
+    def test_out_of_range_raises(self, tmp_path):
+        with pytest.raises(BatchError, match="out of range"):
+            number_from_filename(tmp_path / "design-12.png")
+
+
+class TestConvertBatch:
+    def test_sequential_numbers_on_one_disk(self, tmp_path):
+        _write_images(tmp_path, ["a.png", "b.png", "c.png"])
+        result = convert_batch(
+            collect_sources([tmp_path]), workers=2, stitch_aspect_ratio=1.0
+        )
+        assert len(result.disks) == 1
+        assert [i.number for i in result.items] == [901, 902, 903]
+        assert result.disks[0].read_pattern(902) == [[1] * 20] * 10
+
+    def test_filename_numbering_sorted_into_slots(self, tmp_path):
+        _write_images(tmp_path, ["p-950.png", "p-910.png"])
+        result = convert_batch(
+            collect_sources([tmp_path]), numbering="filename", workers=1
+        )
+        numbers = [e.number for e in result.disks[0].list_patterns()]
+        assert numbers == [910, 950]
+
+    def test_overflow_starts_new_kh930_disk(self, tmp_path):
+        # A KH-930 holds 1,759 bytes of patterns; 120×40 costs 620 bytes each.
+        _write_images(tmp_path, ["a.png", "b.png", "c.png"], width=120, height=40)
+        result = convert_batch(
+            collect_sources([tmp_path]),
+            model=MachineModel.KH930,
+            workers=2,
+            stitch_aspect_ratio=1.0,
+        )
+        assert len(result.disks) == 2
+        assert [(i.disk, i.number) for i in result.items] == [
+            (0, 901),
+            (0, 902),
+            (1, 901),
+        ]
+
+    def test_bad_image_reported_not_fatal(self, tmp_path):
+        _write_images(tmp_path, ["good.png"])
+        (tmp_path / "bad.png").write_bytes(b"not an image")
+        result = convert_batch(collect_sources([tmp_path]), workers=1)
+        assert len(result.items) == 1
+        assert str(tmp_path / "bad.png") in result.errors
+
+    def test_invalid_start_raises(self, tmp_path):
+        with pytest.raises(BatchError, match="start must be"):
+            convert_batch([], start=100)
+
+
+class TestWriteBatch:
+    def test_writes_disks_and_manifest(self, tmp_path):
+        src = tmp_path / "src"
+        src.mkdir()
+        _write_images(src, ["a.png", "b.png"])
+        out = tmp_path / "out"
+        assert main([str(src), "--out", str(out), "--workers", "1"]) == 0
+
+        manifest = json.loads((out / "manifest.json").read_text())
+        assert [d["file"] for d in manifest["disks"]] == ["disk-01.dat"]
+        assert [p["number"] for p in manifest["patterns"]] == [901, 902]
+
+        blob = (out / "disk-01.dat").read_bytes()
+        assert len(blob) == 81920
+        assert len(DiskImage.from_bytes(blob).list_patterns()) == 2
+
+    def test_write_batch_returns_manifest_path(self, tmp_path):
+        result = convert_batch([], workers=1)
+        assert write_batch(result, tmp_path).name == "manifest.json"
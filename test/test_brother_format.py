@@ -10,6 +10,7 @@ metadata field values.  Failures in an early class will likely cause
 failures in later classes too, so fix from the top down.
 """
 
+import random
 import struct
 import pytest
 
@@ -23,6 +24,8 @@ from app.brother_format import (
     decode_row,
     encode_pattern_data,
     decode_pattern_data,
+    encode_pattern_packed,
+    decode_pattern_packed,
     encode_memo,
     decode_memo,
     # Directory entry encode/decode
@@ -40,6 +43,20 @@ from app.brother_format import (
     SECTOR_SIZE,
 )
 
+from app.util import (
+    bytes_per_pattern_and_memo,
+    clear_padding,
+    crop_packed,
+    find_repeat,
+    rle_decode_rows,
+    rle_encode_rows,
+    knit_bounds,
+    pack_rows,
+    packed_row_bytes,
+    trim_box,
+    unpack_rows,
+)
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -100,6 +117,98 @@ class TestGeometry:
         assert bytes_for_memo(3) == 2
 
 
+class TestPackedRows:
+    def test_packed_row_bytes(self):
+        assert packed_row_bytes(1) == 1
+        assert packed_row_bytes(8) == 1
+        assert packed_row_bytes(9) == 2
+        assert packed_row_bytes(200) == 25
+
+    def test_leftmost_stitch_is_lsb(self):
+        assert pack_rows([[1, 0, 0, 0, 0, 0, 0, 0, 1]], 9) == bytes([0x01, 0x01])
+
+    def test_round_trip(self):
+        grid = make_checkerboard(13, 5)
+        assert unpack_rows(pack_rows(grid, 13), 13, 5) == grid
+
+    def test_rejects_non_binary_values(self):
+        with pytest.raises(ValueError, match="other than 0 and 1"):
+            pack_rows([[0, 2, 1]], 3)
+
+    def test_rejects_ragged_rows(self):
+        with pytest.raises(ValueError, match="expected 4"):
+            pack_rows([[0, 1, 0, 1], [1, 0]], 4)
+
+    def test_clear_padding(self):
+        assert clear_padding(bytes([0xFF, 0xFF] * 2), 9) == bytes([0xFF, 0x01] * 2)
+        assert clear_padding(b"\xff", 8) == b"\xff"
+
+
+def _framed(stitches: int, rows: int, box: tuple[int, int, int, int]):
+    """Grid of zeros with a solid knit rectangle at box (right/bottom excl.)."""
+    left, top, right, bottom = box
+    return [
+        [int(left <= x < right and top <= y < bottom) for x in range(stitches)]
+        for y in range(rows)
+    ]
+
+
+class TestTrimHelpers:
+    @pytest.mark.parametrize(
+        "stitches,rows,box",
+        [(20, 10, (3, 2, 11, 7)), (9, 3, (8, 0, 9, 1)), (16, 4, (0, 0, 16, 4))],
+    )
+    def test_knit_bounds(self, stitches, rows, box):
+        packed = pack_rows(_framed(stitches, rows, box), stitches)
+        assert knit_bounds(packed, stitches, rows) == box
+
+    def test_knit_bounds_blank_is_none(self):
+        assert knit_bounds(bytes(6), 20, 2) is None
+
+    def test_crop_packed_matches_list_crop(self):
+        grid = make_checkerboard(21, 6)
+        box = (3, 1, 17, 5)
+        expected = [row[3:17] for row in grid[1:5]]
+        assert crop_packed(pack_rows(grid, 21), 21, box) == pack_rows(expected, 14)
+
+    def test_trim_box_margin_is_clipped(self):
+        assert trim_box((3, 2, 11, 7), 12, 8, margin=2) == (1, 0, 12, 8)
+
+
+def _tiled(tile: list[list[int]], stitches: int, rows: int) -> list[list[int]]:
+    th, tw = len(tile), len(tile[0])
+    return [[tile[y % th][x % tw] for x in range(stitches)] for y in range(rows)]
+
+
+class TestFindRepeat:
+    def test_tiled_motif(self):
+        tile = make_checkerboard(24, 10)
+        tile[3][5] = 1 - tile[3][5]
+        grid = _tiled(tile, 200, 400)
+        assert find_repeat(pack_rows(grid, 200), 200, 400) == (24, 10)
+
+    def test_partial_last_repeat(self):
+        grid = _tiled([[1, 0, 0], [0, 1, 1]], 20, 7)
+        assert find_repeat(pack_rows(grid, 20), 20, 7) == (3, 2)
+        assert find_repeat(pack_rows(grid, 20), 20, 7, whole=True) == (20, 7)
+
+    def test_whole_takes_smallest_dividing_repeat(self):
+        grid = _tiled([[1, 0, 0], [0, 1, 1]], 24, 8)
+        assert find_repeat(pack_rows(grid, 24), 24, 8, whole=True) == (3, 2)
+        grid = _tiled([[1, 1, 0], [0, 1, 0], [1, 0, 0]], 24, 8)
+        assert find_repeat(pack_rows(grid, 24), 24, 8) == (3, 3)
+        assert find_repeat(pack_rows(grid, 24), 24, 8, whole=True) == (3, 8)
+
+    def test_no_repeat(self):
+        grid = make_checkerboard(5, 4)
+        grid[0][0] = 1 - grid[0][0]
+        grid[3][4] = 1 - grid[3][4]
+        assert find_repeat(pack_rows(grid, 5), 5, 4) == (5, 4)
+
+    def test_solid_pattern_is_one_stitch(self):
+        assert find_repeat(pack_rows(make_solid(1, 12, 6), 12), 12, 6) == (1, 1)
+
+
 # ---------------------------------------------------------------------------
 # 2. Row encode / decode round-trip
 # ---------------------------------------------------------------------------
@@ -596,3 +705,271 @@ class TestMultiplePatterns:
         d.write_pattern(901, make_solid(1, 4, 2))
         with pytest.raises(ValueError, match="already exists"):
             d.write_pattern(901, make_solid(0, 4, 2))
+
+
+# ---------------------------------------------------------------------------
+# 11. Packed-row codec
+# ---------------------------------------------------------------------------
+
+
+class TestPackedPatternCodec:
+    @pytest.mark.parametrize("stitches", [1, 4, 5, 8, 12, 13, 200])
+    @pytest.mark.parametrize("rows", [1, 2, 3, 6])
+    def test_matches_list_encoder(self, stitches, rows):
+        grid = make_checkerboard(stitches, rows)
+        grid[0][0] = 1 - grid[0][0]  # break the symmetry
+        packed = pack_rows(grid, stitches)
+        assert encode_pattern_packed(packed, stitches, rows) == encode_pattern_data(
+            grid, stitches, rows
+        )
+
+    @pytest.mark.parametrize("stitches", [3, 8, 13])
+    def test_decode_round_trip(self, stitches):
+        grid = make_checkerboard(stitches, 5)
+        block = encode_pattern_data(grid, stitches, 5)
+        data = bytes(4) + bytes(block) + bytes(4)
+        offset = 4 + len(block) - 1
+        assert decode_pattern_packed(data, offset, stitches, 5) == pack_rows(
+            grid, stitches
+        )
+
+    def test_wrong_length_raises(self):
+        with pytest.raises(ValueError, match="packed bytes"):
+            encode_pattern_packed(b"\x00", 9, 1)
+
+    def test_write_pattern_packed_round_trip(self):
+        d = DiskImage.blank()
+        grid = make_checkerboard(13, 7)
+        d.write_pattern_packed(901, pack_rows(grid, 13), 13, 7, [3] * 7)
+        assert d.read_pattern(901) == grid
+        assert d.read_pattern_packed(901) == pack_rows(grid, 13)
+        assert d.read_memo(901) == [3] * 7
+
+    def test_write_pattern_packed_same_bytes_as_write_pattern(self):
+        grid = make_checkerboard(21, 9)
+        a = DiskImage.blank()
+        a.write_pattern(901, grid)
+        b = DiskImage.blank()
+        b.write_pattern_packed(901, pack_rows(grid, 21), 21, 9)
+        assert a.working_region_bytes() == b.working_region_bytes()
+
+
+class TestWritePatternsPacked:
+    def _frames(self, *numbers, stitches=13, rows=7):
+        packed = pack_rows(make_checkerboard(stitches, rows), stitches)
+        return [(n, packed, stitches, rows) for n in numbers]
+
+    def test_batch_matches_individual_writes(self):
+        a = DiskImage.blank()
+        entries = a.write_patterns_packed(self._frames(901, 902, 903))
+        assert [e.number for e in entries] == [901, 902, 903]
+        b = DiskImage.blank()
+        for args in self._frames(901, 902, 903):
+            b.write_pattern_packed(*args)
+        assert a.working_region_bytes() == b.working_region_bytes()
+
+    def test_existing_number_leaves_disk_unchanged(self):
+        d = DiskImage.blank()
+        d.write_pattern_packed(*self._frames(903)[0])
+        before = d.to_disk_image_bytes()
+        with pytest.raises(ValueError, match="903 already exists"):
+            d.write_patterns_packed(self._frames(901, 902, 903))
+        assert d.to_disk_image_bytes() == before
+
+    def test_duplicate_numbers_rejected(self):
+        with pytest.raises(ValueError, match="duplicate"):
+            DiskImage.blank().write_patterns_packed(self._frames(901, 901))
+
+    def test_not_enough_space_leaves_disk_unchanged(self):
+        d = DiskImage.blank(MachineModel.KH930)
+        before = d.to_disk_image_bytes()
+        big = self._frames(901, 902, stitches=200, rows=60)
+        with pytest.raises(ValueError, match="Not enough space"):
+            d.write_patterns_packed(big)
+        assert d.to_disk_image_bytes() == before
+
+
+class TestRunLengthRows:
+    def test_runs_start_with_background(self):
+        packed = pack_rows([[1, 1, 0, 0, 0, 1], [0] * 6, [1] * 6], 6)
+        assert rle_encode_rows(packed, 6, 3) == [[0, 2, 3, 1], [6], [0, 6]]
+
+    def test_round_trip_random(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            stitches, rows = rng.randint(1, 200), rng.randint(1, 6)
+            grid = [[rng.randint(0, 1) for _ in range(stitches)] for _ in range(rows)]
+            packed = pack_rows(grid, stitches)
+            runs = rle_encode_rows(packed, stitches, rows)
+            assert all(sum(r) == stitches for r in runs)
+            assert rle_decode_rows(runs, stitches) == packed
+
+    def test_decode_rejects_bad_runs(self):
+        with pytest.raises(ValueError):
+            rle_decode_rows([[3, 2]], 4)
+        with pytest.raises(ValueError):
+            rle_decode_rows([[5, -1]], 4)
+
+    def test_decode_rejects_huge_run_before_decoding(self):
+        with pytest.raises(ValueError):
+            rle_decode_rows([[0, 10**18]], 4)
+
+
+class TestGeneration:
+    def test_unique_per_image(self):
+        assert DiskImage.blank().generation != DiskImage.blank().generation
+
+    def test_changes_on_write_only(self):
+        d = DiskImage.blank()
+        g = d.generation
+        d.list_patterns()
+        assert d.generation == g
+        d.write_pattern(901, make_checkerboard(8, 4))
+        assert d.generation > g
+
+    def test_trim_and_fix_change_generation_only_when_data_changes(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, [[1] * 6] * 4)
+        g = d.generation
+        d.trim_patterns()
+        d.fix_floats(max_float=7)
+        assert d.generation == g
+        d.fix_floats(max_float=3)
+        assert d.generation > g
+
+
+class TestSnapshot:
+    def test_snapshot_is_independent_copy(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, make_checkerboard(8, 4))
+        snap = d.snapshot()
+        assert snap.generation == d.generation
+        d.write_pattern(902, make_checkerboard(4, 4))
+        assert [e.number for e in snap.list_patterns()] == [901]
+        assert snap.read_pattern(901) == make_checkerboard(8, 4)
+        snap.write_pattern(903, make_checkerboard(2, 2))
+        assert d.get_pattern_entry(903) is None
+
+
+class TestPatternHash:
+    def test_equal_content_hashes_equal_at_any_position(self):
+        a, b = DiskImage.blank(), DiskImage.blank()
+        a.write_pattern(901, make_checkerboard(8, 4))
+        b.write_pattern(902, make_checkerboard(3, 3))
+        b.write_pattern(901, make_checkerboard(8, 4))
+        assert a.pattern_hash(901) == b.pattern_hash(901)
+        assert b.pattern_hash(902) != b.pattern_hash(901)
+
+    def test_memo_and_dimensions_are_hashed(self):
+        a, b, c = DiskImage.blank(), DiskImage.blank(), DiskImage.blank()
+        a.write_pattern(901, [[0] * 4] * 2)
+        b.write_pattern(901, [[0] * 4] * 2, [3, 0])
+        c.write_pattern(901, [[0] * 2] * 4)
+        assert len({a.pattern_hash(901), b.pattern_hash(901), c.pattern_hash(901)}) == 3
+
+    def test_missing_pattern_raises(self):
+        with pytest.raises(KeyError):
+            DiskImage.blank().pattern_hash(901)
+
+
+class TestPatchPattern:
+    def _disk(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, make_checkerboard(8, 4))
+        d.write_pattern(902, make_checkerboard(9, 5), list(range(5)))
+        return d
+
+    def test_matches_full_rewrite(self):
+        d = self._disk()
+        expected = make_checkerboard(9, 5)
+        expected[1] = [1] * 9
+        expected[3][8] = 1 - expected[3][8]
+        expected[0][0] = 1 - expected[0][0]
+        memo = [0, 1, 9, 3, 4]
+        changed = d.patch_pattern(
+            902,
+            cells=[(8, 3, expected[3][8]), (0, 0, expected[0][0])],
+            rows={1: [1] * 9},
+            memo={2: 9},
+        )
+        assert changed > 0
+        ref = DiskImage.blank()
+        ref.write_pattern(901, make_checkerboard(8, 4))
+        ref.write_pattern(902, expected, memo)
+        assert d.working_region_bytes() == ref.working_region_bytes()
+        assert d.read_pattern(901) == make_checkerboard(8, 4)
+
+    def test_cells_apply_after_rows(self):
+        d = self._disk()
+        d.patch_pattern(901, cells=[(0, 2, 0)], rows={2: [1] * 8})
+        assert d.read_pattern(901)[2] == [0] + [1] * 7
+
+    def test_generation_changes_only_when_data_changes(self):
+        d = self._disk()
+        g = d.generation
+        assert d.patch_pattern(901, cells=[(0, 0, make_checkerboard(8, 4)[0][0])]) == 0
+        assert d.generation == g
+        d.patch_pattern(901, memo={0: 5})
+        assert d.generation > g
+
+    @pytest.mark.parametrize(
+        "edits",
+        [
+            {"cells": [(8, 0, 1)]},
+            {"cells": [(0, 4, 1)]},
+            {"cells": [(0, 0, 2)]},
+            {"rows": {0: [1] * 7}},
+            {"rows": {4: [1] * 8}},
+            {"rows": {0: [2] * 8}},
+            {"memo": {0: 16}},
+            {"memo": {-1: 1}},
+        ],
+    )
+    def test_rejects_bad_edits_without_applying_any(self, edits):
+        d = self._disk()
+        before = d.working_region_bytes()
+        with pytest.raises(ValueError):
+            d.patch_pattern(901, cells=[(1, 1, 1)] + edits.pop("cells", []), **edits)
+        assert d.working_region_bytes() == before
+
+    def test_missing_pattern_raises(self):
+        with pytest.raises(KeyError):
+            DiskImage.blank().patch_pattern(901, memo={0: 1})
+
+
+class TestTrimPatterns:
+    def test_trims_blank_margins_and_frees_space(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, _framed(40, 20, (10, 5, 18, 9)), list(range(20)))
+        d.write_pattern(902, make_checkerboard(8, 4))
+        before = d.bytes_remaining
+        saved = d.trim_patterns()
+        assert saved == {
+            901: bytes_per_pattern_and_memo(40, 20) - bytes_per_pattern_and_memo(8, 4)
+        }
+        assert d.bytes_remaining == before + saved[901]
+        assert d.read_pattern(901) == [[1] * 8] * 4
+        assert d.read_memo(901) == [5, 6, 7, 8]
+        assert d.read_pattern(902) == make_checkerboard(8, 4)
+        assert [e.number for e in d.list_patterns()] == [901, 902]
+
+    def test_margin_and_selection(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, _framed(40, 20, (10, 5, 18, 9)))
+        d.write_pattern(902, _framed(40, 20, (10, 5, 18, 9)))
+        saved = d.trim_patterns([902], margin=1)
+        assert list(saved) == [902]
+        assert d.get_pattern_entry(902).stitches == 10
+        assert d.get_pattern_entry(902).rows == 6
+        assert d.get_pattern_entry(901).stitches == 40
+
+    def test_blank_pattern_left_alone(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, make_solid(0, 10, 3))
+        before = d.to_disk_image_bytes()
+        assert d.trim_patterns() == {}
+        assert d.to_disk_image_bytes() == before
+
+    def test_missing_pattern_raises(self):
+        with pytest.raises(KeyError):
+            DiskImage.blank().trim_patterns([905])
@@ -0,0 +1,130 @@
+"""
+tests/test_floats.py — Tests for float-length analysis in app/floats.py.
+
+Run with:
+    pytest tests/test_floats.py -v
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from app.brother_format import DiskImage
+from app.floats import FloatRun, find_floats, fix_floats, float_heatmap
+from app.util import pack_rows
+
+
+def _naive_runs(grid: list[list[int]], max_float: int) -> list[FloatRun]:
+    """Reference implementation: walk every stitch."""
+    found = []
+    for y, row in enumerate(grid):
+        x = 0
+        while x < len(row):
+            end = x
+            while end < len(row) and row[end] == row[x]:
+                end += 1
+            if end - x > max_float:
+                found.append(FloatRun(y, x, end - x, row[x]))
+            x = end
+    return found
+
+
+def _random_grid(rng: random.Random, stitches: int, rows: int) -> list[list[int]]:
+    density = rng.choice([0.05, 0.5, 0.95])
+    return [[int(rng.random() < density) for _ in range(stitches)] for _ in range(rows)]
+
+
+class TestFindFloats:
+    def test_single_row(self):
+        grid = [[1] + [0] * 9 + [1, 1]]
+        assert find_floats(pack_rows(grid, 12), 12, 1, 7) == [FloatRun(0, 1, 9, 0)]
+
+    def test_runs_of_both_values(self):
+        grid = [[1] * 8 + [0] * 8]
+        assert find_floats(pack_rows(grid, 16), 16, 1, 7) == [
+            FloatRun(0, 0, 8, 1),
+            FloatRun(0, 8, 8, 0),
+        ]
+
+    def test_run_of_exactly_max_is_allowed(self):
+        grid = [[0] * 7 + [1]]
+        assert find_floats(pack_rows(grid, 8), 8, 1, 7) == []
+
+    def test_matches_naive_scan(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            stitches, rows = rng.randint(1, 60), rng.randint(1, 4)
+            max_float = rng.randint(1, 9)
+            grid = _random_grid(rng, stitches, rows)
+            assert find_floats(
+                pack_rows(grid, stitches), stitches, rows, max_float
+            ) == _naive_runs(grid, max_float)
+
+    def test_invalid_max_float_raises(self):
+        with pytest.raises(ValueError, match="max_float"):
+            find_floats(b"\x00", 8, 1, 0)
+
+
+class TestFixFloats:
+    def test_fixed_pattern_has_no_long_floats(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            stitches, rows = rng.randint(1, 60), rng.randint(1, 4)
+            max_float = rng.randint(2, 9)
+            packed = pack_rows(_random_grid(rng, stitches, rows), stitches)
+            fixed, _ = fix_floats(packed, stitches, rows, max_float)
+            assert find_floats(fixed, stitches, rows, max_float) == []
+
+    def test_tie_downs_stagger_between_rows(self):
+        packed = pack_rows([[0] * 20, [0] * 20], 20)
+        fixed, changed = fix_floats(packed, 20, 2, 7)
+        assert changed == 4
+        assert fixed == pack_rows(
+            [
+                [0] * 7 + [1] + [0] * 7 + [1] + [0] * 4,
+                [0] * 4 + [1] + [0] * 7 + [1] + [0] * 7,
+            ],
+            20,
+        )
+
+    def test_clean_pattern_unchanged(self):
+        packed = pack_rows([[0, 1] * 10], 20)
+        assert fix_floats(packed, 20, 1, 3) == (packed, 0)
+
+    def test_max_float_below_two_raises(self):
+        with pytest.raises(ValueError, match="at least 2"):
+            fix_floats(b"\x00", 8, 1, 1)
+
+
+class TestFloatHeatmap:
+    def test_highlights_only_long_runs(self):
+        grid = [[1] * 9 + [0, 1, 0], [0, 1] * 6]
+        packed = pack_rows(grid, 12)
+        img = float_heatmap(packed, 12, 2, find_floats(packed, 12, 2, 7))
+        assert img.mode == "RGB" and img.size == (12, 2)
+        assert img.getpixel((0, 0)) == (160, 0, 0)
+        assert img.getpixel((9, 0)) == (255, 255, 255)
+        assert img.getpixel((1, 1)) == (0, 0, 0)
+
+
+class TestDiskImageFloats:
+    def test_find_and_fix_stored_pattern(self):
+        d = DiskImage.blank()
+        grid = [[0] * 30 for _ in range(4)]
+        d.write_pattern(901, grid, [1, 2, 3, 4])
+        d.write_pattern(902, [[0, 1] * 15] * 4)
+        assert len(d.find_floats(901, 7)) == 4
+        before = d.read_pattern_packed(902)
+
+        assert d.fix_floats(max_float=7) == {901: 14}
+        assert d.find_floats(901, 7) == []
+        assert d.read_memo(901) == [1, 2, 3, 4]
+        assert d.read_pattern_packed(902) == before
+
+    def test_missing_pattern_raises(self):
+        with pytest.raises(KeyError):
+            DiskImage.blank().find_floats(901)
+        with pytest.raises(KeyError):
+            DiskImage.blank().fix_floats([901])
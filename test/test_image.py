@@ -7,6 +7,7 @@ Run with:
 
 from __future__ import annotations
 
+import io
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -48,9 +49,21 @@ with patch.dict(
         ),
     },
 ):
-    from app.image import ImageError, ImageResult, load_image  # noqa: E402
-
-from .helpers import _make_png_bytes, _make_rgb_png_bytes  # noqa: E402
+    import app.image as _image_module  # noqa: E402
+    from app.image import (  # noqa: E402
+        ImageError,
+        ImageResult,
+        load_image,
+        load_image_frames,
+        separate_colours,
+        trim_result,
+    )
+
+from .helpers import (  # noqa: E402
+    _make_multiframe_bytes,
+    _make_png_bytes,
+    _make_rgb_png_bytes,
+)
 
 # ===========================================================================
 # image.py tests
@@ -319,3 +332,315 @@ class TestTargetStitches:
             stitch_aspect_ratio=1.0,
         )
         assert result.width == 60
+
+
+class TestMachineReadyFastPath:
+    """Bilevel sources at stitch resolution bypass resampling and the pixel loop."""
+
+    @staticmethod
+    def _chart(width: int = 13, height: int = 7) -> Image.Image:
+        img = Image.new("1", (width, height), 1)
+        for y in range(height):
+            for x in range(width):
+                if (x * 3 + y) % 5 == 0:
+                    img.putpixel((x, y), 0)
+        return img
+
+    @staticmethod
+    def _expected_rows(img: Image.Image) -> list[list[int]]:
+        w, h = img.size
+        return [
+            [1 if img.getpixel((x, y)) == 0 else 0 for x in range(w)] for y in range(h)
+        ]
+
+    def test_mode_1_reproduced_exactly(self):
+        img = self._chart()
+        with patch.object(_image_module, "_binarise") as binarise:
+            result = load_image(img, stitch_aspect_ratio=1.0)
+        binarise.assert_not_called()
+        assert (result.width, result.height) == img.size
+        assert result.rows == self._expected_rows(img)
+
+    def test_two_colour_palette_uses_fast_path(self):
+        img = self._chart().convert("P")
+        assert img.getcolors(2) is not None
+        with patch.object(_image_module, "_binarise") as binarise:
+            result = load_image(img, stitch_aspect_ratio=1.0)
+        binarise.assert_not_called()
+        assert result.rows == self._expected_rows(self._chart())
+
+    def test_fast_path_matches_slow_path(self):
+        img = self._chart(width=30, height=11)
+        fast = load_image(img, stitch_aspect_ratio=1.0, invert=True)
+        slow = load_image(img.convert("L"), stitch_aspect_ratio=1.0, invert=True)
+        assert fast.rows == slow.rows
+
+    def test_aspect_stretch_disables_fast_path(self):
+        img = self._chart()
+        result = load_image(img, stitch_aspect_ratio=2.0)
+        assert result.height == img.height * 2
+
+    def test_too_wide_bitmap_still_scaled(self):
+        result = load_image(self._chart(width=250), stitch_aspect_ratio=1.0)
+        assert result.width == 200
+
+    def test_flip_applied_before_fast_path(self):
+        img = self._chart()
+        result = load_image(img, stitch_aspect_ratio=1.0, flip_horizontal=True)
+        assert result.rows == [row[::-1] for row in self._expected_rows(img)]
+
+
+class TestPackedImageResult:
+    """ImageResult keeps packed bits and only builds .rows on demand."""
+
+    def _result(self, invert: bool = False) -> ImageResult:
+        img = Image.new("L", (11, 3), 255)
+        img.putpixel((0, 0), 0)
+        img.putpixel((10, 2), 0)
+        return load_image(img, stitch_aspect_ratio=1.0, invert=invert)
+
+    def test_packed_length(self):
+        result = self._result()
+        assert len(result.packed) == 2 * 3  # 11 stitches → 2 bytes per row
+
+    def test_rows_materialised_lazily(self):
+        result = self._result()
+        assert "rows" not in result.__dict__
+        rows = result.rows
+        assert result.__dict__["rows"] is rows
+        assert rows[0][0] == 1 and rows[2][10] == 1
+        assert sum(map(sum, rows)) == 2
+
+    def test_iter_rows_matches_rows(self):
+        result = self._result()
+        assert list(result.iter_rows()) == result.rows
+
+    def test_invert_keeps_padding_bits_clear(self):
+        result = self._result(invert=True)
+        # Second byte of each row holds stitches 8–10; bits 3–7 are padding.
+        assert all(b & 0xF8 == 0 for b in result.packed[1::2])
+        assert sum(map(sum, result.rows)) == 11 * 3 - 2
+
+    def test_to_image_black_is_knit(self):
+        result = self._result()
+        img = result.to_image()
+        assert img.mode == "1"
+        assert img.size == (11, 3)
+        assert img.getpixel((0, 0)) == 0
+        assert img.getpixel((1, 0)) == 255
+
+
+class TestLoadImageFrames:
+    @staticmethod
+    def _knit_columns(result) -> int:
+        return sum(result.rows[0])
+
+    @pytest.mark.parametrize("fmt", ["GIF", "TIFF"])
+    def test_one_result_per_frame_in_order(self, fmt):
+        data = _make_multiframe_bytes(3, format=fmt)
+        results = list(load_image_frames(data, stitch_aspect_ratio=1.0, workers=2))
+        assert [self._knit_columns(r) for r in results] == [1, 2, 3]
+        assert all(r.width == 10 and r.height == 8 for r in results)
+
+    def test_frames_match_load_image(self):
+        data = _make_multiframe_bytes(2, width=12)
+        img = Image.open(io.BytesIO(data))
+        expected = []
+        for i in range(2):
+            img.seek(i)
+            expected.append(load_image(img.copy(), threshold=100, invert=True))
+        assert list(load_image_frames(data, threshold=100, invert=True)) == expected
+
+    def test_single_frame_source_yields_one_result(self):
+        results = list(load_image_frames(_make_png_bytes(width=15)))
+        assert len(results) == 1
+        assert results[0] == load_image(_make_png_bytes(width=15))
+
+    def test_max_frames_stops_early(self):
+        data = _make_multiframe_bytes(4)
+        results = list(
+            load_image_frames(data, max_frames=2, stitch_aspect_ratio=1.0, workers=1)
+        )
+        assert [self._knit_columns(r) for r in results] == [1, 2]
+
+    def test_is_lazy(self):
+        data = _make_multiframe_bytes(8)
+        with patch.object(
+            _image_module, "load_image", wraps=_image_module.load_image
+        ) as loaded:
+            frames = load_image_frames(data, workers=1)
+            next(frames)
+            assert loaded.call_count <= 2
+            frames.close()
+
+    def test_bad_source_raises_image_error(self):
+        with pytest.raises(ImageError):
+            list(load_image_frames(b"garbage"))
+
+
+def _three_colour_image() -> "Image.Image":
+    """30×10 RGB image: 15 white columns, 10 red, 5 blue."""
+    img = Image.new("RGB", (30, 10), (255, 255, 255))
+    img.paste((200, 0, 0), (0, 0, 10, 10))
+    img.paste((0, 0, 200), (10, 0, 15, 10))
+    return img
+
+
+class TestSeparateColours:
+    @staticmethod
+    def _count(result) -> int:
+        return sum(map(sum, result.rows))
+
+    def test_one_pattern_per_contrast_colour(self):
+        sep = separate_colours(_three_colour_image(), 3, stitch_aspect_ratio=1.0)
+        assert sep.background == (255, 255, 255)
+        assert sep.palette == [(200, 0, 0), (0, 0, 200)]
+        assert [self._count(r) for r in sep.results] == [100, 50]
+        assert sep.results[0].rows[0][:12] == [1] * 10 + [0, 0]
+        assert sep.results[1].rows[0][8:16] == [0, 0, 1, 1, 1, 1, 1, 0]
+
+    @pytest.mark.parametrize("method", ["median-cut", "k-means"])
+    def test_masks_partition_the_image(self, method):
+        sep = separate_colours(
+            _three_colour_image(),
+            3,
+            method=method,
+            include_background=True,
+            stitch_aspect_ratio=1.0,
+        )
+        assert sep.palette[0] == sep.background
+        for y in range(10):
+            for x in range(30):
+                assert sum(r.rows[y][x] for r in sep.results) == 1
+
+    def test_geometry_options_apply(self):
+        sep = separate_colours(_three_colour_image(), 2, target_stitches=15)
+        assert sep.results[0].width == 15
+        assert sep.results[0].height == round(5 * 4 / 3)
+        assert sep.results[0].orig_width == 30
+
+    def test_two_colour_design_yields_single_pattern(self):
+        img = Image.new("RGB", (8, 4), (0, 80, 0))
+        img.paste((250, 250, 0), (0, 0, 2, 4))
+        sep = separate_colours(img, 2, stitch_aspect_ratio=1.0)
+        assert len(sep.results) == 1
+        assert sep.results[0].rows[0] == [1, 1, 0, 0, 0, 0, 0, 0]
+
+    @pytest.mark.parametrize("colours", [1, 9])
+    def test_colour_count_out_of_range_raises(self, colours):
+        with pytest.raises(ValueError, match="colours"):
+            separate_colours(_three_colour_image(), colours)
+
+    def test_unknown_method_raises(self):
+        with pytest.raises(ValueError, match="method"):
+            separate_colours(_three_colour_image(), 2, method="octree")
+
+
+class TestAutoTrim:
+    @staticmethod
+    def _framed_png(width=40, height=20, box=(10, 5, 18, 9)) -> bytes:
+        img = Image.new("L", (width, height), 255)
+        img.paste(0, box)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return buf.getvalue()
+
+    def test_crops_to_knit_bounding_box(self):
+        result = load_image(self._framed_png(), stitch_aspect_ratio=1.0, auto_trim=True)
+        assert (result.width, result.height) == (8, 4)
+        assert result.rows == [[1] * 8] * 4
+        assert (result.orig_width, result.orig_height) == (40, 20)
+
+    def test_reports_bytes_saved(self):
+        from app.util import bytes_per_pattern_and_memo
+
+        result = load_image(self._framed_png(), stitch_aspect_ratio=1.0, auto_trim=True)
+        assert result.bytes_saved == bytes_per_pattern_and_memo(
+            40, 20
+        ) - bytes_per_pattern_and_memo(8, 4)
+
+    def test_margin(self):
+        result = load_image(
+            self._framed_png(),
+            stitch_aspect_ratio=1.0,
+            auto_trim=True,
+            trim_margin=2,
+        )
+        assert (result.width, result.height) == (12, 8)
+        assert result.rows[0] == [0] * 12
+        assert result.rows[2] == [0, 0] + [1] * 8 + [0, 0]
+
+    def test_off_by_default(self):
+        result = load_image(self._framed_png(), stitch_aspect_ratio=1.0)
+        assert (result.width, result.height, result.bytes_saved) == (40, 20, 0)
+
+    def test_blank_image_unchanged(self):
+        blank = load_image(_make_png_bytes(color=255), stitch_aspect_ratio=1.0)
+        assert trim_result(blank) is blank
+
+    def test_negative_margin_raises(self):
+        with pytest.raises(ValueError, match="trim_margin"):
+            load_image(self._framed_png(), auto_trim=True, trim_margin=-1)
+
+
+class TestRepeat:
+    @staticmethod
+    def _tiled_png(width=48, height=12) -> bytes:
+        img = Image.new("L", (width, height), 255)
+        for x0 in range(0, width, 8):
+            for y0 in range(0, height, 4):
+                img.paste(0, (x0, y0, x0 + 3, y0 + 2))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        return buf.getvalue()
+
+    def test_repeat_of_tiled_artwork(self):
+        result = load_image(self._tiled_png(), stitch_aspect_ratio=1.0)
+        assert result.repeat == (8, 4)
+
+    def test_base_tile(self):
+        from app.util import bytes_per_pattern_and_memo
+
+        result = load_image(self._tiled_png(), stitch_aspect_ratio=1.0)
+        tile = result.base_tile()
+        assert (tile.width, tile.height) == (8, 4)
+        assert tile.rows == [[1, 1, 1, 0, 0, 0, 0, 0]] * 2 + [[0] * 8] * 2
+        assert tile.bytes_saved == bytes_per_pattern_and_memo(
+            48, 12
+        ) - bytes_per_pattern_and_memo(8, 4)
+
+    def test_base_tile_only_uses_dividing_repeats(self):
+        from app.util import pack_rows
+
+        # Period 3 in a 10-stitch row ends in a partial tile; 10 does not.
+        row = [1, 0, 0] * 3 + [1]
+        result = ImageResult(pack_rows([row], 10), 10, 1, 10, 1)
+        assert result.repeat == (3, 1)
+        assert result.base_tile() is result
+
+    def test_base_tile_without_repeat_is_self(self):
+        # Row 1, 1, 0: no shift of 1 or 2 stitches reproduces it.
+        result = ImageResult(b"\x03", 3, 1, 3, 1)
+        assert result.repeat == (3, 1)
+        assert result.base_tile() is result
+
+
+class TestImageResultFloats:
+    def test_find_and_fix(self):
+        img = Image.new("L", (30, 2), 255)
+        img.paste(0, (0, 0, 3, 2))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        result = load_image(buf.getvalue(), stitch_aspect_ratio=1.0)
+        floats = result.find_floats(7)
+        assert [(f.row, f.start, f.length, f.value) for f in floats] == [
+            (0, 3, 27, 0),
+            (1, 3, 27, 0),
+        ]
+        fixed = result.fix_floats(7)
+        assert fixed.find_floats(7) == []
+        assert (fixed.width, fixed.height) == (30, 2)
+
+    def test_fix_without_floats_returns_self(self):
+        result = ImageResult(bytes([0b01010101]), 8, 1, 8, 1)
+        assert result.fix_floats(3) is result
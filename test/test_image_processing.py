@@ -42,7 +42,15 @@ with patch.dict(
         ),
     },
 ):
-    from app.image import load_image, DitherMode  # noqa: E402
+    import app.image as _image_module  # noqa: E402
+    from app.image import (  # noqa: E402
+        DitherMode,
+        SweepVariant,
+        contact_sheet,
+        load_image,
+        otsu_threshold,
+        sweep_image,
+    )
 
 from .helpers import _make_png_bytes  # noqa: E402
 
@@ -343,3 +351,84 @@ class TestPipelineCombination:
         assert baseline.rows == explicit.rows
         assert baseline.width == explicit.width
         assert baseline.height == explicit.height
+
+
+# ===========================================================================
+# Parameter sweeps
+# ===========================================================================
+
+
+def _gradient_png(width: int = 40, height: int = 12) -> bytes:
+    img = Image.new("L", (width, height))
+    img.putdata(
+        [int(255 * x / (width - 1)) for _ in range(height) for x in range(width)]
+    )
+    import io
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestSweepImage:
+    VARIANTS = [
+        SweepVariant(threshold=64),
+        SweepVariant(threshold=192, invert=True),
+        SweepVariant(dither="bayer"),
+        SweepVariant(dither="floyd-steinberg", target_stitches=20),
+    ]
+
+    def test_results_match_load_image(self):
+        png = _gradient_png()
+        swept = sweep_image(png, self.VARIANTS)
+        for variant, result in zip(self.VARIANTS, swept.results):
+            expected = load_image(
+                png,
+                threshold=variant.threshold,
+                dither=variant.dither,
+                invert=variant.invert,
+                target_stitches=variant.target_stitches,
+            )
+            assert result == expected
+
+    def test_decodes_once_and_resizes_once_per_geometry(self):
+        png = _gradient_png()
+        with (
+            patch.object(_image_module, "_open", wraps=_image_module._open) as opened,
+            patch.object(_image_module, "_scale", wraps=_image_module._scale) as scaled,
+        ):
+            sweep_image(png, self.VARIANTS)
+        assert opened.call_count == 1
+        assert scaled.call_count == 2  # default width and target_stitches=20
+
+    def test_suggested_threshold_splits_bimodal_image(self):
+        img = Image.new("L", (10, 10), 40)
+        img.paste(200, (5, 0, 10, 10))
+        swept = sweep_image(img, [SweepVariant()], stitch_aspect_ratio=1.0)
+        assert 40 <= swept.suggested_threshold < 200
+
+    def test_invalid_variant_raises(self):
+        with pytest.raises(ValueError, match="threshold"):
+            sweep_image(_gradient_png(), [SweepVariant(threshold=300)])
+
+
+class TestOtsuAndContactSheet:
+    def test_otsu_single_level_defaults_to_128(self):
+        hist = [0] * 256
+        hist[90] = 50
+        assert otsu_threshold(hist) == 128
+
+    def test_otsu_black_and_white(self):
+        hist = [0] * 256
+        hist[0] = hist[255] = 10
+        assert otsu_threshold(hist) == 0
+
+    def test_contact_sheet_layout(self):
+        results = sweep_image(
+            _gradient_png(),
+            [SweepVariant(), SweepVariant(target_stitches=10)],
+            stitch_aspect_ratio=1.0,
+        ).results
+        sheet = contact_sheet(results, gap=4)
+        assert sheet.size == (40 + 4 + 10, 12)
+        assert sheet.getpixel((41, 0)) == 128  # gutter
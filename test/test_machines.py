@@ -0,0 +1,134 @@
+"""
+tests/test_machines.py — Tests for machine profiles and per-machine routes.
+
+Covers:
+  GET/POST /machines, DELETE /machines/{name}
+  /machines/{name}/... routes acting on that machine only
+  per-machine emulator task checks and serial port / disk_dir ownership
+
+Run with:
+    pytest tests/test_machines.py -v
+
+Import strategy
+---------------
+As in test_stage2_editor.py, app.api and the client are re-used from
+test_api.py.  app.api's DiskImage and MachineModel are mocks there, so
+setup_method points DiskImage.blank and MachineModel at the real ones,
+giving new machines genuine disk images.
+"""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from .test_api import _api_module, _mock_disk_image_cls, client
+
+from app.brother_format import DiskImage, MachineModel
+
+_state = _api_module._state
+_machines = _api_module._machines
+
+
+class TestMachines:
+    def setup_method(self) -> None:
+        _mock_disk_image_cls.blank.side_effect = (
+            lambda model=MachineModel.KH940: DiskImage.blank(model)
+        )
+        self._model = patch.object(_api_module, "MachineModel", MachineModel)
+        self._model.start()
+        self._saved_default = (_state.disk, _state.model)
+        _state.disk = DiskImage.blank()
+        _state.model = MachineModel.KH940
+
+    def teardown_method(self) -> None:
+        for name in list(_machines):
+            if _machines[name] is not _state:
+                _api_module._stop_machine(_machines.pop(name))
+        _state.disk, _state.model = self._saved_default
+        _state.serial_port = ""
+        self._model.stop()
+        _mock_disk_image_cls.blank.side_effect = None
+
+    def _add(self, name: str, **fields: object) -> dict:
+        r = client.post("/machines", json={"name": name, **fields})
+        assert r.status_code == 201, r.text
+        return r.json()
+
+    def test_add_and_list(self) -> None:
+        info = self._add("left", serial_port="/dev/ttyUSB1", model="KH-930")
+        assert info["disk_dir"] == "/tmp/knitting_disk-left"
+        assert info["model"] == "KH-930"
+        r = client.get("/machines")
+        names = [m["name"] for m in r.json()["machines"]]
+        assert names == ["default", "left"]
+
+    def test_routes_act_on_the_named_machine(self) -> None:
+        self._add("left")
+        _machines["left"].disk.write_pattern(901, [[1, 0, 1, 0]] * 2)
+
+        r = client.get("/machines/left/patterns")
+        assert [p["number"] for p in r.json()["patterns"]] == [901]
+        assert client.get("/patterns").json()["patterns"] == []
+
+        client.patch(
+            "/machines/left/pattern/901", json={"memo": [{"row": 0, "value": 5}]}
+        )
+        assert _machines["left"].disk.read_memo(901)[0] == 5
+        client.delete("/machines/left/disk")
+        assert _machines["left"].disk.list_patterns() == []
+
+    def test_unknown_machine_is_404(self) -> None:
+        assert client.get("/machines/nope/patterns").status_code == 404
+
+    def test_invalid_or_duplicate_profiles_are_rejected(self) -> None:
+        self._add("left", serial_port="/dev/ttyUSB1")
+        assert client.post("/machines", json={"name": "a b"}).status_code == 422
+        assert client.post("/machines", json={"name": "left"}).status_code == 409
+        assert client.post("/machines", json={"name": "default"}).status_code == 409
+        r = client.post(
+            "/machines", json={"name": "right", "serial_port": "/dev/ttyUSB1"}
+        )
+        assert r.status_code == 409
+        r = client.post(
+            "/machines",
+            json={"name": "right", "disk_dir": "/tmp/knitting_disk-left"},
+        )
+        assert r.status_code == 409
+        assert "right" not in _machines
+
+    def test_config_rejects_port_of_another_machine(self) -> None:
+        self._add("left", serial_port="/dev/ttyUSB1")
+        r = client.put("/config", json={"serial_port": "/dev/ttyUSB1"})
+        assert r.status_code == 409
+        r = client.put("/machines/left/config", json={"baud_rate": 19200})
+        assert r.json()["serial_port"] == "/dev/ttyUSB1"
+        assert _machines["left"].baud_rate == 19200
+
+    def test_transfers_on_different_machines_run_side_by_side(self) -> None:
+        self._add("left", serial_port="/dev/ttyUSB1")
+        self._add("right", serial_port="/dev/ttyUSB2")
+        busy = _api_module._TaskState(status=_api_module._TaskStatus.RUNNING)
+        _machines["left"].tasks["t"] = busy
+
+        assert client.post("/machines/left/send").status_code == 409
+        with patch("threading.Thread") as thread:
+            thread.return_value = MagicMock()
+            r = client.post("/machines/right/send")
+        assert r.status_code == 200
+        machine, task_id, _ = thread.call_args.kwargs["args"]
+        assert machine is _machines["right"]
+        assert task_id in _machines["right"].tasks
+        assert client.get(f"/machines/right/send/{task_id}").status_code == 200
+        assert client.get(f"/machines/left/send/{task_id}").status_code == 404
+
+        listed = {
+            m["name"]: m["busy"] for m in client.get("/machines").json()["machines"]
+        }
+        assert listed == {"default": False, "left": True, "right": False}
+
+    def test_remove_machine(self) -> None:
+        self._add("left")
+        assert client.delete("/machines/left").status_code == 200
+        assert "left" not in _machines
+        assert client.delete("/machines/default").status_code == 409
+        assert client.delete("/machines/left").status_code == 404
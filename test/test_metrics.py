@@ -0,0 +1,130 @@
+"""
+tests/test_metrics.py — Tests for app/metrics.py and GET /metrics.
+
+Run with:
+    pytest tests/test_metrics.py -v
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from app.metrics import CONTENT_TYPE, REGISTRY, Laps, Registry
+
+from .helpers import _make_png_bytes
+from .test_api import client
+
+
+def _sample(text: str, series: str) -> float:
+    """Value of *series* (name plus labels, as rendered) in *text*."""
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+class TestRegistry:
+    def test_counter_renders_with_labels(self):
+        reg = Registry()
+        c = reg.counter("x_total", "Things.", ("kind",))
+        c.labels("a").inc()
+        c.labels("a").inc(2)
+        c.labels('b"\\').inc()
+        text = reg.render()
+        assert "# HELP x_total Things.\n# TYPE x_total counter\n" in text
+        assert 'x_total{kind="a"} 3\n' in text
+        assert 'x_total{kind="b\\"\\\\"} 1\n' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        reg = Registry()
+        h = reg.histogram("t_seconds", "Time.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            h.observe(value)
+        text = reg.render()
+        assert 't_seconds_bucket{le="0.1"} 2\n' in text
+        assert 't_seconds_bucket{le="1"} 3\n' in text
+        assert 't_seconds_bucket{le="+Inf"} 4\n' in text
+        assert "t_seconds_sum 3.65\n" in text
+        assert "t_seconds_count 4\n" in text
+
+    def test_histogram_le_follows_own_labels(self):
+        reg = Registry()
+        h = reg.histogram("t_seconds", "Time.", ("op",), buckets=(1.0,))
+        with h.labels("x").time():
+            pass
+        assert 't_seconds_bucket{op="x",le="1"} 1\n' in reg.render()
+
+    def test_timed_records_even_when_raising(self):
+        reg = Registry()
+        h = reg.histogram("t_seconds", "Time.")
+
+        @h.labels().timed
+        def fail() -> None:
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            fail()
+        assert "t_seconds_count 1\n" in reg.render()
+
+    def test_laps_time_each_stage(self):
+        reg = Registry()
+        h = reg.histogram("s_seconds", "Stages.", ("stage",))
+        lap = Laps(h)
+        lap("one")
+        lap("two")
+        text = reg.render()
+        assert 's_seconds_count{stage="one"} 1\n' in text
+        assert 's_seconds_count{stage="two"} 1\n' in text
+
+    def test_label_count_is_checked(self):
+        c = Registry().counter("x_total", "Things.", ("kind",))
+        with pytest.raises(ValueError):
+            c.labels()
+
+    def test_redeclaring_returns_same_metric(self):
+        reg = Registry()
+        c = reg.counter("x_total", "Things.", ("kind",))
+        assert reg.counter("x_total", "Things.", ("kind",)) is c
+        with pytest.raises(ValueError):
+            reg.histogram("x_total", "Things.", ("kind",))
+
+    def test_take_and_merge_move_recordings(self):
+        worker, server = Registry(), Registry()
+        for reg in (worker, server):
+            reg.counter("x_total", "Things.")
+            reg.histogram("t_seconds", "Time.", buckets=(1.0,))
+        worker.counter("x_total", "Things.").inc(4)
+        worker.histogram("t_seconds", "Time.", buckets=(1.0,)).observe(2.0)
+
+        server.merge(worker.take())
+        server.merge(worker.take())  # nothing new the second time
+        text = server.render()
+        assert "x_total 4\n" in text
+        assert 't_seconds_bucket{le="+Inf"} 1\n' in text
+        assert "t_seconds_sum 2\n" in text
+        assert worker.take() == {}
+
+
+class TestMetricsEndpoint:
+    def test_prometheus_text(self):
+        r = client.get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"] == CONTENT_TYPE
+        assert "# TYPE knitting_http_request_duration_seconds histogram" in r.text
+
+    def test_requests_are_labelled_by_route(self):
+        series = (
+            'knitting_http_requests_total{method="GET",'
+            'route="/machines/{machine}/patterns",status="404"}'
+        )
+        before = _sample(REGISTRY.render(), series)
+        client.get("/machines/nope/patterns")
+        assert _sample(client.get("/metrics").text, series) == before + 1
+
+    def test_load_image_stages_are_timed(self):
+        series = 'knitting_load_image_stage_seconds_count{stage="scale"}'
+        before = _sample(REGISTRY.render(), series)
+        from app.image import load_image
+
+        load_image(_make_png_bytes(20, 10, color=0))
+        assert _sample(REGISTRY.render(), series) == before + 1
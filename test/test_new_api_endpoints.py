@@ -7,6 +7,9 @@ in the Step 1–4 batch:
   POST /disk/upload
   GET  /preview/pattern/{number}
   DELETE /pattern/{number}
+  GET  /disk/thumbnails
+  background thumbnail store
+  ETag / If-None-Match on read endpoints
 
 Run with:
     pytest tests/test_new_api_endpoints.py -v
@@ -31,6 +34,8 @@ from unittest.mock import MagicMock
 import pytest
 from PIL import Image
 
+from app.util import pack_rows
+
 # Re-use the already-patched module and client from test_api so we don't
 # re-import app.api against the real (unpatched) brother_format.
 from .test_api import _api_module, _mock_disk, _mock_disk_image_cls, client
@@ -53,7 +58,8 @@ def _make_disk_with_patterns(*numbers: int) -> MagicMock:
     Return a mock DiskImage that reports the given pattern numbers.
 
     list_patterns() returns PatternEntry-like mocks.
-    read_pattern(n) returns a 5×10 pixel grid for any number in `numbers`.
+    read_pattern(n) returns a 5×10 pixel grid for any number in `numbers`,
+    and read_pattern_packed(n) the same grid packed.
     read_memo(n) returns a list of five zeros.
     get_pattern_entry(n) returns a mock entry or None.
     """
@@ -82,6 +88,11 @@ def _make_disk_with_patterns(*numbers: int) -> MagicMock:
 
     disk.read_pattern.side_effect = _read_pattern
 
+    def _read_pattern_packed(n):
+        return pack_rows(_read_pattern(n), 10)
+
+    disk.read_pattern_packed.side_effect = _read_pattern_packed
+
     def _read_memo(n):
         if n in numbers:
             return [0] * 5
@@ -385,17 +396,34 @@ class TestPreviewPattern:
         img = Image.open(io.BytesIO(png_bytes))
         assert img.size == (10, 5)
 
+    def test_png_variant_returns_image_body(self):
+        resp = client.get("/preview/pattern/901.png")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "image/png"
+        assert resp.headers["X-Pattern-Width"] == "10"
+        assert resp.headers["X-Pattern-Height"] == "5"
+        img = Image.open(io.BytesIO(resp.content))
+        assert (img.mode, img.size) == ("1", (10, 5))
+
+    def test_png_variant_missing_pattern_returns_404(self):
+        assert client.get("/preview/pattern/999.png").status_code == 404
+
+    def test_bad_compress_level_returns_422(self):
+        resp = client.get("/preview/pattern/901", params={"compress_level": -1})
+        assert resp.status_code == 422
+
     def test_read_pattern_called_with_correct_number(self):
-        _state.disk.read_pattern.reset_mock()
+        _state.disk.read_pattern_packed.reset_mock()
         client.get("/preview/pattern/902")
-        _state.disk.read_pattern.assert_called_with(902)
+        _state.disk.read_pattern_packed.assert_called_with(902)
+        _state.disk.read_pattern.assert_not_called()
 
     @pytest.mark.filterwarnings("ignore::DeprecationWarning")
     def test_knit_pixels_render_black(self):
         """Stitch value 1 should appear as pixel luminance 0 (black)."""
         solid_knit_disk = _make_disk_with_patterns(901)
-        solid_knit_disk.read_pattern.side_effect = None
-        solid_knit_disk.read_pattern.return_value = [[1, 1], [1, 1]]
+        solid_knit_disk.read_pattern_packed.side_effect = None
+        solid_knit_disk.read_pattern_packed.return_value = pack_rows([[1] * 10] * 5, 10)
         _state.disk = solid_knit_disk
 
         resp = client.get("/preview/pattern/901")
@@ -408,8 +436,8 @@ class TestPreviewPattern:
     def test_skip_pixels_render_white(self):
         """Stitch value 0 should appear as pixel luminance 255 (white)."""
         solid_skip_disk = _make_disk_with_patterns(901)
-        solid_skip_disk.read_pattern.side_effect = None
-        solid_skip_disk.read_pattern.return_value = [[0, 0], [0, 0]]
+        solid_skip_disk.read_pattern_packed.side_effect = None
+        solid_skip_disk.read_pattern_packed.return_value = pack_rows([[0] * 10] * 5, 10)
         _state.disk = solid_skip_disk
 
         resp = client.get("/preview/pattern/901")
@@ -483,27 +511,27 @@ class TestDeletePattern:
         """The surviving pattern should be re-written into the new disk."""
         self._setup_disk(901, 902)
         new_disk = _make_disk_with_patterns()
-        new_disk.write_pattern.return_value = None
+        new_disk.write_pattern_packed.return_value = None
         _mock_disk_image_cls.blank.return_value = new_disk
         client.delete("/pattern/901")
-        # write_pattern should have been called once (for survivor 902)
-        new_disk.write_pattern.assert_called_once()
-        call_args = new_disk.write_pattern.call_args
+        # write_pattern_packed should have been called once (for survivor 902)
+        new_disk.write_pattern_packed.assert_called_once()
+        call_args = new_disk.write_pattern_packed.call_args
         assert call_args[0][0] == 902
 
     def test_compaction_preserves_memo(self):
-        """Memo values for surviving patterns must be passed to write_pattern."""
+        """Memo values for surviving patterns must be passed to the writer."""
         disk = self._setup_disk(901, 902)
         # Give pattern 902 a distinctive memo
         memo_902 = [1, 2, 3, 4, 5]
         disk.read_memo.side_effect = lambda n: memo_902 if n == 902 else [0] * 5
         new_disk = _make_disk_with_patterns()
-        new_disk.write_pattern.return_value = None
+        new_disk.write_pattern_packed.return_value = None
         _mock_disk_image_cls.blank.return_value = new_disk
         client.delete("/pattern/901")
-        call_args = new_disk.write_pattern.call_args
-        # Third positional arg is memo_values
-        assert call_args[0][2] == memo_902
+        call_args = new_disk.write_pattern_packed.call_args
+        # Fifth positional arg is memo_values
+        assert call_args[0][4] == memo_902
 
     def test_delete_only_pattern_leaves_empty_disk(self):
         self._setup_disk(901)
@@ -552,3 +580,184 @@ class TestDiskStatusBytesTotal:
         body = resp.json()
         used = body["bytes_total"] - body["bytes_remaining"]
         assert used == 512
+
+
+# ---------------------------------------------------------------------------
+# GET /disk/thumbnails
+# ---------------------------------------------------------------------------
+
+
+class TestDiskThumbnails:
+    def setup_method(self):
+        from app.brother_format import DiskImage
+
+        self._orig_disk = _state.disk
+        _state.disk = DiskImage.blank()
+        _state.disk.write_pattern(901, _make_pixel_rows(10, 5))
+        _state.disk.write_pattern(902, [[1] * 3] * 4)
+
+    def teardown_method(self):
+        _state.disk = self._orig_disk
+
+    def _sheet(self, body):
+        png_bytes = base64.b64decode(body["data_uri"].split(",", 1)[1])
+        return Image.open(io.BytesIO(png_bytes)).convert("L")
+
+    def test_index_lists_every_pattern(self):
+        body = client.get("/disk/thumbnails").json()
+        sizes = {s["number"]: (s["width"], s["height"]) for s in body["sprites"]}
+        assert sizes == {901: (10, 5), 902: (3, 4)}
+        assert body["generation"] == _state.disk.generation
+
+    def test_sprites_hold_pattern_pixels(self):
+        body = client.get("/disk/thumbnails").json()
+        sheet = self._sheet(body)
+        assert (sheet.width, sheet.height) == (body["width"], body["height"])
+        for s in body["sprites"]:
+            tile = sheet.crop(
+                (s["x"], s["y"], s["x"] + s["width"], s["y"] + s["height"])
+            )
+            expected = _state.disk.read_pattern(s["number"])
+            pixels = [
+                [int(tile.getpixel((x, y)) == 0) for x in range(s["width"])]
+                for y in range(s["height"])
+            ]
+            assert pixels == expected
+
+    def test_sheet_is_rebuilt_after_a_write(self):
+        first = client.get("/disk/thumbnails").json()
+        assert client.get("/disk/thumbnails").json() == first
+        _state.disk.write_pattern(903, [[1]])
+        second = client.get("/disk/thumbnails").json()
+        assert second["generation"] != first["generation"]
+        assert [s["number"] for s in second["sprites"]] == [901, 902, 903]
+
+    def test_empty_disk(self):
+        from app.brother_format import DiskImage
+
+        _state.disk = DiskImage.blank()
+        body = client.get("/disk/thumbnails").json()
+        assert body["sprites"] == []
+
+
+class TestThumbnailStoreWiring:
+    def setup_method(self):
+        from app.brother_format import DiskImage
+
+        self._orig_disk = _state.disk
+        _state.disk = DiskImage.blank()
+
+    def teardown_method(self):
+        _state.disk = self._orig_disk
+
+    def test_write_populates_store_and_preview_skips_codec(self):
+        from .helpers import _make_png_bytes
+
+        resp = client.post(
+            "/pattern",
+            data={"number": "901"},
+            files={"file": ("t.png", _make_png_bytes(), "image/png")},
+        )
+        assert resp.status_code == 200
+        assert _state.thumbnails.wait(5)
+        thumb = _state.thumbnails.get(901, _state.disk.generation)
+        assert thumb is not None
+
+        # Served from the store: the disk is not decoded on the request path.
+        _state.disk.read_pattern_packed = MagicMock(side_effect=AssertionError)
+        resp = client.get("/preview/pattern/901.png")
+        assert resp.status_code == 200
+        assert resp.content == thumb.png
+
+    def test_non_default_compress_level_renders_on_request(self):
+        _state.disk.write_pattern(901, _make_pixel_rows())
+        _api_module._disk_changed(_state)
+        assert _state.thumbnails.wait(5)
+        resp = client.get("/preview/pattern/901.png", params={"compress_level": 0})
+        assert resp.status_code == 200
+        thumb = _state.thumbnails.get(901, _state.disk.generation)
+        assert resp.content != thumb.png
+
+
+class TestConditionalGets:
+    def setup_method(self):
+        from app.brother_format import DiskImage
+
+        self._orig_disk = _state.disk
+        _state.disk = DiskImage.blank()
+        _state.disk.write_pattern(901, _make_pixel_rows())
+
+    def teardown_method(self):
+        _state.disk = self._orig_disk
+
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/patterns",
+            "/disk/status",
+            "/disk/thumbnails",
+            "/preview/pattern/901",
+            "/preview/pattern/901.png",
+            "/pattern/901/pixels",
+        ],
+    )
+    def test_if_none_match_returns_304(self, path):
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert etag.startswith('"') and first.headers["Cache-Control"] == "no-cache"
+        again = client.get(path, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+
+    def test_disk_etag_changes_on_every_write(self):
+        etag = client.get("/disk/status").headers["ETag"]
+        _state.disk.write_pattern(902, _make_pixel_rows())
+        resp = client.get("/disk/status", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
+    def test_disk_etag_changes_when_disk_is_replaced(self):
+        from app.brother_format import DiskImage
+
+        etag = client.get("/patterns").headers["ETag"]
+        _state.disk = DiskImage.from_bytes(_state.disk.working_region_bytes())
+        assert client.get("/patterns").headers["ETag"] != etag
+
+    def test_pattern_etag_ignores_other_patterns(self):
+        etag = client.get("/pattern/901/pixels").headers["ETag"]
+        _state.disk.write_pattern(902, _make_pixel_rows())
+        resp = client.get("/pattern/901/pixels", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_pattern_etag_differs_per_representation(self):
+        tags = {
+            client.get("/preview/pattern/901").headers["ETag"],
+            client.get("/preview/pattern/901.png").headers["ETag"],
+            client.get("/pattern/901/pixels").headers["ETag"],
+            client.get(
+                "/preview/pattern/901.png", params={"compress_level": 9}
+            ).headers["ETag"],
+        }
+        assert len(tags) == 4
+
+    def test_weak_list_and_wildcard_match(self):
+        etag = client.get("/disk/status").headers["ETag"]
+        listed = f'"other", W/{etag}'
+        assert (
+            client.get("/disk/status", headers={"If-None-Match": listed}).status_code
+            == 304
+        )
+        assert (
+            client.get("/disk/status", headers={"If-None-Match": "*"}).status_code
+            == 304
+        )
+        assert (
+            client.get("/disk/status", headers={"If-None-Match": '"x"'}).status_code
+            == 200
+        )
+
+    def test_missing_pattern_is_404_not_304(self):
+        resp = client.get("/preview/pattern/950.png", headers={"If-None-Match": "*"})
+        assert resp.status_code == 404
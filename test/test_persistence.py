@@ -0,0 +1,156 @@
+"""
+tests/test_persistence.py — Tests for the disk state store in app/persistence.py.
+
+Run with:
+    pytest tests/test_persistence.py -v
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+
+from app.brother_format import DiskImage, MachineModel
+from app.persistence import JOURNAL_FILE, SECTORS_FILE, SNAPSHOT_FILE, DiskStore
+
+KH940 = MachineModel.KH940.value
+
+
+def _region(*patterns: int) -> bytes:
+    disk = DiskImage.blank()
+    for number in patterns:
+        disk.write_pattern(number, [[(x + number) % 2 for x in range(8)]] * 4)
+    return disk.working_region_bytes()
+
+
+@pytest.fixture
+def store():
+    s = DiskStore()
+    yield s
+    s.close()
+
+
+class TestDiskStore:
+    def test_empty_directory_has_no_state(self, store, tmp_path):
+        assert store.open(tmp_path / "disk") is None
+        assert (tmp_path / "disk").is_dir()
+
+    def test_closed_store_writes_nothing(self, tmp_path):
+        s = DiskStore()
+        s.open(tmp_path)
+        s.close()
+        s.record(_region(901), KH940)
+        s.save_sectors({0: b"\x01"}, {})
+        assert sorted(p.name for p in tmp_path.iterdir()) == [JOURNAL_FILE]
+
+    def test_restores_last_recorded_state(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(901), KH940)
+        store.record(_region(901, 902), KH940)
+        store.close()
+
+        state = DiskStore().open(tmp_path)
+        assert state is not None
+        assert state.model == KH940
+        assert state.region == _region(901, 902)
+        disk = DiskImage.from_bytes(state.region, MachineModel(state.model))
+        assert [e.number for e in disk.list_patterns()] == [901, 902]
+
+    def test_edits_are_journalled_as_changed_blocks(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(), KH940)
+        store.record(_region(901), KH940)
+        journal = (tmp_path / JOURNAL_FILE).stat().st_size
+        assert 0 < journal < 1024
+
+    def test_replays_journal_after_crash(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(), KH940)
+        store.record(_region(901), KH940)
+        store.record(_region(901, 902), KH940)
+        # No close(): the journal is all that holds the last two edits.
+        state = DiskStore().open(tmp_path)
+        assert state is not None and state.region == _region(901, 902)
+
+    def test_torn_journal_tail_is_discarded(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(), KH940)
+        store.record(_region(901), KH940)
+        intact = (tmp_path / JOURNAL_FILE).stat().st_size
+        store.record(_region(901, 902), KH940)
+        with open(tmp_path / JOURNAL_FILE, "r+b") as f:
+            f.truncate(intact + 10)
+
+        state = DiskStore().open(tmp_path)
+        assert state is not None and state.region == _region(901)
+
+    def test_compacts_journal_into_snapshot(self, tmp_path):
+        s = DiskStore(compact_bytes=100)
+        s.open(tmp_path)
+        s.record(_region(), KH940)
+        s.record(_region(901), KH940)
+        assert (tmp_path / JOURNAL_FILE).stat().st_size == 0
+        snapshot = (tmp_path / SNAPSHOT_FILE).read_bytes()
+        assert snapshot.endswith(_region(901))
+        s.close()
+
+    def test_open_folds_replayed_journal_into_snapshot(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(), KH940)
+        store.record(_region(901), KH940)
+        reopened = DiskStore()
+        reopened.open(tmp_path)
+        assert (tmp_path / JOURNAL_FILE).stat().st_size == 0
+        reopened.record(_region(901, 902), KH940)
+        state = DiskStore().open(tmp_path)
+        assert state is not None and state.region == _region(901, 902)
+        reopened.close()
+
+    def test_open_after_replay_holds_one_journal_handle(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(), KH940)
+        store.record(_region(901), KH940)
+        handles = []
+
+        def _open(*args, **kwargs):
+            handles.append(open(*args, **kwargs))
+            return handles[-1]
+
+        reopened = DiskStore()
+        with patch("app.persistence.open", _open, create=True):
+            reopened.open(tmp_path)
+        journals = [f for f in handles if f.name.endswith(JOURNAL_FILE)]
+        assert [f.closed for f in journals] == [False]
+        reopened.close()
+        assert journals[0].closed
+
+    def test_corrupt_snapshot_is_ignored(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(901), KH940)
+        store.close()
+        data = bytearray((tmp_path / SNAPSHOT_FILE).read_bytes())
+        data[-1] ^= 0xFF
+        (tmp_path / SNAPSHOT_FILE).write_bytes(bytes(data))
+        assert DiskStore().open(tmp_path) is None
+
+    def test_model_change_writes_snapshot(self, store, tmp_path):
+        kh930 = DiskImage.blank(MachineModel.KH930).working_region_bytes()
+        store.open(tmp_path)
+        store.record(_region(901), KH940)
+        store.record(kh930, MachineModel.KH930.value)
+        state = DiskStore().open(tmp_path)
+        assert state is not None
+        assert (state.model, state.region) == (MachineModel.KH930.value, kh930)
+
+    def test_sectors_round_trip(self, store, tmp_path):
+        store.open(tmp_path)
+        store.record(_region(), KH940)
+        dat = {0: b"\x01" * 1024, 5: b"\x02" * 1024}
+        ids = {0: b"\x00" * 12, 5: b"\x05" * 12, 7: b"\x07" * 12}
+        store.save_sectors(dat, ids)
+        assert not (tmp_path / (SECTORS_FILE + ".tmp")).exists()
+
+        state = DiskStore().open(tmp_path)
+        assert state is not None
+        assert (state.sector_dat, state.sector_id) == (dat, ids)
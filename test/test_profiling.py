@@ -0,0 +1,167 @@
+"""
+tests/test_profiling.py — Tests for app/profiling.py and the /admin/profile
+endpoints.
+
+Run with:
+    pytest tests/test_profiling.py -v
+"""
+
+from __future__ import annotations
+
+import marshal
+from unittest.mock import patch
+
+import pytest
+
+from app.profiling import EMULATOR, Profiler
+
+from .test_api import _api_module, client
+
+
+def _busy() -> int:
+    return sum(i * i for i in range(20000))
+
+
+class TestProfiler:
+    def test_unarmed_capture_records_nothing(self):
+        profiler = Profiler()
+        with profiler.capture("/patterns", "GET"):
+            _busy()
+        assert profiler.profiles() == []
+
+    def test_route_template_matches_next_count_requests(self):
+        profiler = Profiler()
+        trigger = profiler.arm("/preview/pattern/{number}", count=2, method="GET")
+        for path in ("/preview/pattern/901", "/preview/pattern/901/fabric"):
+            with profiler.capture(path, "GET"):
+                pass
+        with profiler.capture("/preview/pattern/902", "POST"):
+            pass
+        assert len(profiler.profiles()) == 1
+        assert trigger.remaining == 1
+        with profiler.capture("/preview/pattern/903", "GET"):
+            pass
+        assert profiler.triggers() == []
+        assert [p.label for p in profiler.profiles()] == [
+            "/preview/pattern/901",
+            "/preview/pattern/903",
+        ]
+
+    def test_cpu_profile_exports(self):
+        profiler = Profiler()
+        profiler.arm(EMULATOR)
+        with profiler.capture(EMULATOR, label="send default"):
+            _busy()
+        (profile,) = profiler.profiles()
+        assert profile.kind == "cpu" and profile.label == "send default"
+
+        stats = marshal.loads(profile.export("pstats"))
+        assert any(func[2] == "_busy" for func in stats)
+        assert "_busy" in profile.export("text").decode()
+        collapsed = profile.export("collapsed").decode().splitlines()
+        assert collapsed and all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed)
+        assert any("_busy (test_profiling.py:" in line for line in collapsed)
+
+    def test_memory_profile(self):
+        profiler = Profiler()
+        profiler.arm("/x", kind="memory")
+        with profiler.capture("/x"):
+            kept = [bytearray(4096) for _ in range(10)]
+        (profile,) = profiler.profiles()
+        assert "Peak traced memory" in profile.export("text").decode()
+        assert "test_profiling.py:" in profile.export("collapsed").decode()
+        with pytest.raises(ValueError):
+            profile.export("pstats")
+        del kept
+
+    def test_only_one_capture_at_a_time(self):
+        profiler = Profiler()
+        profiler.arm("/x", count=2)
+        with profiler.capture("/x"):
+            with profiler.capture("/x"):
+                pass
+        assert len(profiler.profiles()) == 1
+        assert profiler.triggers()[0].remaining == 1
+
+    def test_capture_that_cannot_start_keeps_the_trigger(self):
+        profiler = Profiler()
+        trigger = profiler.arm("/x")
+        with patch("cProfile.Profile.enable", side_effect=ValueError):
+            with profiler.capture("/x"):
+                pass
+        assert profiler.profiles() == []
+        assert profiler.triggers() == [trigger] and trigger.remaining == 1
+        with profiler.capture("/x"):
+            pass
+        assert len(profiler.profiles()) == 1 and profiler.triggers() == []
+
+    def test_store_is_bounded(self):
+        profiler = Profiler(max_profiles=2)
+        profiler.arm("/x", count=3)
+        for _ in range(3):
+            with profiler.capture("/x"):
+                pass
+        assert len(profiler.profiles()) == 2
+
+    def test_invalid_target(self):
+        with pytest.raises(ValueError):
+            Profiler().arm("patterns")
+
+
+class TestProfileEndpoints:
+    _auth = {"Authorization": "Bearer s3cret"}
+
+    def setup_method(self):
+        self._token = patch.object(_api_module, "_admin_token", "s3cret")
+        self._token.start()
+        self._profiler = patch.object(_api_module, "_profiler", Profiler())
+        self._profiler.start()
+
+    def teardown_method(self):
+        self._profiler.stop()
+        self._token.stop()
+
+    def test_requires_admin_token(self):
+        assert client.get("/admin/profile").status_code == 401
+        r = client.get("/admin/profile", headers={"Authorization": "Bearer nope"})
+        assert r.status_code == 401
+        with patch.object(_api_module, "_admin_token", ""):
+            assert client.get("/admin/profile", headers=self._auth).status_code == 403
+
+    def test_profile_a_route(self):
+        r = client.post(
+            "/admin/profile",
+            json={"target": "/machines/{machine}/patterns", "method": "get"},
+            headers=self._auth,
+        )
+        assert r.status_code == 201
+        assert r.json()["method"] == "GET"
+
+        client.get("/machines/default/patterns")
+        listed = client.get("/admin/profile", headers=self._auth).json()
+        assert listed["triggers"] == []
+        (profile,) = listed["profiles"]
+        assert profile["label"] == "GET /machines/default/patterns"
+
+        r = client.get(
+            f"/admin/profile/{profile['id']}?format=pstats", headers=self._auth
+        )
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/octet-stream"
+        assert marshal.loads(r.content)
+        r = client.get(
+            f"/admin/profile/{profile['id']}?format=collapsed", headers=self._auth
+        )
+        assert "list_patterns" in r.text
+
+    def test_bad_requests(self):
+        r = client.post("/admin/profile", json={"target": "x"}, headers=self._auth)
+        assert r.status_code == 422
+        r = client.get("/admin/profile/missing", headers=self._auth)
+        assert r.status_code == 404
+
+    def test_disarm(self):
+        client.post("/admin/profile", json={"target": "emulator"}, headers=self._auth)
+        r = client.delete("/admin/profile", headers=self._auth)
+        assert r.json()["detail"] == "1 trigger(s) removed."
+        assert _api_module._profiler.triggers() == []
@@ -0,0 +1,99 @@
+"""
+tests/test_render.py — Tests for the fabric preview renderer in app/render.py.
+
+Run with:
+    pytest tests/test_render.py -v
+"""
+
+from __future__ import annotations
+
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+import app.render as render
+from app.render import render_fabric, render_fabric_png
+from app.util import pack_rows
+
+KNIT = (200, 0, 0)
+BACKGROUND = (0, 0, 200)
+
+
+def _cell_colour(img: Image.Image, x: int, y: int, cell=(8, 6)) -> str:
+    """Which yarn a stitch cell was drawn in, judged by its dominant channel."""
+    w, h = cell
+    r, _, b = (
+        img.crop((x * w, y * h, (x + 1) * w, (y + 1) * h))
+        .resize((1, 1))
+        .getpixel((0, 0))
+    )
+    return "knit" if r > b else "background"
+
+
+class TestRenderFabric:
+    def test_size_follows_cell(self):
+        img = render_fabric(pack_rows([[1, 0, 1]] * 2, 3), 3, 2, cell=(8, 6))
+        assert img.mode == "RGB"
+        assert img.size == (24, 12)
+
+    def test_each_cell_in_its_yarn_colour(self):
+        grid = [[1, 0, 0, 1, 1], [0, 1, 0, 0, 1]]
+        img = render_fabric(
+            pack_rows(grid, 5), 5, 2, knit_colour=KNIT, background_colour=BACKGROUND
+        )
+        for y, row in enumerate(grid):
+            for x, value in enumerate(row):
+                assert _cell_colour(img, x, y) == ("knit" if value else "background")
+
+    def test_cells_share_one_sprite(self):
+        img = render_fabric(pack_rows([[1] * 4], 4), 4, 1, knit_colour=(255, 255, 255))
+        first = img.crop((0, 0, 8, 6)).tobytes()
+        assert all(
+            img.crop((x * 8, 0, x * 8 + 8, 6)).tobytes() == first for x in range(4)
+        )
+
+    def test_full_size_pattern_is_fast(self):
+        import time
+
+        packed = pack_rows([[(x + y) % 2 for x in range(200)] for y in range(999)], 200)
+        start = time.perf_counter()
+        render_fabric(packed, 200, 999)
+        assert time.perf_counter() - start < 2.0
+
+    @pytest.mark.parametrize(
+        "stitches,rows,cell", [(0, 1, (8, 6)), (1, 1, (1, 6)), (200, 999, (32, 24))]
+    )
+    def test_invalid_arguments_raise(self, stitches, rows, cell):
+        with pytest.raises(ValueError):
+            render_fabric(b"\x00", stitches, rows, cell=cell)
+
+
+class TestRenderFabricPng:
+    def setup_method(self):
+        render._cache.clear()
+        render._cache_bytes = 0
+
+    def test_returns_png(self):
+        png = render_fabric_png(pack_rows([[1, 0]], 2), 2, 1)
+        assert Image.open(io.BytesIO(png)).size == (16, 6)
+
+    def test_cached_by_content(self):
+        packed = pack_rows([[1, 0, 1]], 3)
+        with patch.object(render, "render_fabric", wraps=render.render_fabric) as r:
+            first = render_fabric_png(packed, 3, 1)
+            again = render_fabric_png(bytes(packed), 3, 1)
+            assert r.call_count == 1
+            assert again is first
+            render_fabric_png(pack_rows([[0, 1, 1]], 3), 3, 1)
+            render_fabric_png(packed, 3, 1, knit_colour=(1, 2, 3))
+            assert r.call_count == 3
+
+    def test_cache_is_bounded_by_bytes(self):
+        with patch.object(render, "_CACHE_BYTES", 1000):
+            for n in range(20):
+                render_fabric_png(n.to_bytes(2, "little"), 16, 1)
+            assert 0 < render._cache_bytes <= 1000
+            assert render._cache_bytes == sum(map(len, render._cache.values()))
+            assert len(render._cache) < 20
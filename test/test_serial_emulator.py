@@ -401,3 +401,42 @@ class TestOpModeChecksum:
             for data_len in [0, 1, 5, 10]:
                 data = bytes([req % 256] * data_len)
                 assert 0 <= self._ck(req, data) <= 255
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+
+class TestMetrics:
+    def _counts(self) -> tuple[float, ...]:
+        return (
+            se._BYTES_IN.value,
+            se._BYTES_OUT.value,
+            se._SECTORS.labels("served").value,
+            se._SECTORS.labels("written").value,
+            se._ACK_TIMEOUTS.labels().value,
+            sum(se._COMMAND_SECONDS.labels("R").counts),
+        )
+
+    def _delta(self, before: tuple[float, ...]) -> tuple[float, ...]:
+        return tuple(a - b for a, b in zip(self._counts(), before))
+
+    def test_read_sector_is_counted(self, tmp_path):
+        emu = _make_emulator(tmp_path)
+        before = self._counts()
+        emu._handle_fdc(se._SerialIO(_FakePort(b"0\r\r")), "R")
+        assert self._delta(before) == (3, 8 + se.SECTOR_SIZE, 1, 0, 0, 1)
+
+    def test_write_sector_is_counted(self, tmp_path):
+        emu = _make_emulator(tmp_path)
+        before = self._counts()
+        port = _FakePort(b"0\r" + bytes(se.SECTOR_SIZE))
+        emu._handle_fdc(se._SerialIO(port), "W")
+        assert self._delta(before) == (2 + se.SECTOR_SIZE, 16, 0, 1, 0, 0)
+
+    def test_missing_ack_is_a_timeout(self, tmp_path):
+        emu = _make_emulator(tmp_path)
+        before = self._counts()
+        emu._handle_fdc(se._SerialIO(_FakePort(b"0\r")), "R")
+        assert self._delta(before)[2:5] == (0, 0, 1)
@@ -4,6 +4,11 @@ tests/test_stage2_editor.py — Tests for the Stage 2 pixel editor endpoints.
 Covers:
   GET  /pattern/{number}/pixels — read committed pixel data and memo values
   PUT  /pattern/{number}        — overwrite an existing pattern (delete + rewrite)
+  PUT  /pattern/{number}/pixels — the same with a raw packed body
+  PATCH /pattern/{number}       — in-place cell, row and memo edits
+  copy-on-write publishing of _state.disk by all of the above
+  journalling of those edits to disk_dir
+  packed / RLE / binary pixel encodings on both
 
 Run with:
     pytest tests/test_stage2_editor.py -v
@@ -29,11 +34,19 @@ mock to its original return_value so other test classes are unaffected.
 
 from __future__ import annotations
 
+import base64
+import threading
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
 # Re-use the already-patched module and client from test_api — same pattern
 # as test_new_api_endpoints.py.
 from .test_api import _api_module, _mock_disk_image_cls, client
 
 from app.brother_format import DiskImage, MachineModel
+from app.persistence import DiskStore
 
 _state = _api_module._state
 
@@ -234,3 +247,363 @@ class TestPutPattern:
         data = r.json()
         assert data["pixels"] == edited_pixels
         assert data["memo"] == edited_memo
+
+
+# ===========================================================================
+# Compact pixel encodings
+# ===========================================================================
+
+# _SMALL_PIXELS packed one byte per row, leftmost stitch in the lowest bit.
+_SMALL_PACKED = bytes([0b0101, 0b1010, 0b0011])
+
+
+class TestPixelEncodings:
+    def setup_method(self) -> None:
+        _reset_disk()
+        _write_pattern(901, _SMALL_PIXELS, _SMALL_MEMO)
+        _mock_disk_image_cls.blank.side_effect = (
+            lambda model=MachineModel.KH940: DiskImage.blank(model)
+        )
+
+    def teardown_method(self) -> None:
+        _mock_disk_image_cls.blank.side_effect = None
+
+    def test_get_packed(self) -> None:
+        data = client.get("/pattern/901/pixels", params={"format": "packed"}).json()
+        assert data["encoding"] == "packed"
+        assert base64.b64decode(data["packed"]) == _SMALL_PACKED
+        assert "pixels" not in data
+        assert (data["width"], data["height"], data["memo"]) == (4, 3, _SMALL_MEMO)
+
+    def test_get_rle(self) -> None:
+        data = client.get("/pattern/901/pixels", params={"format": "rle"}).json()
+        assert data["rle"] == [[0, 1, 1, 1, 1], [1, 1, 1, 1], [0, 2, 2]]
+
+    def test_get_binary_by_query_or_accept(self) -> None:
+        by_query = client.get("/pattern/901/pixels", params={"format": "binary"})
+        by_accept = client.get(
+            "/pattern/901/pixels", headers={"Accept": "application/octet-stream"}
+        )
+        for r in (by_query, by_accept):
+            assert r.headers["content-type"] == "application/octet-stream"
+            assert r.content == _SMALL_PACKED
+            assert r.headers["X-Pattern-Width"] == "4"
+            assert r.headers["X-Pattern-Height"] == "3"
+            assert r.headers["X-Pattern-Memo"] == "123"
+        assert by_query.headers["ETag"] == by_accept.headers["ETag"]
+        assert (
+            by_query.headers["ETag"]
+            != client.get("/pattern/901/pixels").headers["ETag"]
+        )
+
+    def test_unknown_format_is_422(self) -> None:
+        r = client.get("/pattern/901/pixels", params={"format": "xml"})
+        assert r.status_code == 422
+
+    def test_put_packed(self) -> None:
+        edited = bytes([0b1111, 0, 0b1001])
+        r = client.put(
+            "/pattern/901",
+            json={
+                "packed": base64.b64encode(edited).decode(),
+                "width": 4,
+                "memo": [0, 0, 0],
+            },
+        )
+        assert r.status_code == 200
+        pixels = client.get("/pattern/901/pixels").json()["pixels"]
+        assert pixels == [[1, 1, 1, 1], [0, 0, 0, 0], [1, 0, 0, 1]]
+
+    def test_put_packed_clears_padding_and_skips_the_grid(self) -> None:
+        with patch.object(_api_module, "pack_rows", side_effect=AssertionError):
+            r = client.put(
+                "/pattern/901",
+                json={
+                    "packed": base64.b64encode(bytes([0xF1, 0xFE])).decode(),
+                    "width": 4,
+                    "memo": [0, 0],
+                },
+            )
+        assert r.status_code == 200
+        packed = client.get("/pattern/901/pixels", params={"format": "packed"})
+        assert base64.b64decode(packed.json()["packed"]) == bytes([0x01, 0x0E])
+
+    def test_put_rle(self) -> None:
+        r = client.put(
+            "/pattern/901",
+            json={"rle": [[0, 6], [6], [3, 3]], "memo": [0, 0, 0]},
+        )
+        assert r.status_code == 200
+        assert (r.json()["width"], r.json()["height"]) == (6, 3)
+        pixels = client.get("/pattern/901/pixels").json()["pixels"]
+        assert pixels == [[1] * 6, [0] * 6, [0, 0, 0, 1, 1, 1]]
+
+    def test_put_binary(self) -> None:
+        r = client.put(
+            "/pattern/901/pixels",
+            params={"width": 4},
+            content=bytes([0b1000, 0b0001]),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Pattern-Memo": "f0",
+            },
+        )
+        assert r.status_code == 200
+        data = client.get("/pattern/901/pixels").json()
+        assert data["pixels"] == [[0, 0, 0, 1], [1, 0, 0, 0]]
+        assert data["memo"] == [15, 0]
+
+    def test_round_trip_every_encoding(self) -> None:
+        wide = [[(x * y) % 3 == 0 for x in range(37)] for y in range(9)]
+        grid = [[int(v) for v in row] for row in wide]
+        _reset_disk()
+        _write_pattern(901, grid, [0] * 9)
+        for fmt in ("packed", "rle"):
+            data = client.get("/pattern/901/pixels", params={"format": fmt}).json()
+            body = {fmt: data[fmt], "width": data["width"], "memo": data["memo"]}
+            assert client.put("/pattern/901", json=body).status_code == 200
+            assert client.get("/pattern/901/pixels").json()["pixels"] == grid
+
+    def test_put_rejects_ambiguous_or_missing_pixels(self) -> None:
+        both = {"pixels": _SMALL_PIXELS, "rle": [[4]] * 3, "memo": [0, 0, 0]}
+        assert client.put("/pattern/901", json=both).status_code == 422
+        assert client.put("/pattern/901", json={"memo": []}).status_code == 422
+
+    def test_put_rejects_bad_packed_data(self) -> None:
+        body = {"packed": "not base64!", "width": 4, "memo": [0]}
+        assert client.put("/pattern/901", json=body).status_code == 422
+        body = {"packed": base64.b64encode(b"\x00" * 3).decode(), "memo": [0] * 3}
+        assert client.put("/pattern/901", json=body).status_code == 422
+        r = client.put(
+            "/pattern/901/pixels",
+            params={"width": 9},
+            content=b"\x00" * 3,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert r.status_code == 422
+
+    def test_put_rejects_inconsistent_rle(self) -> None:
+        body = {"rle": [[4], [3]], "memo": [0, 0]}
+        assert client.put("/pattern/901", json=body).status_code == 422
+
+    def test_put_rejects_huge_rle_runs_quickly(self) -> None:
+        for rle in ([[0, 4_000_000_000]], [[4], [0, 4_000_000_000]]):
+            body = {"rle": rle, "memo": [0] * len(rle)}
+            assert client.put("/pattern/901", json=body).status_code == 422
+
+    def test_put_binary_missing_pattern_is_404(self) -> None:
+        r = client.put(
+            "/pattern/950/pixels",
+            params={"width": 8},
+            content=b"\x00",
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert r.status_code == 404
+
+
+# ===========================================================================
+# PATCH /pattern/{number}
+# ===========================================================================
+
+
+class TestPatchPattern:
+    def setup_method(self) -> None:
+        _reset_disk()
+        _write_pattern(901, _SMALL_PIXELS, _SMALL_MEMO)
+
+    def test_applies_cells_rows_and_memo(self) -> None:
+        r = client.patch(
+            "/pattern/901",
+            json={
+                "cells": [{"x": 3, "y": 2, "value": 1}],
+                "rows": [{"start": 0, "pixels": [[1, 1, 1, 1], [0, 0, 0, 0]]}],
+                "memo": [{"row": 1, "value": 15}],
+            },
+        )
+        assert r.status_code == 200
+        data = r.json()
+        assert (data["number"], data["width"], data["height"]) == (901, 4, 3)
+        assert data["changed"] > 0
+        assert _state.disk.read_pattern(901) == [
+            [1, 1, 1, 1],
+            [0, 0, 0, 0],
+            [1, 1, 0, 1],
+        ]
+        assert _state.disk.read_memo(901) == [1, 15, 3]
+
+    def test_returns_etag_of_packed_pixels(self) -> None:
+        r = client.patch("/pattern/901", json={"cells": [{"x": 0, "y": 0, "value": 0}]})
+        assert r.headers["ETag"] == r.json()["etag"]
+        get = client.get("/pattern/901/pixels", params={"format": "packed"})
+        assert get.headers["ETag"] == r.json()["etag"]
+        again = client.get(
+            "/pattern/901/pixels",
+            params={"format": "packed"},
+            headers={"If-None-Match": r.json()["etag"]},
+        )
+        assert again.status_code == 304
+
+    def test_if_match(self) -> None:
+        etag = client.get("/pattern/901/pixels").headers["ETag"]
+        edit = {"memo": [{"row": 0, "value": 7}]}
+        r = client.patch("/pattern/901", json=edit, headers={"If-Match": etag})
+        assert r.status_code == 200
+        # The pattern has changed since etag was taken.
+        r = client.patch("/pattern/901", json=edit, headers={"If-Match": etag})
+        assert r.status_code == 412
+        r = client.patch("/pattern/901", json=edit, headers={"If-Match": "*"})
+        assert r.status_code == 200
+
+    def test_out_of_range_edit_is_422_and_changes_nothing(self) -> None:
+        r = client.patch(
+            "/pattern/901",
+            json={
+                "cells": [{"x": 0, "y": 0, "value": 0}, {"x": 4, "y": 0, "value": 1}]
+            },
+        )
+        assert r.status_code == 422
+        assert _state.disk.read_pattern(901) == _SMALL_PIXELS
+
+    def test_missing_pattern_is_404(self) -> None:
+        assert client.patch("/pattern/950", json={}).status_code == 404
+
+
+# ===========================================================================
+# Copy-on-write disk state
+# ===========================================================================
+
+
+class TestDiskSnapshots:
+    def setup_method(self) -> None:
+        _reset_disk()
+        _write_pattern(901, _SMALL_PIXELS, _SMALL_MEMO)
+        _write_pattern(902, [[1, 1]], [0])
+        _mock_disk_image_cls.blank.side_effect = (
+            lambda model=MachineModel.KH940: DiskImage.blank(model)
+        )
+
+    def teardown_method(self) -> None:
+        _mock_disk_image_cls.blank.side_effect = None
+
+    def test_writes_publish_a_new_disk_and_leave_the_old_one_alone(self) -> None:
+        before = _state.disk
+        data = before.working_region_bytes()
+        client.patch("/pattern/901", json={"memo": [{"row": 0, "value": 9}]})
+        assert _state.disk is not before
+        assert _state.disk.read_memo(901)[0] == 9
+        assert before.working_region_bytes() == data
+
+    def test_unchanged_edit_publishes_nothing(self) -> None:
+        before = _state.disk
+        client.patch("/pattern/901", json={"memo": [{"row": 0, "value": 1}]})
+        assert _state.disk is before
+
+    def test_send_serves_the_disk_as_it_was_when_requested(self) -> None:
+        _state.serial_port = "/dev/ttyUSB0"
+        try:
+            with patch("threading.Thread") as thread:
+                thread.return_value = MagicMock()
+                client.post("/send")
+        finally:
+            _state.serial_port = ""
+        sent = thread.call_args.kwargs["args"][2]
+        assert sent is _state.disk
+        client.delete("/pattern/902")
+        assert [e.number for e in sent.list_patterns()] == [901, 902]
+
+    def test_concurrent_writers_lose_no_updates(self) -> None:
+        _reset_disk()
+        _write_pattern(901, [[0] * 40] * 8, [0] * 8)
+
+        def toggle_row(y: int) -> None:
+            for x in range(40):
+                with _api_module._editing_disk(_state) as disk:
+                    disk.patch_pattern(901, cells=[(x, y, 1)])
+
+        threads = [threading.Thread(target=toggle_row, args=(y,)) for y in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert _state.disk.read_pattern(901) == [[1] * 40] * 8
+
+    def test_rebuild_is_redone_when_another_write_lands(self) -> None:
+        real_run = _api_module._workers.run
+        calls = 0
+
+        async def racing_run(fn: Any, *args: Any, **kwargs: Any) -> Any:
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                with _api_module._editing_disk(_state) as disk:
+                    disk.write_pattern(903, [[1]])
+            return await real_run(fn, *args, **kwargs)
+
+        with patch.object(_api_module._workers, "run", racing_run):
+            r = client.delete("/pattern/902")
+        assert r.status_code == 200
+        assert calls == 2
+        assert [e.number for e in _state.disk.list_patterns()] == [901, 903]
+
+
+class TestDiskPersistence:
+    """Edits are saved once the lifespan has opened the machine's store."""
+
+    def setup_method(self) -> None:
+        _reset_disk()
+        _write_pattern(901, _SMALL_PIXELS, _SMALL_MEMO)
+
+    def teardown_method(self) -> None:
+        _state.persistence.close()
+        _state.disk_dir = "/tmp/knitting_disk"
+
+    def _open(self, directory: Any) -> None:
+        _state.disk_dir = str(directory)
+        _api_module._open_disk_dir(_state)
+
+    def test_edits_survive_a_restart(self, tmp_path) -> None:
+        self._open(tmp_path)
+        client.patch("/pattern/901", json={"memo": [{"row": 0, "value": 9}]})
+        expected = _state.disk.working_region_bytes()
+
+        stored = DiskStore().open(tmp_path)
+        assert stored is not None and stored.region == expected
+
+    @pytest.mark.parametrize("stored", [False, True])
+    def test_start_reports_the_disk_once(self, tmp_path, stored) -> None:
+        if stored:
+            self._open(tmp_path)
+            _api_module._disk_changed(_state)
+            _state.persistence.close()
+            assert DiskStore().open(tmp_path) is not None
+        _state.disk_dir = str(tmp_path)
+        changed = _api_module._disk_changed
+        with (
+            patch.object(_api_module, "DiskImage", DiskImage),
+            patch.object(_api_module, "MachineModel", MachineModel),
+            patch.object(_api_module, "_disk_changed", wraps=changed) as spy,
+        ):
+            _api_module._start_machine(_state)
+        assert spy.call_count == 1
+
+    def test_moving_disk_dir_saves_state_there(self, tmp_path) -> None:
+        self._open(tmp_path / "old")
+        _state.sector_id = {0: b"\x01" * 12}
+        try:
+            r = client.put("/config", json={"disk_dir": str(tmp_path / "new")})
+        finally:
+            _state.sector_id = {}
+        assert r.json()["disk_dir"] == str(tmp_path / "new")
+
+        stored = DiskStore().open(tmp_path / "new")
+        assert stored is not None
+        assert stored.region == _state.disk.working_region_bytes()
+        assert stored.sector_id == {0: b"\x01" * 12}
+
+    def test_unusable_disk_dir_is_rejected(self, tmp_path) -> None:
+        self._open(tmp_path)
+        (tmp_path / "file").write_bytes(b"")
+        r = client.put("/config", json={"disk_dir": str(tmp_path / "file" / "x")})
+        assert r.status_code == 400
+        assert _state.disk_dir == str(tmp_path)
+        assert _state.persistence.directory == tmp_path
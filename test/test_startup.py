@@ -0,0 +1,90 @@
+"""
+tests/test_startup.py — Tests for how quickly the API starts: the import-time
+budget of app.api, lazily imported modules and background port discovery.
+
+Run with:
+    pytest tests/test_startup.py -v
+
+KNITTING_IMPORT_BUDGET (seconds, default 3) sets the import-time budget.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from .test_api import _api_module, _state, client
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules app.api must not import until they are needed.
+_LAZY = ("PIL.Image", "serial.tools.list_ports", "app.serial_emulator")
+
+_MEASURE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.api
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "loaded": [m for m in {_LAZY!r} if m in sys.modules],
+}}))
+"""
+
+
+def _import_api() -> dict:
+    """Import app.api in a fresh interpreter; its import time and lazy modules."""
+    out = subprocess.run(
+        [sys.executable, "-c", _MEASURE],
+        cwd=_ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+        env={**os.environ, "KNITTING_WORKERS": "0"},
+    )
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+class TestImport:
+    def test_import_is_within_budget(self):
+        budget = float(os.environ.get("KNITTING_IMPORT_BUDGET", "3"))
+        # The best of two runs: the first may also compile bytecode.
+        seconds = min(_import_api()["seconds"] for _ in range(2))
+        assert seconds < budget, f"import app.api took {seconds:.2f} s"
+
+    def test_heavy_modules_load_lazily(self):
+        assert _import_api()["loaded"] == []
+
+
+class TestPortDiscovery:
+    def setup_method(self):
+        self._port = _state.serial_port
+        _state.serial_port = ""
+
+    def teardown_method(self):
+        _state.serial_port = self._port
+
+    def test_runs_in_the_background(self):
+        _api_module._start_port_discovery().join(timeout=5)
+        r = client.get("/ports/discovery")
+        assert r.json() == {
+            "status": "found",
+            "port": "/dev/ttyUSB0",
+            "error": None,
+            "serial_port": "/dev/ttyUSB0",
+        }
+
+    def test_does_not_replace_a_configured_port(self):
+        _state.serial_port = "/dev/ttyS1"
+        _api_module._startup_discover_port()
+        assert client.get("/ports/discovery").json()["status"] == "skipped"
+        assert _state.serial_port == "/dev/ttyS1"
+
+    def test_send_while_discovering(self):
+        with patch.object(_api_module._discovery, "status", "running"):
+            r = client.post("/send")
+        assert r.status_code == 503
+        assert "still running" in r.json()["detail"]["message"]
@@ -0,0 +1,107 @@
+"""
+tests/test_static_assets.py — Tests for app/static_assets.py and the /static
+mount.
+
+Run with:
+    pytest tests/test_static_assets.py -v
+"""
+
+from __future__ import annotations
+
+import re
+
+from fastapi import FastAPI
+
+from app.static_assets import StaticAssets
+
+from .test_api import TestClient, client
+
+_CSS = b"body { color: red; }\n" * 50
+
+
+def _client(tmp_path) -> tuple[TestClient, StaticAssets]:
+    (tmp_path / "site.css").write_bytes(_CSS)
+    (tmp_path / "tiny.txt").write_bytes(b"x")
+    (tmp_path / "index.html").write_bytes(
+        b'<link rel="stylesheet" href="site.css"><a href="/elsewhere.css">'
+    )
+    assets = StaticAssets(tmp_path)
+    app = FastAPI()
+    app.mount("/static", assets)
+    return TestClient(app), assets
+
+
+class TestStaticAssets:
+    def test_precompressed_gzip(self, tmp_path):
+        c, _ = _client(tmp_path)
+        r = c.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["vary"] == "Accept-Encoding"
+        assert r.headers["content-type"] == "text/css; charset=utf-8"
+        assert r.content == _CSS  # decoded by the client
+
+    def test_identity_when_not_accepted_or_not_smaller(self, tmp_path):
+        c, _ = _client(tmp_path)
+        r = c.get("/static/site.css", headers={"Accept-Encoding": "gzip;q=0"})
+        assert "content-encoding" not in r.headers
+        assert int(r.headers["content-length"]) == len(_CSS)
+        r = c.get("/static/tiny.txt", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in r.headers and "vary" not in r.headers
+
+    def test_hashed_names_are_immutable(self, tmp_path):
+        c, assets = _client(tmp_path)
+        css = assets.asset("site.css")
+        assert css is not None and re.fullmatch(
+            r"site\.[0-9a-f]{12}\.css", css.hashed_name
+        )
+        r = c.get(f"/static/{css.hashed_name}")
+        assert r.content == _CSS
+        assert "immutable" in r.headers["cache-control"]
+        assert c.get("/static/site.css").headers["cache-control"] == "no-cache"
+
+    def test_html_references_hashed_names(self, tmp_path):
+        c, assets = _client(tmp_path)
+        css = assets.asset("site.css")
+        assert css is not None
+        html = c.get("/static/index.html").text
+        assert f'href="{css.hashed_name}"' in html
+        assert 'href="/elsewhere.css"' in html
+
+    def test_etag_revalidation(self, tmp_path):
+        c, _ = _client(tmp_path)
+        headers = {"Accept-Encoding": "gzip"}
+        etag = c.get("/static/site.css", headers=headers).headers["etag"]
+        r = c.get("/static/site.css", headers={**headers, "If-None-Match": etag})
+        assert r.status_code == 304 and r.content == b""
+        r = c.get(
+            "/static/site.css",
+            headers={"Accept-Encoding": "identity", "If-None-Match": etag},
+        )
+        assert r.status_code == 200  # a different representation
+
+    def test_head_missing_and_other_methods(self, tmp_path):
+        c, _ = _client(tmp_path)
+        r = c.head("/static/site.css", headers={"Accept-Encoding": "identity"})
+        assert r.content == b"" and int(r.headers["content-length"]) == len(_CSS)
+        assert c.get("/static/nope.js").status_code == 404
+        assert c.post("/static/site.css").status_code == 405
+
+    def test_reload_picks_up_changes(self, tmp_path):
+        c, assets = _client(tmp_path)
+        c.get("/static/tiny.txt")
+        (tmp_path / "tiny.txt").write_bytes(b"y")
+        assets.reload()
+        assert c.get("/static/tiny.txt").content == b"y"
+
+
+class TestFrontend:
+    def test_frontend_loads_hashed_script_and_stylesheet(self):
+        html = client.get("/static/frontend.html")
+        assert html.headers["cache-control"] == "no-cache"
+        (script,) = re.findall(r'<script src="([^"]+)"', html.text)
+        assert re.fullmatch(r"frontend\.[0-9a-f]{12}\.js", script)
+        r = client.get(f"/static/{script}", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert "immutable" in r.headers["cache-control"]
+        assert "const API" in r.text
+        assert int(r.headers["content-length"]) < len(r.content) // 2
@@ -0,0 +1,214 @@
+"""
+tests/test_thumbnails.py — Tests for the sprite-sheet thumbnails in
+app/thumbnails.py.
+
+Run with:
+    pytest tests/test_thumbnails.py -v
+"""
+
+from __future__ import annotations
+
+import io
+from unittest.mock import patch
+
+from PIL import Image
+
+import app.thumbnails as thumbnails
+from app.brother_format import DiskImage
+from app.thumbnails import (
+    DEFAULT_PADDING,
+    ThumbnailStore,
+    build_sprite_sheet,
+    disk_sprite_sheet,
+    pattern_png,
+)
+from app.util import pack_rows
+
+
+def _pattern(number: int, grid: list[list[int]]) -> tuple[int, bytes, int, int]:
+    return number, pack_rows(grid, len(grid[0])), len(grid[0]), len(grid)
+
+
+def _checker(stitches: int, rows: int) -> list[list[int]]:
+    return [[(x + y) % 2 for x in range(stitches)] for y in range(rows)]
+
+
+def _cut(sheet, sprite) -> list[list[int]]:
+    img = Image.open(io.BytesIO(sheet.png))
+    assert img.mode == "1"
+    return [
+        [
+            int(img.getpixel((sprite.x + x, sprite.y + y)) == 0)
+            for x in range(sprite.width)
+        ]
+        for y in range(sprite.height)
+    ]
+
+
+class TestBuildSpriteSheet:
+    def test_sprites_round_trip(self):
+        grids = {901: _checker(10, 5), 902: [[1, 0, 0]] * 7, 903: _checker(200, 3)}
+        sheet = build_sprite_sheet(_pattern(n, g) for n, g in grids.items())
+        assert [s.number for s in sheet.sprites] == [901, 902, 903]
+        for sprite in sheet.sprites:
+            assert _cut(sheet, sprite) == grids[sprite.number]
+
+    def test_sprites_do_not_overlap_and_fit(self):
+        patterns = [
+            _pattern(901 + i, _checker(30 + 17 * i, 5 + 3 * i)) for i in range(10)
+        ]
+        sheet = build_sprite_sheet(patterns, sheet_width=128)
+        boxes = [(s.x, s.y, s.x + s.width, s.y + s.height) for s in sheet.sprites]
+        for i, a in enumerate(boxes):
+            assert a[2] <= sheet.width and a[3] <= sheet.height
+            for b in boxes[i + 1 :]:
+                assert (
+                    a[2] + DEFAULT_PADDING <= b[0]
+                    or b[2] + DEFAULT_PADDING <= a[0]
+                    or a[3] + DEFAULT_PADDING <= b[1]
+                    or b[3] + DEFAULT_PADDING <= a[1]
+                )
+
+    def test_widens_for_wide_pattern(self):
+        sheet = build_sprite_sheet([_pattern(901, _checker(200, 2))], sheet_width=64)
+        assert sheet.width == 200
+
+    def test_empty(self):
+        sheet = build_sprite_sheet([])
+        assert sheet.sprites == []
+        assert Image.open(io.BytesIO(sheet.png)).size == (sheet.width, 1)
+
+
+class TestDiskSpriteSheet:
+    def test_cached_until_disk_changes(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, _checker(8, 4))
+        with patch.object(
+            thumbnails, "build_sprite_sheet", wraps=build_sprite_sheet
+        ) as build:
+            first = disk_sprite_sheet(d)
+            assert disk_sprite_sheet(d) is first
+            assert build.call_count == 1
+            d.write_pattern(902, _checker(4, 4))
+            second = disk_sprite_sheet(d)
+            assert build.call_count == 2
+        assert second.generation == d.generation
+        assert [s.number for s in second.sprites] == [901, 902]
+
+    def test_other_disk_is_not_served_from_cache(self):
+        a, b = DiskImage.blank(), DiskImage.blank()
+        a.write_pattern(901, _checker(8, 4))
+        assert [s.number for s in disk_sprite_sheet(a).sprites] == [901]
+        assert disk_sprite_sheet(b).sprites == []
+
+    def test_disks_do_not_evict_each_other(self):
+        a, b = DiskImage.blank(), DiskImage.blank()
+        a.write_pattern(901, _checker(8, 4))
+        first = disk_sprite_sheet(a)
+        disk_sprite_sheet(b)
+        assert disk_sprite_sheet(a) is first
+
+    def test_cache_is_bounded(self):
+        disks = [DiskImage.blank() for _ in range(thumbnails._SHEET_CACHE_SIZE + 1)]
+        first = disk_sprite_sheet(disks[0])
+        for d in disks[1:]:
+            disk_sprite_sheet(d)
+        assert len(thumbnails._cache) == thumbnails._SHEET_CACHE_SIZE
+        assert disk_sprite_sheet(disks[0]) is not first
+
+
+class TestPatternPng:
+    def test_knit_is_black_one_bit(self):
+        img = Image.open(io.BytesIO(pattern_png(pack_rows([[1, 0]], 2), 2, 1)))
+        assert img.mode == "1"
+        assert [img.getpixel((0, 0)), img.getpixel((1, 0))] == [0, 255]
+
+
+class TestThumbnailStore:
+    def _disk(self):
+        d = DiskImage.blank()
+        d.write_pattern(901, _checker(8, 4))
+        d.write_pattern(902, _checker(5, 3))
+        return d
+
+    def test_serves_rendered_pngs_at_current_generation(self):
+        d = self._disk()
+        store = ThumbnailStore()
+        assert store.get(901, d.generation) is None
+        store.refresh(d)
+        thumb = store.get(901, d.generation)
+        assert (thumb.width, thumb.height) == (8, 4)
+        assert thumb.png == pattern_png(d.read_pattern_packed(901), 8, 4)
+        assert store.get(999, d.generation) is None
+
+    def test_stale_store_answers_nothing(self):
+        d = self._disk()
+        store = ThumbnailStore()
+        store.refresh(d)
+        d.write_pattern(903, _checker(2, 2))
+        assert store.get(901, d.generation) is None
+
+    def test_unchanged_patterns_are_not_re_rendered(self):
+        d = self._disk()
+        store = ThumbnailStore()
+        store.refresh(d)
+        before = store.get(901, d.generation)
+        d.write_pattern(903, _checker(2, 2))
+        with patch.object(thumbnails, "pattern_png", wraps=pattern_png) as render:
+            store.refresh(d)
+        assert render.call_count == 1
+        assert store.get(901, d.generation) is before
+
+    def test_removed_patterns_are_evicted(self):
+        d = self._disk()
+        store = ThumbnailStore()
+        store.refresh(d)
+        fresh = DiskImage.blank()
+        fresh.write_pattern(902, _checker(5, 3))
+        store.refresh(fresh)
+        assert len(store) == 1
+        assert store.get(901, fresh.generation) is None
+
+    def test_memory_is_bounded(self):
+        d = self._disk()
+        one = len(pattern_png(d.read_pattern_packed(901), 8, 4))
+        store = ThumbnailStore(max_bytes=one)
+        store.refresh(d)
+        assert len(store) == 1
+        assert store.bytes_used <= one
+
+    def test_refresh_keeps_recency(self):
+        d = self._disk()
+        store = ThumbnailStore()
+        store.refresh(d)
+        store.get(901, d.generation)
+        d.write_pattern(903, _checker(2, 2))
+        store.refresh(d)
+        assert list(store._entries) == [902, 901, 903]
+
+    def test_evicted_patterns_are_not_re_rendered(self):
+        d = self._disk()
+        one = len(pattern_png(d.read_pattern_packed(902), 5, 3))
+        store = ThumbnailStore(max_bytes=one)
+        store.refresh(d)
+        assert list(store._entries) == [902]
+        d.write_pattern(903, _checker(2, 2))
+        with patch.object(thumbnails, "pattern_png", wraps=pattern_png) as render:
+            store.refresh(d)
+        assert render.call_count == 1  # only 903
+
+    def test_schedule_renders_in_background(self):
+        d = self._disk()
+        store = ThumbnailStore()
+        store.schedule(d)
+        generation = d.generation
+        # Published disks are replaced, never changed in place.
+        d = d.snapshot()
+        d.write_pattern(903, _checker(2, 2))
+        assert store.wait(5)
+        assert store.get(901, generation) is not None
+        assert store.get(903, generation) is None
+        store.schedule(d)
+        assert store.wait(5)
+        assert store.get(903, d.generation) is not None
+        assert disk_sprite_sheet(d).generation == d.generation
@@ -0,0 +1,73 @@
+"""
+tests/test_timing.py — Tests for app/timing.py and the Server-Timing header.
+
+Run with:
+    pytest tests/test_timing.py -v
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from app import timing
+from app.metrics import Registry
+
+from .helpers import _make_png_bytes
+from .test_api import client
+
+
+def _stages(header: str) -> dict[str, str]:
+    """Server-Timing header value -> {name: rest of the entry}."""
+    entries = (part.strip().split(";", 1) for part in header.split(","))
+    return {name: rest for name, rest in entries}
+
+
+class TestTimings:
+    def test_header(self):
+        t = timing.Timings()
+        t.add("decode", 0.0015)
+        t.add("png", 0.001)
+        t.add("png", 0.002)
+        assert t.header(0.01) == (
+            'decode;dur=1.50, png;dur=3.00;desc="2x", total;dur=10.00'
+        )
+
+    def test_records_only_inside_collect(self):
+        timing.record("lost", 1.0)
+        with timing.collect() as t:
+            with timing.stage("kept"):
+                pass
+            timing.merge([("worker", 0.5, 2)])
+        assert [name for name, _, _ in t.items()] == ["kept", "worker"]
+        assert t.items()[1] == ("worker", 0.5, 2)
+
+    def test_threads_record_into_the_request(self):
+        async def handler() -> list[timing.Entry]:
+            with timing.collect() as t:
+                await asyncio.to_thread(timing.record, "thread", 0.25)
+            return t.items()
+
+        assert asyncio.run(handler()) == [("thread", 0.25, 1)]
+
+    def test_histogram_timing_prefix(self):
+        h = Registry().histogram("x_seconds", "X.", ("op",), timing="x-")
+        with timing.collect() as t:
+            h.labels("encode").observe(0.1)
+        assert t.items() == [("x-encode", 0.1, 1)]
+
+
+class TestServerTimingHeader:
+    def test_every_response_has_a_total(self):
+        r = client.get("/config")
+        assert "total" in _stages(r.headers["server-timing"])
+
+    def test_preview_breaks_down_stages(self):
+        r = client.post(
+            "/preview",
+            data={"max_float": "5"},
+            files={"file": ("f.png", _make_png_bytes(40, 20), "image/png")},
+        )
+        assert r.status_code == 200
+        stages = _stages(r.headers["server-timing"])
+        for name in ("open", "scale", "binarise", "png", "base64", "total"):
+            assert stages[name].startswith("dur=")
@@ -0,0 +1,151 @@
+"""
+tests/test_workers.py — Tests for the worker process pool in app/workers.py.
+
+Run with:
+    pytest tests/test_workers.py -v
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pickle
+
+import pytest
+
+from app.brother_format import DiskImage
+from app.image import ImageError, SweepVariant, load_image
+from app.metrics import REGISTRY
+from app.util import pack_rows
+from app.workers import (
+    CompactionError,
+    WorkerPool,
+    convert_frames,
+    convert_image,
+    rebuild_disk,
+    render_preview,
+    render_sweep,
+)
+
+from .helpers import _make_multiframe_bytes, _make_png_bytes
+
+
+def _checker(stitches: int, rows: int) -> list[list[int]]:
+    return [[(x + y) % 2 for x in range(stitches)] for y in range(rows)]
+
+
+def _disk() -> DiskImage:
+    d = DiskImage.blank()
+    d.write_pattern(901, _checker(8, 4), [1, 2, 3, 4])
+    d.write_pattern(902, _checker(5, 3))
+    d.write_pattern(903, [[1] * 4] * 2)
+    return d
+
+
+@pytest.fixture(scope="module")
+def pool():
+    p = WorkerPool()
+    p.start(1)
+    yield p
+    p.close()
+
+
+class TestWorkerPool:
+    def test_runs_in_worker_process(self, pool):
+        png = _make_png_bytes(20, 10, color=0)
+        result = asyncio.run(pool.run(convert_image, png, {"threshold": 100}))
+        expected = load_image(png, threshold=100)
+        assert (result.packed, result.width, result.height) == (
+            expected.packed,
+            expected.width,
+            expected.height,
+        )
+
+    def test_exceptions_are_reraised(self, pool):
+        with pytest.raises(ImageError):
+            asyncio.run(pool.run(convert_image, b"not an image", {}))
+
+    def test_returned_disk_gets_fresh_generation(self, pool):
+        disk = _disk()
+        rebuilt = asyncio.run(pool.run(rebuild_disk, disk, disk.model, 902))
+        assert [e.number for e in rebuilt.list_patterns()] == [901, 903]
+        assert rebuilt.generation > disk.generation
+
+    def test_sweep_runs_in_worker_process(self, pool):
+        png = _make_png_bytes(20, 10, color=0)
+        variants = [SweepVariant(threshold=100), SweepVariant(threshold=200)]
+        rendered = asyncio.run(pool.run(render_sweep, png, variants, {}, sheet=True))
+        assert len(rendered.pngs) == len(rendered.sweep.results) == 2
+        assert rendered.sheet_png is not None
+
+    def test_unstarted_pool_runs_in_thread(self):
+        png = _make_png_bytes(20, 10, color=0)
+        result = asyncio.run(WorkerPool().run(convert_image, png, {}))
+        assert result.packed == load_image(png).packed
+
+
+class TestTasks:
+    def test_convert_image_tile_and_floats(self):
+        png = _make_png_bytes(40, 10, color=0)
+        tiled = convert_image(png, {"stitch_aspect_ratio": 1}, store_tile=True)
+        assert (tiled.width, tiled.height) == (1, 1)
+        fixed = convert_image(png, {"stitch_aspect_ratio": 1}, fix_floats=5)
+        assert fixed.find_floats(5) == []
+
+    def test_convert_frames_stops_at_max_frames(self):
+        data = _make_multiframe_bytes(3)
+        assert len(convert_frames(data, {})) == 3
+        assert len(convert_frames(data, {}, max_frames=2)) == 2
+
+    def test_render_sweep_sheet_only_when_asked(self):
+        png = _make_png_bytes(20, 10, color=0)
+        rendered = render_sweep(png, [SweepVariant()], {})
+        assert rendered.sheet_png is None
+        assert rendered.pngs[0].startswith(b"\x89PNG")
+
+    def test_render_preview_floats_only_with_max_float(self):
+        png = _make_png_bytes(40, 10, color=0)
+        plain = render_preview(png, {})
+        assert plain.floats is None and plain.heatmap_png is None
+        assert plain.png.startswith(b"\x89PNG")
+        report = render_preview(png, {}, max_float=7)
+        assert report.floats and report.heatmap_png is not None
+        fixed = render_preview(png, {}, max_float=7, fix_floats=True)
+        assert fixed.floats == []
+
+    def test_rebuild_disk_removes_or_replaces(self):
+        disk = _disk()
+        removed = rebuild_disk(disk, disk.model, 901)
+        assert [e.number for e in removed.list_patterns()] == [902, 903]
+        assert removed.read_pattern(903) == [[1] * 4] * 2
+
+        replaced = rebuild_disk(
+            disk, disk.model, 902, (pack_rows([[1, 0]], 2), 2, 1, [7])
+        )
+        assert [e.number for e in replaced.list_patterns()] == [901, 902, 903]
+        assert replaced.read_pattern(902) == [[1, 0]]
+        assert replaced.read_memo(901) == [1, 2, 3, 4]
+
+    def test_rebuild_disk_rejected_pattern(self):
+        disk = _disk()
+        with pytest.raises(CompactionError) as info:
+            rebuild_disk(disk, disk.model, 902, (bytes(38), 300, 1, [0]))
+        assert isinstance(info.value.__cause__, ValueError)
+
+
+class TestDiskImagePickling:
+    def test_round_trip_keeps_data_with_new_generation(self):
+        disk = _disk()
+        copy = pickle.loads(pickle.dumps(disk))
+        assert copy.working_region_bytes() == disk.working_region_bytes()
+        assert copy.generation != disk.generation
+        copy.write_pattern(904, [[1]])
+        assert disk.get_pattern_entry(904) is None
+
+
+class TestWorkerMetrics:
+    def test_worker_metrics_reach_the_server(self, pool):
+        stages = REGISTRY.get("knitting_load_image_stage_seconds")
+        assert stages is not None
+        before = sum(stages.labels("open").counts)
+        asyncio.run(pool.run(convert_image, _make_png_bytes(20, 10), {}))
+        assert sum(stages.labels("open").counts) == before + 1